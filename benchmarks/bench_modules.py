@@ -0,0 +1,427 @@
+# ==============================================================
+# === Microbenchmark Suite for modules/ (Time / Throughput / Peak Allocation) ===
+# ==============================================================
+# (実行例)
+#   python benchmarks/bench_modules.py -o bench_result.json
+#   python benchmarks/bench_modules.py --quick --filter stft
+#   python benchmarks/bench_modules.py -o new.json --compare bench_result.json --threshold 10
+import argparse
+import contextlib
+import datetime
+import io
+import itertools
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import scipy
+
+# リポジトリルートをimportパスに追加 (「python benchmarks/bench_modules.py」での実行向け)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.audio_signal_processing_advanced import (  # noqa: E402
+    gen_mel_filter_bank, overlap, window)
+from modules.audio_signal_processing_basic import (  # noqa: E402
+    a_weighting, discrete_data_normalize, dft_normalize, gen_time_axis_data)
+from modules.decimate_waveform import MinMaxPyramid  # noqa: E402
+from modules.gen_cepstrum_data import (  # noqa: E402
+    gen_cepstrum_data, gen_melscale_spctrm_env_data, gen_mfcc_spctrm_env_data)
+from modules.gen_freq_domain_data import (  # noqa: E402
+    gen_freq_domain_data, gen_freq_domain_data_of_signal_spctrgrm,
+    gen_freq_domain_data_of_stft, gen_fundamental_freq_data)
+from modules.octave_band_analyzer import OctaveBandAnalyzer  # noqa: E402
+from modules.spl_meter import SPLMeter  # noqa: E402
+from modules.stream_resampler import (  # noqa: E402
+    RESAMPLE_QUALITY_PRESETS, StreamResampler)
+
+# === ベンチマーク パラメータマトリクス ===
+# samplerate    : サンプリング周波数[Hz]
+# buffer_len    : 入力データ数 (リアルタイムモードの1バッファ ～ レコーディングモードの数秒分)
+# frame_size    : STFTフレーム長
+PARAM_MATRIX = {
+    "samplerate": [8000, 16000, 48000],
+    "buffer_len": [1024 * 8, 1024 * 64],
+    "frame_size": [256, 1024]
+}
+
+# --quick指定時のパラメータマトリクス
+PARAM_MATRIX_QUICK = {
+    "samplerate": [16000],
+    "buffer_len": [1024 * 8],
+    "frame_size": [512]
+}
+
+# サンプリング周波数変換ベンチマークの入力サンプリング周波数[Hz] (一般的なデバイスのネイティブサンプリング周波数)
+RESAMPLE_IN_RATE = 48000
+
+# 1ベンチマークあたりの最小計測時間[s] / 最小・最大呼出回数
+DEFAULT_MIN_TIME = 0.2
+MIN_CALLS = 3
+MAX_CALLS = 1000
+
+
+def gen_synthetic_signal(samplerate, buffer_len, seed=0):
+    # ==========================================
+    # === 合成テスト信号生成関数 ===
+    # ==========================================
+    # 基本周波数が緩やかに変化する調波信号 + 白色雑音 (正規化済 -1.0～+1.0)
+    # samplerate    : サンプリング周波数[Hz]
+    # buffer_len    : データ数
+    # seed          : 乱数シード
+    rng = np.random.default_rng(seed)
+    t = np.arange(buffer_len) / samplerate
+    f0 = 150 + 30 * np.sin(2 * np.pi * 0.5 * t)
+    phase = 2 * np.pi * np.cumsum(f0) / samplerate
+    data = sum((0.5 / k) * np.sin(k * phase) for k in range(1, 6))
+    data = data + 0.01 * rng.standard_normal(buffer_len)
+    data = data / np.max(np.abs(data)) * 0.8
+
+    # data : 合成テスト信号 1次元配列 (float64)
+    return data
+
+
+# ==============================================
+# === ベンチマーク対象 (引数生成関数 & 対象関数) ===
+# ==============================================
+# 引数生成関数は(samplerate, buffer_len, frame_size)を受け取り、対象関数の引数タプルを返す
+# (計測対象外の前処理は引数生成関数側で実施する)
+# uses : 使用するパラメータマトリクスの軸 (未使用の軸は先頭値のみで計測する)
+
+def _args_signal(sr, n, fs):
+    return (gen_synthetic_signal(sr, n),)
+
+
+def _args_bytes(sr, n, fs):
+    data = gen_synthetic_signal(sr, n)
+    return ((data * 32767).astype(np.int16).tobytes(), "int16")
+
+
+def _args_time_axis(sr, n, fs):
+    return (gen_synthetic_signal(sr, n), sr)
+
+
+def _args_dft_normalize(sr, n, fs):
+    return (scipy.fft.fft(gen_synthetic_signal(sr, n)),)
+
+
+def _args_a_weighting(sr, n, fs):
+    return (scipy.fft.fftfreq(n, d=1 / sr)[:n // 2].copy(),)
+
+
+def _args_overlap(sr, n, fs):
+    return (gen_synthetic_signal(sr, n), sr, fs, 50)
+
+
+def _args_window(sr, n, fs):
+    data_overlaped, N_ave, _ = overlap(gen_synthetic_signal(sr, n), sr, fs, 50)
+    return (data_overlaped, fs, N_ave, "hann")
+
+
+def _args_freq_domain(sr, n, fs):
+    return (gen_synthetic_signal(sr, n), sr, 0, True)
+
+
+def _args_signal_spctrgrm(sr, n, fs):
+    return (gen_synthetic_signal(sr, n), sr, fs, 50, "hann", 0, True)
+
+
+def _args_stft(sr, n, fs):
+    data_overlaped, N_ave, final_time = overlap(gen_synthetic_signal(sr, n), sr, fs, 50)
+    data_applied_window, acf = window(data_overlaped, fs, N_ave, "hann")
+    return (data_applied_window, sr, fs, N_ave, final_time, acf, 0, True)
+
+
+def _args_f0(sr, n, fs):
+    return (gen_synthetic_signal(sr, n), sr)
+
+
+def _args_cepstrum(sr, n, fs):
+    return (gen_synthetic_signal(sr, n), sr, 0)
+
+
+def _args_mel_filter_bank(sr, n, fs):
+    return (gen_synthetic_signal(sr, n), sr, 32)
+
+
+def _args_melscale(sr, n, fs):
+    return (gen_synthetic_signal(sr, n), sr, 32, 0)
+
+
+def _args_mfcc(sr, n, fs):
+    melscale_amp_normalized, _, _ = gen_melscale_spctrm_env_data(gen_synthetic_signal(sr, n), sr, 32, 0)
+    return (melscale_amp_normalized, 12, 32)
+
+
+def _args_freq_domain_spl_a(sr, n, fs):
+    # 周波数領域でのA特性補正 (dB SPL(A)) / SPLMeterとの比較用
+    return (gen_synthetic_signal(sr, n), sr, 2e-5, True)
+
+
+def _spl_meter(meter, data):
+    return meter.process(data)
+
+
+def _args_spl_meter(sr, n, fs):
+    # フィルタ状態を保持したまま繰返し算出する
+    return (SPLMeter(sr, dbref=2e-5, A=True), gen_synthetic_signal(sr, n))
+
+
+def _octave_band(analyzer, data):
+    return analyzer.process(data)
+
+
+def _gen_args_octave_band(fraction):
+    # 帯域分割数毎の引数生成関数 (フィルタ状態を保持したまま繰返し分析する)
+    def _args_octave_band(sr, n, fs):
+        return (OctaveBandAnalyzer(sr, fraction=fraction), gen_synthetic_signal(sr, n))
+    return _args_octave_band
+
+
+def _stream_resample(resampler, data):
+    return resampler.process(data)
+
+
+def _gen_args_stream_resample(quality):
+    # 品質プリセット毎の引数生成関数
+    # (n = 変換後のデータ数 / 入力は同一時間長のRESAMPLE_IN_RATEのデータとし、フィルタ状態を保持したまま繰返し変換する)
+    def _args_stream_resample(sr, n, fs):
+        n_in = n * RESAMPLE_IN_RATE // sr
+        data = (gen_synthetic_signal(RESAMPLE_IN_RATE, n_in) * 32767).astype(np.int16).tobytes()
+        return (StreamResampler(RESAMPLE_IN_RATE, sr, quality=quality), data)
+    return _args_stream_resample
+
+
+BENCHMARKS = [
+    # (ベンチマーク名, 対象関数, 引数生成関数, 使用するパラメータ軸)
+    ("discrete_data_normalize", discrete_data_normalize, _args_bytes, ("samplerate", "buffer_len")),
+    ("gen_time_axis_data", gen_time_axis_data, _args_time_axis, ("samplerate", "buffer_len")),
+    ("dft_normalize", dft_normalize, _args_dft_normalize, ("samplerate", "buffer_len")),
+    ("a_weighting", a_weighting, _args_a_weighting, ("samplerate", "buffer_len")),
+    ("overlap", overlap, _args_overlap, ("samplerate", "buffer_len", "frame_size")),
+    ("window", window, _args_window, ("samplerate", "buffer_len", "frame_size")),
+    ("gen_freq_domain_data", gen_freq_domain_data, _args_freq_domain, ("samplerate", "buffer_len")),
+    ("gen_freq_domain_data[dB SPL(A)]", gen_freq_domain_data, _args_freq_domain_spl_a, ("samplerate", "buffer_len")),
+    ("SPLMeter", _spl_meter, _args_spl_meter, ("samplerate", "buffer_len")),
+    ("OctaveBandAnalyzer[1/1]", _octave_band, _gen_args_octave_band(1), ("samplerate", "buffer_len")),
+    ("OctaveBandAnalyzer[1/3]", _octave_band, _gen_args_octave_band(3), ("samplerate", "buffer_len")),
+    (
+        "gen_freq_domain_data_of_signal_spctrgrm",
+        gen_freq_domain_data_of_signal_spctrgrm,
+        _args_signal_spctrgrm,
+        ("samplerate", "buffer_len", "frame_size")
+    ),
+    ("gen_freq_domain_data_of_stft", gen_freq_domain_data_of_stft, _args_stft, ("samplerate", "buffer_len", "frame_size")),
+    ("gen_fundamental_freq_data", gen_fundamental_freq_data, _args_f0, ("samplerate", "buffer_len")),
+    ("gen_cepstrum_data", gen_cepstrum_data, _args_cepstrum, ("samplerate", "buffer_len")),
+    ("gen_mel_filter_bank", gen_mel_filter_bank, _args_mel_filter_bank, ("samplerate", "buffer_len")),
+    ("gen_melscale_spctrm_env_data", gen_melscale_spctrm_env_data, _args_melscale, ("samplerate", "buffer_len")),
+    ("gen_mfcc_spctrm_env_data", gen_mfcc_spctrm_env_data, _args_mfcc, ("samplerate", "buffer_len")),
+    ("MinMaxPyramid", MinMaxPyramid, _args_signal, ("samplerate", "buffer_len")),
+    *[
+        (
+            "StreamResampler[" + quality + "]",
+            _stream_resample,
+            _gen_args_stream_resample(quality),
+            ("samplerate", "buffer_len")
+        )
+        for quality in RESAMPLE_QUALITY_PRESETS
+    ]
+]
+
+
+def gen_param_combinations(param_matrix, uses):
+    # ==================================================
+    # === パラメータ組合せ生成関数 ===
+    # ==================================================
+    # param_matrix  : パラメータマトリクス辞書
+    # uses          : 使用するパラメータ軸のタプル (未使用の軸は先頭値に固定)
+    axes = list(param_matrix.keys())
+    values = [param_matrix[axis] if axis in uses else param_matrix[axis][:1] for axis in axes]
+
+    # combinations : パラメータ辞書のリスト
+    return [dict(zip(axes, combination)) for combination in itertools.product(*values)]
+
+
+def run_benchmark(func, args, min_time):
+    # ==================================================
+    # === 単一ベンチマーク計測関数 ===
+    # ==================================================
+    # func      : 対象関数
+    # args      : 対象関数の引数タプル
+    # min_time  : 最小計測時間[s]
+    # (対象関数の標準出力は計測から除外するため破棄する)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        # ウォームアップ (初回呼出しのキャッシュ/遅延import等を計測から除外)
+        func(*args)
+
+        # === 実行時間の計測 ===
+        times = []
+        start = time.perf_counter()
+        while len(times) < MIN_CALLS or (time.perf_counter() - start < min_time and len(times) < MAX_CALLS):
+            t0 = time.perf_counter()
+            func(*args)
+            times.append(time.perf_counter() - t0)
+
+        # === ピークメモリ割当量の計測 (計測オーバーヘッドがあるため、実行時間計測とは別に1回実行) ===
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    # times : 呼出し毎の実行時間[s]のリスト
+    # peak  : ピークメモリ割当量[byte]
+    return times, peak
+
+
+def run_benchmarks(param_matrix, min_time, name_filter=None):
+    # ==================================================
+    # === ベンチマークスイート実行関数 ===
+    # ==================================================
+    # param_matrix  : パラメータマトリクス辞書
+    # min_time      : 1ベンチマークあたりの最小計測時間[s]
+    # name_filter   : ベンチマーク名の部分一致フィルタ (Noneの場合は全ベンチマーク)
+    results = []
+
+    for name, func, gen_args, uses in BENCHMARKS:
+        if name_filter is not None and name_filter not in name:
+            continue
+
+        for params in gen_param_combinations(param_matrix, uses):
+            result = {"benchmark": name, "params": params}
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    args = gen_args(params["samplerate"], params["buffer_len"], params["frame_size"])
+                times, peak = run_benchmark(func, args, min_time)
+            except Exception as e:
+                # 実行環境のライブラリ非互換等で失敗したベンチマークは記録して継続する
+                result["error"] = type(e).__name__ + ": " + str(e)
+                print(f"  {name:<42s} {format_params(params):<34s} ERROR ({result['error']})")
+                results.append(result)
+                continue
+
+            time_per_call = statistics.median(times)
+            audio_time = params["buffer_len"] / params["samplerate"]
+            result.update({
+                "calls": len(times),
+                "time_per_call_ms": time_per_call * 1000,
+                "time_min_ms": min(times) * 1000,
+                "time_stdev_ms": statistics.pstdev(times) * 1000,
+                "audio_sec_per_sec": audio_time / time_per_call if time_per_call > 0 else 0.0,
+                "peak_alloc_kib": peak / 1024
+            })
+            results.append(result)
+
+            print(
+                f"  {name:<42s} {format_params(params):<34s}"
+                f" {result['time_per_call_ms']:10.3f} [ms/call]"
+                f" {result['audio_sec_per_sec']:10.1f} [audio-s/s]"
+                f" {result['peak_alloc_kib']:10.1f} [KiB peak]"
+            )
+
+    # results : ベンチマーク結果辞書のリスト
+    return results
+
+
+def format_params(params):
+    return "sr=" + str(params["samplerate"]) + " n=" + str(params["buffer_len"]) + " frame=" + str(params["frame_size"])
+
+
+def gen_result_key(result):
+    return result["benchmark"] + " " + format_params(result["params"])
+
+
+def compare_results(results, baseline_results, threshold):
+    # ==================================================
+    # === ベンチマーク結果比較関数 (リグレッション検出) ===
+    # ==================================================
+    # results           : 今回のベンチマーク結果リスト
+    # baseline_results  : 比較元のベンチマーク結果リスト
+    # threshold         : リグレッションと判定する実行時間の増加率[%]
+    baseline = {gen_result_key(result): result for result in baseline_results if "error" not in result}
+    regressions = []
+
+    print("")
+    print("=== Compare with Baseline (regression threshold: +" + str(threshold) + " [%]) ===")
+    for result in results:
+        key = gen_result_key(result)
+        if "error" in result or key not in baseline:
+            continue
+
+        base_time = baseline[key]["time_per_call_ms"]
+        ratio = result["time_per_call_ms"] / base_time if base_time > 0 else 1.0
+        change = (ratio - 1) * 100
+
+        mark = ""
+        if change > threshold:
+            mark = "  <== REGRESSION"
+            regressions.append({"benchmark": key, "baseline_ms": base_time, "current_ms": result["time_per_call_ms"]})
+        elif change < -threshold:
+            mark = "  (improved)"
+
+        print(f"  {key:<78s} {base_time:10.3f} -> {result['time_per_call_ms']:10.3f} [ms] ({change:+6.1f} [%]){mark}")
+
+    # regressions : リグレッション判定されたベンチマークのリスト
+    return regressions
+
+
+if __name__ == '__main__':
+    # =================
+    # === Main Code ===
+    # =================
+
+    # --- Parameters ---
+    parser = argparse.ArgumentParser(description="Microbenchmark suite for functions in modules/.")
+    parser.add_argument("-o", "--output", default=None, help="output JSON file (default: bench_<timestamp>.json)")
+    parser.add_argument("--quick", action="store_true", help="run a single parameter combination per benchmark")
+    parser.add_argument("--filter", default=None, help="run only benchmarks whose name contains this string")
+    parser.add_argument("--min-time", type=float, default=DEFAULT_MIN_TIME, help="minimum measuring time per benchmark [s]")
+    parser.add_argument("--compare", default=None, help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="regression threshold [%%] (default: 10)")
+    args = parser.parse_args()
+
+    param_matrix = PARAM_MATRIX_QUICK if args.quick else PARAM_MATRIX
+    output = args.output or "bench_" + datetime.datetime.now().strftime("%Y%m%d_%H%M%S") + ".json"
+    # ------------------------
+
+    print("Microbenchmark START")
+    results = run_benchmarks(param_matrix, args.min_time, args.filter)
+    print("Microbenchmark END\n")
+
+    report = {
+        "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "scipy": scipy.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor()
+        },
+        "param_matrix": param_matrix,
+        "min_time": args.min_time,
+        "results": results
+    }
+
+    exit_code = 0
+    if args.compare is not None:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline_report = json.load(f)
+        regressions = compare_results(results, baseline_report["results"], args.threshold)
+        report["compare"] = {"baseline": args.compare, "threshold": args.threshold, "regressions": regressions}
+
+        print("")
+        print("Regressions = ", len(regressions))
+        if regressions:
+            exit_code = 1
+
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print("Saved Benchmark Result = ", output, "\n")
+
+    sys.exit(exit_code)
@@ -0,0 +1,240 @@
+import functools
+import time
+
+import librosa
+import numpy as np
+import scipy
+
+from .audio_signal_processing_advanced import gen_mel_filter_bank
+from .log_util import get_logger, log_fields
+
+logger = get_logger(__name__)
+
+
+class ActivityGate:
+    # ==================================================
+    # === 音声区間(アクティビティ)判定クラス ===
+    # ==================================================
+    # バッファ毎に 短時間エネルギー と スペクトル平坦度 から音声(有意な音)の有無を判定し、
+    # 非アクティブなバッファでは、後段の重い解析ステージ(基本周波数 / ケプストラム / メルケプストラム)を省略させる
+    # (判定結果はフレーム辞書の"active"に格納し、各ステージ関数はgated_call()経由で解析関数を呼出す)
+    #
+    # アクティブ判定 : エネルギー >= max(energy_threshold, 雑音レベル推定値 + snr_margin) かつ
+    #                  スペクトル平坦度 <= flatness_threshold (白色雑音に近い平坦なスペクトルは非アクティブとする)
+    # ハングオーバー : アクティブ判定後hangover_time[s]は、判定が外れてもアクティブを維持する (語尾等の途切れ防止)
+    #
+    # samplerate            : サンプリング周波数[Hz]
+    # energy_threshold      : エネルギーの絶対閾値[dB FS]
+    # snr_margin            : 雑音レベル推定値に対するエネルギーの閾値マージン[dB]
+    # flatness_threshold    : スペクトル平坦度の閾値 (0.0～1.0 / 白色雑音で約0.56)
+    # hangover_time         : ハングオーバー時間[s]
+    # noise_floor_rate      : 雑音レベル推定値の追従係数 (非アクティブなバッファで上昇方向に指数平均で追従する)
+
+    def __init__(
+        self,
+        samplerate,
+        energy_threshold=-50.0,
+        snr_margin=6.0,
+        flatness_threshold=0.4,
+        hangover_time=0.3,
+        noise_floor_rate=0.05
+    ):
+        self.samplerate = samplerate
+        self.energy_threshold = energy_threshold
+        self.snr_margin = snr_margin
+        self.flatness_threshold = flatness_threshold
+        self.hangover_frames = int(round(hangover_time * samplerate))
+        self.noise_floor_rate = noise_floor_rate
+
+        self.noise_floor = None
+        self.hangover_remaining = 0
+
+        # 統計
+        self.buffer_count = 0
+        self.active_count = 0
+        self.busy_time = 0.0
+        self.stage_run_counts = {}
+        self.stage_skip_counts = {}
+        self.stage_run_times = {}
+
+    def process(self, data_normalized):
+        # ==================================================
+        # === 1バッファ分 アクティビティ判定関数 ===
+        # ==================================================
+        # data_normalized : 時間領域 波形データ(正規化済)
+        start = time.perf_counter()
+        x = np.asarray(data_normalized)
+
+        # 短時間エネルギー[dB FS]
+        energy_db = 10 * np.log10(np.mean(np.square(x)) + 1e-20)
+
+        # スペクトル平坦度 (パワースペクトルの幾何平均 / 算術平均 / 直流成分を除く)
+        power = np.square(np.abs(scipy.fft.rfft(x)[1:])) + 1e-20
+        flatness = np.exp(np.mean(np.log(power))) / np.mean(power)
+
+        threshold = self.energy_threshold
+        if self.noise_floor is not None:
+            threshold = max(threshold, self.noise_floor + self.snr_margin)
+        detected = energy_db >= threshold and flatness <= self.flatness_threshold
+
+        if detected:
+            self.hangover_remaining = self.hangover_frames
+            active = True
+        elif self.hangover_remaining > 0:
+            self.hangover_remaining -= len(x)
+            active = True
+        else:
+            active = False
+
+        # 雑音レベル推定値の更新 (非検出のバッファのみ / 下降は即時・上昇は指数平均で追従)
+        if not detected:
+            if self.noise_floor is None or energy_db < self.noise_floor:
+                self.noise_floor = energy_db
+            else:
+                self.noise_floor += self.noise_floor_rate * (energy_db - self.noise_floor)
+
+        self.buffer_count += 1
+        if active:
+            self.active_count += 1
+        self.busy_time += time.perf_counter() - start
+        logger.debug(
+            "activity gate",
+            extra=log_fields(
+                rate_limit=1.0, active=active, energy_db=round(float(energy_db), 1),
+                flatness=round(float(flatness), 3), noise_floor=round(float(self.noise_floor), 1)
+                if self.noise_floor is not None else None
+            )
+        )
+
+        # active    : アクティブ(True)/非アクティブ(False) (ハングオーバー込み)
+        # energy_db : 短時間エネルギー[dB FS]
+        # flatness  : スペクトル平坦度
+        return active, float(energy_db), float(flatness)
+
+    def account(self, frame):
+        # ==================================================
+        # === 解析ステージの実行/省略 集計関数 ===
+        # ==================================================
+        # (シンク実行時に、フレーム毎に呼出 / ステージがプロセス実行の場合も集計できるよう、結果はフレーム辞書経由で受取る)
+        for name, elapsed_time in frame.get("gated_stages", {}).items():
+            if elapsed_time is None:
+                self.stage_skip_counts[name] = self.stage_skip_counts.get(name, 0) + 1
+            else:
+                self.stage_run_counts[name] = self.stage_run_counts.get(name, 0) + 1
+                self.stage_run_times[name] = self.stage_run_times.get(name, 0.0) + elapsed_time
+        return frame
+
+    def format_stats(self):
+        # ==================================
+        # === アクティビティ判定統計 文字列化 ===
+        # ==================================
+        active_rate = self.active_count / self.buffer_count * 100 if self.buffer_count > 0 else 0
+        ave_gate_time = self.busy_time / self.buffer_count if self.buffer_count > 0 else 0
+        lines = [
+            "=== Activity Gate Stats (energy >= " + str(self.energy_threshold) + " [dB FS] / flatness <= "
+            + str(self.flatness_threshold) + ") ===",
+            f"  buffers: {self.buffer_count:6d} | active: {self.active_count:6d} ({active_rate:5.1f} [%])"
+            f" | gate ave: {ave_gate_time * 1000:8.3f} [ms]"
+        ]
+
+        # 省略したステージの処理時間は、実行したバッファの平均処理時間から推定する
+        total_run_time = 0.0
+        total_saved_time = 0.0
+        for name in sorted(set(self.stage_run_counts) | set(self.stage_skip_counts)):
+            run_count = self.stage_run_counts.get(name, 0)
+            skip_count = self.stage_skip_counts.get(name, 0)
+            run_time = self.stage_run_times.get(name, 0.0)
+            ave_time = run_time / run_count if run_count > 0 else 0
+            saved_time = ave_time * skip_count
+            total_run_time += run_time
+            total_saved_time += saved_time
+            lines.append(
+                f"  {name:12s} run: {run_count:6d} / skipped: {skip_count:6d} | ave: {ave_time * 1000:8.3f} [ms]"
+                f" | saved (est.): {saved_time:8.3f} [s]"
+            )
+
+        saved_rate = total_saved_time / (total_run_time + total_saved_time) * 100 \
+            if total_run_time + total_saved_time > 0 else 0
+        lines.append(
+            f"  total saved (est.): {total_saved_time:8.3f} [s] ({saved_rate:5.1f} [%] of gated stage time)"
+            f" | gate overhead: {self.busy_time:8.3f} [s]"
+        )
+        return "\n".join(lines)
+
+    def print_stats(self):
+        print(self.format_stats())
+        print("")
+
+
+def gated_call(frame, name, func, placeholder):
+    # ==================================================
+    # === アクティビティ判定に応じた解析関数 呼出関数 ===
+    # ==================================================
+    # frame         : フレーム辞書 ("active"が無い場合は判定無しとして常に解析関数を呼出す)
+    # name          : 集計用のステージ名
+    # func          : 解析関数 (引数無しで呼出す)
+    # placeholder   : 非アクティブ時の代替データ生成関数 (引数無しで呼出す / 解析関数と同一形状の戻り値を返す)
+    # (実行時は処理時間、省略時はNoneをフレーム辞書の"gated_stages"に記録し、ActivityGate.account()で集計する)
+    if "active" not in frame:
+        return func()
+
+    gated_stages = frame.setdefault("gated_stages", {})
+    if not frame["active"]:
+        gated_stages[name] = None
+        return placeholder()
+
+    start = time.perf_counter()
+    result = func()
+    gated_stages[name] = time.perf_counter() - start
+
+    # result : 解析関数の戻り値
+    return result
+
+
+def gen_placeholder_f0_data(data_len, samplerate, frame_period=None):
+    # ==================================================
+    # === 非アクティブ時 基本周波数 代替データ生成関数 ===
+    # ==================================================
+    # (gen_fundamental_freq_data()と同一の時間軸で、全フレーム無声(0[Hz])とする)
+    if frame_period is None:
+        frame_period = (np.float64(1 / samplerate) * 1000) * 20
+    frame_count = int(data_len / samplerate * 1000 / frame_period) + 1
+    time_f0 = np.arange(frame_count) * frame_period / 1000
+
+    # f0        : 基本周波数 時系列データ 1次元配列 (全て0)
+    # time_f0   : 基本周波数 時系列データに対応した時間軸データ 1次元配列
+    return np.zeros(frame_count), time_f0
+
+
+def gen_placeholder_cepstrum_data(data_len):
+    # ==================================================
+    # === 非アクティブ時 ケプストラム 代替データ生成関数 ===
+    # ==================================================
+    # (gen_cepstrum_data()と同一形状で、全てNaN(グラフ上は非表示)とする)
+
+    # amp_envelope_normalized / cepstrum_data / cepstrum_data_lpl
+    return np.full(data_len // 2, np.nan), np.full(data_len, np.nan), np.full(data_len, np.nan)
+
+
+@functools.lru_cache(maxsize=8)
+def _gen_mel_axis_data(data_len, samplerate, mel_filter_number):
+    # メル周波数軸 & メルフィルタバンクは入力データに依存しないため、データ数毎にキャッシュする
+    # (gen_melscale_spctrm_env_data()と同一のデータを生成)
+    mel_filter_bank = gen_mel_filter_bank(np.empty(data_len), samplerate, mel_filter_number)
+    melscale_freq_normalized = librosa.mel_frequencies(
+        n_mels=mel_filter_number + 2, fmin=0.0, fmax=samplerate / 2, htk=True
+    )[1:-1]
+    mel_filter_bank.flags.writeable = False
+    melscale_freq_normalized.flags.writeable = False
+    return melscale_freq_normalized, mel_filter_bank
+
+
+def gen_placeholder_melscale_data(data_len, samplerate, mel_filter_number):
+    # ==================================================
+    # === 非アクティブ時 メルスケールスペクトル包絡 代替データ生成関数 ===
+    # ==================================================
+    # (gen_melscale_spctrm_env_data()と同一形状で、振幅は全てNaN(グラフ上は非表示)とする)
+    melscale_freq_normalized, mel_filter_bank = _gen_mel_axis_data(data_len, samplerate, mel_filter_number)
+
+    # melscale_amp_normalized / melscale_freq_normalized / mel_filter_bank
+    return np.full(mel_filter_number, np.nan), melscale_freq_normalized, mel_filter_bank
@@ -0,0 +1,250 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from .audio_stream import audio_stream_start, audio_stream_stop
+from .gen_time_domain_data import gen_audio_stream_source
+from .pipeline_stages import (stage_f0, stage_frame, stage_mel,
+                              stage_normalize, stage_signal_spctrgrm,
+                              stage_stft)
+
+
+def analyze_spectral_frame(frame, stages):
+    # ==================================================
+    # === スペクトル特徴量フレーム解析関数 ===
+    # ==================================================
+    # frame     : フレーム辞書 (audio_discrete_dataを含む)
+    # stages    : ステージ関数(functools.partialで引数束縛済)のリスト
+    # (ProcessPoolExecutorで実行できるよう、モジュールレベル関数として定義)
+
+    for stage in stages:
+        frame = stage(frame)
+
+    # frame : 解析結果を追加したフレーム辞書
+    return frame
+
+
+class AsyncSpectralAnalyzer:
+    # ========================================================
+    # === asyncio対応 スペクトル特徴量ストリーミングクラス ===
+    # ========================================================
+    # 「async for frame in analyzer.frames()」で、マイク入力音声からタイムスタンプ付きの
+    # スペクトログラム / 基本周波数(F0) / MFCC フレーム辞書を順次取得する
+    # (ブロッキングする音声ストリーム読込は専用スレッド、信号処理はdsp_executorにオフロードするため、
+    #  1つのイベントループで複数のアナライザやネットワーク出力を並行処理できる)
+    #
+    # mic_index             : 使用するマイクのdevice index
+    # samplerate            : サンプリング周波数[Hz]
+    # frames_per_buffer     : 入力音声ストリームバッファあたりのサンプリングデータ数 (= 1フレームのデータ数)
+    # spctrgrm_mode         : スペクトログラムデータ算出モード (0:scipy.signal.spectrogram()関数 / 1:自作STFT関数)
+    # stft_frame_size       : STFTフレーム長 (Noneの場合は、frames_per_buffer / 35)
+    # overlap_rate          : オーバーラップ率 [%]
+    # window_func           : 使用する窓関数
+    # mel_filter_number     : メルフィルタバンク フィルタ数
+    # mfcc_dim              : メル周波数ケプストラム係数(MFCC) 次元数
+    # dbref                 : デシベル基準値
+    # A                     : 聴感補正(A特性)の有効(True)/無効(False)設定
+    # dsp_executor          : 信号処理を実行するconcurrent.futures.Executor
+    #                         (Noneの場合は、イベントループの既定Executorを使用)
+    # max_pending_frames    : 解析中フレームの最大数 (超過時は音声ストリーム読込を待機)
+    # mic_mode              : マイクモード (1:モノラル / 2:ステレオ)
+    # latency_monitor       : 処理時間を記録するLatencyMonitorインスタンス (Noneの場合は記録無し)
+    #                         (音声ストリーム読込を"source"、解析を"dsp"、取得開始から呼出元への受渡しまでを"end_to_end"として記録)
+
+    def __init__(
+        self,
+        mic_index,
+        samplerate=8000,
+        frames_per_buffer=1024 * 8,
+        spctrgrm_mode=0,
+        stft_frame_size=None,
+        overlap_rate=50,
+        window_func="hann",
+        mel_filter_number=32,
+        mfcc_dim=12,
+        dbref=0,
+        A=True,
+        dsp_executor=None,
+        max_pending_frames=4,
+        mic_mode=1,
+        latency_monitor=None
+    ):
+        self.mic_index = mic_index
+        self.mic_mode = mic_mode
+        self.samplerate = samplerate
+        self.frames_per_buffer = frames_per_buffer
+        self.dsp_executor = dsp_executor
+        self.max_pending_frames = max_pending_frames
+        self.latency_monitor = latency_monitor
+
+        if stft_frame_size is None:
+            stft_frame_size = int(frames_per_buffer / 35)
+
+        # === 解析ステージの構成 ===
+        if spctrgrm_mode == 0:
+            spctrgrm_stages = [
+                partial(
+                    stage_signal_spctrgrm,
+                    samplerate=samplerate,
+                    stft_frame_size=stft_frame_size,
+                    overlap_rate=overlap_rate,
+                    window_func=window_func,
+                    dbref=dbref,
+                    A=A
+                )
+            ]
+        else:
+            spctrgrm_stages = [
+                partial(
+                    stage_frame,
+                    samplerate=samplerate,
+                    stft_frame_size=stft_frame_size,
+                    overlap_rate=overlap_rate,
+                    window_func=window_func
+                ),
+                partial(stage_stft, samplerate=samplerate, stft_frame_size=stft_frame_size, dbref=dbref, A=A)
+            ]
+
+        self.stages = [
+            partial(stage_normalize, samplerate=samplerate),
+            *spctrgrm_stages,
+            partial(stage_f0, samplerate=samplerate),
+            partial(stage_mel, samplerate=samplerate, mel_filter_number=mel_filter_number, mfcc_dim=mfcc_dim, dbref=dbref)
+        ]
+
+        # 音声ストリームの生成/読込/停止は、同一の専用スレッドで逐次実行する
+        # (読込中のストリームを別スレッドから停止しないようにするため)
+        self.read_executor = None
+        self.pa = None
+        self.stream = None
+        self.source = None
+        self.frame_count = 0
+
+    @property
+    def is_running(self):
+        return self.stream is not None
+
+    async def start(self):
+        # ========================================
+        # === 音声ストリーム取得開始関数 ===
+        # ========================================
+        if self.is_running:
+            return
+
+        loop = asyncio.get_running_loop()
+        self.read_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="async_spectral_analyzer")
+
+        self.pa, self.stream = await loop.run_in_executor(
+            self.read_executor,
+            audio_stream_start,
+            self.mic_index,
+            self.mic_mode,
+            self.samplerate,
+            self.frames_per_buffer
+        )
+
+        # リアルタイムモード(time = 0)のソースジェネレータ
+        self.source = gen_audio_stream_source(self.stream, self.frames_per_buffer, self.samplerate, 0)
+
+    async def close(self):
+        # ==================================================
+        # === 音声ストリーム停止 & 専用スレッド終了関数 ===
+        # ==================================================
+        if not self.is_running:
+            return
+
+        loop = asyncio.get_running_loop()
+        pa, stream = self.pa, self.stream
+        self.pa = None
+        self.stream = None
+        self.source = None
+
+        # 実行中の読込完了後に停止するよう、読込と同一の専用スレッドで停止する
+        # (呼出元タスクがキャンセルされた場合も、停止処理は完了させる)
+        await asyncio.shield(loop.run_in_executor(self.read_executor, audio_stream_stop, pa, stream))
+        self.read_executor.shutdown(wait=False)
+        self.read_executor = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _read_frames(self, pending):
+        # ======================================================
+        # === 音声ストリーム読込 & 解析投入タスク関数 ===
+        # ======================================================
+        # pending : 解析中フレーム(asyncio.Future)を投入順に格納するasyncio.Queue
+        loop = asyncio.get_running_loop()
+
+        while True:
+            start = time.perf_counter()
+            frame = await loop.run_in_executor(self.read_executor, next, self.source)
+            if self.latency_monitor is not None:
+                self.latency_monitor.record("source", time.perf_counter() - start)
+
+            # 解析はdsp_executorで並列実行し、結果の取り出し順は投入順(フレーム順)とする
+            future = loop.run_in_executor(self.dsp_executor, analyze_spectral_frame, frame, self.stages)
+            if self.latency_monitor is not None:
+                # 解析時間は、投入からExecutorでの解析完了までの時間(Executor内の待ち時間を含む)
+                future.add_done_callback(partial(self._record_dsp_latency, time.perf_counter()))
+
+            # 解析中フレーム数が上限に達した場合は、取り出されるまで待機(バックプレッシャー)
+            await pending.put(future)
+
+    def _record_dsp_latency(self, start, future):
+        if not future.cancelled() and future.exception() is None:
+            self.latency_monitor.record("dsp", time.perf_counter() - start)
+
+    async def frames(self):
+        # ==================================================
+        # === スペクトル特徴量フレーム 非同期ジェネレータ ===
+        # ==================================================
+        # 呼出元でのbreak / タスクのキャンセル / 例外発生時は、音声ストリームを停止して終了する
+        await self.start()
+
+        pending = asyncio.Queue(maxsize=self.max_pending_frames)
+        reader_task = asyncio.create_task(self._read_frames(pending))
+
+        try:
+            while True:
+                get_task = asyncio.ensure_future(pending.get())
+                done, _ = await asyncio.wait({get_task, reader_task}, return_when=asyncio.FIRST_COMPLETED)
+
+                if get_task not in done:
+                    # 読込タスクが例外終了した場合は、呼出元に例外を送出する
+                    get_task.cancel()
+                    reader_task.result()
+
+                frame = await get_task.result()
+                self.frame_count += 1
+                if self.latency_monitor is not None:
+                    self.latency_monitor.record("end_to_end", time.time() - frame["timestamp"])
+
+                # frame : フレーム辞書
+                #         index                     : フレーム番号
+                #         timestamp                 : フレーム取得開始時刻 (UNIX時間[s])
+                #         freq_spctrgrm             : スペクトログラム y軸向けデータ[Hz]
+                #         time_spctrgrm             : スペクトログラム x軸向けデータ[s]
+                #         spectrogram               : スペクトログラム 振幅データ
+                #         f0                        : 基本周波数 時系列データ 1次元配列
+                #         time_f0                   : 基本周波数 時系列データに対応した時間軸データ 1次元配列
+                #         melscale_amp_normalized   : メルスケールスペクトル包絡データ振幅成分 1次元配列
+                #         mfcc_amp_normalized       : MFCCスペクトル包絡データ振幅成分 1次元配列
+                yield frame
+
+        finally:
+            reader_task.cancel()
+            try:
+                await reader_task
+            except (asyncio.CancelledError, Exception):
+                pass
+
+            # 解析中フレームの結果は破棄する
+            while not pending.empty():
+                pending.get_nowait().cancel()
+
+            await self.close()
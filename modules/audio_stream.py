@@ -1,5 +1,9 @@
 import pyaudio
 
+from .log_util import get_logger, log_fields
+
+logger = get_logger(__name__)
+
 
 def audio_stream_start(index, mic_mode, samplerate, frames_per_buffer):
     # ================================================
@@ -11,8 +15,6 @@ def audio_stream_start(index, mic_mode, samplerate, frames_per_buffer):
     # frames_per_buffer     : 入力音声ストリームバッファあたりのサンプリングデータ数
 
     pa = pyaudio.PyAudio()
-    print("pa = ", pa)
-    print("type(pa) = ", type(pa))
 
     stream = pa.open(
         format=pyaudio.paInt16,
@@ -23,9 +25,13 @@ def audio_stream_start(index, mic_mode, samplerate, frames_per_buffer):
         input_device_index=index,
         frames_per_buffer=frames_per_buffer
     )
-    print("stream = ", stream)
-    print("type(stream) = ", type(stream))
-    print("")
+    logger.debug(
+        "Audio Stream opened",
+        extra=log_fields(
+            pa=pa, stream=stream, index=index, mic_mode=mic_mode,
+            samplerate=samplerate, frames_per_buffer=frames_per_buffer
+        )
+    )
 
     # pa        : 生成したpyaudio.PyAudioクラスオブジェクト
     #             (pyaudio.PyAudio object)
@@ -34,6 +40,84 @@ def audio_stream_start(index, mic_mode, samplerate, frames_per_buffer):
     return pa, stream
 
 
+def duplex_stream_start(input_index, output_index, channels, samplerate, frames_per_buffer, stream_callback):
+    # ================================================
+    # === 全二重(入出力同時)音声ストリーム開始関数 ===
+    # ================================================
+    # input_index           : 使用する入力デバイスのdevice index (Noneの場合は既定のデバイス)
+    # output_index          : 使用する出力デバイスのdevice index (Noneの場合は既定のデバイス)
+    # channels              : 入出力のチャンネル数
+    # samplerate            : サンプリング周波数[sampling data count/s)]
+    # frames_per_buffer     : 入出力音声ストリームバッファあたりのサンプリングデータ数
+    # stream_callback       : コールバック関数 (入力データを受取り、同一フレーム数の出力データを返す)
+
+    pa = pyaudio.PyAudio()
+
+    stream = pa.open(
+        format=pyaudio.paInt16,
+        channels=channels,
+        rate=samplerate,
+        input=True,
+        output=True,
+        input_device_index=input_index,
+        output_device_index=output_index,
+        frames_per_buffer=frames_per_buffer,
+        stream_callback=stream_callback
+    )
+    logger.debug(
+        "Duplex Audio Stream opened",
+        extra=log_fields(
+            input_index=input_index, output_index=output_index, channels=channels,
+            samplerate=samplerate, frames_per_buffer=frames_per_buffer
+        )
+    )
+
+    # pa        : 生成したpyaudio.PyAudioクラスオブジェクト
+    # stream    : 生成したpyaudio.PyAudio.Streamオブジェクト (コールバックモード / 開始済)
+    return pa, stream
+
+
+def get_capture_samplerate(index, mic_mode, samplerate, native_rate=False):
+    # ==================================================
+    # === 入力音声ストリーム取得時 サンプリング周波数決定関数 ===
+    # ==================================================
+    # index         : 使用するマイクのdevice index
+    # mic_mode      : マイクモード (1:モノラル / 2:ステレオ)
+    # samplerate    : 解析用サンプリング周波数[Hz]
+    # native_rate   : デバイスのネイティブサンプリング周波数で取得する(True)/しない(False)設定
+    #                 (Falseの場合も、解析用サンプリング周波数にデバイスが非対応の場合はネイティブで取得する)
+
+    pa = pyaudio.PyAudio()
+    try:
+        # デバイスのネイティブ(既定)サンプリング周波数
+        native_samplerate = int(pa.get_device_info_by_index(index)["defaultSampleRate"])
+
+        if native_rate:
+            capture_samplerate = native_samplerate
+        else:
+            try:
+                pa.is_format_supported(
+                    samplerate,
+                    input_device=index,
+                    input_channels=mic_mode,
+                    input_format=pyaudio.paInt16
+                )
+                capture_samplerate = samplerate
+            except ValueError:
+                # 非対応のサンプリング周波数の場合、is_format_supported()はValueErrorを送出する
+                logger.warning(
+                    "Samplerate not supported by the device, capture at native samplerate",
+                    extra=log_fields(index=index, samplerate=samplerate, native_samplerate=native_samplerate)
+                )
+                capture_samplerate = native_samplerate
+    finally:
+        pa.terminate()
+
+    # capture_samplerate : 入力音声ストリーム取得時のサンプリング周波数[Hz]
+    #                      (解析用サンプリング周波数と異なる場合は、StreamResamplerで変換する)
+    return capture_samplerate
+
+
 def audio_stream_stop(pa, stream):
     # ================================================
     # === Microphone入力音声ストリーム取得停止関数 ===
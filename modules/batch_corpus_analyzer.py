@@ -0,0 +1,483 @@
+import contextlib
+import datetime
+import io
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import soundfile as sf
+
+from .feature_store import FeatureStore
+from .pipeline_stages import (stage_cepstrum, stage_f0, stage_mel,
+                              stage_signal_spctrgrm)
+from .result_cache import DEFAULT_CACHE_MAX_BYTES, ResultCache
+
+# 解析対象の音声ファイル拡張子
+AUDIO_FILE_EXTENSIONS = (".wav", ".flac")
+
+# ファイル毎の解析結果サマリ(JSON Lines)のファイル名
+SUMMARY_JSONL_FILENAME = "summary.jsonl"
+
+# 全体の解析結果サマリ(JSON)のファイル名
+SUMMARY_JSON_FILENAME = "summary.json"
+
+# 解析結果の出力形式 ("npz":ファイル毎のnpzファイル / "feature_store":特徴量ストア)
+OUTPUT_FORMATS = ("npz", "feature_store")
+
+# 解析パラメータの既定値
+DEFAULT_ANALYSIS_PARAMS = {
+    "stft_frame_size": 1024,    # STFT(短時間フーリエ変換)を行う時系列データ数(=STFTフレーム長)
+    "overlap_rate": 50,         # オーバーラップ率 [%]
+    "window_func": "hann",      # 使用する窓関数
+    "mel_filter_number": 32,    # メルフィルタバンク フィルタ数
+    "mfcc_dim": 12,             # メル周波数ケプストラム係数(MFCC) 次元数
+    "dbref": 0,                 # デシベル基準値
+    "A": True                   # 聴感補正(A特性)の有効(True)/無効(False)設定
+}
+
+# 解析結果として保存するフレーム辞書のキー
+RESULT_KEYS = (
+    "freq_spctrgrm",
+    "time_spctrgrm",
+    "spectrogram",
+    "f0",
+    "time_f0",
+    "amp_envelope_normalized",
+    "cepstrum_data",
+    "cepstrum_data_lpl",
+    "melscale_amp_normalized",
+    "melscale_freq_normalized",
+    "mfcc_amp_normalized"
+)
+
+
+def gen_audio_file_list(input_path):
+    # ==================================================
+    # === 解析対象 音声ファイルリスト生成関数 ===
+    # ==================================================
+    # input_path : 音声ファイルを格納したディレクトリ、またはマニフェストファイル
+    #              (マニフェストファイル : 1行に1ファイルのPATHを記載したテキストファイル
+    #                                     (相対PATHはマニフェストファイルのディレクトリ基準 / "#"始まりの行はコメント))
+
+    if os.path.isdir(input_path):
+        # ディレクトリ配下の音声ファイルを再帰的に検索
+        base_dir = input_path
+        file_list = []
+        for dirpath, dirnames, filenames in os.walk(input_path):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.lower().endswith(AUDIO_FILE_EXTENSIONS):
+                    file_list.append(os.path.join(dirpath, filename))
+
+    else:
+        # マニフェストファイルの読込
+        manifest_dir = os.path.dirname(os.path.abspath(input_path))
+        file_list = []
+        with open(input_path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line == "" or line.startswith("#"):
+                    continue
+                if not os.path.isabs(line):
+                    line = os.path.join(manifest_dir, line)
+                file_list.append(os.path.normpath(line))
+
+        base_dir = os.path.commonpath([os.path.dirname(filename) for filename in file_list]) if file_list else ""
+
+    # file_list : 音声ファイルPATHのリスト
+    # base_dir  : 解析結果ファイルの相対PATH算出の基準ディレクトリ
+    return file_list, base_dir
+
+
+def gen_result_filename(audio_filename, base_dir, output_dir, output_format="npz"):
+    # ==========================================
+    # === 解析結果ファイル名生成関数 ===
+    # ==========================================
+    # audio_filename    : 音声ファイルPATH
+    # base_dir          : 相対PATH算出の基準ディレクトリ
+    # output_dir        : 解析結果の出力ディレクトリ
+    # output_format     : 解析結果の出力形式 ("npz" / "feature_store")
+
+    relpath = os.path.relpath(os.path.abspath(audio_filename), os.path.abspath(base_dir))
+
+    if output_format == "feature_store":
+        # 特徴量ストアの場合は、録音ID(=拡張子を除いた相対PATH)のmeta.jsonを解析結果ファイルとする
+        return os.path.join(output_dir, os.path.splitext(relpath)[0], "meta.json")
+
+    # result_filename : 解析結果ファイルPATH (入力側のディレクトリ構成を維持し、拡張子を".npz"に変更)
+    return os.path.join(output_dir, os.path.splitext(relpath)[0] + ".npz")
+
+
+def load_audio_file(filename):
+    # ==========================================
+    # === 音声ファイル読込関数 ===
+    # ==========================================
+    # filename : 音声ファイルPATH (WAV/FLAC)
+
+    # 16bit量子化データとして読込み、マイク入力と同一の正規化を行う
+    # (ステレオの場合は、全チャンネルの平均をモノラルデータとする)
+    data, samplerate = sf.read(filename, dtype="int16", always_2d=True)
+    data_normalized = np.mean(data, axis=1) / float((np.power(2, 16) / 2) - 1)
+
+    # data_normalized   : 時間領域波形データ(正規化済)
+    # samplerate        : サンプリング周波数[Hz]
+    return data_normalized, samplerate
+
+
+def analyze_audio_data(data_normalized, samplerate, analysis_params, cache=None):
+    # ==========================================
+    # === 音声データ解析関数 ===
+    # ==========================================
+    # data_normalized   : 時間領域波形データ(正規化済)
+    # samplerate        : サンプリング周波数[Hz]
+    # analysis_params   : 解析パラメータ辞書 (DEFAULT_ANALYSIS_PARAMSと同一キー)
+    # cache             : 解析結果キャッシュ (ResultCacheインスタンス / Noneの場合はキャッシュ無し)
+
+    params = dict(DEFAULT_ANALYSIS_PARAMS, **analysis_params)
+
+    frame = {"data_normalized": data_normalized}
+
+    frame = stage_signal_spctrgrm(
+        frame,
+        samplerate,
+        params["stft_frame_size"],
+        params["overlap_rate"],
+        params["window_func"],
+        params["dbref"],
+        params["A"],
+        cache
+    )
+    frame = stage_f0(frame, samplerate, cache)
+    frame = stage_cepstrum(frame, samplerate, params["dbref"], cache)
+    frame = stage_mel(frame, samplerate, params["mel_filter_number"], params["mfcc_dim"], params["dbref"], cache)
+
+    # frame : 解析結果を追加したフレーム辞書
+    return frame
+
+
+def save_analysis_result(result_filename, frame, samplerate):
+    # ==========================================
+    # === 解析結果ファイル保存関数 ===
+    # ==========================================
+    # result_filename   : 解析結果ファイルPATH (.npz)
+    # frame             : 解析結果を格納したフレーム辞書
+    # samplerate        : サンプリング周波数[Hz]
+
+    os.makedirs(os.path.dirname(result_filename) or ".", exist_ok=True)
+
+    # 一時ファイルに書込んだ後にリネームする事で、中断時に不完全な解析結果ファイルを残さない
+    # (解析結果ファイルの存在 = 当該ファイルの解析完了、として再開時の判定に使用する)
+    tmp_filename = result_filename + ".tmp"
+    with open(tmp_filename, "wb") as f:
+        np.savez(f, samplerate=samplerate, **{key: frame[key] for key in RESULT_KEYS})
+    os.replace(tmp_filename, result_filename)
+
+
+def save_analysis_result_to_feature_store(
+    output_dir, recording_id, frame, samplerate, duration, audio_filename, analysis_params, feature_dtype
+):
+    # ==========================================
+    # === 解析結果 特徴量ストア保存関数 ===
+    # ==========================================
+    # output_dir        : 特徴量ストアのルートディレクトリ
+    # recording_id      : 録音ID
+    # frame             : 解析結果を格納したフレーム辞書
+    # samplerate        : サンプリング周波数[Hz]
+    # duration          : 録音時間[s]
+    # audio_filename    : 音声ファイルPATH
+    # analysis_params   : 解析パラメータ辞書
+    # feature_dtype     : 特徴量の保存型 ("float16" / "float32")
+
+    store = FeatureStore(output_dir)
+
+    # 再解析時は既存の特徴量を破棄して書き直す
+    recording_dir = store.get_recording_dir(recording_id)
+    if os.path.isdir(recording_dir):
+        shutil.rmtree(recording_dir)
+
+    metadata = dict(DEFAULT_ANALYSIS_PARAMS, **analysis_params)
+    metadata.update({"samplerate": int(samplerate), "duration": duration, "source_file": audio_filename})
+
+    with store.open_writer(recording_id, metadata, dtype=feature_dtype) as writer:
+        # スペクトログラム (時間軸先頭に転置: (時間, 周波数))
+        writer.write_axis("freq_spctrgrm", frame["freq_spctrgrm"])
+        writer.append("spectrogram", frame["time_spctrgrm"], frame["spectrogram"].T, axes=["freq_spctrgrm"])
+
+        # 基本周波数 時系列データ
+        writer.append("f0", frame["time_f0"], frame["f0"])
+
+        # メルスケールスペクトル包絡 & MFCC (録音全体で1フレーム / 時刻は録音の中央)
+        writer.write_axis("melscale_freq_normalized", frame["melscale_freq_normalized"])
+        writer.append(
+            "melscale_amp", [duration / 2], frame["melscale_amp_normalized"][np.newaxis, :],
+            axes=["melscale_freq_normalized"]
+        )
+        writer.append("mfcc", [duration / 2], frame["mfcc_amp_normalized"][np.newaxis, :])
+
+
+# ワーカープロセス毎の解析結果キャッシュ
+# (ファイル毎に生成すると、生成時のディレクトリ走査がファイル数分繰り返されるため、プロセス毎に1つだけ生成する)
+_worker_cache = None
+
+
+def get_worker_cache(cache_dir):
+    # ==================================================
+    # === ワーカープロセス用 解析結果キャッシュ取得関数 ===
+    # ==================================================
+    # cache_dir : 解析結果キャッシュディレクトリ (Noneの場合はキャッシュ無し)
+    # (旧バージョンの削除と最大サイズの適用は親プロセスが行うため、エントリの読み書きのみを行うキャッシュを生成する)
+    global _worker_cache
+    if cache_dir is None:
+        return None
+    if _worker_cache is None or _worker_cache.cache_dir != cache_dir:
+        _worker_cache = ResultCache(cache_dir, purge_stale=False, indexed=False)
+
+    # _worker_cache : ResultCacheインスタンス
+    return _worker_cache
+
+
+def analyze_audio_file(
+    audio_filename, result_filename, analysis_params, quiet=True,
+    output_dir=None, output_format="npz", feature_dtype="float32",
+    cache_dir=None, cache_max_bytes=DEFAULT_CACHE_MAX_BYTES
+):
+    # ==================================================
+    # === 音声ファイル解析関数 (ワーカープロセスで実行) ===
+    # ==================================================
+    # audio_filename    : 音声ファイルPATH
+    # result_filename   : 解析結果ファイルPATH (.npz / 特徴量ストアの場合はmeta.json)
+    # analysis_params   : 解析パラメータ辞書
+    # quiet             : 各解析関数の標準出力を抑制する(True)/しない(False)設定
+    # output_dir        : 解析結果の出力ディレクトリ (特徴量ストアの場合のみ使用)
+    # output_format     : 解析結果の出力形式 ("npz" / "feature_store")
+    # feature_dtype     : 特徴量ストアの保存型 ("float16" / "float32")
+    # cache_dir         : 解析結果キャッシュディレクトリ (Noneの場合はキャッシュ無し)
+    # cache_max_bytes   : 解析結果キャッシュの最大サイズ[byte] (最大サイズはrun_batch_corpus_analysis()で適用する)
+
+    start = time.perf_counter()
+    summary = {"file": audio_filename, "result": result_filename}
+    cache = get_worker_cache(cache_dir)
+    if cache is not None:
+        # ワーカー内のキャッシュは複数ファイルで共有するため、ファイル毎のヒット/ミス数は差分で求める
+        start_hits = cache.hit_count
+        start_misses = cache.miss_count
+
+    try:
+        stdout = io.StringIO() if quiet else None
+        with contextlib.redirect_stdout(stdout) if quiet else contextlib.nullcontext():
+            data_normalized, samplerate = load_audio_file(audio_filename)
+            frame = analyze_audio_data(data_normalized, samplerate, analysis_params, cache)
+
+            if output_format == "feature_store":
+                save_analysis_result_to_feature_store(
+                    output_dir,
+                    os.path.relpath(os.path.dirname(result_filename), output_dir),
+                    frame,
+                    samplerate,
+                    len(data_normalized) / samplerate,
+                    audio_filename,
+                    analysis_params,
+                    feature_dtype
+                )
+            else:
+                save_analysis_result(result_filename, frame, samplerate)
+
+        voiced_f0 = frame["f0"][frame["f0"] > 0]
+
+        summary.update({
+            "status": "ok",
+            "samplerate": int(samplerate),
+            "duration": len(data_normalized) / samplerate,
+            "f0_mean": float(np.mean(voiced_f0)) if len(voiced_f0) > 0 else 0.0,
+            "voiced_rate": len(voiced_f0) / len(frame["f0"]) if len(frame["f0"]) > 0 else 0.0
+        })
+
+    except Exception as e:
+        # 解析に失敗したファイルはサマリに記録して処理を継続する
+        summary.update({"status": "error", "error": type(e).__name__ + ": " + str(e)})
+
+    if cache is not None:
+        summary["cache_hits"] = cache.hit_count - start_hits
+        summary["cache_misses"] = cache.miss_count - start_misses
+
+    summary["elapsed_time"] = time.perf_counter() - start
+
+    # summary : ファイル毎の解析結果サマリ辞書
+    return summary
+
+
+def load_summary_jsonl(output_dir):
+    # ==================================================
+    # === ファイル毎の解析結果サマリ読込関数 ===
+    # ==================================================
+    # output_dir : 解析結果の出力ディレクトリ
+
+    summaries = {}
+    summary_filename = os.path.join(output_dir, SUMMARY_JSONL_FILENAME)
+
+    if os.path.isfile(summary_filename):
+        with open(summary_filename, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    summary = json.loads(line)
+                except json.JSONDecodeError:
+                    # 中断により書込途中となった行は無視する
+                    continue
+                summaries[summary["file"]] = summary
+
+    # summaries : 音声ファイルPATHをキーとした解析結果サマリ辞書
+    return summaries
+
+
+def run_batch_corpus_analysis(
+    input_path, output_dir, workers=None, analysis_params=None, resume=True, quiet=True,
+    output_format="npz", feature_dtype="float32", cache_dir=None, cache_max_bytes=DEFAULT_CACHE_MAX_BYTES
+):
+    # ==================================================
+    # === 音声コーパス 一括解析関数 ===
+    # ==================================================
+    # input_path        : 音声ファイルを格納したディレクトリ、またはマニフェストファイル
+    # output_dir        : 解析結果の出力ディレクトリ
+    # workers           : ワーカープロセス数 (Noneの場合はCPUコア数)
+    # analysis_params   : 解析パラメータ辞書 (Noneの場合はDEFAULT_ANALYSIS_PARAMS)
+    # resume            : 解析結果ファイルが存在する音声ファイルをスキップする(True)/しない(False)設定
+    # quiet             : 各解析関数の標準出力を抑制する(True)/しない(False)設定
+    # output_format     : 解析結果の出力形式 ("npz" / "feature_store")
+    # feature_dtype     : 特徴量ストアの保存型 ("float16" / "float32")
+    # cache_dir         : 解析結果キャッシュディレクトリ (Noneの場合はキャッシュ無し)
+    # cache_max_bytes   : 解析結果キャッシュの最大サイズ[byte]
+
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError("output_format must be one of " + str(OUTPUT_FORMATS) + " : " + str(output_format))
+
+    if analysis_params is None:
+        analysis_params = {}
+
+    file_list, base_dir = gen_audio_file_list(input_path)
+    os.makedirs(output_dir, exist_ok=True)
+
+    # === 解析済ファイルの判定 (再開時) ===
+    summaries = load_summary_jsonl(output_dir) if resume else {}
+    tasks = []
+    skipped_count = 0
+    for audio_filename in file_list:
+        result_filename = gen_result_filename(audio_filename, base_dir, output_dir, output_format)
+        if resume and os.path.isfile(result_filename):
+            skipped_count += 1
+            continue
+        tasks.append((audio_filename, result_filename))
+
+    print("Batch Corpus Analysis START")
+    print("  - Audio Files   : ", len(file_list))
+    print("  - Skipped Files : ", skipped_count, "(already analyzed)")
+    print("  - Target Files  : ", len(tasks))
+    print("")
+
+    start = time.perf_counter()
+    analyzed_count = 0
+    error_count = 0
+    audio_time = 0.0
+    cache_hits = 0
+    cache_misses = 0
+
+    # 旧バージョンの削除と最大サイズの適用は、解析開始前と全ワーカー終了後に親プロセスでのみ行う
+    # (ワーカーはエントリの読み書きのみを行うため、解析中は一時的に最大サイズを超える場合がある)
+    cache = ResultCache(cache_dir, cache_max_bytes) if cache_dir is not None else None
+
+    # ファイル毎の解析結果サマリは完了順に追記する (中断時も完了分のサマリを保持する)
+    with open(os.path.join(output_dir, SUMMARY_JSONL_FILENAME), "a" if resume else "w", encoding="utf-8") as summary_file, \
+            ProcessPoolExecutor(max_workers=workers, initializer=get_worker_cache, initargs=(cache_dir,)) as executor:
+        futures = [
+            executor.submit(
+                analyze_audio_file,
+                audio_filename,
+                result_filename,
+                analysis_params,
+                quiet,
+                output_dir,
+                output_format,
+                feature_dtype,
+                cache_dir,
+                cache_max_bytes
+            )
+            for audio_filename, result_filename in tasks
+        ]
+
+        try:
+            for future in as_completed(futures):
+                summary = future.result()
+                summaries[summary["file"]] = summary
+
+                summary_file.write(json.dumps(summary, ensure_ascii=False) + "\n")
+                summary_file.flush()
+
+                cache_hits += summary.get("cache_hits", 0)
+                cache_misses += summary.get("cache_misses", 0)
+
+                if summary["status"] == "ok":
+                    analyzed_count += 1
+                    audio_time += summary["duration"]
+                else:
+                    error_count += 1
+                    print("  - [ERROR] ", summary["file"], " : ", summary["error"])
+
+                done_count = analyzed_count + error_count
+                elapsed_time = time.perf_counter() - start
+                print(
+                    "  - Progress : ", done_count, "/", len(tasks),
+                    " (", round(done_count / elapsed_time, 2), "[files/s] )"
+                )
+
+        except KeyboardInterrupt:
+            # 「ctrl+c」が押下された場合、未着手の解析をキャンセルして終了する
+            # (再開時は、解析結果ファイルが存在しないファイルのみを解析する)
+            for future in futures:
+                future.cancel()
+            print("\nBatch Corpus Analysis INTERRUPTED (resume by running again)\n")
+
+    elapsed_time = time.perf_counter() - start
+
+    if cache is not None:
+        cache.enforce_max_bytes()
+
+    # === 全体の解析結果サマリ ===
+    total_summary = {
+        "input_path": input_path,
+        "output_dir": output_dir,
+        "finished_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "output_format": output_format,
+        "analysis_params": dict(DEFAULT_ANALYSIS_PARAMS, **analysis_params),
+        "file_count": len(file_list),
+        "analyzed_count": analyzed_count,
+        "skipped_count": skipped_count,
+        "error_count": error_count,
+        "elapsed_time": elapsed_time,
+        "files_per_sec": (analyzed_count + error_count) / elapsed_time if elapsed_time > 0 else 0.0,
+        "audio_sec_per_sec": audio_time / elapsed_time if elapsed_time > 0 else 0.0,
+        "cache_hits": cache_hits,
+        "cache_misses": cache_misses,
+        "cache_hit_rate": cache_hits / (cache_hits + cache_misses) if cache_hits + cache_misses > 0 else 0.0,
+        "files": [summaries[filename] for filename in file_list if filename in summaries]
+    }
+
+    tmp_filename = os.path.join(output_dir, SUMMARY_JSON_FILENAME + ".tmp")
+    with open(tmp_filename, "w", encoding="utf-8") as f:
+        json.dump(total_summary, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_filename, os.path.join(output_dir, SUMMARY_JSON_FILENAME))
+
+    print("")
+    print("Batch Corpus Analysis END")
+    print("  - Analyzed Files  : ", analyzed_count)
+    print("  - Error Files     : ", error_count)
+    print("  - Elapsed Time[s] : ", round(elapsed_time, 2))
+    print("  - Files per Second: ", round(total_summary["files_per_sec"], 2))
+    print("  - Audio Seconds per Second: ", round(total_summary["audio_sec_per_sec"], 2))
+    if cache_dir is not None:
+        print("  - Cache Hit Rate[%]: ", round(total_summary["cache_hit_rate"] * 100, 1))
+    print("")
+
+    # total_summary : 全体の解析結果サマリ辞書
+    return total_summary
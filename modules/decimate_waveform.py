@@ -0,0 +1,189 @@
+import weakref
+
+import numpy as np
+
+# Min/Max間引きピラミッドの最下位レベルのビン幅 [sampling data count]
+PYRAMID_BASE_BIN_SIZE = 4
+
+# Min/Max間引きピラミッドの最上位レベルの最小ビン数
+PYRAMID_MIN_BIN_COUNT = 64
+
+# 間引きを行わずに元データをプロットする際の、1ピクセルあたりの最大データ数
+RAW_PLOT_SAMPLES_PER_PIXEL = 4
+
+# 生成済みMin/Max間引きピラミッドのキャッシュ
+# (key: 波形データのid / value: (波形データの弱参照, MinMaxPyramidインスタンス))
+_pyramid_cache = {}
+
+
+class MinMaxPyramid:
+    # ================================================
+    # === 時間領域波形 Min/Max間引きピラミッドクラス ===
+    # ================================================
+    # 時間領域波形データを、ビン幅を2倍ずつ拡大した複数の解像度(レベル)で、
+    # ビン毎の最小値/最大値の位置(index)に縮約して保持する
+    # (上位レベルは下位レベルの隣接2ビンの統合により生成するため、全レベルの生成コストはO(N))
+    #
+    # (波形データ自体は保持しない / キャッシュから波形データへの参照が残ると、波形データ破棄時のキャッシュ削除が行われないため)
+    #
+    # data  : 時間領域 波形データ 1次元配列
+
+    def __init__(self, data):
+        data = np.asarray(data)
+        self.data_len = len(data)
+
+        # indexの型 (データ数に応じてint32/int64を選択)
+        index_dtype = np.int32 if len(data) < np.iinfo(np.int32).max else np.int64
+
+        # levels : 各レベルの(ビン幅, ビン毎の最小値index, ビン毎の最大値index)のリスト
+        self.levels = []
+
+        if len(data) < PYRAMID_BASE_BIN_SIZE * PYRAMID_MIN_BIN_COUNT:
+            # データ数が少ない場合は間引き不要のため、レベルを生成しない
+            return
+
+        # === 最下位レベルの生成 ===
+        bin_size = PYRAMID_BASE_BIN_SIZE
+        bin_count_full = len(data) // bin_size
+        data_binned = data[:bin_count_full * bin_size].reshape(bin_count_full, bin_size)
+        offset = np.arange(bin_count_full, dtype=index_dtype) * bin_size
+
+        min_index = (np.argmin(data_binned, axis=1) + offset).astype(index_dtype)
+        max_index = (np.argmax(data_binned, axis=1) + offset).astype(index_dtype)
+
+        # 端数データは独立した1ビンとして追加
+        if len(data) % bin_size != 0:
+            tail_start = bin_count_full * bin_size
+            tail = data[tail_start:]
+            min_index = np.append(min_index, tail_start + np.argmin(tail)).astype(index_dtype)
+            max_index = np.append(max_index, tail_start + np.argmax(tail)).astype(index_dtype)
+
+        self.levels.append((bin_size, min_index, max_index))
+
+        # === 上位レベルの生成 (隣接2ビンの統合) ===
+        while len(min_index) >= PYRAMID_MIN_BIN_COUNT * 2:
+            pair_count = len(min_index) // 2
+
+            min_a = min_index[0:pair_count * 2:2]
+            min_b = min_index[1:pair_count * 2:2]
+            max_a = max_index[0:pair_count * 2:2]
+            max_b = max_index[1:pair_count * 2:2]
+
+            min_merged = np.where(data[min_b] < data[min_a], min_b, min_a)
+            max_merged = np.where(data[max_b] > data[max_a], max_b, max_a)
+
+            # 端数ビンはそのまま引き継ぐ
+            if len(min_index) % 2 != 0:
+                min_merged = np.append(min_merged, min_index[-1])
+                max_merged = np.append(max_merged, max_index[-1])
+
+            bin_size *= 2
+            min_index = min_merged
+            max_index = max_merged
+            self.levels.append((bin_size, min_index, max_index))
+
+    def get_envelope_index(self, samples_per_pixel):
+        # ====================================================
+        # === Min/Max包絡線 データindex取得関数 ===
+        # ====================================================
+        # samples_per_pixel : 1ピクセルあたりの表示データ数
+
+        # 1ピクセルあたり2ビン以上となる、最も粗いレベルを選択
+        selected_level = None
+        for level in self.levels:
+            if level[0] * 2 <= samples_per_pixel:
+                selected_level = level
+            else:
+                break
+
+        if selected_level is None:
+            # 該当レベルが無い場合は、間引き無しの全データindexを返す
+            return np.arange(self.data_len)
+
+        bin_size, min_index, max_index = selected_level
+
+        # ビン毎に最小値/最大値を出現順(時系列順)に並べた上で交互に配置
+        envelope_index = np.empty(len(min_index) * 2, dtype=min_index.dtype)
+        envelope_index[0::2] = np.minimum(min_index, max_index)
+        envelope_index[1::2] = np.maximum(min_index, max_index)
+
+        # envelope_index : Min/Max包絡線を構成する元データのindex 1次元配列(昇順)
+        return envelope_index
+
+
+def get_minmax_pyramid(data):
+    # ====================================================
+    # === Min/Max間引きピラミッド取得関数(キャッシュ付) ===
+    # ====================================================
+    # data  : 時間領域 波形データ 1次元配列
+
+    key = id(data)
+    cached = _pyramid_cache.get(key)
+
+    if cached is not None and cached[0]() is data:
+        return cached[1]
+
+    pyramid = MinMaxPyramid(data)
+
+    # numpy.ndarrayの場合のみ、波形データの破棄に合わせて自動削除されるキャッシュに登録
+    if isinstance(data, np.ndarray):
+        _pyramid_cache[key] = (weakref.ref(data), pyramid)
+        weakref.finalize(data, _pyramid_cache.pop, key, None)
+
+    # pyramid : Min/Max間引きピラミッドクラスインスタンス
+    return pyramid
+
+
+def gen_decimated_waveform_data(time_data, data, xlim, pixel_width):
+    # ========================================================
+    # === 時間領域波形 Min/Max間引きデータ生成関数 ===
+    # ========================================================
+    # time_data     : 時間領域 X軸向けデータ [s]
+    # data          : 時間領域 波形データ
+    # xlim          : X軸表示範囲 (最小値, 最大値) [s]
+    # pixel_width   : X軸表示範囲のピクセル数
+
+    time_data = np.asarray(time_data)
+    data = np.asarray(data)
+
+    # X軸表示範囲内のデータindex範囲 (範囲外の前後1点を含む)
+    start = max(np.searchsorted(time_data, xlim[0], side="left") - 1, 0)
+    stop = min(np.searchsorted(time_data, xlim[1], side="right") + 1, len(data))
+
+    samples_per_pixel = (stop - start) / max(pixel_width, 1)
+
+    if samples_per_pixel <= RAW_PLOT_SAMPLES_PER_PIXEL:
+        # 1ピクセルあたりのデータ数が少ない場合は間引きを行わない
+        return time_data[start:stop], data[start:stop]
+
+    envelope_index = get_minmax_pyramid(data).get_envelope_index(samples_per_pixel)
+
+    # X軸表示範囲内のindexのみを抽出
+    envelope_index = envelope_index[
+        np.searchsorted(envelope_index, start, side="left"):
+        np.searchsorted(envelope_index, stop, side="left")
+    ]
+
+    # time_decimated : 間引き後 時間領域 X軸向けデータ [s]
+    # data_decimated : 間引き後 時間領域 波形データ
+    return time_data[envelope_index], data[envelope_index]
+
+
+def plot_decimated_waveform(wave_fig, time_data, data, **plot_kwargs):
+    # ================================================
+    # === 時間領域波形 Min/Max間引きプロット関数 ===
+    # ================================================
+    # wave_fig      : 時間領域波形向けmatplotlib Axesインスタンス
+    # time_data     : 時間領域 X軸向けデータ [s]
+    # data          : 時間領域 波形データ
+    # plot_kwargs   : Axes.plot()に渡すキーワード引数 (label, lw, color等)
+
+    # Axesの描画幅[pixel] (figureのdpiに基づく表示/保存時のピクセル数)
+    pixel_width = wave_fig.get_window_extent().width
+
+    time_decimated, data_decimated = gen_decimated_waveform_data(
+        time_data, data, wave_fig.get_xlim(), pixel_width
+    )
+
+    # lines : 生成したmatplotlib Line2Dインスタンスのリスト
+    return wave_fig.plot(time_decimated, data_decimated, **plot_kwargs)
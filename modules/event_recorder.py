@@ -0,0 +1,405 @@
+import collections
+import datetime
+import os
+import time
+
+import numpy as np
+import scipy
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from .audio_signal_processing_basic import (a_weighting, db,
+                                            discrete_data_normalize)
+from .gen_freq_domain_data import (gen_freq_domain_data_of_signal_spctrgrm,
+                                   gen_fundamental_freq_data)
+from .log_util import get_logger, log_fields
+from .save_audio_to_wav_file import AUDIO_FORMAT_EXTENSIONS
+from .save_matplot_graph import save_matplot_graph
+
+logger = get_logger(__name__)
+
+
+class LevelTrigger:
+    # ==================================================
+    # === 音圧レベル / 帯域エネルギー トリガークラス ===
+    # ==================================================
+    # バッファの実効値レベル(パワースペクトルの総和)が閾値以上の場合にトリガーする
+    # (dbref > 0の場合は音圧レベル[dB SPL] (A=TrueでA特性補正 [dB SPL(A)]) / dbref = 0の場合は[dB FS])
+    #
+    # threshold : トリガー閾値[dB]
+    # dbref     : デシベル基準値 (dB SPLの場合は最小可聴値20[μPa] ="2e-5" / dB FSの場合は"0")
+    # A         : 聴感補正(A特性)の有効(True)/無効(False)設定
+    # band      : 対象周波数帯域 (下限[Hz], 上限[Hz]) (Noneの場合は全帯域)
+
+    def __init__(self, threshold, dbref=0, A=True, band=None):
+        self.threshold = threshold
+        self.dbref = dbref
+        self.A = A
+        self.band = band
+        if band is not None:
+            self.name = "band " + str(band[0]) + "-" + str(band[1]) + " [Hz]"
+        else:
+            self.name = "level"
+
+        # バッファ長毎の周波数重み(A特性補正 & 帯域マスク)
+        self.weights = {}
+
+    def _gen_weight(self, data_len, samplerate):
+        # ==================================================
+        # === パワースペクトル 周波数重み生成関数 ===
+        # ==================================================
+        freq = scipy.fft.rfftfreq(data_len, d=1 / samplerate)
+        weight = np.ones(len(freq))
+
+        if self.dbref > 0 and self.A:
+            # A特性補正値[dB]をパワー比に換算 (a_weighting()は周波数0を書換えるためコピーを渡す)
+            weight *= np.power(10, a_weighting(freq.copy()) / 10)
+
+        if self.band is not None:
+            weight[(freq < self.band[0]) | (freq > self.band[1])] = 0
+
+        # 片側スペクトルのため、直流/ナイキスト周波数以外を2倍する
+        weight[1:] *= 2
+        if data_len % 2 == 0:
+            weight[-1] /= 2
+
+        # weight : パワースペクトル 周波数重み 1次元配列
+        return weight / np.power(data_len, 2)
+
+    def evaluate(self, data_normalized, samplerate):
+        # ==================================
+        # === トリガー判定関数 ===
+        # ==================================
+        # data_normalized   : 時間領域 波形データ(正規化済)
+        # samplerate        : サンプリング周波数[Hz]
+        weight = self.weights.get(len(data_normalized))
+        if weight is None:
+            weight = self._gen_weight(len(data_normalized), samplerate)
+            self.weights[len(data_normalized)] = weight
+
+        # パワースペクトルの重み付き総和 = (A特性補正済/帯域内の)平均2乗値 (パーセバルの定理)
+        power = np.sum(np.square(np.abs(scipy.fft.rfft(data_normalized))) * weight)
+        level = db(np.sqrt(power), self.dbref if self.dbref > 0 else 1.0)
+
+        # triggered : トリガー有無
+        # level     : 音圧レベル[dB]
+        return level >= self.threshold, level
+
+
+class F0Trigger:
+    # ======================================
+    # === 基本周波数(F0) トリガークラス ===
+    # ======================================
+    # バッファ内で基本周波数が指定範囲内となる時間の割合が閾値以上の場合にトリガーする
+    #
+    # f0_min        : 基本周波数の下限[Hz]
+    # f0_max        : 基本周波数の上限[Hz]
+    # voiced_ratio  : トリガーする有声(範囲内)フレームの割合 (0.0～1.0)
+
+    def __init__(self, f0_min=80, f0_max=400, voiced_ratio=0.5):
+        self.f0_min = f0_min
+        self.f0_max = f0_max
+        self.voiced_ratio = voiced_ratio
+        self.name = "f0 " + str(f0_min) + "-" + str(f0_max) + " [Hz]"
+
+    def evaluate(self, data_normalized, samplerate):
+        # ==================================
+        # === トリガー判定関数 ===
+        # ==================================
+        # data_normalized   : 時間領域 波形データ(正規化済)
+        # samplerate        : サンプリング周波数[Hz]
+        f0, _ = gen_fundamental_freq_data(data_normalized, samplerate)
+        ratio = np.mean((f0 >= self.f0_min) & (f0 <= self.f0_max)) if len(f0) > 0 else 0.0
+
+        # triggered : トリガー有無
+        # ratio     : 範囲内フレームの割合
+        return ratio >= self.voiced_ratio, ratio
+
+
+def save_event_spectrogram(filename, samplerate, audio_discrete_data, trigger_time, stft_frame_size, dbref, A):
+    # ==================================================
+    # === イベント区間 スペクトログラム保存関数 ===
+    # ==================================================
+    # filename              : 保存するグラフファイル名
+    # samplerate            : サンプリング周波数[Hz]
+    # audio_discrete_data   : イベント区間の量子化離散データ (16bit量子化 byte列のリスト / モノラル)
+    # trigger_time          : イベント区間先頭からのトリガー時刻[s]
+    # stft_frame_size       : STFTフレーム長
+    # dbref                 : デシベル基準値
+    # A                     : 聴感補正(A特性)の有効(True)/無効(False)設定
+    # (SaveServiceのワーカースレッドで実行するため、pyplotを使用せずにAggキャンバスのfigureを生成する)
+
+    data_normalized = discrete_data_normalize(b"".join(audio_discrete_data), "int16")
+    freq_spctrgrm, time_spctrgrm, spectrogram = gen_freq_domain_data_of_signal_spctrgrm(
+        data_normalized, samplerate, stft_frame_size, 50, "hann", dbref, A
+    )
+
+    fig = Figure(figsize=(10, 5))
+    FigureCanvasAgg(fig)
+    spctrgrm_fig = fig.add_subplot(1, 1, 1)
+
+    # スペクトログラムデータ範囲指定
+    if dbref > 0:
+        colorbar_min, colorbar_max = 0, 90
+    else:
+        colorbar_min, colorbar_max = -100, 0
+
+    spctrgrm_im = spctrgrm_fig.pcolormesh(
+        time_spctrgrm,
+        freq_spctrgrm,
+        spectrogram,
+        vmin=colorbar_min,
+        vmax=colorbar_max,
+        cmap="jet"
+    )
+    cbar = fig.colorbar(spctrgrm_im)
+    if (dbref > 0) and not (A):
+        cbar.set_label("Sound Pressure [dB spl]")
+    elif (dbref > 0) and (A):
+        cbar.set_label("Sound Pressure [dB spl(A)]")
+    else:
+        cbar.set_label("Log Power Spectrum [dB FS]")
+
+    # トリガー時刻 (プリトリガー区間 / ポストトリガー区間の境界)
+    spctrgrm_fig.axvline(trigger_time, color="white", linestyle="--", lw=1)
+    spctrgrm_fig.set_xlabel("Time [s]")
+    spctrgrm_fig.set_ylabel("Frequency [Hz]")
+    spctrgrm_fig.set_title(os.path.basename(filename))
+
+    # filename : 保存したグラフのファイル名(拡張子あり:相対PATH)
+    return save_matplot_graph(None, fig, filename)
+
+
+class EventRecorder:
+    # ==================================================
+    # === プリトリガー付き イベント録音クラス ===
+    # ==================================================
+    # 直近pre_trigger_time[s]分のバッファをリングバッファに保持し、トリガー条件のいずれかを満たした場合に、
+    # プリトリガー区間 + ポストトリガー区間の音声を1イベントとしてSaveServiceで保存する
+    # (ポストトリガー区間中の再トリガーで区間を延長する / 最大max_event_time[s]で区切る)
+    # (無音区間は保存しないため、全区間を録音する場合と比べてディスクI/O & 保存ファイル数を削減できる)
+    #
+    # samplerate            : サンプリング周波数[Hz]
+    # triggers              : トリガー条件のリスト (LevelTrigger / F0Triggerインスタンス / いずれかを満たした場合にトリガー)
+    # save_service          : 音声 & グラフ バックグラウンド保存サービス (SaveServiceインスタンス)
+    # channels              : チャンネル数 (トリガー判定は第1チャンネルで行う)
+    # pre_trigger_time      : プリトリガー区間の時間長[s]
+    # post_trigger_time     : ポストトリガー区間の時間長[s] (最後のトリガーからの時間長)
+    # max_event_time        : 1イベントの最大時間長[s]
+    # save_spectrogram      : イベント区間のスペクトログラム(png)を保存する(True)/しない(False)設定
+    # stft_frame_size       : スペクトログラムのSTFTフレーム長
+    # dbref                 : スペクトログラムのデシベル基準値
+    # A                     : スペクトログラムの聴感補正(A特性)の有効(True)/無効(False)設定
+    # output_dir            : イベントファイルの保存ディレクトリ
+    # filename_prefix       : イベントファイル名のプレフィックス
+
+    def __init__(
+        self,
+        samplerate,
+        triggers,
+        save_service,
+        channels=1,
+        pre_trigger_time=5.0,
+        post_trigger_time=5.0,
+        max_event_time=60.0,
+        save_spectrogram=False,
+        stft_frame_size=512,
+        dbref=0,
+        A=True,
+        output_dir="wav/events",
+        filename_prefix="event_"
+    ):
+        if not triggers:
+            raise ValueError("at least one trigger is required")
+
+        self.samplerate = samplerate
+        self.triggers = triggers
+        self.save_service = save_service
+        self.channels = channels
+        self.pre_trigger_frames = int(round(pre_trigger_time * samplerate))
+        self.post_trigger_frames = int(round(post_trigger_time * samplerate))
+        self.max_event_frames = int(round(max_event_time * samplerate))
+        self.save_spectrogram = save_spectrogram
+        self.stft_frame_size = stft_frame_size
+        self.dbref = dbref
+        self.A = A
+        self.output_dir = output_dir
+        self.filename_prefix = filename_prefix
+        os.makedirs(output_dir, exist_ok=True)
+
+        # プリトリガー リングバッファ (バッファ(byte列)単位 / 直近pre_trigger_frames分以上を保持)
+        self.ring = collections.deque()
+        self.ring_frames = 0
+
+        # 録音中イベントの状態 (Noneの場合は待機中)
+        self.event = None
+
+        # 録音開始時刻 (UNIX時間[s] / 以降のイベント時刻は、サンプル数から算出する)
+        self.start_timestamp = None
+        self.total_frames = 0
+
+        # 統計
+        self.events = []
+        self.buffer_count = 0
+        self.recorded_frames = 0
+        self.busy_time = 0.0
+
+    def _evaluate(self, data):
+        # 全トリガー条件を判定する (最初に満たした条件名 & 判定値を返す)
+        x = np.frombuffer(data, dtype=np.int16)
+        if self.channels > 1:
+            x = x[::self.channels]
+        data_normalized = discrete_data_normalize(x.tobytes(), "int16")
+
+        for trigger in self.triggers:
+            triggered, value = trigger.evaluate(data_normalized, self.samplerate)
+            if triggered:
+                return trigger.name, float(value)
+
+        return None, None
+
+    def _start_event(self, trigger_name, value):
+        # ==================================
+        # === イベント録音開始関数 ===
+        # ==================================
+        buffers = list(self.ring)
+        event_frames = self.ring_frames
+        self.ring.clear()
+        self.ring_frames = 0
+
+        start_frame = self.total_frames - event_frames
+        trigger_timestamp = self.start_timestamp + (self.total_frames - self._frame_count(buffers[-1])) / self.samplerate
+        self.event = {
+            "index": len(self.events),
+            "trigger": trigger_name,
+            "value": value,
+            "trigger_time": datetime.datetime.fromtimestamp(trigger_timestamp).isoformat(timespec="milliseconds"),
+            "trigger_offset": (self.total_frames - self._frame_count(buffers[-1]) - start_frame) / self.samplerate,
+            "start_timestamp": self.start_timestamp + start_frame / self.samplerate,
+            "buffers": buffers,
+            "frames": event_frames,
+            "remaining_frames": self.post_trigger_frames
+        }
+        logger.info(
+            "Event triggered",
+            extra=log_fields(index=self.event["index"], trigger=trigger_name, value=round(value, 2))
+        )
+
+    def _finish_event(self):
+        # ==================================================
+        # === イベント録音終了 & 保存投入関数 ===
+        # ==================================================
+        event = self.event
+        self.event = None
+
+        start_time = datetime.datetime.fromtimestamp(event["start_timestamp"])
+        basename = os.path.join(
+            self.output_dir,
+            self.filename_prefix + start_time.strftime("%Y%m%d_%H%M%S") + "_" + str(event["index"]).zfill(4)
+        )
+
+        # バッファのリストをそのまま渡し、連結せずに逐次書込む
+        audio_filename = basename + AUDIO_FORMAT_EXTENSIONS[self.save_service.audio_format.upper()]
+        event["audio_future"] = self.save_service.submit_audio(
+            self.samplerate, event["buffers"], filename=audio_filename, channels=self.channels
+        )
+
+        if self.save_spectrogram:
+            buffers = event["buffers"]
+            if self.channels > 1:
+                buffers = [np.frombuffer(data, dtype=np.int16)[::self.channels].tobytes() for data in buffers]
+            event["graph_future"] = self.save_service.submit_task(
+                save_event_spectrogram,
+                basename + ".png",
+                self.samplerate,
+                buffers,
+                event["trigger_offset"],
+                self.stft_frame_size,
+                self.dbref,
+                self.A
+            )
+
+        del event["buffers"]
+        del event["remaining_frames"]
+        event["duration"] = event["frames"] / self.samplerate
+        self.recorded_frames += event["frames"]
+        self.events.append(event)
+        logger.info(
+            "Event recorded",
+            extra=log_fields(index=event["index"], filename=audio_filename, duration=round(event["duration"], 2))
+        )
+
+    def _frame_count(self, data):
+        return len(data) // (self.channels * 2)
+
+    def process(self, data, timestamp=None):
+        # ==================================================
+        # === 1バッファ分 トリガー判定 & 録音関数 ===
+        # ==================================================
+        # data      : 時間領域波形 量子化離散データ (16bit量子化 byte列 / チャンネルインターリーブ)
+        # timestamp : バッファの取得開始時刻 (UNIX時間[s] / 初回バッファのみ使用 / Noneの場合は現在時刻から算出)
+        start = time.perf_counter()
+        frame_count = self._frame_count(data)
+        if self.start_timestamp is None:
+            if timestamp is None:
+                timestamp = datetime.datetime.now().timestamp() - frame_count / self.samplerate
+            self.start_timestamp = timestamp
+
+        self.total_frames += frame_count
+        self.buffer_count += 1
+        trigger_name, value = self._evaluate(data)
+
+        if self.event is None:
+            # === 待機中 : リングバッファに追加し、プリトリガー区間より古いバッファを破棄 ===
+            self.ring.append(data)
+            self.ring_frames += frame_count
+            while self.ring_frames - self._frame_count(self.ring[0]) >= self.pre_trigger_frames:
+                self.ring_frames -= self._frame_count(self.ring.popleft())
+
+            if trigger_name is not None:
+                self._start_event(trigger_name, value)
+        else:
+            # === イベント録音中 : 再トリガーでポストトリガー区間を延長 ===
+            self.event["buffers"].append(data)
+            self.event["frames"] += frame_count
+            if trigger_name is not None:
+                self.event["remaining_frames"] = self.post_trigger_frames
+            else:
+                self.event["remaining_frames"] -= frame_count
+
+        if self.event is not None and (
+            self.event["remaining_frames"] <= 0 or self.event["frames"] >= self.max_event_frames
+        ):
+            self._finish_event()
+
+        self.busy_time += time.perf_counter() - start
+
+    def flush(self):
+        # ==================================================
+        # === 録音中イベントの保存投入関数 (録音終了時に呼出) ===
+        # ==================================================
+        if self.event is not None:
+            self._finish_event()
+
+    def format_stats(self):
+        # ==================================
+        # === イベント録音統計 文字列化 ===
+        # ==================================
+        ave_time = self.busy_time / self.buffer_count if self.buffer_count > 0 else 0
+        recorded_rate = self.recorded_frames / self.total_frames * 100 if self.total_frames > 0 else 0
+        lines = [
+            "=== Event Recorder Stats (" + ", ".join(trigger.name for trigger in self.triggers) + ") ===",
+            f"  input: {self.total_frames / self.samplerate:10.1f} [s] | events: {len(self.events):6d}"
+            f" | recorded: {self.recorded_frames / self.samplerate:10.1f} [s] ({recorded_rate:5.1f} [%])"
+            f" | ave: {ave_time * 1000:8.3f} [ms/buffer]"
+        ]
+        for event in self.events:
+            lines.append(
+                f"  #{event['index']:04d} {event['trigger_time']} | {event['trigger']:24s}"
+                f" value: {event['value']:8.2f} | duration: {event['duration']:8.2f} [s]"
+            )
+        return "\n".join(lines)
+
+    def print_stats(self):
+        print(self.format_stats())
+        print("")
@@ -0,0 +1,346 @@
+import bisect
+import datetime
+import json
+import os
+
+import numpy as np
+
+# 録音毎のメタデータファイル名
+META_FILENAME = "meta.json"
+
+# 特徴量ストア全体の録音カタログ(JSON Lines)のファイル名
+CATALOG_FILENAME = "catalog.jsonl"
+
+# 1チャンクあたりの既定フレーム数
+DEFAULT_CHUNK_FRAMES = 1024
+
+# 特徴量の保存型として指定可能なdtype
+FEATURE_DTYPES = ("float16", "float32")
+
+
+def _save_npy_atomic(filename, array):
+    # ==============================================
+    # === npyファイル保存関数 (一時ファイル経由) ===
+    # ==============================================
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, "wb") as f:
+        np.save(f, array)
+    os.replace(tmp_filename, filename)
+
+
+def _save_json_atomic(filename, data):
+    # ===============================================
+    # === jsonファイル保存関数 (一時ファイル経由) ===
+    # ===============================================
+    tmp_filename = filename + ".tmp"
+    with open(tmp_filename, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_filename, filename)
+
+
+class FeatureStore:
+    # ============================================
+    # === 特徴量ストア(チャンク分割 列指向形式) ===
+    # ============================================
+    # スペクトログラム / 基本周波数(F0) / MFCC等の時系列特徴量を、録音毎・特徴量毎に
+    # 時間軸方向(time-major)でチャンク分割したnpyファイルとして保存する
+    #
+    # <root_dir>/catalog.jsonl                          : 録音カタログ (1行1録音 / 追記のみ)
+    # <root_dir>/<recording_id>/meta.json               : 録音メタデータ & 特徴量毎のチャンク時間インデックス
+    # <root_dir>/<recording_id>/axes/<axis>.npy         : 時間軸以外の軸データ (周波数軸等)
+    # <root_dir>/<recording_id>/<feature>/value_NNNNN.npy : 特徴量値チャンク (shape: (フレーム数, ...))
+    # <root_dir>/<recording_id>/<feature>/time_NNNNN.npy  : 特徴量時間軸チャンク (shape: (フレーム数,))
+    #
+    # root_dir : 特徴量ストアのルートディレクトリ
+
+    def __init__(self, root_dir):
+        self.root_dir = root_dir
+        os.makedirs(root_dir, exist_ok=True)
+
+    def get_recording_dir(self, recording_id):
+        return os.path.join(self.root_dir, recording_id)
+
+    def has_recording(self, recording_id):
+        # meta.jsonはクローズ時に書込むため、存在する場合は書込完了済の録音とみなす
+        return os.path.isfile(os.path.join(self.get_recording_dir(recording_id), META_FILENAME))
+
+    def open_writer(self, recording_id, metadata=None, dtype="float32", chunk_frames=DEFAULT_CHUNK_FRAMES):
+        # ==============================================
+        # === 録音 特徴量書込クラスインスタンス生成 ===
+        # ==============================================
+        # recording_id  : 録音ID (ストア内の相対ディレクトリ名)
+        # metadata      : 録音メタデータ辞書 (samplerate, stft_frame_size, overlap_rate, dbref, A 等)
+        # dtype         : 特徴量の保存型 ("float16" / "float32")
+        # chunk_frames  : 1チャンクあたりのフレーム数
+        # (既存の録音IDを指定した場合は、既存チャンクの後ろに追記する)
+        return FeatureWriter(self, recording_id, metadata, dtype, chunk_frames)
+
+    def open_reader(self, recording_id):
+        # ==============================================
+        # === 録音 特徴量読込クラスインスタンス生成 ===
+        # ==============================================
+        # recording_id  : 録音ID
+        return FeatureReader(self, recording_id)
+
+    def list_recordings(self):
+        # ==================================
+        # === 録音カタログ取得関数 ===
+        # ==================================
+        catalog = {}
+        catalog_filename = os.path.join(self.root_dir, CATALOG_FILENAME)
+
+        if os.path.isfile(catalog_filename):
+            with open(catalog_filename, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    # 同一録音IDの追記は、後の行を優先する
+                    catalog[entry["recording_id"]] = entry
+
+        # catalog : 録音カタログエントリ(録音ID, メタデータ, 特徴量毎のフレーム数)のリスト
+        return list(catalog.values())
+
+    def _append_catalog(self, entry):
+        # 1行単位の追記のため、複数プロセスから並行して書込み可能
+        with open(os.path.join(self.root_dir, CATALOG_FILENAME), "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+
+class FeatureWriter:
+    # ====================================
+    # === 録音 特徴量書込クラス ===
+    # ====================================
+    # append()で受け取ったフレームをchunk_frames単位でnpyチャンクとして書出し、
+    # close()でmeta.json(チャンク時間インデックス)とカタログを更新する
+    #
+    # store         : FeatureStoreインスタンス
+    # recording_id  : 録音ID
+    # metadata      : 録音メタデータ辞書
+    # dtype         : 特徴量の保存型 ("float16" / "float32")
+    # chunk_frames  : 1チャンクあたりのフレーム数
+
+    def __init__(self, store, recording_id, metadata, dtype, chunk_frames):
+        if dtype not in FEATURE_DTYPES:
+            raise ValueError("dtype must be one of " + str(FEATURE_DTYPES) + " : " + str(dtype))
+
+        self.store = store
+        self.recording_id = recording_id
+        self.recording_dir = store.get_recording_dir(recording_id)
+        self.chunk_frames = chunk_frames
+
+        meta_filename = os.path.join(self.recording_dir, META_FILENAME)
+        if os.path.isfile(meta_filename):
+            # 既存録音への追記
+            with open(meta_filename, encoding="utf-8") as f:
+                self.meta = json.load(f)
+            if metadata:
+                self.meta["metadata"].update(metadata)
+        else:
+            self.meta = {
+                "recording_id": recording_id,
+                "created_at": datetime.datetime.now().isoformat(timespec="seconds"),
+                "dtype": dtype,
+                "metadata": dict(metadata or {}),
+                "axes": [],
+                "features": {}
+            }
+
+        # 特徴量毎の未書出しフレーム (time配列リスト, value配列リスト, フレーム数)
+        self.buffers = {}
+        os.makedirs(self.recording_dir, exist_ok=True)
+
+    def write_axis(self, axis_name, values):
+        # ==================================
+        # === 軸データ(周波数軸等)書込関数 ===
+        # ==================================
+        # axis_name : 軸名 (例:"freq_spctrgrm")
+        # values    : 軸データ 1次元配列
+        axes_dir = os.path.join(self.recording_dir, "axes")
+        os.makedirs(axes_dir, exist_ok=True)
+        _save_npy_atomic(os.path.join(axes_dir, axis_name + ".npy"), np.asarray(values, dtype=np.float64))
+
+        if axis_name not in self.meta["axes"]:
+            self.meta["axes"].append(axis_name)
+
+    def append(self, feature_name, time_data, values, axes=None):
+        # ==================================
+        # === 特徴量フレーム追記関数 ===
+        # ==================================
+        # feature_name  : 特徴量名 (例:"spectrogram", "f0", "mfcc")
+        # time_data     : フレーム毎の時刻[s] 1次元配列 (単調増加)
+        # values        : 特徴量値 (shape: (フレーム数, ...) の時間軸先頭配列)
+        # axes          : 時間軸以外の各次元に対応する軸名のリスト (write_axis()で書込んだ軸名)
+        time_data = np.atleast_1d(np.asarray(time_data, dtype=np.float64))
+        values = np.asarray(values, dtype=self.meta["dtype"])
+
+        if len(time_data) != len(values):
+            raise ValueError(
+                "time_data and values must have the same frame count : "
+                + str(len(time_data)) + " != " + str(len(values))
+            )
+
+        feature = self.meta["features"].get(feature_name)
+        if feature is None:
+            feature = {
+                "frame_shape": list(values.shape[1:]),
+                "axes": list(axes or []),
+                "frame_count": 0,
+                "chunks": []
+            }
+            self.meta["features"][feature_name] = feature
+            os.makedirs(os.path.join(self.recording_dir, feature_name), exist_ok=True)
+        elif list(values.shape[1:]) != feature["frame_shape"]:
+            raise ValueError(
+                "frame shape mismatch for '" + feature_name + "' : "
+                + str(list(values.shape[1:])) + " != " + str(feature["frame_shape"])
+            )
+
+        buffer = self.buffers.setdefault(feature_name, [[], [], 0])
+        buffer[0].append(time_data)
+        buffer[1].append(values)
+        buffer[2] += len(values)
+
+        if buffer[2] >= self.chunk_frames:
+            self._flush_feature(feature_name, final=False)
+
+    def _flush_feature(self, feature_name, final):
+        # ==========================================
+        # === 特徴量チャンク書出し関数 ===
+        # ==========================================
+        # final : 端数フレームも書出す(True)/chunk_frames単位のみ書出す(False)設定
+        buffer = self.buffers.get(feature_name)
+        if buffer is None or buffer[2] == 0:
+            return
+
+        feature = self.meta["features"][feature_name]
+        time_data = np.concatenate(buffer[0])
+        values = np.concatenate(buffer[1])
+
+        start = 0
+        while len(values) - start >= self.chunk_frames or (final and start < len(values)):
+            stop = min(start + self.chunk_frames, len(values))
+            chunk_index = len(feature["chunks"])
+            value_file = feature_name + "/value_" + str(chunk_index).zfill(5) + ".npy"
+            time_file = feature_name + "/time_" + str(chunk_index).zfill(5) + ".npy"
+
+            _save_npy_atomic(os.path.join(self.recording_dir, value_file), values[start:stop])
+            _save_npy_atomic(os.path.join(self.recording_dir, time_file), time_data[start:stop])
+
+            # チャンク時間インデックス (時間範囲指定の読込時に、対象チャンクのみを特定するために使用)
+            feature["chunks"].append({
+                "value_file": value_file,
+                "time_file": time_file,
+                "frame_count": int(stop - start),
+                "start_time": float(time_data[start]),
+                "end_time": float(time_data[stop - 1])
+            })
+            feature["frame_count"] += int(stop - start)
+            start = stop
+
+        self.buffers[feature_name] = [[time_data[start:]], [values[start:]], len(values) - start]
+
+    def close(self):
+        # ==================================================
+        # === 特徴量書込完了関数 (meta.json & カタログ更新) ===
+        # ==================================================
+        for feature_name in list(self.buffers.keys()):
+            self._flush_feature(feature_name, final=True)
+        self.buffers = {}
+
+        self.meta["updated_at"] = datetime.datetime.now().isoformat(timespec="seconds")
+        _save_json_atomic(os.path.join(self.recording_dir, META_FILENAME), self.meta)
+
+        self.store._append_catalog({
+            "recording_id": self.recording_id,
+            "metadata": self.meta["metadata"],
+            "frame_counts": {name: feature["frame_count"] for name, feature in self.meta["features"].items()}
+        })
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # 例外発生時はmeta.jsonを更新しない (書込途中のチャンクは、次回の追記時に上書きされる)
+        if exc_type is None:
+            self.close()
+
+
+class FeatureReader:
+    # ====================================
+    # === 録音 特徴量読込クラス ===
+    # ====================================
+    # チャンクはnumpy.memmapとして開き、時間範囲指定時は該当チャンクの該当範囲のみを読込む
+    #
+    # store         : FeatureStoreインスタンス
+    # recording_id  : 録音ID
+
+    def __init__(self, store, recording_id):
+        self.recording_id = recording_id
+        self.recording_dir = store.get_recording_dir(recording_id)
+
+        with open(os.path.join(self.recording_dir, META_FILENAME), encoding="utf-8") as f:
+            self.meta = json.load(f)
+
+        # 特徴量毎のチャンク開始時刻リスト (bisectによる対象チャンク検索用)
+        self.chunk_start_times = {
+            name: [chunk["start_time"] for chunk in feature["chunks"]]
+            for name, feature in self.meta["features"].items()
+        }
+
+    @property
+    def metadata(self):
+        return self.meta["metadata"]
+
+    @property
+    def features(self):
+        return list(self.meta["features"].keys())
+
+    def read_axis(self, axis_name):
+        # ==================================
+        # === 軸データ(周波数軸等)読込関数 ===
+        # ==================================
+        return np.load(os.path.join(self.recording_dir, "axes", axis_name + ".npy"), mmap_mode="r")
+
+    def read(self, feature_name, start_time=None, end_time=None):
+        # ==========================================
+        # === 特徴量 時間範囲指定読込関数 ===
+        # ==========================================
+        # feature_name  : 特徴量名
+        # start_time    : 読込開始時刻[s] (Noneの場合は先頭から)
+        # end_time      : 読込終了時刻[s] (Noneの場合は末尾まで / 終了時刻のフレームを含む)
+        feature = self.meta["features"][feature_name]
+        chunks = feature["chunks"]
+        starts = self.chunk_start_times[feature_name]
+
+        # 時間範囲と重なるチャンクのindex範囲
+        first = 0 if start_time is None else max(bisect.bisect_right(starts, start_time) - 1, 0)
+        last = len(chunks) if end_time is None else bisect.bisect_right(starts, end_time)
+
+        time_parts = []
+        value_parts = []
+        for chunk in chunks[first:last]:
+            if start_time is not None and chunk["end_time"] < start_time:
+                continue
+
+            chunk_time = np.load(os.path.join(self.recording_dir, chunk["time_file"]), mmap_mode="r")
+            chunk_value = np.load(os.path.join(self.recording_dir, chunk["value_file"]), mmap_mode="r")
+
+            lo = 0 if start_time is None else np.searchsorted(chunk_time, start_time, side="left")
+            hi = len(chunk_time) if end_time is None else np.searchsorted(chunk_time, end_time, side="right")
+
+            time_parts.append(chunk_time[lo:hi])
+            value_parts.append(chunk_value[lo:hi])
+
+        if not value_parts:
+            frame_shape = tuple(feature["frame_shape"])
+            return np.empty(0), np.empty((0,) + frame_shape, dtype=self.meta["dtype"])
+
+        if len(value_parts) == 1:
+            # 単一チャンク内の場合は、memmapのスライス(ビュー)をそのまま返す
+            return time_parts[0], value_parts[0]
+
+        # time_data : フレーム毎の時刻[s] 1次元配列
+        # values    : 特徴量値 (shape: (フレーム数, ...))
+        return np.concatenate(time_parts), np.concatenate(value_parts)
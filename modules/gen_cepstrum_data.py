@@ -1,9 +1,14 @@
+import logging
+
 import librosa
 import numpy as np
 import scipy
 
 from .audio_signal_processing_advanced import gen_mel_filter_bank
 from .audio_signal_processing_basic import db, dft_normalize, liner
+from .log_util import get_logger, log_fields
+
+logger = get_logger(__name__)
 
 
 def gen_cepstrum_data(discrete_data, samplerate, dbref):
@@ -51,7 +56,7 @@ def gen_cepstrum_data(discrete_data, samplerate, dbref):
     cut_off_index = voice_fundamental_freq // 2
     if cut_off_index < 30:
         cut_off_index = 30
-    print("cut_off_index = ", cut_off_index)
+    logger.debug("cepstrum lifter cut-off", extra=log_fields(rate_limit=1.0, cut_off_index=cut_off_index))
 
     # ケプストラム波形へのLPL(=Low-Pass-Lifter)の適用 (高次ケフレンシー成分の0化)
     cepstrum_data_lpl[cut_off_index:len(cepstrum_data_lpl) - cut_off_index] = 0
@@ -108,13 +113,9 @@ def gen_melscale_spctrm_env_data(discrete_data, samplerate, mel_filter_number, d
     # (振幅成分の正規化 & 負の周波数領域の除外)
     spectrum_normalized, amp_normalized, phase_normalized = dft_normalize(spectrum_data)
 
-    print("mel_filter_bank.shape = ", mel_filter_bank.shape)
-    print("amp_normalized.shape = ", amp_normalized.shape)
-
     # メルスケール(メル尺度)スペクトル包絡データ生成
     # (正規化後 DFTデータ振幅成分 1次元配列へのメルフィルタバンク伝達関数を適用する)
     melscale_amp_normalized = np.dot(mel_filter_bank, amp_normalized)
-    print("(np.dot(mel_filter_bank, amp_normalized).shape  = ", melscale_amp_normalized.shape)
 
     # メル周波数軸データの作成
     melscale_freq_normalized = librosa.mel_frequencies(
@@ -125,7 +126,19 @@ def gen_melscale_spctrm_env_data(discrete_data, samplerate, mel_filter_number, d
 
     # mel_freq_normalizedリストの先頭と末尾を除いた上で、メル周波数軸データとする
     melscale_freq_normalized = melscale_freq_normalized[1:-1]
-    print("len(melscale_freq_normalized) = ", len(melscale_freq_normalized))
+
+    # バッファ毎に呼出されるため、DEBUGレベル & レート制限付きでログ出力する
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "melscale spectrum envelope generated",
+            extra=log_fields(
+                rate_limit=1.0,
+                mel_filter_bank_shape=mel_filter_bank.shape,
+                amp_shape=amp_normalized.shape,
+                melscale_amp_shape=melscale_amp_normalized.shape,
+                melscale_freq_len=len(melscale_freq_normalized)
+            )
+        )
 
     # dbrefが0以上の場合、音圧レベル(dB SPL)に変換
     if dbref > 0:
@@ -1,3 +1,5 @@
+import logging
+
 import numpy as np
 import pyworld
 import scipy
@@ -5,6 +7,9 @@ import scipy
 from .audio_signal_processing_basic import (a_weighting, db,
                                             dft_negative_freq_domain_exlusion,
                                             dft_normalize)
+from .log_util import get_logger, log_fields
+
+logger = get_logger(__name__)
 
 
 def gen_freq_domain_data(discrete_data, samplerate, dbref, A):
@@ -95,32 +100,39 @@ def gen_freq_domain_data_of_signal_spctrgrm(
         mode="magnitude"
     )
 
-    print("freq_spctrgrm.shape = ", freq_spctrgrm.shape)
-    print("time_spctrgrm.shape = ", time_spctrgrm.shape)
-    print("spectrogram.shape [scipy org] = ", spectrogram.shape)
-
     # 聴感補正曲線を計算
     a_scale = a_weighting(freq_spctrgrm)
-    print("a_scale.shape = ", a_scale.shape)
 
     # dbrefが0以上の場合、音圧レベル(dB SPL)に変換
     if dbref > 0:
         spectrogram = db(spectrogram, dbref)
-        print("spectrogram.shape [dB SPL] = ", spectrogram.shape)
+        unit = "dB SPL"
 
         # A=Trueの場合に、A特性補正を行う
         if A:
             for i in range(len(time_spctrgrm)):
                 # 各時間軸データ(freq_spctrgrmと同じ次元サイズ)に対して、A特性補正を実施
                 spectrogram[:, i] += a_scale
-
-            print("spectrogram.shape [dB SPL(A)]= ", spectrogram.shape)
+            unit = "dB SPL(A)"
     else:
         # スペクトログラム 振幅データを対数パワースペクトル(=10 * log10(amp^2))に変換
         spectrogram = 20 * np.log10(spectrogram)
-        print("spectrogram.shape [dB FS] = ", spectrogram.shape)
+        unit = "dB FS"
+
+    # バッファ毎に呼出されるため、DEBUGレベル & レート制限付きでログ出力する
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "spectrogram generated (scipy.signal.spectrogram)",
+            extra=log_fields(
+                rate_limit=1.0,
+                freq_shape=freq_spctrgrm.shape,
+                time_shape=time_spctrgrm.shape,
+                spectrogram_shape=spectrogram.shape,
+                a_scale_shape=a_scale.shape,
+                unit=unit
+            )
+        )
 
-    print("")
     # freq_spctrgrm         : スペクトログラム y軸向けデータ[Hz]
     # time_spctrgrm         : スペクトログラム x軸向けデータ[s]
     # spectrogram           : スペクトログラム 振幅データ
@@ -149,9 +161,6 @@ def gen_freq_domain_data_of_stft(
     # dbref                     : デシベル基準値
     # A                         : 聴感補正(A特性)の有効(True)/無効(False)設定
 
-    print("N_ave = ", N_ave)
-    print("final_time = ", final_time)
-
     # スペクトログラムデータ格納配列の初期化
     spectrogram = []
 
@@ -167,17 +176,14 @@ def gen_freq_domain_data_of_stft(
 
     # 周波数軸データの正規化(負の周波数領域の除外)を実施
     freq_spctrgrm = dft_negative_freq_domain_exlusion(freq_data)
-    print("freq_spctrgrm.shape = ", freq_spctrgrm.shape)
 
     # DFT(離散フーリエ変換)データに対応した時間軸データを作成
     # (開始:0 , 終了:オーバーラップ処理で切り出したデータの最終時刻[s],
     #  要素数:オーバーラップ処理における切り出しフレーム数)
     time_spctrgrm = np.linspace(0, final_time, N_ave)
-    print("time_spctrgrm.shape = ", time_spctrgrm.shape)
 
     # 聴感補正曲線を計算
     a_scale = a_weighting(freq_spctrgrm)
-    print("a_scale.shape = ", a_scale.shape)
 
     # 時間軸方向データ数分のループ処理
     for i in range(N_ave):
@@ -214,36 +220,49 @@ def gen_freq_domain_data_of_stft(
 
     # numpy.ndarray変換を行う
     spectrogram = np.array(spectrogram)
-    print("spectrogram.shape = ", spectrogram.shape)
 
     # dbrefが0以上、かつ、A=Trueの場合に、A特性補正を行う
     if (dbref > 0) and A:
         spectrogram = spectrogram + a_scale
-        print("spectrogram.shape [dB(A)] = ", spectrogram.shape)
 
     # 縦軸周波数、横軸時間にするためにデータを転置
     spectrogram = spectrogram.T
-    print("spectrogram.shape [dB(A) and Transposed] = ", spectrogram.shape)
 
-    print("")
+    # バッファ毎に呼出されるため、DEBUGレベル & レート制限付きでログ出力する
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(
+            "spectrogram generated (full scratch STFT)",
+            extra=log_fields(
+                rate_limit=1.0,
+                N_ave=N_ave,
+                final_time=final_time,
+                freq_shape=freq_spctrgrm.shape,
+                time_shape=time_spctrgrm.shape,
+                spectrogram_shape=spectrogram.shape,
+                a_weighted=(dbref > 0) and A
+            )
+        )
+
     # freq_spctrgrm         : スペクトログラム y軸向けデータ[Hz]
     # time_spctrgrm         : スペクトログラム x軸向けデータ[s]
     # spectrogram           : スペクトログラム 振幅データ
     return freq_spctrgrm, time_spctrgrm, spectrogram
 
 
-def gen_fundamental_freq_data(discrete_data, samplerate):
+def gen_fundamental_freq_data(discrete_data, samplerate, frame_period=None):
     # =======================================
     # === 基本周波数 時系列データ生成関数 ===
     # =======================================
     # discrete_data     : 時間領域波形 離散データ 1次元配列
     # samplerate        : サンプリング周波数[Hz]
+    # frame_period      : 基本周波数Rawデータ抽出における時間分解能(ms単位) (Noneの場合は既定値)
 
     # === 基本周波数Rawデータの抽出
 
     # 基本周波数Rawデータ抽出における時間分解能 frame_period(ms単位)
-    # (サンプリング周期の20倍の時間長とする)
-    frame_period = (np.float64(1 / samplerate) * 1000) * 20
+    # (既定値は、サンプリング周期の20倍の時間長とする)
+    if frame_period is None:
+        frame_period = (np.float64(1 / samplerate) * 1000) * 20
 
     f0_raw, time_f0 = pyworld.dio(x=discrete_data, fs=samplerate, frame_period=frame_period)
     # f0_raw    : 基本周波数 時系列データ 1次元配列(Rawデータ)
@@ -1,18 +1,23 @@
+import datetime
+import logging
 import math
 
 from .audio_signal_processing_basic import (discrete_data_normalize,
                                             gen_time_axis_data)
 from .audio_stream import gen_discrete_data_from_audio_stream
+from .log_util import get_logger, log_fields
 
+logger = get_logger(__name__)
 
-def gen_time_domain_data(stream, frames_per_buffer, samplerate, time):
-    # ==============================================
-    # === 時間領域波形データ生成関数(時間指定版) ===
-    # ==============================================
+
+def gen_audio_discrete_data(stream, frames_per_buffer, samplerate, time):
+    # ==========================================================
+    # === 時間領域波形 量子化離散データ取得関数(時間指定版) ===
+    # ==========================================================
     # stream                : マイク入力音声データストリーム
     # frames_per_buffer     : 入力音声ストリームバッファあたりのサンプリングデータ数
     # samplerate            : サンプリングレート [sampling data count/s)]
-    # time                  : 録音時間[s] ("0"の場合は、リアルタイムモードとしてデータ生成)
+    # time                  : 録音時間[s] ("0"の場合は、リアルタイムモードとしてデータ取得)
 
     if time > 0:
         # ==========================
@@ -27,14 +32,15 @@ def gen_time_domain_data(stream, frames_per_buffer, samplerate, time):
         # サンプリング周期[s]の算出
         dt = 1 / samplerate
 
-        print("Audio Stream Recording START")
+        logger.info("Audio Stream Recording START", extra=log_fields(time=time, samplerate=samplerate))
 
         # 入力音声ストリームバッファ毎に時間領域波形 離散データ 1次元配列を生成
         for i in range(int(((time / dt) / frames_per_buffer))):
-            # 標準出力への経過時間表示
-            erapsed_time = math.floor(
-                ((i * frames_per_buffer) / samplerate) * 100) / 100
-            print("  - Erapsed Time[s]: ", erapsed_time)
+            # 経過時間のログ出力 (バッファ毎に出力されるため、DEBUGレベル & レート制限付き)
+            if logger.isEnabledFor(logging.DEBUG):
+                erapsed_time = math.floor(
+                    ((i * frames_per_buffer) / samplerate) * 100) / 100
+                logger.debug("Audio Stream Recording", extra=log_fields(rate_limit=0.5, erapsed_time=erapsed_time))
 
             # 時間領域波形 離散データ 1次元配列 生成の生成
             audio_data_per_buffer = gen_discrete_data_from_audio_stream(
@@ -43,13 +49,12 @@ def gen_time_domain_data(stream, frames_per_buffer, samplerate, time):
 
             audio_data_united.append(audio_data_per_buffer)
 
-        print("Audio Stream Recording END\n")
+        logger.info("Audio Stream Recording END")
 
         # 入力音声ストリームバッファ毎の時間領域波形 離散データ 1次元配列を連結
         # (入力音声ストリームバッファ毎に、要素が分かれていたdataを、要素間でbyte列連結)
         audio_discrete_data = b"".join(audio_data_united)
-        print("Length of Discrete All-DATA = ", len(audio_discrete_data))
-        print("")
+        logger.info("Discrete All-DATA generated", extra=log_fields(length=len(audio_discrete_data)))
 
     else:
         # ==========================
@@ -60,11 +65,27 @@ def gen_time_domain_data(stream, frames_per_buffer, samplerate, time):
         audio_discrete_data = gen_discrete_data_from_audio_stream(
             stream, frames_per_buffer
         )
-        print(
-            "Length of Discrete DATA per Buffer = ",
-            len(audio_discrete_data)
+        logger.debug(
+            "Discrete DATA per Buffer generated",
+            extra=log_fields(rate_limit=1.0, length=len(audio_discrete_data))
         )
 
+    # audio_discrete_data : 時間領域波形 量子化離散データ(16bit量子化 byte列)
+    return audio_discrete_data
+
+
+def gen_time_domain_data(stream, frames_per_buffer, samplerate, time):
+    # ==============================================
+    # === 時間領域波形データ生成関数(時間指定版) ===
+    # ==============================================
+    # stream                : マイク入力音声データストリーム
+    # frames_per_buffer     : 入力音声ストリームバッファあたりのサンプリングデータ数
+    # samplerate            : サンプリングレート [sampling data count/s)]
+    # time                  : 録音時間[s] ("0"の場合は、リアルタイムモードとしてデータ生成)
+
+    # 時間領域波形 量子化離散データの取得
+    audio_discrete_data = gen_audio_discrete_data(stream, frames_per_buffer, samplerate, time)
+
     # 時間領域波形データの正規化
     data_normalized = discrete_data_normalize(audio_discrete_data, "int16")
 
@@ -74,3 +95,32 @@ def gen_time_domain_data(stream, frames_per_buffer, samplerate, time):
     # data_normalized : 時間領域波形データ(正規化済)
     # time_normalized : 時間領域波形データ(正規化済)に対応した時間軸データ
     return data_normalized, time_normalized
+
+
+def gen_audio_stream_source(stream, frames_per_buffer, samplerate, time, take_count=1):
+    # ==============================================
+    # === 音声ストリーム ソース(ジェネレータ)関数 ===
+    # ==============================================
+    # stream                : マイク入力音声データストリーム
+    # frames_per_buffer     : 入力音声ストリームバッファあたりのサンプリングデータ数
+    # samplerate            : サンプリングレート [sampling data count/s)]
+    # time                  : 録音時間[s] ("0"の場合は、リアルタイムモードとしてバッファ毎にフレームを生成)
+    # take_count            : レコーディングモードのテイク数 (1テイク = 1フレーム)
+
+    index = 0
+
+    while (time == 0) or (index < take_count):
+        timestamp = datetime.datetime.now().timestamp()
+
+        audio_discrete_data = gen_audio_discrete_data(stream, frames_per_buffer, samplerate, time)
+
+        # index                 : フレーム番号
+        # timestamp             : フレーム取得開始時刻 (UNIX時間[s])
+        # audio_discrete_data   : 時間領域波形 量子化離散データ(16bit量子化 byte列)
+        yield {
+            "index": index,
+            "timestamp": timestamp,
+            "audio_discrete_data": audio_discrete_data
+        }
+
+        index += 1
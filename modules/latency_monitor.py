@@ -0,0 +1,209 @@
+import contextlib
+import csv
+import functools
+import json
+import threading
+import time
+
+import numpy as np
+
+# ステージ毎に保持する直近の計測数 (パーセンタイル算出 & CSV時系列出力の対象)
+DEFAULT_WINDOW_SIZE = 2048
+
+
+class _StageLatency:
+    # ==================================================
+    # === ステージ毎の処理時間 リングバッファクラス ===
+    # ==================================================
+    # window_size : 保持する直近の計測数
+
+    def __init__(self, window_size):
+        self.window_size = window_size
+        self.latencies = np.zeros(window_size, dtype=np.float64)
+        self.timestamps = np.zeros(window_size, dtype=np.float64)
+        self.count = 0
+        self.total = 0.0
+        self.max_all = 0.0
+        self.over_budget = 0
+
+    def add(self, timestamp, latency, budget):
+        i = self.count % self.window_size
+        self.latencies[i] = latency
+        self.timestamps[i] = timestamp
+        self.count += 1
+        self.total += latency
+        if latency > self.max_all:
+            self.max_all = latency
+        if budget is not None and latency > budget:
+            self.over_budget += 1
+
+    def get_window(self):
+        # 直近の計測値を計測順に並べて返す
+        n = min(self.count, self.window_size)
+        if self.count <= self.window_size:
+            return self.timestamps[:n].copy(), self.latencies[:n].copy()
+        start = self.count % self.window_size
+        order = np.r_[start:self.window_size, 0:start]
+        return self.timestamps[order], self.latencies[order]
+
+
+class LatencyMonitor:
+    # ==============================================
+    # === ステージ毎 処理時間(レイテンシ)計測クラス ===
+    # ==============================================
+    # リアルタイムループの各ステージ(音声取得/スペクトログラム/F0/描画等)の処理時間を計測し、
+    # 直近window_size回のローリングパーセンタイル(p50/p95/p99/max)として集計する
+    # (計測時の処理はperf_counter 2回 + リングバッファへの書込のみのため、常時有効のまま運用できる)
+    #
+    # budget        : 1フレームあたりの処理時間予算[s] (= frames_per_buffer / samplerate / Noneの場合は判定無し)
+    # window_size   : ステージ毎に保持する直近の計測数
+
+    def __init__(self, budget=None, window_size=DEFAULT_WINDOW_SIZE):
+        self.budget = budget
+        self.window_size = window_size
+        self.stages = {}
+        self.lock = threading.Lock()
+        self.start_time = time.time()
+
+    def record(self, stage, latency):
+        # ==================================
+        # === 処理時間 記録関数 ===
+        # ==================================
+        # stage     : ステージ名
+        # latency   : 処理時間[s]
+        # (ワーカー数2以上のステージでは複数スレッドから呼出されるため、リングバッファの更新はロック内で行う)
+        timestamp = time.time()
+        with self.lock:
+            stage_latency = self.stages.get(stage)
+            if stage_latency is None:
+                stage_latency = self.stages[stage] = _StageLatency(self.window_size)
+            stage_latency.add(timestamp, latency, self.budget)
+
+    @contextlib.contextmanager
+    def timer(self, stage):
+        # ==================================================
+        # === 処理時間計測 コンテキストマネージャ ===
+        # ==================================================
+        # (使用例) with latency_monitor.timer("f0"): ...
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    def timed(self, stage):
+        # ==================================
+        # === 処理時間計測 デコレータ ===
+        # ==================================
+        # (使用例) @latency_monitor.timed("spectrogram")
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def summary(self):
+        # ==================================
+        # === ステージ毎 集計結果取得関数 ===
+        # ==================================
+        # 計測中のステージと整合した値とするため、ロック内で計測値を複製してから集計する
+        with self.lock:
+            snapshots = [
+                (
+                    stage, stage_latency.get_window()[1], stage_latency.count, stage_latency.total,
+                    stage_latency.max_all, stage_latency.over_budget
+                )
+                for stage, stage_latency in self.stages.items()
+            ]
+
+        result = {}
+        for stage, latencies, count, total, max_all, over_budget in snapshots:
+            if len(latencies) == 0:
+                continue
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            result[stage] = {
+                "count": count,
+                "mean_ms": total / count * 1000,
+                "p50_ms": p50 * 1000,
+                "p95_ms": p95 * 1000,
+                "p99_ms": p99 * 1000,
+                "max_ms": float(np.max(latencies)) * 1000,
+                "max_all_ms": max_all * 1000,
+                "over_budget": over_budget
+            }
+
+        # result : ステージ名をキーとした集計結果辞書
+        #          (p50/p95/p99/max_msは直近window_size回、mean_ms/max_all_msは全計測の値)
+        return result
+
+    def format_stats(self):
+        # ==========================================
+        # === ステージ毎 集計結果 文字列化 ===
+        # ==========================================
+        title = "=== Latency Stats (rolling window: " + str(self.window_size)
+        if self.budget is not None:
+            title += " / budget: " + str(round(self.budget * 1000, 2)) + " [ms]"
+        lines = [title + ") ==="]
+
+        for stage, stats in self.summary().items():
+            line = (
+                f"  {stage:<12s}"
+                f" count: {stats['count']:7d}"
+                f" | p50: {stats['p50_ms']:8.2f} / p95: {stats['p95_ms']:8.2f}"
+                f" / p99: {stats['p99_ms']:8.2f} / max: {stats['max_ms']:8.2f} [ms]"
+            )
+            if self.budget is not None:
+                line += (
+                    f" | p95/budget: {stats['p95_ms'] / (self.budget * 1000) * 100:6.1f} [%]"
+                    f" / over budget: {stats['over_budget']:5d}"
+                )
+            lines.append(line)
+        return "\n".join(lines)
+
+    def print_stats(self):
+        print(self.format_stats())
+        print("")
+
+    def export_json(self, filename):
+        # ==========================================
+        # === 集計結果 JSONファイル出力関数 ===
+        # ==========================================
+        # filename : 出力JSONファイル名
+        with open(filename, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "start_time": self.start_time,
+                    "budget_ms": self.budget * 1000 if self.budget is not None else None,
+                    "window_size": self.window_size,
+                    "stages": self.summary()
+                },
+                f,
+                ensure_ascii=False,
+                indent=2
+            )
+        return filename
+
+    def export_csv(self, filename):
+        # ==================================================
+        # === 直近の計測値 CSV時系列ファイル出力関数 ===
+        # ==================================================
+        # filename : 出力CSVファイル名 (列: timestamp(UNIX時間[s]), stage, latency_ms)
+        with self.lock:
+            windows = [(stage, *stage_latency.get_window()) for stage, stage_latency in self.stages.items()]
+
+        rows = []
+        for stage, timestamps, latencies in windows:
+            rows.extend(zip(timestamps, [stage] * len(timestamps), latencies * 1000))
+        rows.sort(key=lambda row: row[0])
+
+        with open(filename, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(["timestamp", "stage", "latency_ms"])
+            for timestamp, stage, latency_ms in rows:
+                writer.writerow([f"{timestamp:.6f}", stage, f"{latency_ms:.3f}"])
+        return filename
@@ -0,0 +1,160 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+# 本リポジトリのロガーの親ロガー名
+ROOT_LOGGER_NAME = "audio_signal_processing"
+
+# ログレベル / 出力形式を指定する環境変数名
+# (例) AUDIO_SP_LOG_LEVEL=DEBUG python pyaudio_Plot_TimeWave_and_Spectrogram_of_Microphone-Input.py
+LOG_LEVEL_ENV = "AUDIO_SP_LOG_LEVEL"
+LOG_FORMAT_ENV = "AUDIO_SP_LOG_FORMAT"
+
+# 既定のログレベル (バッファ毎のログはDEBUGで出力するため、既定では出力されない)
+DEFAULT_LOG_LEVEL = "INFO"
+
+_setup_lock = threading.Lock()
+_is_setup = False
+
+
+class RateLimitFilter(logging.Filter):
+    # ==================================================
+    # === メッセージ毎 ログ出力レート制限フィルタ ===
+    # ==================================================
+    # 同一メッセージ(ロガー名 + メッセージ書式)のログを、rate_limit[s]に1回までに制限する
+    # (抑制したログ数は、次に出力するログの"suppressed"フィールドとして出力する)
+    #
+    # default_interval : rate_limit未指定のログの最小出力間隔[s] (0の場合は制限無し)
+
+    def __init__(self, default_interval=0.0):
+        super().__init__()
+        self.default_interval = default_interval
+        self.lock = threading.Lock()
+        self.last_emit_times = {}
+        self.suppressed_counts = {}
+
+    def filter(self, record):
+        interval = getattr(record, "rate_limit", None)
+        if interval is None:
+            interval = self.default_interval
+        if interval <= 0:
+            return True
+
+        key = (record.name, record.msg)
+        now = time.monotonic()
+        with self.lock:
+            last = self.last_emit_times.get(key)
+            if last is not None and now - last < interval:
+                self.suppressed_counts[key] = self.suppressed_counts.get(key, 0) + 1
+                return False
+            self.last_emit_times[key] = now
+            suppressed = self.suppressed_counts.pop(key, 0)
+
+        if suppressed > 0:
+            record.fields = dict(getattr(record, "fields", None) or {}, suppressed=suppressed)
+        return True
+
+
+class StructuredFormatter(logging.Formatter):
+    # ==========================================
+    # === 構造化フィールド対応 ログ書式クラス ===
+    # ==========================================
+    # fmt : 出力形式 ("text":「時刻 レベル ロガー名 メッセージ key=value ...」 / "json":1行1JSON)
+
+    def __init__(self, fmt="text"):
+        super().__init__()
+        self.fmt = fmt
+
+    def format(self, record):
+        fields = getattr(record, "fields", None) or {}
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.created))
+        timestamp += ".%03d" % record.msecs
+
+        if self.fmt == "json":
+            entry = {
+                "time": timestamp,
+                "level": record.levelname,
+                "logger": record.name,
+                "message": record.getMessage()
+            }
+            entry.update({key: _to_json_value(value) for key, value in fields.items()})
+            if record.exc_info:
+                entry["exc_info"] = self.formatException(record.exc_info)
+            return json.dumps(entry, ensure_ascii=False)
+
+        line = timestamp + " " + record.levelname + " " + record.name + " : " + record.getMessage()
+        if fields:
+            line += " | " + " ".join(key + "=" + str(value) for key, value in fields.items())
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+
+def _to_json_value(value):
+    # JSONに変換できない値(numpy型/タプル等)は、変換可能な値または文字列とする
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, (list, tuple)):
+        return [_to_json_value(v) for v in value]
+    if hasattr(value, "item") and getattr(value, "ndim", 1) == 0:
+        return value.item()
+    return str(value)
+
+
+def setup_logging(level=None, fmt=None, stream=None):
+    # ==================================
+    # === ログ出力設定関数 ===
+    # ==================================
+    # level     : ログレベル ("DEBUG"/"INFO"/"WARNING"等 / Noneの場合は環境変数 AUDIO_SP_LOG_LEVEL、未設定時はINFO)
+    # fmt       : 出力形式 ("text"/"json" / Noneの場合は環境変数 AUDIO_SP_LOG_FORMAT、未設定時はtext)
+    # stream    : 出力先ストリーム (Noneの場合は標準出力)
+    global _is_setup
+
+    if level is None:
+        level = os.environ.get(LOG_LEVEL_ENV, DEFAULT_LOG_LEVEL)
+    if fmt is None:
+        fmt = os.environ.get(LOG_FORMAT_ENV, "text")
+
+    with _setup_lock:
+        logger = logging.getLogger(ROOT_LOGGER_NAME)
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+
+        handler = logging.StreamHandler(stream if stream is not None else sys.stdout)
+        handler.setFormatter(StructuredFormatter(fmt))
+        handler.addFilter(RateLimitFilter())
+
+        logger.addHandler(handler)
+        logger.setLevel(level.upper() if isinstance(level, str) else level)
+        logger.propagate = False
+        _is_setup = True
+
+    return logger
+
+
+def get_logger(name):
+    # ==================================
+    # === モジュール毎 ロガー取得関数 ===
+    # ==================================
+    # name : ロガー名 (モジュール名)
+    # (初回呼出時に、環境変数に従ってログ出力を設定する)
+    if not _is_setup:
+        setup_logging()
+
+    # logger : logging.Loggerインスタンス (ROOT_LOGGER_NAMEの子ロガー)
+    return logging.getLogger(ROOT_LOGGER_NAME + "." + name.rsplit(".", 1)[-1])
+
+
+def log_fields(rate_limit=None, **fields):
+    # ==================================================
+    # === 構造化フィールド & レート制限 指定関数 ===
+    # ==================================================
+    # rate_limit    : 当該メッセージの最小出力間隔[s] (Noneの場合は制限無し)
+    # fields        : ログに付与する構造化フィールド (key=value)
+    # (使用例) logger.debug("spectrogram generated", extra=log_fields(rate_limit=1.0, shape=spectrogram.shape))
+
+    # extra : logging.Logger各メソッドのextra引数に渡す辞書
+    return {"fields": fields, "rate_limit": rate_limit}
@@ -0,0 +1,272 @@
+import time
+
+import numpy as np
+import scipy
+
+from .audio_signal_processing_basic import a_weighting, db, discrete_data_normalize
+from .log_util import get_logger, log_fields
+
+logger = get_logger(__name__)
+
+# オクターブ比 (IEC 61260 / 10進)
+OCTAVE_RATIO = np.power(10, 3 / 10)
+
+# 帯域通過フィルタ(Butterworth)の次数 (帯域通過フィルタとしての次数は2倍)
+BAND_FILTER_ORDER = 3
+
+# 間引き前のアンチエイリアス低域通過フィルタ(Butterworth)の次数 & 遮断周波数 (間引き前のサンプリング周波数に対する比)
+DECIMATION_FILTER_ORDER = 8
+DECIMATION_CUTOFF = 0.2
+
+# 各段で処理する帯域の上限周波数 (当該段のサンプリング周波数に対する比)
+# (上限以下の帯域は、1/2に間引いた次段以降で処理する / アンチエイリアスフィルタの通過域内)
+DECIMATION_BAND_LIMIT = 0.2
+
+
+def gen_band_center_freqs(fraction, fmin=25.0, fmax=20000.0, samplerate=None):
+    # ==================================================
+    # === オクターブ / 1/3オクターブバンド 中心周波数生成関数 ===
+    # ==================================================
+    # fraction      : 1オクターブあたりの帯域数 (1:オクターブバンド / 3:1/3オクターブバンド)
+    # fmin          : 最低帯域の中心周波数[Hz] (以上)
+    # fmax          : 最高帯域の中心周波数[Hz] (以下)
+    # samplerate    : サンプリング周波数[Hz] (指定時は上側帯域端がナイキスト周波数未満の帯域に限定)
+    # (中心周波数は 1000 * G^(x / fraction) [Hz] (G = 10^(3/10)) の厳密値とする)
+    x_min = int(np.ceil(fraction * np.log(fmin / 1000) / np.log(OCTAVE_RATIO) - 1e-9))
+    x_max = int(np.floor(fraction * np.log(fmax / 1000) / np.log(OCTAVE_RATIO) + 1e-9))
+    center_freqs = 1000 * np.power(OCTAVE_RATIO, np.arange(x_min, x_max + 1) / fraction)
+
+    if samplerate is not None:
+        upper_freqs = center_freqs * np.power(OCTAVE_RATIO, 1 / (2 * fraction))
+        center_freqs = center_freqs[upper_freqs < samplerate / 2]
+
+    # center_freqs : 帯域中心周波数[Hz] 1次元配列 (昇順)
+    return center_freqs
+
+
+class OctaveBandAnalyzer:
+    # ==================================================
+    # === ストリーミング オクターブ / 1/3オクターブバンド分析クラス ===
+    # ==================================================
+    # マルチレートIIRフィルタバンクで、入力音声ストリームのバッファ毎に帯域毎の音圧レベルを算出する
+    # (高域の帯域は入力のサンプリング周波数で、低域の帯域は1/2ずつ間引いた段で帯域通過フィルタを適用する)
+    # (帯域通過フィルタ / アンチエイリアスフィルタ / 間引き位相の状態はバッファ間で保持する)
+    # 算出区間毎に帯域毎の等価騒音レベル(Leq)を出力する (dbref > 0の場合は[dB SPL] / dbref = 0の場合は[dB FS])
+    # (A=Trueの場合は、帯域中心周波数のA特性補正値(a_weighting())を加算する [dB SPL(A)])
+    #
+    # samplerate    : サンプリング周波数[Hz]
+    # fraction      : 1オクターブあたりの帯域数 (1:オクターブバンド / 3:1/3オクターブバンド)
+    # fmin          : 最低帯域の中心周波数[Hz]
+    # fmax          : 最高帯域の中心周波数[Hz]
+    # dbref         : デシベル基準値 (dB SPLの場合は最小可聴値20[μPa] ="2e-5" / dB FSの場合は"0")
+    # A             : 聴感補正(A特性)の有効(True)/無効(False)設定
+    # leq_interval  : 等価騒音レベル(Leq)の算出区間[s]
+    # channels      : チャンネル数 (第1チャンネルで分析する)
+
+    def __init__(
+        self,
+        samplerate,
+        fraction=3,
+        fmin=25.0,
+        fmax=20000.0,
+        dbref=2e-5,
+        A=True,
+        leq_interval=1.0,
+        channels=1
+    ):
+        if fraction not in (1, 3):
+            raise ValueError("fraction must be 1 (octave) or 3 (third-octave) : " + str(fraction))
+
+        self.samplerate = samplerate
+        self.fraction = fraction
+        self.dbref = dbref
+        self.A = A
+        self.channels = channels
+        self.leq_interval_frames = int(round(leq_interval * samplerate))
+        if self.leq_interval_frames <= 0:
+            raise ValueError("leq_interval must be at least 1 frame : " + str(leq_interval))
+
+        self.center_freqs = gen_band_center_freqs(fraction, fmin, fmax, samplerate)
+        if len(self.center_freqs) == 0:
+            raise ValueError("no band between fmin and fmax below the Nyquist frequency")
+        half_band = np.power(OCTAVE_RATIO, 1 / (2 * fraction))
+        self.lower_freqs = self.center_freqs / half_band
+        self.upper_freqs = self.center_freqs * half_band
+
+        # 帯域中心周波数のA特性補正値[dB] (a_weighting()は周波数0を書換えるためコピーを渡す)
+        self.a_scale = a_weighting(self.center_freqs.copy()) if A else np.zeros(len(self.center_freqs))
+
+        # === 帯域毎の処理段(間引き回数)の決定 & 帯域通過フィルタ設計 ===
+        # (上側帯域端 <= 当該段のサンプリング周波数 × DECIMATION_BAND_LIMIT となる最も低いサンプリング周波数の段)
+        self.band_stages = np.maximum(
+            0, np.floor(np.log2(samplerate * DECIMATION_BAND_LIMIT / self.upper_freqs))
+        ).astype(int)
+        self.stage_count = int(np.max(self.band_stages)) + 1
+
+        self.band_sos = []
+        self.band_zi = []
+        for lower, upper, stage in zip(self.lower_freqs, self.upper_freqs, self.band_stages):
+            sos = scipy.signal.butter(
+                BAND_FILTER_ORDER, [lower, upper], btype="bandpass", output="sos", fs=samplerate / 2 ** stage
+            )
+            self.band_sos.append(sos)
+            self.band_zi.append(np.zeros((sos.shape[0], 2)))
+
+        # === 段毎のアンチエイリアスフィルタ & 間引き位相 ===
+        # (全段で同一の正規化周波数のため、係数は共通)
+        self.decimation_sos = scipy.signal.butter(
+            DECIMATION_FILTER_ORDER, DECIMATION_CUTOFF * 2, btype="lowpass", output="sos"
+        )
+        self.decimation_zi = [np.zeros((self.decimation_sos.shape[0], 2)) for _ in range(self.stage_count - 1)]
+        self.decimation_phase = [0] * (self.stage_count - 1)
+
+        # === 段毎のLeq算出状態 ===
+        # (各段のサンプル数で算出区間の境界を判定し、全段が完了した算出区間から出力する)
+        self.stage_frames = [0] * self.stage_count
+        self.stage_interval_index = [0] * self.stage_count
+        self.leq_sums = np.zeros(len(self.center_freqs))
+        self.leq_counts = np.zeros(len(self.center_freqs))
+        self.pending = {}
+        self.completed_count = 0
+
+        # 統計
+        self.total_sums = np.zeros(len(self.center_freqs))
+        self.total_counts = np.zeros(len(self.center_freqs))
+        self.total_frames = 0
+        self.chunk_count = 0
+        self.busy_time = 0.0
+        logger.debug(
+            "Octave Band Analyzer created",
+            extra=log_fields(
+                samplerate=samplerate, fraction=fraction, band_count=len(self.center_freqs),
+                stage_count=self.stage_count, dbref=dbref, A=A, leq_interval=leq_interval
+            )
+        )
+
+    def _interval_boundary(self, stage, interval_index):
+        # 段のサンプル数での算出区間の終了位置
+        return int(round((interval_index + 1) * self.leq_interval_frames / 2 ** stage))
+
+    def _levels(self, sums, counts):
+        # 帯域毎の平均2乗値 → 帯域レベル[dB] (A特性補正値を加算 / dbref = 0の場合は満振幅(1.0)を基準とする)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ms = np.where(counts > 0, sums / np.maximum(counts, 1), 0)
+        return db(np.sqrt(ms), self.dbref if self.dbref > 0 else 1.0) + self.a_scale
+
+    def _accumulate_stage(self, stage, band_x2):
+        # ==================================================
+        # === 1段分 帯域毎の2乗値積算 & 算出区間完了判定関数 ===
+        # ==================================================
+        # stage     : 段番号 (間引き回数)
+        # band_x2   : 当該段の帯域番号 → 帯域通過フィルタ出力の2乗値 の辞書
+        bands = list(band_x2.keys())
+        data_len = len(band_x2[bands[0]])
+        pos = 0
+        while pos < data_len:
+            boundary = self._interval_boundary(stage, self.stage_interval_index[stage])
+            count = min(data_len - pos, boundary - self.stage_frames[stage])
+            for band in bands:
+                self.leq_sums[band] += np.sum(band_x2[band][pos:pos + count])
+                self.leq_counts[band] += count
+            self.stage_frames[stage] += count
+            pos += count
+
+            if self.stage_frames[stage] >= boundary:
+                # 当該段の帯域の算出区間が完了
+                interval_index = self.stage_interval_index[stage]
+                entry = self.pending.setdefault(
+                    interval_index,
+                    {"sums": np.zeros(len(self.center_freqs)), "counts": np.zeros(len(self.center_freqs)), "stages": 0}
+                )
+                for band in bands:
+                    entry["sums"][band] = self.leq_sums[band]
+                    entry["counts"][band] = self.leq_counts[band]
+                    self.leq_sums[band] = 0.0
+                    self.leq_counts[band] = 0
+                entry["stages"] += 1
+                self.stage_interval_index[stage] += 1
+
+    def process(self, data):
+        # ==================================================
+        # === 1バッファ分 帯域分析関数 ===
+        # ==================================================
+        # data : 時間領域波形 量子化離散データ (16bit量子化 byte列 / チャンネルインターリーブ)
+        #        または時間領域 波形データ(正規化済 1次元配列)
+        start = time.perf_counter()
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            x = np.frombuffer(data, dtype=np.int16)
+            if self.channels > 1:
+                x = x[::self.channels]
+            x = discrete_data_normalize(x.tobytes(), "int16")
+        else:
+            x = np.asarray(data, dtype=np.float64)
+        self.total_frames += len(x)
+
+        for stage in range(self.stage_count):
+            if stage > 0:
+                # === アンチエイリアスフィルタ & 1/2間引き (間引き位相をバッファ間で保持) ===
+                x, self.decimation_zi[stage - 1] = scipy.signal.sosfilt(
+                    self.decimation_sos, x, zi=self.decimation_zi[stage - 1]
+                )
+                phase = self.decimation_phase[stage - 1]
+                self.decimation_phase[stage - 1] = (phase + len(x)) % 2
+                x = x[phase::2]
+
+            if len(x) == 0:
+                break
+
+            # === 当該段の帯域通過フィルタ ===
+            band_x2 = {}
+            for band in np.flatnonzero(self.band_stages == stage):
+                y, self.band_zi[band] = scipy.signal.sosfilt(self.band_sos[band], x, zi=self.band_zi[band])
+                band_x2[band] = np.square(y)
+            if band_x2:
+                self._accumulate_stage(stage, band_x2)
+
+        # === 全段で完了した算出区間の帯域レベルを出力 ===
+        band_leq = []
+        stage_with_bands = len(np.unique(self.band_stages))
+        while self.completed_count in self.pending and \
+                self.pending[self.completed_count]["stages"] >= stage_with_bands:
+            entry = self.pending.pop(self.completed_count)
+            levels = self._levels(entry["sums"], entry["counts"])
+            band_leq.append((self.completed_count * self.leq_interval_frames / self.samplerate, levels))
+            self.total_sums += entry["sums"]
+            self.total_counts += entry["counts"]
+            self.completed_count += 1
+
+        self.chunk_count += 1
+        self.busy_time += time.perf_counter() - start
+
+        # band_leq : バッファ内で算出区間が完了した帯域毎の等価騒音レベルのリスト
+        #            ((区間開始時刻[s], 帯域毎のLeq[dB] 1次元配列 (center_freqsと同順)) のタプル)
+        return band_leq
+
+    def leq_total(self):
+        # 計測開始から完了済の算出区間までの帯域毎の等価騒音レベル[dB] 1次元配列
+        return self._levels(self.total_sums, self.total_counts)
+
+    def format_stats(self):
+        # ==================================
+        # === 帯域分析統計 文字列化 ===
+        # ==================================
+        if self.dbref > 0:
+            unit = "dB SPL(A)" if self.A else "dB SPL"
+        else:
+            unit = "dB FS(A)" if self.A else "dB FS"
+        band_name = "Octave" if self.fraction == 1 else "1/3 Octave"
+        realtime_ratio = self.busy_time / (self.total_frames / self.samplerate) if self.total_frames > 0 else 0
+        lines = [
+            "=== " + band_name + " Band Analyzer Stats (" + unit + " / " + str(len(self.center_freqs))
+            + " bands / " + str(self.stage_count) + " stages) ===",
+            f"  measured: {self.total_frames / self.samplerate:10.1f} [s] | intervals: {self.completed_count:6d}"
+            f" | processing time / audio time: {realtime_ratio * 100:8.4f} [%]"
+        ]
+        if self.completed_count > 0:
+            for center_freq, leq in zip(self.center_freqs, self.leq_total()):
+                lines.append(f"  {center_freq:9.1f} [Hz] | Leq: {leq:7.2f}")
+        return "\n".join(lines)
+
+    def print_stats(self):
+        print(self.format_stats())
+        print("")
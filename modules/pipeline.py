@@ -0,0 +1,391 @@
+import heapq
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# ステージ間キューの終端マーカー
+_END_OF_STREAM = object()
+
+# キュー操作のタイムアウト[s] (停止要求の確認周期)
+_QUEUE_POLL_TIMEOUT = 0.1
+
+
+class PipelineStop(Exception):
+    # ==========================================
+    # === パイプライン停止要求 例外クラス ===
+    # ==========================================
+    # シンク関数からraiseする事で、パイプライン全体の停止を要求する
+    pass
+
+
+class PipelineStage:
+    # ==================================
+    # === パイプライン ステージクラス ===
+    # ==================================
+    # name          : ステージ名
+    # func          : フレーム処理関数 (引数:フレーム辞書 / 戻り値:フレーム辞書 (Noneの場合はフレームを破棄))
+    # workers       : ワーカー数
+    # executor      : ワーカーの実行方式 ("thread":スレッド / "process":プロセス)
+    #                 ("process"の場合、funcおよびフレーム辞書はpickle可能である必要あり)
+    # queue_size    : 当該ステージの入力キューの最大フレーム数 (上流ステージへのバックプレッシャー)
+
+    def __init__(self, name, func, workers=1, executor="thread", queue_size=4):
+        if executor not in ("thread", "process"):
+            raise ValueError("executor must be 'thread' or 'process' : " + str(executor))
+
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.executor = executor
+        self.queue_size = queue_size
+        self.stats = StageStats(name)
+
+
+class StageStats:
+    # ========================================
+    # === パイプライン ステージ統計クラス ===
+    # ========================================
+    # name : ステージ名
+
+    def __init__(self, name):
+        self.name = name
+        self.lock = threading.Lock()
+        self.count = 0              # 処理済フレーム数
+        self.dropped = 0            # 破棄フレーム数 (処理関数がNoneを返したフレーム)
+        self.busy_time = 0.0        # 処理関数の累積実行時間[s]
+        self.max_time = 0.0         # 処理関数の最大実行時間[s]
+        self.wait_time = 0.0        # 入力キューでのフレーム待ち累積時間[s]
+        self.blocked_time = 0.0     # 出力キュー満杯による待ち累積時間[s] (バックプレッシャー)
+        self.max_queue_depth = 0    # 入力キューの最大滞留フレーム数
+
+    def add(self, busy_time, wait_time, blocked_time, dropped, queue_depth):
+        with self.lock:
+            self.count += 1
+            if dropped:
+                self.dropped += 1
+            self.busy_time += busy_time
+            self.max_time = max(self.max_time, busy_time)
+            self.wait_time += wait_time
+            self.blocked_time += blocked_time
+            self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+
+    def format(self, elapsed_time):
+        # ==================================
+        # === ステージ統計 文字列化関数 ===
+        # ==================================
+        # elapsed_time : パイプライン実行時間[s]
+        ave_time = self.busy_time / self.count if self.count > 0 else 0
+        throughput = self.count / elapsed_time if elapsed_time > 0 else 0
+        return (
+            f"  {self.name:<12s}"
+            f" frames: {self.count:6d} (dropped: {self.dropped:4d})"
+            f" | ave: {ave_time * 1000:8.2f} [ms] / max: {self.max_time * 1000:8.2f} [ms]"
+            f" | wait: {self.wait_time:7.2f} [s] / blocked: {self.blocked_time:7.2f} [s]"
+            f" | max queue: {self.max_queue_depth:3d}"
+            f" | {throughput:7.2f} [frame/s]"
+        )
+
+
+class Pipeline:
+    # ============================================
+    # === ステージ構成型 音声処理パイプライン ===
+    # ============================================
+    # ソース → ステージ群 → シンク を有界キューで接続し、各ステージを個別のスレッド/プロセスで実行する
+    # (下流ステージの処理が滞留した場合、有界キューにより上流ステージが待たされる(バックプレッシャー))
+    # シンクはrun()の呼出スレッド(メインスレッド)で実行するため、matplotlibの描画処理をシンクとして配置できる
+    #
+    # source                : フレーム辞書を順次生成するジェネレータ関数 (引数無し)
+    # stages                : PipelineStageインスタンスのリスト (先頭から順に実行)
+    # sink                  : 最終ステージの処理関数 (引数:フレーム辞書 / PipelineStopをraiseすると停止)
+    # latency_monitor       : 各ステージの処理時間を記録するLatencyMonitorインスタンス (Noneの場合は記録無し)
+    #                         (フレーム辞書にtimestampがある場合は、取得開始からシンク処理完了までを"end_to_end"として記録)
+    # quality_controller    : 処理時間に応じて品質パラメータを制御するAdaptiveQualityControllerインスタンス
+    #                         (Noneの場合は品質制御無し / 各フレームのボトルネックステージの処理時間を計測結果として渡す)
+    # profiling_hooks       : ProfilingHooksインスタンス (Noneの場合はプロファイリング無し)
+    #                         (シンク処理毎に1イテレーションとして計数し、各ステージ/シンクの処理をcProfileで計測)
+
+    def __init__(
+        self, source, stages, sink=None, latency_monitor=None, quality_controller=None, profiling_hooks=None
+    ):
+        self.source = source
+        self.stages = stages
+        self.sink = sink
+        self.latency_monitor = latency_monitor
+        self.quality_controller = quality_controller
+        self.profiling_hooks = profiling_hooks
+
+        self.source_stats = StageStats("source")
+        self.sink_stats = StageStats("sink")
+
+        self.stop_event = threading.Event()
+        self.errors = []
+        self.threads = []
+        self.process_pools = []
+        self.start_time = None
+        self.elapsed_time = 0.0
+
+    def _put(self, q, item):
+        # ==============================================================
+        # === キュー投入関数 (満杯時は停止要求を確認しながら待機) ===
+        # ==============================================================
+        start = time.perf_counter()
+        while not self.stop_event.is_set():
+            try:
+                q.put(item, timeout=_QUEUE_POLL_TIMEOUT)
+                break
+            except queue.Full:
+                continue
+        # blocked_time : キュー満杯による待ち時間[s]
+        return time.perf_counter() - start
+
+    def _get(self, q):
+        # ==============================================================
+        # === キュー取出関数 (空の場合は停止要求を確認しながら待機) ===
+        # ==============================================================
+        while not self.stop_event.is_set():
+            try:
+                return q.get(timeout=_QUEUE_POLL_TIMEOUT)
+            except queue.Empty:
+                continue
+        return _END_OF_STREAM
+
+    def _run_source(self, out_q):
+        # ==================================
+        # === ソース実行スレッド関数 ===
+        # ==================================
+        seq = 0
+        try:
+            iterator = iter(self.source())
+            while not self.stop_event.is_set():
+                start = time.perf_counter()
+                try:
+                    frame = next(iterator)
+                except StopIteration:
+                    break
+                busy_time = time.perf_counter() - start
+                if self.latency_monitor is not None:
+                    self.latency_monitor.record("source", busy_time)
+                if self.quality_controller is not None and isinstance(frame, dict):
+                    self.quality_controller.apply(frame)
+
+                blocked_time = self._put(out_q, (seq, frame))
+                self.source_stats.add(busy_time, 0.0, blocked_time, False, 0)
+                seq += 1
+        except BaseException as e:
+            # ソースで例外が発生した場合はパイプライン全体を停止し、run()の呼出元で例外を送出する
+            self.errors.append(e)
+            self.stop()
+        finally:
+            self._put(out_q, _END_OF_STREAM)
+
+    def _run_stage_worker(self, stage, in_q, out_q, pool, finished_counter):
+        # ==========================================
+        # === ステージ ワーカー実行スレッド関数 ===
+        # ==========================================
+        # ワーカー数が1の場合は、上流ステージの並列処理で順序が入れ替わったフレームを
+        # シーケンス番号順に並べ直してから処理する
+        reorder = stage.workers == 1
+        pending = []
+        next_seq = 0
+
+        try:
+            while not self.stop_event.is_set():
+                wait_start = time.perf_counter()
+                item = self._get(in_q)
+                wait_time = time.perf_counter() - wait_start
+
+                if item is _END_OF_STREAM:
+                    # 同一ステージの他ワーカーにも終端を伝える
+                    if stage.workers > 1 and not self.stop_event.is_set():
+                        in_q.put(_END_OF_STREAM)
+                    break
+
+                if reorder:
+                    heapq.heappush(pending, (item[0], id(item), item))
+                    ready = []
+                    while pending and pending[0][0] == next_seq:
+                        ready.append(heapq.heappop(pending)[2])
+                        next_seq += 1
+                else:
+                    ready = [item]
+
+                for seq, frame in ready:
+                    busy_time = 0.0
+                    if frame is not None:
+                        start = time.perf_counter()
+                        if pool is not None:
+                            frame = pool.submit(stage.func, frame).result()
+                        elif self.profiling_hooks is not None:
+                            with self.profiling_hooks.profile_thread():
+                                frame = stage.func(frame)
+                        else:
+                            frame = stage.func(frame)
+                        busy_time = time.perf_counter() - start
+                        if self.latency_monitor is not None:
+                            self.latency_monitor.record(stage.name, busy_time)
+                        if self.quality_controller is not None and isinstance(frame, dict):
+                            frame.setdefault("processing_times", {})[stage.name] = busy_time
+
+                    # 破棄されたフレームもシーケンス番号を維持するためNoneとして下流に渡す
+                    blocked_time = self._put(out_q, (seq, frame))
+                    stage.stats.add(busy_time, wait_time, blocked_time, frame is None, in_q.qsize())
+                    wait_time = 0.0
+
+        except BaseException as e:
+            # ステージで例外が発生した場合はパイプライン全体を停止し、run()の呼出元で例外を送出する
+            self.errors.append(e)
+            self.stop()
+
+        finally:
+            with finished_counter["lock"]:
+                finished_counter["count"] += 1
+                is_last_worker = finished_counter["count"] == stage.workers
+            if is_last_worker:
+                # 全ワーカー終了時に下流ステージへ終端を伝える
+                self._put(out_q, _END_OF_STREAM)
+
+    def _run_sink(self, in_q):
+        # ==============================================
+        # === シンク実行関数 (呼出スレッドで実行) ===
+        # ==============================================
+        pending = []
+        next_seq = 0
+
+        while not self.stop_event.is_set():
+            wait_start = time.perf_counter()
+            item = self._get(in_q)
+            wait_time = time.perf_counter() - wait_start
+
+            if item is _END_OF_STREAM:
+                break
+
+            heapq.heappush(pending, (item[0], id(item), item))
+            while pending and pending[0][0] == next_seq:
+                seq, frame = heapq.heappop(pending)[2]
+                next_seq += 1
+
+                busy_time = 0.0
+                if frame is not None and self.sink is not None:
+                    if self.quality_controller is not None:
+                        self.quality_controller.restore_skipped(frame)
+
+                    start = time.perf_counter()
+                    try:
+                        if self.profiling_hooks is not None:
+                            with self.profiling_hooks.profile_thread():
+                                self.sink(frame)
+                        else:
+                            self.sink(frame)
+                    except PipelineStop:
+                        self.stop()
+                    busy_time = time.perf_counter() - start
+
+                    if self.quality_controller is not None:
+                        # 各ステージは並行実行されるため、最も処理時間の長いステージ(ボトルネック)で判定する
+                        self.quality_controller.update(
+                            max([busy_time, *frame.get("processing_times", {}).values()]),
+                            frame.get("quality", {}).get("level")
+                        )
+                    if self.latency_monitor is not None:
+                        self.latency_monitor.record("sink", busy_time)
+                        if isinstance(frame, dict) and "timestamp" in frame:
+                            self.latency_monitor.record("end_to_end", time.time() - frame["timestamp"])
+
+                self.sink_stats.add(busy_time, wait_time, 0.0, frame is None, in_q.qsize())
+                wait_time = 0.0
+
+                if self.profiling_hooks is not None:
+                    self.profiling_hooks.tick()
+
+    def run(self):
+        # ==================================
+        # === パイプライン実行関数 ===
+        # ==================================
+        # ソース終了、シンクからの停止要求、または「ctrl+c」押下までブロックする
+        self.start_time = time.perf_counter()
+        self.stop_event.clear()
+        self.errors = []
+
+        # ステージ間キューの生成 (各ステージの入力キュー + シンクの入力キュー)
+        queues = [queue.Queue(maxsize=stage.queue_size) for stage in self.stages]
+        queues.append(queue.Queue(maxsize=4))
+
+        self.threads = [
+            threading.Thread(target=self._run_source, args=(queues[0],), name="pipeline-source", daemon=True)
+        ]
+
+        for i, stage in enumerate(self.stages):
+            pool = None
+            if stage.executor == "process":
+                # GUIバックエンド/スレッド状態を引き継がないよう、spawn方式でワーカープロセスを生成する
+                pool = ProcessPoolExecutor(
+                    max_workers=stage.workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+                self.process_pools.append(pool)
+
+            finished_counter = {"lock": threading.Lock(), "count": 0}
+            for worker_index in range(stage.workers):
+                self.threads.append(
+                    threading.Thread(
+                        target=self._run_stage_worker,
+                        args=(stage, queues[i], queues[i + 1], pool, finished_counter),
+                        name=f"pipeline-{stage.name}-{worker_index}",
+                        daemon=True
+                    )
+                )
+
+        for thread in self.threads:
+            thread.start()
+
+        try:
+            self._run_sink(queues[-1])
+        except KeyboardInterrupt:
+            # 「ctrl+c」が押下された場合、パイプラインを停止する
+            pass
+        finally:
+            self.stop()
+            self.join()
+            self.elapsed_time = time.perf_counter() - self.start_time
+
+            if self.profiling_hooks is not None:
+                # 指定イテレーション数に達する前に終了した場合も、計測済の範囲でレポートを出力する
+                self.profiling_hooks.stop()
+
+        if self.errors:
+            raise self.errors[0]
+
+    def stop(self):
+        # ==================================
+        # === パイプライン停止要求関数 ===
+        # ==================================
+        self.stop_event.set()
+
+    def join(self, timeout=5):
+        # ==========================================
+        # === パイプライン実行スレッド終了待ち ===
+        # ==========================================
+        for thread in self.threads:
+            if thread is not threading.current_thread():
+                thread.join(timeout)
+        for pool in self.process_pools:
+            pool.shutdown(wait=True, cancel_futures=True)
+        self.threads = []
+        self.process_pools = []
+
+    def format_stats(self):
+        # ==========================================
+        # === パイプライン ステージ統計 文字列化 ===
+        # ==========================================
+        lines = ["=== Pipeline Stage Stats (elapsed: " + str(round(self.elapsed_time, 2)) + " [s]) ==="]
+        lines.append(self.source_stats.format(self.elapsed_time))
+        for stage in self.stages:
+            lines.append(stage.stats.format(self.elapsed_time))
+        lines.append(self.sink_stats.format(self.elapsed_time))
+        return "\n".join(lines)
+
+    def print_stats(self):
+        print(self.format_stats())
+        print("")
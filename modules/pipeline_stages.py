@@ -0,0 +1,266 @@
+from .activity_gate import (gated_call, gen_placeholder_cepstrum_data,
+                            gen_placeholder_f0_data,
+                            gen_placeholder_melscale_data)
+from .audio_signal_processing_advanced import overlap, window
+from .audio_signal_processing_basic import (discrete_data_normalize,
+                                            gen_time_axis_data)
+from .gen_cepstrum_data import (gen_cepstrum_data,
+                                gen_melscale_spctrm_env_data,
+                                gen_mfcc_spctrm_env_data)
+from .gen_freq_domain_data import (gen_freq_domain_data,
+                                   gen_freq_domain_data_of_signal_spctrgrm,
+                                   gen_freq_domain_data_of_stft,
+                                   gen_fundamental_freq_data)
+from .quality_controller import get_quality_param
+from .result_cache import cached_call
+
+# =====================================================================
+# === パイプライン ステージ関数群 ===
+# =====================================================================
+# 各ステージ関数は、フレーム辞書を受け取り、算出結果をフレーム辞書に追加して返す
+# (フレーム辞書のキー名は、各Main Codeの変数名と同一とする)
+# ステージ固有のパラメータはfunctools.partialで束縛してPipelineStageに渡す
+# (cache引数にResultCacheインスタンスを指定した場合は、解析関数の結果をキャッシュ経由で取得する)
+# (フレーム辞書に品質パラメータ"quality"がある場合は、束縛されたパラメータより優先して使用する)
+
+
+def stage_resample(frame, resampler, last=False):
+    # ==========================================
+    # === サンプリング周波数変換ステージ ===
+    # ==========================================
+    # resampler : StreamResamplerインスタンス (フィルタ状態を保持するため、ワーカー数1/スレッド実行とする)
+    # last      : フレーム毎にフィルタ状態を初期化する(True)/しない(False)設定
+    #             (レコーディングモードの場合はTrue / 1テイク = 1フレームで前後のフレームと連続しないため)
+
+    # 取得時のサンプリング周波数の量子化離散データを、解析用サンプリング周波数に変換
+    frame["audio_discrete_data"] = resampler.process(frame["audio_discrete_data"], last=last)
+
+    return frame
+
+
+def stage_octave_band(frame, analyzer):
+    # ==================================================
+    # === オクターブ / 1/3オクターブバンド分析ステージ ===
+    # ==================================================
+    # analyzer : OctaveBandAnalyzerインスタンス (フィルタ状態を保持するため、ワーカー数1/スレッド実行とする)
+
+    # 算出区間が完了した帯域毎の等価騒音レベル(Leq)のリスト (完了が無いフレームは空リスト)
+    frame["band_leq"] = analyzer.process(frame["audio_discrete_data"])
+
+    return frame
+
+
+def stage_normalize(frame, samplerate):
+    # ========================================
+    # === 時間領域波形データ 正規化ステージ ===
+    # ========================================
+    # samplerate : サンプリングレート [sampling data count/s)]
+
+    # 時間領域波形データの正規化
+    frame["data_normalized"] = discrete_data_normalize(frame["audio_discrete_data"], "int16")
+
+    # 時間領域波形データ(正規化済)に対応した時間軸データを作成
+    frame["time_normalized"] = gen_time_axis_data(frame["data_normalized"], samplerate)
+
+    return frame
+
+
+def stage_activity(frame, gate):
+    # ==========================================
+    # === 音声区間(アクティビティ)判定ステージ ===
+    # ==========================================
+    # gate : ActivityGateインスタンス (雑音レベル推定値 & ハングオーバーを保持するため、ワーカー数1/スレッド実行とする)
+    # (非アクティブなフレームでは、基本周波数 / ケプストラム / メルスケールの各ステージが解析を省略し代替データを格納する)
+
+    frame["active"], frame["activity_energy_db"], frame["activity_flatness"] = gate.process(
+        frame["data_normalized"]
+    )
+
+    return frame
+
+
+def stage_freq_domain(frame, samplerate, dbref, A, cache=None):
+    # ==================================
+    # === 周波数特性データ生成ステージ ===
+    # ==================================
+    # samplerate    : サンプリング周波数[Hz]
+    # dbref         : デシベル基準値
+    # A             : 聴感補正(A特性)の有効(True)/無効(False)設定
+    # cache         : 解析結果キャッシュ (ResultCacheインスタンス / Noneの場合はキャッシュ無し)
+
+    (
+        frame["spectrum_normalized"],
+        frame["amp_normalized"],
+        frame["phase_normalized"],
+        frame["freq_normalized"]
+    ) = cached_call(cache, gen_freq_domain_data, frame["data_normalized"], samplerate, dbref, A)
+
+    return frame
+
+
+def stage_signal_spctrgrm(frame, samplerate, stft_frame_size, overlap_rate, window_func, dbref, A, cache=None):
+    # ==============================================================
+    # === スペクトログラム生成ステージ (scipy.signal.spectrogram版) ===
+    # ==============================================================
+    # samplerate        : サンプリング周波数[Hz]
+    # stft_frame_size   : STFT(短時間フーリエ変換)を行う時系列データ数(=STFTフレーム長)
+    # overlap_rate      : オーバーラップ率 [%]
+    # window_func       : 使用する窓関数
+    # dbref             : デシベル基準値
+    # A                 : 聴感補正(A特性)の有効(True)/無効(False)設定
+    # cache             : 解析結果キャッシュ (ResultCacheインスタンス / Noneの場合はキャッシュ無し)
+
+    stft_frame_size = get_quality_param(frame, "stft_frame_size", stft_frame_size)
+    overlap_rate = get_quality_param(frame, "overlap_rate", overlap_rate)
+
+    (
+        frame["freq_spctrgrm"],
+        frame["time_spctrgrm"],
+        frame["spectrogram"]
+    ) = cached_call(
+        cache,
+        gen_freq_domain_data_of_signal_spctrgrm,
+        frame["data_normalized"], samplerate, stft_frame_size, overlap_rate, window_func, dbref, A
+    )
+
+    return frame
+
+
+def stage_frame(frame, samplerate, stft_frame_size, overlap_rate, window_func):
+    # ==================================================
+    # === STFTフレーム切り出しステージ (オーバーラップ & 窓関数) ===
+    # ==================================================
+    # samplerate        : サンプリング周波数[Hz]
+    # stft_frame_size   : STFT(短時間フーリエ変換)を行う時系列データ数(=STFTフレーム長)
+    # overlap_rate      : オーバーラップ率 [%]
+    # window_func       : 使用する窓関数
+
+    stft_frame_size = get_quality_param(frame, "stft_frame_size", stft_frame_size)
+    overlap_rate = get_quality_param(frame, "overlap_rate", overlap_rate)
+
+    # オーバーラップ処理の実行
+    data_overlaped, frame["N_ave"], frame["final_time"] = overlap(
+        frame["data_normalized"], samplerate, stft_frame_size, overlap_rate
+    )
+
+    # 窓関数の適用
+    frame["data_applied_window"], frame["acf"] = window(
+        data_overlaped, stft_frame_size, frame["N_ave"], window_func
+    )
+
+    return frame
+
+
+def stage_stft(frame, samplerate, stft_frame_size, dbref, A, cache=None):
+    # ======================================================
+    # === スペクトログラム生成ステージ (自作STFT関数版) ===
+    # ======================================================
+    # samplerate        : サンプリング周波数[Hz]
+    # stft_frame_size   : STFT(短時間フーリエ変換)を行う時系列データ数(=STFTフレーム長)
+    # dbref             : デシベル基準値
+    # A                 : 聴感補正(A特性)の有効(True)/無効(False)設定
+    # cache             : 解析結果キャッシュ (ResultCacheインスタンス / Noneの場合はキャッシュ無し)
+
+    # STFTフレーム長は、STFTフレーム切り出しステージと同一の品質パラメータを使用する
+    stft_frame_size = get_quality_param(frame, "stft_frame_size", stft_frame_size)
+
+    (
+        frame["freq_spctrgrm"],
+        frame["time_spctrgrm"],
+        frame["spectrogram"]
+    ) = cached_call(
+        cache,
+        gen_freq_domain_data_of_stft,
+        frame["data_applied_window"],
+        samplerate,
+        stft_frame_size,
+        frame["N_ave"],
+        frame["final_time"],
+        frame["acf"],
+        dbref,
+        A
+    )
+
+    return frame
+
+
+def stage_f0(frame, samplerate, cache=None):
+    # ==========================================
+    # === 基本周波数 時系列データ生成ステージ ===
+    # ==========================================
+    # samplerate : サンプリング周波数[Hz]
+    # cache      : 解析結果キャッシュ (ResultCacheインスタンス / Noneの場合はキャッシュ無し)
+
+    frame_period = get_quality_param(frame, "f0_frame_period", None)
+    if frame_period is None:
+        frame["f0"], frame["time_f0"] = gated_call(
+            frame, "f0",
+            lambda: cached_call(cache, gen_fundamental_freq_data, frame["data_normalized"], samplerate),
+            lambda: gen_placeholder_f0_data(len(frame["data_normalized"]), samplerate)
+        )
+    else:
+        frame["f0"], frame["time_f0"] = gated_call(
+            frame, "f0",
+            lambda: cached_call(cache, gen_fundamental_freq_data, frame["data_normalized"], samplerate, frame_period),
+            lambda: gen_placeholder_f0_data(len(frame["data_normalized"]), samplerate, frame_period)
+        )
+
+    return frame
+
+
+def stage_cepstrum(frame, samplerate, dbref, cache=None):
+    # ==================================
+    # === ケプストラムデータ生成ステージ ===
+    # ==================================
+    # samplerate    : サンプリング周波数[Hz]
+    # dbref         : デシベル基準値
+    # cache         : 解析結果キャッシュ (ResultCacheインスタンス / Noneの場合はキャッシュ無し)
+
+    # 品質パラメータでケプストラムの間引きが指定された場合、間引き対象フレームでは算出しない
+    # (シンク側で前フレームの算出結果を再利用する)
+    cepstrum_interval = get_quality_param(frame, "cepstrum_interval", 1)
+    if cepstrum_interval > 1 and frame.get("index", 0) % cepstrum_interval != 0:
+        frame["cepstrum_skipped"] = True
+        return frame
+
+    (
+        frame["amp_envelope_normalized"],
+        frame["cepstrum_data"],
+        frame["cepstrum_data_lpl"]
+    ) = gated_call(
+        frame, "cepstrum",
+        lambda: cached_call(cache, gen_cepstrum_data, frame["data_normalized"], samplerate, dbref),
+        lambda: gen_placeholder_cepstrum_data(len(frame["data_normalized"]))
+    )
+
+    return frame
+
+
+def stage_mel(frame, samplerate, mel_filter_number, mfcc_dim, dbref, cache=None):
+    # ==============================================================
+    # === メルスケールスペクトル包絡 & MFCCデータ生成ステージ ===
+    # ==============================================================
+    # samplerate        : サンプリング周波数[Hz]
+    # mel_filter_number : メルフィルタバンク フィルタ数
+    # mfcc_dim          : メル周波数ケプストラム係数(MFCC) 次元数
+    # dbref             : デシベル基準値
+    # cache             : 解析結果キャッシュ (ResultCacheインスタンス / Noneの場合はキャッシュ無し)
+
+    (
+        frame["melscale_amp_normalized"],
+        frame["melscale_freq_normalized"],
+        frame["mel_filter_bank"]
+    ) = gated_call(
+        frame, "melscale",
+        lambda: cached_call(
+            cache, gen_melscale_spctrm_env_data, frame["data_normalized"], samplerate, mel_filter_number, dbref
+        ),
+        lambda: gen_placeholder_melscale_data(len(frame["data_normalized"]), samplerate, mel_filter_number)
+    )
+
+    # (MFCCは演算量が小さいため常に算出する / 非アクティブ時は代替データ(NaN)からNaNとなる)
+    frame["mfcc_amp_normalized"] = cached_call(
+        cache, gen_mfcc_spctrm_env_data, frame["melscale_amp_normalized"], mfcc_dim, mel_filter_number
+    )
+
+    return frame
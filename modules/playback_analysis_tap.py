@@ -0,0 +1,285 @@
+import collections
+import threading
+import time
+
+import numpy as np
+
+from .log_util import get_logger, log_fields
+
+logger = get_logger(__name__)
+
+# 表示待ち(DAC時刻同期)の最大待ち時間[s]
+MAX_SYNC_WAIT_TIME = 1.0
+
+# 遅延統計に保持する直近の計測数
+LAG_HISTORY_SIZE = 4096
+
+
+class PlaybackAnalysisTap:
+    # ==================================================
+    # === 再生音声 解析用タップクラス (再生 & 解析モード) ===
+    # ==================================================
+    # WavPlayerのリーダースレッドが読込んだPCMデータ(mmapのmemoryview / デコード済配列)を参照で保持し、
+    # 出力コールバックが再生したbyte範囲と同一の範囲を、コピー無しでパイプラインのソースとして渡す
+    # (解析フレームが読込単位の境界を跨ぐ場合 / ステレオの場合のみ、1フレーム分をコピーする)
+    # 各解析フレームには、先頭サンプルがDACから出力される時刻(time.monotonic()基準)を付与し、
+    # シンクでは当該時刻まで表示を待つ事で、表示を再生音声に同期させる
+    #
+    # player            : WavPlayerインスタンス (16bit PCMであること / start()前に生成すること)
+    # frames_per_buffer : 解析フレームあたりのフレーム数 (Noneの場合はplayerの出力バッファと同一)
+    # max_lag_time      : 解析が再生に遅れた場合に許容する遅れ[s] (超過分は解析せずに破棄する)
+    # latency_monitor   : 表示遅延を"playback_lag"として記録するLatencyMonitorインスタンス (Noneの場合は記録無し)
+
+    def __init__(self, player, frames_per_buffer=None, max_lag_time=1.0, latency_monitor=None):
+        if player.sampwidth != 2:
+            raise ValueError("analysis tap supports 16bit PCM only : sampwidth = " + str(player.sampwidth))
+
+        self.player = player
+        self.samplerate = player.samplerate
+        self.channels = player.channels
+        self.frame_bytes = player.frame_bytes
+        self.frames_per_buffer = frames_per_buffer if frames_per_buffer is not None else player.frames_per_buffer
+        self.buffer_bytes = self.frames_per_buffer * self.frame_bytes
+        self.max_lag_bytes = max(int(max_lag_time * self.samplerate), self.frames_per_buffer * 2) * self.frame_bytes
+        self.latency_monitor = latency_monitor
+
+        # 解析フレームが読込単位を跨がないよう、リーダースレッドの読込フレーム数を解析フレーム長の整数倍とする
+        read_frames = max(player.read_frames // self.frames_per_buffer, 1) * self.frames_per_buffer
+        if read_frames * self.frame_bytes <= player.ring.capacity // 2:
+            player.read_frames = read_frames
+
+        self.cond = threading.Condition()
+
+        # リーダースレッドの読込データ (リングバッファの累積書込byte数での開始/終了位置, プレイリスト内のindex,
+        # ファイル内の開始フレーム, PCMデータ)
+        self.chunks = collections.deque()
+
+        # 出力コールバックの再生範囲 (リングバッファの累積読出byte数での開始/終了位置, 先頭サンプルのDAC出力時刻)
+        self.segments = collections.deque()
+
+        # 次に解析するフレームの開始位置 (累積byte数)
+        self.analysis_total = 0
+        self.finished = False
+
+        # 統計
+        self.frame_count = 0
+        self.copied_count = 0
+        self.dropped_frames = 0
+        self.late_count = 0
+        self.lags = collections.deque(maxlen=LAG_HISTORY_SIZE)
+
+        player.analysis_tap = self
+
+    def add_chunk(self, start_total, track_index, track_frame, data):
+        # ==================================================
+        # === 読込データ登録関数 (リーダースレッドから呼出) ===
+        # ==================================================
+        # start_total   : リングバッファへの書込開始位置 (累積byte数)
+        # track_index   : プレイリスト内のindex
+        # track_frame   : ファイル内の読込開始フレーム
+        # data          : 読込んだPCMデータ (memoryview / 参照のみ保持する)
+        with self.cond:
+            self.chunks.append((start_total, start_total + len(data), track_index, track_frame, data))
+
+    def add_played(self, start_total, n_bytes, time_info):
+        # ======================================================
+        # === 再生範囲登録関数 (出力コールバックから呼出) ===
+        # ======================================================
+        # start_total   : リングバッファからの読出開始位置 (累積byte数)
+        # n_bytes       : 読出byte数
+        # time_info     : PortAudioのコールバック時刻情報 (output_buffer_dac_time / current_time)
+        now = time.monotonic()
+        dac_time = time_info.get("output_buffer_dac_time", 0) if time_info else 0
+        current_time = time_info.get("current_time", 0) if time_info else 0
+        if dac_time > 0 and current_time > 0:
+            # PortAudioのストリーム時刻をtime.monotonic()基準に換算
+            dac_time = now + (dac_time - current_time)
+        else:
+            # DAC出力時刻を取得できないホストAPIの場合は、1出力バッファ分の遅延と見なす
+            dac_time = now + self.player.frames_per_buffer / self.samplerate
+
+        with self.cond:
+            self.segments.append((start_total, start_total + n_bytes, dac_time))
+
+            # 解析が停止/大幅に遅延している場合も保持データが増え続けないよう、許容遅れより古いデータを破棄
+            limit = start_total - self.max_lag_bytes - self.buffer_bytes
+            while self.chunks and self.chunks[0][1] <= limit:
+                self.chunks.popleft()
+            while self.segments and self.segments[0][1] <= limit:
+                self.segments.popleft()
+            self.cond.notify()
+
+    def finish(self):
+        # ==================================
+        # === 再生終了通知関数 ===
+        # ==================================
+        with self.cond:
+            self.finished = True
+            self.cond.notify_all()
+
+    def clear(self):
+        with self.cond:
+            self.chunks.clear()
+            self.segments.clear()
+
+    def _next_frame_range(self):
+        # ==================================================
+        # === 次の解析フレーム範囲 決定関数 (ロック内で呼出) ===
+        # ==================================================
+        # 戻り値 : 解析フレーム開始位置の再生範囲 (未再生の場合はNone)
+        while self.segments:
+            start, end, _ = self.segments[0]
+            if self.analysis_total < start:
+                # シーク/再生開始直後は、再生範囲の先頭以降で、解析フレーム長の境界から解析する
+                self.analysis_total = -(-start // self.buffer_bytes) * self.buffer_bytes
+            if end <= self.analysis_total:
+                self.segments.popleft()
+                continue
+
+            # 連続して再生された範囲の末尾
+            played_end = end
+            for segment in list(self.segments)[1:]:
+                if segment[0] != played_end:
+                    break
+                played_end = segment[1]
+
+            if played_end - self.analysis_total > self.max_lag_bytes:
+                # 解析が許容遅れを超えた場合は、最新の1フレーム分以上を残して破棄する (解析フレーム長の境界に揃える)
+                new_total = (played_end - self.buffer_bytes) // self.buffer_bytes * self.buffer_bytes
+                self.dropped_frames += (new_total - self.analysis_total) // self.frame_bytes
+                self.analysis_total = new_total
+                continue
+
+            if played_end - self.analysis_total >= self.buffer_bytes:
+                return self.segments[0]
+
+            if played_end != self.segments[-1][1]:
+                # シークにより再生範囲が不連続となった場合は、1フレームに満たない端数を破棄する
+                self.dropped_frames += (played_end - self.analysis_total) // self.frame_bytes
+                self.analysis_total = played_end
+                continue
+
+            return None
+        return None
+
+    def _slice_chunks(self, start, end):
+        # ==================================================
+        # === 解析フレーム PCMデータ取得関数 (ロック内で呼出) ===
+        # ==================================================
+        while self.chunks and self.chunks[0][1] <= start:
+            self.chunks.popleft()
+
+        chunk_start, chunk_end, track_index, track_frame, data = self.chunks[0]
+        track_frame += (start - chunk_start) // self.frame_bytes
+        if chunk_start <= start and end <= chunk_end:
+            # 1つの読込単位に収まる場合は、読込データのスライス(参照)を渡す
+            return data[start - chunk_start:end - chunk_start], track_index, track_frame, False
+
+        # 読込単位の境界を跨ぐ場合のみ、連結(コピー)する
+        parts = []
+        for chunk_start, chunk_end, _, _, data in self.chunks:
+            if chunk_start >= end:
+                break
+            parts.append(data[max(start - chunk_start, 0):min(end, chunk_end) - chunk_start])
+        return b"".join(parts), track_index, track_frame, True
+
+    def source(self):
+        # ==================================================
+        # === 再生音声 ソース(ジェネレータ)関数 ===
+        # ==================================================
+        # (Pipelineのsourceに指定する / 再生終了まで、再生済の範囲をframes_per_buffer毎にフレームとして生成)
+        index = 0
+
+        while True:
+            with self.cond:
+                segment = self._next_frame_range()
+                while segment is None:
+                    if self.finished:
+                        return
+                    self.cond.wait(0.1)
+                    segment = self._next_frame_range()
+
+                start = self.analysis_total
+                end = start + self.buffer_bytes
+                data, track_index, track_frame, copied = self._slice_chunks(start, end)
+                self.analysis_total = end
+
+            dac_time = segment[2] + (start - segment[0]) // self.frame_bytes / self.samplerate
+
+            if self.channels > 1:
+                # ステレオ等の場合は、先頭チャンネルを解析対象とする
+                data = np.ascontiguousarray(np.frombuffer(data, dtype=np.int16)[::self.channels])
+                copied = True
+
+            self.frame_count += 1
+            if copied:
+                self.copied_count += 1
+
+            # index                 : フレーム番号
+            # timestamp             : フレーム生成時刻 (UNIX時間[s])
+            # audio_discrete_data   : 再生したPCMデータ(16bit量子化) (読込データのmemoryview)
+            # dac_time              : フレーム先頭サンプルのDAC出力時刻 (time.monotonic()基準[s])
+            # track_index           : プレイリスト内のindex
+            # track_time            : フレーム先頭のファイル内時間[s]
+            yield {
+                "index": index,
+                "timestamp": time.time(),
+                "audio_discrete_data": data,
+                "dac_time": dac_time,
+                "track_index": track_index,
+                "track_time": track_frame / self.samplerate
+            }
+            index += 1
+
+    def wait_for_playback(self, frame):
+        # ==================================================
+        # === 表示同期関数 (シンクから表示前に呼出) ===
+        # ==================================================
+        # フレーム先頭サンプルがDACから出力される時刻まで待ち、出力時刻からの表示遅れを記録する
+        # frame : source()が生成したフレーム辞書
+        delay = frame["dac_time"] - time.monotonic()
+        if delay > 0:
+            time.sleep(min(delay, MAX_SYNC_WAIT_TIME))
+
+        lag = time.monotonic() - frame["dac_time"]
+        self.lags.append(lag)
+        if lag > self.frames_per_buffer / self.samplerate:
+            self.late_count += 1
+        if self.latency_monitor is not None:
+            self.latency_monitor.record("playback_lag", max(lag, 0.0))
+
+        logger.debug(
+            "Analysis Frame displayed",
+            extra=log_fields(
+                rate_limit=1.0, index=frame["index"], track_index=frame["track_index"],
+                track_time=round(frame["track_time"], 3), lag_ms=round(lag * 1000, 1)
+            )
+        )
+
+        # lag : DAC出力時刻からの表示遅れ[s] (再生位置に対する解析の遅れ)
+        return lag
+
+    def format_stats(self):
+        # ==========================================
+        # === 再生 & 解析 同期統計 文字列化 ===
+        # ==========================================
+        lines = [
+            "=== Playback Analysis Stats (frames: " + str(self.frame_count)
+            + " / buffer: " + str(round(self.frames_per_buffer / self.samplerate * 1000, 1)) + " [ms]) ==="
+        ]
+        lines.append(
+            f"  zero-copy frames: {self.frame_count - self.copied_count:6d}"
+            f" | copied frames: {self.copied_count:6d}"
+            f" | dropped: {self.dropped_frames / self.samplerate:7.2f} [s]"
+        )
+        if self.lags:
+            lags = np.array(self.lags) * 1000
+            lines.append(
+                f"  lag  ave: {lags.mean():8.2f} [ms] / p95: {np.percentile(lags, 95):8.2f} [ms]"
+                f" / max: {lags.max():8.2f} [ms] | late frames: {self.late_count:6d}"
+            )
+        return "\n".join(lines)
+
+    def print_stats(self):
+        print(self.format_stats())
+        print("")
@@ -3,6 +3,8 @@ import warnings
 import numpy as np
 from matplotlib import pyplot as plt
 
+from .decimate_waveform import plot_decimated_waveform
+
 
 def gen_graph_figure(graph_type):
     # ==========================
@@ -265,8 +267,9 @@ def plot_time_and_freq(
     # レイアウト設定
     fig.tight_layout()
 
-    # 時間領域波形データプロット
-    wave_fig.plot(
+    # 時間領域波形データプロット (表示ピクセル数に応じたMin/Max間引きを実施)
+    plot_decimated_waveform(
+        wave_fig,
         time_normalized,
         data_normalized,
         label="Time Waveform",
@@ -393,8 +396,9 @@ def plot_time_and_spectrogram(
         # レイアウト設定
         fig.tight_layout()
 
-        # 時間領域波形データプロット
-        wave_fig.plot(
+        # 時間領域波形データプロット (表示ピクセル数に応じたMin/Max間引きを実施)
+        plot_decimated_waveform(
+            wave_fig,
             time_normalized,
             data_normalized,
             label="Time Waveform",
@@ -634,8 +638,9 @@ def plot_time_freq_quef(
     # レイアウト設定
     fig.tight_layout()
 
-    # 時間領域波形データプロット
-    wave_fig.plot(
+    # 時間領域波形データプロット (表示ピクセル数に応じたMin/Max間引きを実施)
+    plot_decimated_waveform(
+        wave_fig,
         time_normalized,
         data_normalized,
         label="Time Waveform",
@@ -811,8 +816,9 @@ def plot_time_freq_melfreq(
     # レイアウト設定
     fig.tight_layout()
 
-    # 時間領域波形データプロット
-    wave_fig.plot(
+    # 時間領域波形データプロット (表示ピクセル数に応じたMin/Max間引きを実施)
+    plot_decimated_waveform(
+        wave_fig,
         time_normalized,
         data_normalized,
         label="Time Waveform",
@@ -0,0 +1,364 @@
+import collections
+import contextlib
+import cProfile
+import datetime
+import io
+import json
+import os
+import pstats
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+
+from .log_util import get_logger, log_fields
+
+logger = get_logger(__name__)
+
+# プロファイリングを起動時から有効にする環境変数名 (値はプロファイリング対象のイテレーション数)
+# (例) AUDIO_SP_PROFILE=200 python pyaudio_Plot_TimeWave_and_Spectrogram_of_Microphone-Input.py
+PROFILE_ENV = "AUDIO_SP_PROFILE"
+
+# プロファイリング結果の出力ディレクトリ (graph/ & wav/と同じ階層)
+DEFAULT_PROFILE_DIR = "profile/"
+
+# tracemallocのメモリ確保元集計の対象とするファイル (本リポジトリのmodules/配下)
+_TRACEMALLOC_TARGET_PATTERN = os.path.join("*", "modules", "*")
+
+# Python 3.12以降のcProfileは、sys.monitoringによりインタプリタ全体(全スレッド)を1つのプロファイラで計測し、
+# 同時に有効化できるプロファイラは1つのみ (2つ目のenable()はValueError) のため、スレッド毎ではなく共有の1つで計測する
+_SHARED_CPROFILE = sys.version_info >= (3, 12)
+
+# サンプリング結果の関数毎集計から除外する待機中の関数 (キュー待ち / スレッド待ち)
+_IDLE_FUNCTIONS = {"threading.py:wait", "queue.py:get", "queue.py:put", "selectors.py:select"}
+
+
+class ProfilingHooks:
+    # ==================================================
+    # === オンデマンド プロファイリングクラス ===
+    # ==================================================
+    # request()の呼出し(フラグ指定 / SIGUSR1受信)後、メインループのiterations回分について
+    # 以下を計測し、profile/<日時>/ ディレクトリにレポートを出力する
+    #   cProfile    : 関数毎の呼出回数/実行時間 (スレッド毎に計測して統合 / Python 3.12以降は全スレッド共有の1つで計測)
+    #   tracemalloc : modules/配下のメモリ確保元 (行単位 / ループ中間時点 & 開始時点からの増加分)
+    #   sampling    : 全スレッドのスタックの定期サンプリング (flamegraph向けcollapsed形式)
+    # (プロセス実行のステージ内の処理は、cProfile/tracemallocの計測対象外となる)
+    #
+    # iterations            : プロファイリング対象のメインループのイテレーション数
+    # output_dir            : レポートの出力ディレクトリ
+    # enable_cprofile       : cProfileの有効(True)/無効(False)設定
+    # enable_tracemalloc    : tracemallocの有効(True)/無効(False)設定
+    # enable_sampling       : サンプリングプロファイラの有効(True)/無効(False)設定
+    # sampling_interval     : サンプリング周期[s]
+    # tracemalloc_frames    : tracemallocで記録するトレースバックのフレーム数
+
+    def __init__(
+        self,
+        iterations=100,
+        output_dir=DEFAULT_PROFILE_DIR,
+        enable_cprofile=True,
+        enable_tracemalloc=True,
+        enable_sampling=True,
+        sampling_interval=0.005,
+        tracemalloc_frames=8
+    ):
+        self.iterations = iterations
+        self.output_dir = output_dir
+        self.enable_cprofile = enable_cprofile
+        self.enable_tracemalloc = enable_tracemalloc
+        self.enable_sampling = enable_sampling
+        self.sampling_interval = sampling_interval
+        self.tracemalloc_frames = tracemalloc_frames
+
+        self.lock = threading.Lock()
+        self.requested = False
+        self.active = False
+        self.iteration = 0
+        self.report_dirs = []
+
+        # スレッド毎のcProfileインスタンス (key: スレッドident / value: [cProfile.Profile, ロック])
+        self.profiles = {}
+
+    def request(self):
+        # ==================================================
+        # === プロファイリング開始要求関数 ===
+        # ==================================================
+        # (シグナルハンドラから呼出されるため、フラグの設定のみを行い、次のtick()で開始する)
+        self.requested = True
+
+    def install_signal_handler(self, signum=None):
+        # ==================================================
+        # === プロファイリング開始シグナル ハンドラ設定関数 ===
+        # ==================================================
+        # signum : プロファイリングを開始するシグナル (Noneの場合はSIGUSR1)
+        # (SIGUSR1の無いOS(Windows)の場合、およびメインスレッド以外から呼出した場合は設定しない)
+        if signum is None:
+            signum = getattr(signal, "SIGUSR1", None)
+        if signum is None or threading.current_thread() is not threading.main_thread():
+            return False
+
+        signal.signal(signum, lambda received_signum, frame: self.request())
+        logger.info("Profiling hooks installed", extra=log_fields(signal=signal.Signals(signum).name, pid=os.getpid()))
+        return True
+
+    def tick(self):
+        # ==================================================
+        # === メインループ 1イテレーション完了通知関数 ===
+        # ==================================================
+        # (メインループ(パイプラインのシンク)から、イテレーション毎に呼出)
+        if self.active:
+            self.iteration += 1
+            if self.enable_tracemalloc and self.iteration == self.iterations // 2:
+                # ループ処理中の一時的なメモリ確保を捉えるため、中間時点のスナップショットを取得
+                self.snapshot_mid = tracemalloc.take_snapshot()
+            if self.iteration >= self.iterations:
+                self.stop()
+        elif self.requested:
+            self.requested = False
+            self.start()
+
+    @contextlib.contextmanager
+    def profile_thread(self):
+        # ==================================================
+        # === 呼出スレッドのcProfile計測 コンテキストマネージャ ===
+        # ==================================================
+        # (使用例) with profiling_hooks.profile_thread(): frame = stage.func(frame)
+        # (Python 3.12以降は、start()で有効化した共有のプロファイラで全スレッドを計測するため何もしない)
+        if not (self.active and self.enable_cprofile) or _SHARED_CPROFILE:
+            yield
+            return
+
+        ident = threading.get_ident()
+        entry = self.profiles.get(ident)
+        if entry is None:
+            with self.lock:
+                entry = self.profiles.setdefault(ident, [cProfile.Profile(), threading.Lock()])
+
+        profile, profile_lock = entry
+        with profile_lock:
+            try:
+                profile.enable()
+            except ValueError:
+                # 他のプロファイリングツールが有効な場合は、当該呼出を計測しない
+                logger.warning("cProfile could not be enabled (another profiling tool is active)")
+                yield
+                return
+            try:
+                yield
+            finally:
+                profile.disable()
+
+    def start(self):
+        # ==================================
+        # === プロファイリング開始関数 ===
+        # ==================================
+        if self.active:
+            return
+
+        self.iteration = 0
+        self.profiles = {}
+        self.snapshot_start = None
+        self.snapshot_mid = None
+        self.samples = collections.Counter()
+        self.sample_count = 0
+        self.start_time = time.perf_counter()
+        self.started_at = datetime.datetime.now()
+
+        if self.enable_tracemalloc:
+            self.tracemalloc_started = not tracemalloc.is_tracing()
+            if self.tracemalloc_started:
+                tracemalloc.start(self.tracemalloc_frames)
+            tracemalloc.reset_peak()
+            self.snapshot_start = tracemalloc.take_snapshot()
+
+        if self.enable_cprofile and _SHARED_CPROFILE:
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                self.profiles["shared"] = [profile, threading.Lock()]
+            except ValueError:
+                logger.warning("cProfile could not be enabled (another profiling tool is active)")
+
+        self.active = True
+
+        if self.enable_sampling:
+            self.sampling_thread = threading.Thread(
+                target=self._run_sampling, name="profiling-sampler", daemon=True
+            )
+            self.sampling_thread.start()
+
+        logger.info("Profiling START", extra=log_fields(iterations=self.iterations))
+
+    def _run_sampling(self):
+        # ======================================================
+        # === サンプリングプロファイラ 実行スレッド関数 ===
+        # ======================================================
+        own_ident = threading.get_ident()
+        while self.active:
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(os.path.basename(code.co_filename) + ":" + code.co_name)
+                    frame = frame.f_back
+
+                thread_name = thread_names.get(ident, str(ident))
+                self.samples[";".join([thread_name] + stack[::-1])] += 1
+
+            self.sample_count += 1
+            time.sleep(self.sampling_interval)
+
+    def stop(self):
+        # ==========================================
+        # === プロファイリング停止 & レポート出力関数 ===
+        # ==========================================
+        if not self.active:
+            return None
+
+        self.active = False
+        elapsed_time = time.perf_counter() - self.start_time
+
+        if _SHARED_CPROFILE and "shared" in self.profiles:
+            self.profiles["shared"][0].disable()
+
+        report_dir = os.path.join(self.output_dir, self.started_at.strftime("%Y%m%d_%H%M%S"))
+        os.makedirs(report_dir, exist_ok=True)
+        summary = {
+            "started_at": self.started_at.isoformat(),
+            "iterations": self.iteration,
+            "elapsed_time": elapsed_time
+        }
+
+        if self.enable_sampling:
+            self.sampling_thread.join()
+            self._write_sampling_report(report_dir)
+            summary["sample_count"] = self.sample_count
+
+        if self.enable_cprofile:
+            summary["profiled_threads"] = self._write_cprofile_report(report_dir)
+
+        if self.enable_tracemalloc:
+            current, peak = tracemalloc.get_traced_memory()
+            summary["tracemalloc_current_bytes"] = current
+            summary["tracemalloc_peak_bytes"] = peak
+            self._write_tracemalloc_report(report_dir, tracemalloc.take_snapshot())
+            if self.tracemalloc_started:
+                tracemalloc.stop()
+            self.snapshot_start = None
+            self.snapshot_mid = None
+
+        with open(os.path.join(report_dir, "summary.json"), "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+
+        self.report_dirs.append(report_dir)
+        logger.info("Profiling END", extra=log_fields(report_dir=report_dir, **summary))
+
+        # report_dir : レポートの出力ディレクトリ
+        return report_dir
+
+    def _write_cprofile_report(self, report_dir):
+        # スレッド毎のcProfile計測結果を統合し、pstats形式とテキスト形式で出力する
+        # (計測中のスレッドは、当該呼出の完了を待ってから統合する)
+        stats = None
+        profiled_count = 0
+        for profile, profile_lock in list(self.profiles.values()):
+            with profile_lock:
+                try:
+                    if stats is None:
+                        stats = pstats.Stats(profile)
+                    else:
+                        stats.add(profile)
+                except TypeError:
+                    # 計測結果が無いプロファイル(有効化できなかった場合等)は統合しない
+                    continue
+                profiled_count += 1
+
+        if stats is None:
+            return 0
+
+        stats.dump_stats(os.path.join(report_dir, "cprofile.prof"))
+
+        text = io.StringIO()
+        stats.stream = text
+        stats.sort_stats("cumulative").print_stats(50)
+        stats.sort_stats("tottime").print_stats(50)
+        with open(os.path.join(report_dir, "cprofile.txt"), "w", encoding="utf-8") as f:
+            f.write(text.getvalue())
+
+        return profiled_count
+
+    def _write_tracemalloc_report(self, report_dir, snapshot_end):
+        # modules/配下のメモリ確保元を、ループ中間時点の確保量順 & 開始時点からの増加量順に出力する
+        target_filter = [tracemalloc.Filter(True, _TRACEMALLOC_TARGET_PATTERN)]
+        lines = []
+
+        snapshot_mid = self.snapshot_mid if self.snapshot_mid is not None else snapshot_end
+        lines.append("=== Top allocations in modules/ (mid-loop snapshot, by line) ===")
+        for stat in snapshot_mid.filter_traces(target_filter).statistics("lineno")[:30]:
+            lines.append(str(stat))
+
+        lines.append("")
+        lines.append("=== Top allocations in modules/ (mid-loop snapshot, by traceback) ===")
+        for stat in snapshot_mid.filter_traces(target_filter).statistics("traceback")[:10]:
+            lines.append(str(stat))
+            lines.extend("    " + line for line in stat.traceback.format())
+
+        lines.append("")
+        lines.append("=== Memory growth since profiling start (all files, by line) ===")
+        for stat in snapshot_end.compare_to(self.snapshot_start, "lineno")[:30]:
+            lines.append(str(stat))
+
+        with open(os.path.join(report_dir, "tracemalloc.txt"), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+
+    def _write_sampling_report(self, report_dir):
+        # collapsed形式(「スレッド名;関数;...;関数 サンプル数」)と、関数毎のサンプル数(self/total)を出力する
+        with open(os.path.join(report_dir, "sampling_collapsed.txt"), "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(stack + " " + str(count) + "\n")
+
+        # (待機中のスタックは、関数毎の集計から除外する)
+        self_counts = collections.Counter()
+        total_counts = collections.Counter()
+        for stack, count in self.samples.items():
+            functions = stack.split(";")[1:]
+            if not functions or functions[-1] in _IDLE_FUNCTIONS:
+                continue
+            self_counts[functions[-1]] += count
+            for function in set(functions):
+                total_counts[function] += count
+
+        total = max(sum(self_counts.values()), 1)
+        with open(os.path.join(report_dir, "sampling_top.txt"), "w", encoding="utf-8") as f:
+            f.write(
+                f"=== Sampling Profile (samples: {self.sample_count}, interval: {self.sampling_interval} [s]"
+                f", busy thread samples: {sum(self_counts.values())}) ===\n"
+            )
+            f.write(f"{'self [%]':>9s} {'total [%]':>10s}  function\n")
+            for function, count in self_counts.most_common(50):
+                f.write(f"{count / total * 100:9.1f} {total_counts[function] / total * 100:10.1f}  {function}\n")
+
+
+def setup_profiling_hooks(iterations=0, output_dir=DEFAULT_PROFILE_DIR):
+    # ==================================================
+    # === エントリスクリプト向け プロファイリング設定関数 ===
+    # ==================================================
+    # iterations    : 起動時からプロファイリングするイテレーション数
+    #                 (0の場合は、環境変数 AUDIO_SP_PROFILE の値 / 未設定の場合はSIGUSR1受信時のみ開始)
+    # output_dir    : レポートの出力ディレクトリ
+    env_iterations = int(os.environ.get(PROFILE_ENV, "0") or 0)
+    if iterations <= 0:
+        iterations = env_iterations
+
+    hooks = ProfilingHooks(iterations=iterations if iterations > 0 else 100, output_dir=output_dir)
+    if iterations > 0:
+        hooks.request()
+    hooks.install_signal_handler()
+
+    # hooks : ProfilingHooksインスタンス
+    return hooks
@@ -0,0 +1,192 @@
+import collections
+import datetime
+import threading
+
+from .log_util import get_logger, log_fields
+
+logger = get_logger(__name__)
+
+# 品質レベル定義 (先頭が最高品質 / 後方ほど処理負荷が小さい)
+# overlap_rate_scale        : オーバーラップ率の倍率 (小さいほどSTFTのホップ長が大きい)
+# stft_frame_size_scale     : STFTフレーム長の倍率
+# f0_frame_period_scale     : 基本周波数抽出の時間分解能 frame_period の倍率 (大きいほど疎)
+# cepstrum_interval         : ケプストラム算出を行うバッファ間隔 (2の場合は1バッファおきに算出)
+DEFAULT_QUALITY_LEVELS = [
+    {"overlap_rate_scale": 1.0, "stft_frame_size_scale": 1.0, "f0_frame_period_scale": 1, "cepstrum_interval": 1},
+    {"overlap_rate_scale": 0.5, "stft_frame_size_scale": 1.0, "f0_frame_period_scale": 2, "cepstrum_interval": 1},
+    {"overlap_rate_scale": 0.5, "stft_frame_size_scale": 0.5, "f0_frame_period_scale": 4, "cepstrum_interval": 2},
+    {"overlap_rate_scale": 0.0, "stft_frame_size_scale": 0.5, "f0_frame_period_scale": 8, "cepstrum_interval": 2}
+]
+
+# 間引き時に前フレームの結果を再利用するケプストラム関連キー
+CEPSTRUM_RESULT_KEYS = ("amp_envelope_normalized", "cepstrum_data", "cepstrum_data_lpl")
+
+
+class AdaptiveQualityController:
+    # ================================================
+    # === リアルタイム処理 適応品質制御クラス ===
+    # ================================================
+    # バッファ毎の処理時間と処理時間予算(= 1バッファ分の音声の時間長)を比較し、
+    # 予算超過が続く場合は品質レベルを下げ(ホップ長拡大 / STFTフレーム長縮小 / F0抽出の間引き / ケプストラム間引き)、
+    # 余裕がある状態が続く場合は品質レベルを戻す (変更時は毎回ログ出力する)
+    # 決定した品質パラメータはフレーム辞書の"quality"に格納し、各ステージ関数がパラメータとして使用する
+    #
+    # budget            : 1バッファあたりの処理時間予算[s] (= frames_per_buffer / samplerate)
+    # samplerate        : サンプリング周波数[Hz]
+    # stft_frame_size   : 最高品質時のSTFTフレーム長 (Noneの場合はSTFT関連パラメータを制御しない)
+    # overlap_rate      : 最高品質時のオーバーラップ率 [%] (Noneの場合はSTFT関連パラメータを制御しない)
+    # levels            : 品質レベル定義のリスト
+    # down_threshold    : 品質を下げる負荷率 (= 処理時間 / 処理時間予算 の直近window回平均)
+    # up_threshold      : 品質を戻す負荷率 (直近window回平均)
+    # window            : 負荷率の平均を取るバッファ数 (品質変更後は、window回計測するまで再変更しない)
+
+    def __init__(
+        self,
+        budget,
+        samplerate,
+        stft_frame_size=None,
+        overlap_rate=None,
+        levels=DEFAULT_QUALITY_LEVELS,
+        down_threshold=0.9,
+        up_threshold=0.5,
+        window=4
+    ):
+        self.budget = budget
+        self.samplerate = samplerate
+        self.stft_frame_size = stft_frame_size
+        self.overlap_rate = overlap_rate
+        self.levels = levels
+        self.down_threshold = down_threshold
+        self.up_threshold = up_threshold
+
+        self.lock = threading.Lock()
+        self.loads = collections.deque(maxlen=window)
+        self.level = 0
+        self.params = self.gen_quality_params(0)
+
+        # 品質レベル変更履歴 (時刻, 変更前レベル, 変更後レベル, 平均負荷率)
+        self.changes = []
+        self.level_frame_counts = [0] * len(levels)
+
+        # ケプストラム間引き時に再利用する前フレームの算出結果
+        self.last_cepstrum_results = None
+
+    def gen_quality_params(self, level):
+        # ==========================================
+        # === 品質レベル毎 パラメータ生成関数 ===
+        # ==========================================
+        # level : 品質レベル (0が最高品質)
+        spec = self.levels[level]
+
+        # 基本周波数抽出の時間分解能 frame_period(ms単位)の既定値は、サンプリング周期の20倍
+        f0_frame_period = (1 / self.samplerate * 1000) * 20 * spec["f0_frame_period_scale"]
+
+        params = {
+            "level": level,
+            "f0_frame_period": f0_frame_period,
+            "cepstrum_interval": spec["cepstrum_interval"]
+        }
+        if self.stft_frame_size is not None and self.overlap_rate is not None:
+            params["overlap_rate"] = self.overlap_rate * spec["overlap_rate_scale"]
+            params["stft_frame_size"] = max(int(self.stft_frame_size * spec["stft_frame_size_scale"]), 16)
+
+        # params : 品質パラメータ辞書
+        return params
+
+    def apply(self, frame):
+        # ==================================================
+        # === フレーム辞書への品質パラメータ付与関数 ===
+        # ==================================================
+        # (パイプラインのソーススレッドから、フレーム取得毎に呼出)
+        with self.lock:
+            frame["quality"] = self.params
+            self.level_frame_counts[self.level] += 1
+        return frame
+
+    def restore_skipped(self, frame):
+        # ======================================================
+        # === 間引かれた算出結果の補完関数 (前フレームの結果を再利用) ===
+        # ======================================================
+        # (パイプラインのシンク実行前に、フレーム順に呼出)
+        if frame.get("cepstrum_skipped"):
+            if self.last_cepstrum_results is not None:
+                frame.update(self.last_cepstrum_results)
+        elif CEPSTRUM_RESULT_KEYS[0] in frame:
+            self.last_cepstrum_results = {key: frame[key] for key in CEPSTRUM_RESULT_KEYS}
+        return frame
+
+    def update(self, processing_time, level=None):
+        # ==========================================
+        # === 処理時間計測結果 反映関数 ===
+        # ==========================================
+        # processing_time : 当該バッファの処理時間[s]
+        #                   (パイプラインの場合はボトルネックとなるステージの処理時間)
+        # level           : 当該バッファの処理に使用した品質レベル
+        #                   (パイプライン内で処理中だった変更前レベルのバッファは、判定に使用しない)
+        with self.lock:
+            if level is not None and level != self.level:
+                return self.level
+
+            self.loads.append(processing_time / self.budget)
+            if len(self.loads) < self.loads.maxlen:
+                return self.level
+
+            load = sum(self.loads) / len(self.loads)
+            if load > self.down_threshold and self.level < len(self.levels) - 1:
+                new_level = self.level + 1
+            elif load < self.up_threshold and self.level > 0:
+                new_level = self.level - 1
+            else:
+                return self.level
+
+            self.changes.append((datetime.datetime.now(), self.level, new_level, load))
+            logger.info(
+                "Quality Level Changed",
+                extra=log_fields(
+                    old_level=self.level,
+                    new_level=new_level,
+                    load_percent=round(load * 100, 1),
+                    **self.gen_quality_params(new_level)
+                )
+            )
+
+            self.level = new_level
+            self.params = self.gen_quality_params(new_level)
+            self.loads.clear()
+
+        # level : 変更後の品質レベル
+        return self.level
+
+    def format_stats(self):
+        # ==========================================
+        # === 品質制御統計 文字列化 ===
+        # ==========================================
+        lines = [
+            "=== Adaptive Quality Stats (level: " + str(self.level)
+            + " / changes: " + str(len(self.changes)) + ") ==="
+        ]
+        for level, count in enumerate(self.level_frame_counts):
+            lines.append(f"  level {level}  frames: {count:6d} | params: {self.gen_quality_params(level)}")
+        for changed_at, old_level, new_level, load in self.changes:
+            lines.append(
+                f"  {changed_at.strftime('%H:%M:%S.%f')[:-3]}  {old_level} -> {new_level}"
+                f" (load: {load * 100:6.1f} [%])"
+            )
+        return "\n".join(lines)
+
+    def print_stats(self):
+        print(self.format_stats())
+        print("")
+
+
+def get_quality_param(frame, name, default):
+    # ==================================================
+    # === フレーム辞書の品質パラメータ取得関数 ===
+    # ==================================================
+    # frame     : フレーム辞書
+    # name      : 品質パラメータ名
+    # default   : 品質パラメータ未設定時の値 (ステージ関数に束縛されたパラメータ)
+    quality = frame.get("quality")
+    if quality is None:
+        return default
+    return quality.get(name, default)
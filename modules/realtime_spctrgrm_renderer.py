@@ -0,0 +1,257 @@
+import time
+import warnings
+
+import numpy as np
+from matplotlib import pyplot as plt
+
+
+class RealtimeSpctrgrmRenderer:
+    # ===============================================================
+    # === リアルタイムスペクトログラム描画クラス(Blitting描画版) ===
+    # ===============================================================
+    # スペクトログラム画像 / カラーバー / 基本周波数ラインのArtistを初回描画時のみ生成し、
+    # 以降のバッファ毎の描画では、Artistのデータのみを差し替えた上で、
+    # 変更のあったArtistのみをBlittingにより再描画する
+    # (バッファ毎の「tight_layout() / pcolormesh() / colorbar() / plot()」の再生成を行わない)
+    #
+    # fig               : 生成したmatplotlib figureインスタンス
+    # spctrgrm_fig      : スペクトログラム向けmatplotlib Axesインスタンス
+    # cbar_fig          : スペクトログラム向けmatplotlib カラーバー用Axesインスタンス
+    # f0_fig            : 基本周波数 時系列波形向けmatplotlib Axesインスタンス
+    # time_range        : スペクトログラムグラフ X軸表示レンジ [s]
+    # freq_range        : スペクトログラムグラフ Y軸表示レンジ [Hz]
+    # dbref             : デシベル基準値
+    # A                 : 聴感補正(A特性)の有効(True)/無効(False)設定
+
+    def __init__(self, fig, spctrgrm_fig, cbar_fig, f0_fig, time_range, freq_range, dbref, A):
+        self.fig = fig
+        self.spctrgrm_fig = spctrgrm_fig
+        self.cbar_fig = cbar_fig
+        self.f0_fig = f0_fig
+        self.dbref = dbref
+        self.A = A
+
+        # 描画対象Artist (初回描画時に生成)
+        self.spctrgrm_im = None
+        self.f0_line = None
+
+        # Blitting用背景画像 (Artist以外の静的な描画領域)
+        self.background = None
+
+        # 描画フレームレート計測用変数
+        self.frame_count = 0
+        self.start_time = None
+        self.last_frame_time = None
+        self.frame_interval_ave = 0
+
+        # フォントサイズ設定
+        plt.rcParams['font.size'] = 10
+
+        # 目盛内側化
+        f0_fig.tick_params(axis="both", direction="in")
+
+        # スペクトログラム 軸ラベル設定
+        spctrgrm_fig.set_xlabel("Time [s]")
+        spctrgrm_fig.set_ylabel("Frequency [Hz]")
+
+        # 基本周波数 時系列データ 軸ラベル設定
+        f0_fig.set_xlabel("Time [s]")
+        f0_fig.set_ylabel("Frequency [Hz]")
+
+        # スペクトログラム 軸目盛り設定
+        spctrgrm_fig.set_xlim(0, time_range)
+        spctrgrm_fig.set_ylim(0, freq_range)
+
+        # 基本周波数 時系列データ 軸目盛り設定
+        f0_fig.set_xlim(0, time_range)
+        f0_fig.set_ylim(-20, 1000)  # -20[Hz] 〜 1000[Hz]
+        f0_fig.set_yticks(np.arange(0, 1020, 100))  # 100[Hz]刻み(範囲:0〜1020[Hz])
+
+        # スペクトログラムデータ範囲指定
+        if dbref > 0:
+            # スペクトログラムデータがdB SPLの場合
+            self.colorbar_min = 0    # カラーバー最小値[dB]
+            self.colorbar_max = 90   # カラーバー最大値[dB]
+        else:
+            # スペクトログラムデータがdB FSの場合
+            self.colorbar_min = -100     # カラーバー最小値[dB]
+            self.colorbar_max = 0        # カラーバー最大値[dB]
+
+    def _create_artists(self, freq_spctrgrm, time_spctrgrm, spectrogram, f0, time_f0):
+        # ================================
+        # === 描画対象Artist生成関数 ===
+        # ================================
+
+        # スペクトログラム画像の生成
+        # (pcolormeshではなく、データ差し替えが軽量なimshow(AxesImage)を使用する)
+        self.spctrgrm_im = self.spctrgrm_fig.imshow(
+            spectrogram,
+            extent=gen_spctrgrm_image_extent(freq_spctrgrm, time_spctrgrm),
+            origin="lower",
+            aspect="auto",
+            interpolation="nearest",
+            vmin=self.colorbar_min,
+            vmax=self.colorbar_max,
+            cmap="jet",
+            animated=True
+        )
+
+        # カラーバー設定 (カラーバーは静的な背景として初回のみ描画)
+        cbar = plt.colorbar(self.spctrgrm_im, orientation='vertical', cax=self.cbar_fig)
+
+        if (self.dbref > 0) and not (self.A):
+            cbar.set_label("Sound Pressure [dB spl]")
+        elif (self.dbref > 0) and (self.A):
+            cbar.set_label("Sound Pressure [dB spl(A)]")
+        else:
+            cbar.set_label("Log Power Spectrum [dB FS]")
+
+        # 基本周波数ラインの生成
+        (self.f0_line,) = self.f0_fig.plot(
+            time_f0,
+            f0,
+            label="Fundamental Frequency",
+            lw=3,
+            color="forestgreen",
+            animated=True
+        )
+
+        # グラフの凡例表示
+        self.f0_fig.legend(loc="upper right", borderaxespad=1, fontsize=8)
+
+        # ウィンドウリサイズ等でfigure全体が再描画された場合に、背景画像を再取得する
+        self.fig.canvas.mpl_connect("draw_event", self._on_draw)
+
+        # グラフウィンドウの表示 & 静的な背景の初回描画
+        # (当該、pause()メソッドにより、show()メソッド無しでも、matplotlibグラフウィンドウが開く形となる)
+        warnings.simplefilter("ignore", UserWarning)
+        plt.pause(0.0001)
+        self.fig.canvas.draw()
+
+    def _on_draw(self, event):
+        # ==============================================
+        # === figure全体再描画時のコールバック関数 ===
+        # ==============================================
+        # animated=TrueのArtistはfigure全体の描画対象外となるため、
+        # 静的な背景のみを背景画像として保存した上で、Artistを重ね描きする
+        if event is not None and event.canvas != self.fig.canvas:
+            return
+
+        self.background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_animated_artists()
+
+    def _draw_animated_artists(self):
+        # ===================================
+        # === 変更対象Artistの描画関数 ===
+        # ===================================
+        self.spctrgrm_fig.draw_artist(self.spctrgrm_im)
+        self.f0_fig.draw_artist(self.f0_line)
+
+    def update(self, freq_spctrgrm, time_spctrgrm, spectrogram, f0, time_f0):
+        # ====================================================
+        # === スペクトログラム & 基本周波数 描画更新関数 ===
+        # ====================================================
+        # freq_spctrgrm     : スペクトログラム y軸向けデータ[Hz]
+        # time_spctrgrm     : スペクトログラム x軸向けデータ[s]
+        # spectrogram       : スペクトログラム 振幅データ
+        # f0                : 基本周波数 時系列データ 1次元配列
+        # time_f0           : 基本周波数 時系列データに対応した時間軸データ 1次元配列
+
+        if self.spctrgrm_im is None:
+            self._create_artists(freq_spctrgrm, time_spctrgrm, spectrogram, f0, time_f0)
+        else:
+            # 既存Artistのデータのみを差し替え
+            if self.spctrgrm_im.get_array().shape != spectrogram.shape:
+                # データ形状が変化した場合のみ、画像の表示範囲を再設定
+                self.spctrgrm_im.set_extent(gen_spctrgrm_image_extent(freq_spctrgrm, time_spctrgrm))
+            self.spctrgrm_im.set_data(spectrogram)
+            self.f0_line.set_data(time_f0, f0)
+
+        self._blit()
+
+    def _blit(self):
+        # ==================================
+        # === Blittingによる描画更新関数 ===
+        # ==================================
+        canvas = self.fig.canvas
+
+        if self.background is None or not canvas.supports_blit:
+            # Blitting非対応のバックエンドの場合は、通常の再描画を実施
+            canvas.draw_idle()
+        else:
+            # 背景画像を復元し、変更のあったArtistのみを再描画してBlitting
+            canvas.restore_region(self.background)
+            self._draw_animated_artists()
+            canvas.blit(self.fig.bbox)
+
+        # GUIイベントの処理 (plt.pause()によるfigure全体の再描画は行わない)
+        canvas.flush_events()
+
+        self._count_frame()
+
+    def _count_frame(self):
+        # ==================================
+        # === 描画フレームレート計測関数 ===
+        # ==================================
+        now = time.perf_counter()
+
+        if self.start_time is None:
+            self.start_time = now
+        else:
+            # 描画間隔の指数移動平均を更新
+            frame_interval = now - self.last_frame_time
+            if self.frame_interval_ave == 0:
+                self.frame_interval_ave = frame_interval
+            else:
+                self.frame_interval_ave = 0.9 * self.frame_interval_ave + 0.1 * frame_interval
+
+        self.last_frame_time = now
+        self.frame_count += 1
+
+    @property
+    def fps(self):
+        # fps : 描画フレームレート(指数移動平均)[frame/s]
+        if self.frame_interval_ave == 0:
+            return 0.0
+        return 1 / self.frame_interval_ave
+
+    @property
+    def fps_average(self):
+        # fps_average : 描画開始からの平均描画フレームレート[frame/s]
+        if self.frame_count < 2:
+            return 0.0
+        return (self.frame_count - 1) / (self.last_frame_time - self.start_time)
+
+    @property
+    def is_open(self):
+        # is_open : グラフウィンドウが開いている(True)/閉じられた(False)
+        return plt.fignum_exists(self.fig.number)
+
+
+def gen_spctrgrm_image_extent(freq_spctrgrm, time_spctrgrm):
+    # ==================================================
+    # === スペクトログラム画像 表示範囲データ生成関数 ===
+    # ==================================================
+    # freq_spctrgrm     : スペクトログラム y軸向けデータ[Hz]
+    # time_spctrgrm     : スペクトログラム x軸向けデータ[s]
+
+    # 各データ点を画素の中心とするため、軸データ間隔の半分だけ表示範囲を拡張する
+    # (pcolormesh(shading="nearest")と同一の表示位置とする)
+    if len(time_spctrgrm) > 1:
+        dt = (time_spctrgrm[-1] - time_spctrgrm[0]) / (len(time_spctrgrm) - 1)
+    else:
+        dt = 0
+    if len(freq_spctrgrm) > 1:
+        df = (freq_spctrgrm[-1] - freq_spctrgrm[0]) / (len(freq_spctrgrm) - 1)
+    else:
+        df = 0
+
+    extent = (
+        time_spctrgrm[0] - dt / 2,
+        time_spctrgrm[-1] + dt / 2,
+        freq_spctrgrm[0] - df / 2,
+        freq_spctrgrm[-1] + df / 2
+    )
+
+    # extent : スペクトログラム画像の表示範囲 (left, right, bottom, top)
+    return extent
@@ -0,0 +1,341 @@
+import hashlib
+import os
+import shutil
+import threading
+import time
+import weakref
+
+import numpy as np
+
+# 解析関数毎のアルゴリズムバージョン
+# (解析関数の処理内容を変更した場合は、当該関数のバージョンを更新する事で旧バージョンのキャッシュを無効化する)
+ALGORITHM_VERSIONS = {
+    "gen_freq_domain_data": 1,
+    "gen_freq_domain_data_of_signal_spctrgrm": 1,
+    "gen_freq_domain_data_of_stft": 1,
+    "gen_fundamental_freq_data": 1,
+    "gen_cepstrum_data": 1,
+    "gen_melscale_spctrm_env_data": 1,
+    "gen_mfcc_spctrm_env_data": 1
+}
+
+# キャッシュの既定最大サイズ[byte]
+DEFAULT_CACHE_MAX_BYTES = 1024 * 1024 * 1024
+
+# 算出済み配列ハッシュ値のキャッシュ
+# (key: 配列のid / value: (配列の弱参照, ハッシュ値))
+_array_hash_cache = {}
+
+
+def hash_array(data):
+    # ==========================================
+    # === 配列内容ハッシュ値算出関数 ===
+    # ==========================================
+    # data : numpy.ndarray
+    # (同一配列を複数の解析関数に渡す場合に再計算しないよう、配列の破棄までハッシュ値を保持する)
+    # (ハッシュ値算出後に配列内容を書き換える用途には使用しない事)
+    key = id(data)
+    cached = _array_hash_cache.get(key)
+    if cached is not None and cached[0]() is data:
+        return cached[1]
+
+    array = np.ascontiguousarray(data)
+    h = hashlib.sha256()
+    h.update(str(array.dtype).encode())
+    h.update(str(array.shape).encode())
+    h.update(memoryview(array).cast("B"))
+    digest = h.hexdigest()
+
+    if isinstance(data, np.ndarray):
+        _array_hash_cache[key] = (weakref.ref(data), digest)
+        weakref.finalize(data, _array_hash_cache.pop, key, None)
+
+    # digest : 配列内容(dtype/shape/データ)のSHA-256ハッシュ値(16進文字列)
+    return digest
+
+
+class ResultCache:
+    # ==================================================
+    # === 解析結果キャッシュ(内容アドレス方式)クラス ===
+    # ==================================================
+    # 解析関数の結果を、「入力配列内容のハッシュ値 + 関数名 + アルゴリズムバージョン + 全パラメータ」を
+    # キーとしてnpzファイルに保存し、同一の音声データ/パラメータでの再解析時に再利用する
+    # (キャッシュサイズがmax_bytesを超えた場合は、最終アクセスが古いエントリから削除する(LRU))
+    #
+    # <cache_dir>/<関数名>/v<バージョン>/<キー先頭2文字>/<キー>.npz
+    #
+    # cache_dir     : キャッシュディレクトリ
+    # max_bytes     : キャッシュの最大サイズ[byte]
+    # purge_stale   : 現行バージョンと異なるバージョンのキャッシュを生成時に削除する(True)/しない(False)設定
+    # indexed       : 生成時にエントリのインデックスを構築し、最大サイズを適用する(True)/しない(False)設定
+    #                 (Falseの場合はエントリの読み書きのみを行う / 複数プロセスで共有する場合は、
+    #                  親プロセスのみがTrueで生成し、enforce_max_bytes()で全プロセス分の最大サイズを適用する)
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_CACHE_MAX_BYTES, purge_stale=True, indexed=True):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.indexed = indexed
+        self.lock = threading.Lock()
+
+        # 関数名毎のヒット/ミス数
+        self.hits = {}
+        self.misses = {}
+        self.evictions = 0
+
+        # エントリのインデックス (key: ファイルPATH / value: [最終アクセス時刻, ファイルサイズ])
+        # (最終アクセス時刻はファイルのmtimeとして永続化し、ヒット時に更新する)
+        self.entries = {}
+        self.total_bytes = 0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        if purge_stale:
+            self.invalidate_stale_versions()
+
+        if indexed:
+            # 最大サイズが縮小された場合に備え、生成時にも最大サイズを適用する
+            self.enforce_max_bytes()
+
+    def _build_index(self):
+        # ディスク上の全エントリを走査してインデックスを再構築する
+        entries = {}
+        total_bytes = 0
+        for dirpath, _, filenames in os.walk(self.cache_dir):
+            for filename in filenames:
+                if not filename.endswith(".npz"):
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries[path] = [stat.st_mtime, stat.st_size]
+                total_bytes += stat.st_size
+
+        with self.lock:
+            self.entries = entries
+            self.total_bytes = total_bytes
+
+    def enforce_max_bytes(self):
+        # ==================================================
+        # === 最大サイズ適用関数 (インデックス再構築 & LRU削除) ===
+        # ==================================================
+        # (他プロセスが書込んだエントリも含めて、ディスク上の全エントリに対して最大サイズを適用する)
+        self.indexed = True
+        self._build_index()
+        self._evict()
+
+    def __getstate__(self):
+        # プロセス実行のステージに渡せるよう、ロックを除いてpickleする
+        # (子プロセス側のヒット/ミス数は、親プロセスの統計には反映されない)
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def gen_key(self, func_name, args):
+        # ==========================================
+        # === キャッシュキー生成関数 ===
+        # ==========================================
+        # func_name : 解析関数名
+        # args      : 解析関数の引数(位置引数)のタプル
+        h = hashlib.sha256()
+        h.update(func_name.encode())
+        h.update(str(ALGORITHM_VERSIONS.get(func_name, 0)).encode())
+        for arg in args:
+            if isinstance(arg, np.ndarray):
+                h.update(b"ndarray:" + hash_array(arg).encode())
+            else:
+                h.update(b"param:" + repr(arg).encode())
+
+        # key : キャッシュキー(16進文字列)
+        return h.hexdigest()
+
+    def _gen_entry_path(self, func_name, key):
+        version = ALGORITHM_VERSIONS.get(func_name, 0)
+        return os.path.join(self.cache_dir, func_name, "v" + str(version), key[:2], key + ".npz")
+
+    def get(self, func_name, key):
+        # ==========================================
+        # === キャッシュ取得関数 ===
+        # ==========================================
+        # 戻り値 : (ヒット有無, 解析結果)
+        path = self._gen_entry_path(func_name, key)
+        try:
+            with np.load(path, allow_pickle=False) as npz:
+                count = int(npz["count"])
+                results = [npz["r" + str(i)] for i in range(count)]
+                is_tuple = bool(npz["is_tuple"])
+        except (FileNotFoundError, OSError, KeyError, ValueError):
+            with self.lock:
+                self.misses[func_name] = self.misses.get(func_name, 0) + 1
+            return False, None
+
+        # 0次元配列はスカラ値に戻す
+        results = [result[()] if result.ndim == 0 else result for result in results]
+
+        # 最終アクセス時刻の更新 (LRU)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+        with self.lock:
+            self.hits[func_name] = self.hits.get(func_name, 0) + 1
+            if path in self.entries:
+                self.entries[path][0] = time.time()
+
+        return True, tuple(results) if is_tuple else results[0]
+
+    def put(self, func_name, key, result):
+        # ==========================================
+        # === キャッシュ保存関数 ===
+        # ==========================================
+        # result : 解析結果 (配列/スカラ値、またはそれらのタプル)
+        path = self._gen_entry_path(func_name, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        is_tuple = isinstance(result, tuple)
+        results = result if is_tuple else (result,)
+        arrays = {"r" + str(i): np.asarray(r) for i, r in enumerate(results)}
+
+        # 一時ファイルに書込んだ後にリネームする事で、並行プロセスから不完全なエントリを読まない
+        tmp_path = path + "." + str(os.getpid()) + "." + str(threading.get_ident()) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, count=len(results), is_tuple=is_tuple, **arrays)
+        os.replace(tmp_path, path)
+
+        # インデックス無しの場合は、最大サイズの適用をenforce_max_bytes()の呼出元に任せる
+        if not self.indexed:
+            return
+
+        size = os.path.getsize(path)
+        with self.lock:
+            if path in self.entries:
+                self.total_bytes -= self.entries[path][1]
+            self.entries[path] = [os.path.getmtime(path), size]
+            self.total_bytes += size
+
+        self._evict()
+
+    def _evict(self):
+        # ==============================================
+        # === LRUエントリ削除関数 (最大サイズ超過時) ===
+        # ==============================================
+        with self.lock:
+            if self.total_bytes <= self.max_bytes:
+                return
+
+            for path, (atime, size) in sorted(self.entries.items(), key=lambda item: item[1][0]):
+                if self.total_bytes <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    # 他プロセスにより削除済
+                    pass
+                del self.entries[path]
+                self.total_bytes -= size
+                self.evictions += 1
+
+    def call(self, func, *args):
+        # ==================================================
+        # === キャッシュ経由 解析関数呼出し関数 ===
+        # ==================================================
+        # func  : 解析関数 (gen_freq_domain_data等)
+        # args  : 解析関数の引数(位置引数)
+        func_name = func.__name__
+        key = self.gen_key(func_name, args)
+
+        hit, result = self.get(func_name, key)
+        if hit:
+            return result
+
+        result = func(*args)
+        self.put(func_name, key, result)
+
+        # result : 解析関数の戻り値
+        return result
+
+    def invalidate(self, func_name=None):
+        # ==========================================
+        # === キャッシュ無効化(削除)関数 ===
+        # ==========================================
+        # func_name : 無効化する解析関数名 (Noneの場合は全関数)
+        with self.lock:
+            if func_name is None:
+                targets = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)]
+            else:
+                targets = [os.path.join(self.cache_dir, func_name)]
+
+            for target in targets:
+                if os.path.isdir(target):
+                    shutil.rmtree(target, ignore_errors=True)
+
+            for path in [path for path in self.entries if not os.path.exists(path)]:
+                self.total_bytes -= self.entries.pop(path)[1]
+
+    def invalidate_stale_versions(self):
+        # ======================================================
+        # === 旧アルゴリズムバージョン キャッシュ削除関数 ===
+        # ======================================================
+        if not os.path.isdir(self.cache_dir):
+            return
+
+        for func_name in os.listdir(self.cache_dir):
+            func_dir = os.path.join(self.cache_dir, func_name)
+            if not os.path.isdir(func_dir):
+                continue
+            current = "v" + str(ALGORITHM_VERSIONS.get(func_name, 0))
+            for version_dir in os.listdir(func_dir):
+                if version_dir != current:
+                    shutil.rmtree(os.path.join(func_dir, version_dir), ignore_errors=True)
+
+    @property
+    def hit_count(self):
+        return sum(self.hits.values())
+
+    @property
+    def miss_count(self):
+        return sum(self.misses.values())
+
+    @property
+    def hit_rate(self):
+        total = self.hit_count + self.miss_count
+        return self.hit_count / total if total > 0 else 0.0
+
+    def format_stats(self):
+        # ==========================================
+        # === キャッシュ統計 文字列化 ===
+        # ==========================================
+        lines = [
+            "=== Result Cache Stats (hit rate: " + str(round(self.hit_rate * 100, 1)) + " [%]"
+            + " / size: " + str(round(self.total_bytes / 1024 / 1024, 1)) + " [MiB]"
+            + " / evictions: " + str(self.evictions) + ") ==="
+        ]
+        for func_name in sorted(set(self.hits) | set(self.misses)):
+            hits = self.hits.get(func_name, 0)
+            misses = self.misses.get(func_name, 0)
+            lines.append(
+                f"  {func_name:<40s} hits: {hits:6d} / misses: {misses:6d}"
+                f" | hit rate: {hits / (hits + misses) * 100:5.1f} [%]"
+            )
+        return "\n".join(lines)
+
+    def print_stats(self):
+        print(self.format_stats())
+        print("")
+
+
+def cached_call(cache, func, *args):
+    # ==================================================
+    # === 解析関数呼出し関数 (キャッシュ指定時のみ使用) ===
+    # ==================================================
+    # cache : ResultCacheインスタンス (Noneの場合はキャッシュを使用せずに直接呼出す)
+    # func  : 解析関数
+    # args  : 解析関数の引数(位置引数)
+    if cache is None:
+        return func(*args)
+    return cache.call(func, *args)
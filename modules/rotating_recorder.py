@@ -0,0 +1,355 @@
+import datetime
+import json
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+import soundfile as sf
+
+from .log_util import get_logger, log_fields
+from .save_audio_to_wav_file import (AUDIO_FORMAT_EXTENSIONS,
+                                     resolve_audio_subtype)
+
+logger = get_logger(__name__)
+
+# セグメント マニフェスト(JSON Lines)のファイル名
+MANIFEST_FILENAME = "manifest.jsonl"
+
+# 書込中セグメントファイルの拡張子 (クローズ時に正式なファイル名へリネーム)
+PARTIAL_SUFFIX = ".part"
+
+# 入力音声ストリームの量子化データ 1サンプルあたりのバイト数 (16bit量子化)
+SAMPLE_WIDTH = 2
+
+
+class RotatingRecorder:
+    # ================================================
+    # === 連続録音 セグメント分割(ローテーション)クラス ===
+    # ================================================
+    # 入力音声ストリームのバッファを、一定時間長 または 一定サイズのセグメントファイルに分割して連続保存する
+    # (セグメント境界はサンプル単位で分割し、バッファの残りは次セグメントの先頭に書込むため、ファイル間の欠落/重複は無い)
+    # write()はキューへの投入のみを行い、ファイル書込 / ローテーション / 古いセグメントの削除は書込スレッドで行う
+    # (キューが満杯の場合はキャプチャスレッドを待たせずにバッファを破棄し、破棄データ数をマニフェストに記録する)
+    #
+    # <output_dir>/<prefix><開始日時>_<セグメント番号>.<拡張子>   : セグメントファイル
+    # <output_dir>/manifest.jsonl                              : セグメント マニフェスト (1行1イベント / 追記のみ)
+    #
+    # samplerate        : サンプリング周波数[Hz]
+    # channels          : チャンネル数
+    # output_dir        : セグメントファイルの保存ディレクトリ
+    # segment_time      : 1セグメントの時間長[s]
+    # segment_bytes     : 1セグメントのPCMデータサイズ[byte] (指定時はsegment_timeより優先 / 16bit量子化データ換算)
+    # max_files         : 保持するセグメント数の上限 (Noneの場合は無制限 / 超過時は古いセグメントから削除)
+    # max_bytes         : 保持するセグメントの合計ファイルサイズ上限[byte] (Noneの場合は無制限)
+    # audio_format      : 保存形式 ("WAV" / "FLAC" / "OGG")
+    # subtype           : サブタイプ ("PCM_16":16bit整数 (量子化データをそのまま保存) 等 / OGGの場合は"VORBIS")
+    # filename_prefix   : セグメントファイル名のプレフィックス
+    # queue_size        : 書込待ちバッファ数の上限
+
+    def __init__(
+        self,
+        samplerate,
+        channels=1,
+        output_dir="wav/continuous",
+        segment_time=600.0,
+        segment_bytes=None,
+        max_files=None,
+        max_bytes=None,
+        audio_format="WAV",
+        subtype="PCM_16",
+        filename_prefix="continuous_",
+        queue_size=256
+    ):
+        if segment_bytes is not None:
+            segment_frames = segment_bytes // (channels * SAMPLE_WIDTH)
+        else:
+            segment_frames = int(round(segment_time * samplerate))
+        if segment_frames <= 0:
+            raise ValueError("segment length must be at least 1 frame : " + str(segment_frames))
+
+        self.samplerate = samplerate
+        self.channels = channels
+        self.output_dir = output_dir
+        self.segment_frames = segment_frames
+        self.max_files = max_files
+        self.max_bytes = max_bytes
+        self.audio_format = audio_format.upper()
+        self.subtype = resolve_audio_subtype(self.audio_format, subtype)
+        self.filename_prefix = filename_prefix
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.lock = threading.Lock()
+        self.writer_thread = None
+        self.error = None
+
+        os.makedirs(output_dir, exist_ok=True)
+        self.manifest_filename = os.path.join(output_dir, MANIFEST_FILENAME)
+
+        # 保持中のセグメント (前回までの実行分を含む / 古い順)
+        self.segments = self._load_manifest()
+
+        # 書込中セグメントの状態
+        self.file = None
+        self.segment = None
+
+        # 録音開始時刻 (UNIX時間[s] / 以降のセグメント開始時刻は、サンプル数から算出する)
+        self.start_timestamp = None
+        self.total_frames = 0
+        self.skipped_frames = 0
+        self.segment_index = 0
+        self.pending_dropped_frames = 0
+
+        # 統計
+        self.written_frames = 0
+        self.closed_count = 0
+        self.deleted_count = 0
+        self.dropped_buffers = 0
+        self.dropped_frames = 0
+        self.max_queue_depth = 0
+        self.busy_time = 0.0
+        logger.debug(
+            "Rotating Recorder created",
+            extra=log_fields(
+                output_dir=output_dir, samplerate=samplerate, channels=channels,
+                segment_frames=segment_frames, max_files=max_files, max_bytes=max_bytes,
+                audio_format=self.audio_format, subtype=self.subtype, retained_segments=len(self.segments)
+            )
+        )
+
+    def _load_manifest(self):
+        # ============================================
+        # === マニフェスト読込関数 (保持中セグメント取得) ===
+        # ============================================
+        segments = {}
+        if os.path.isfile(self.manifest_filename):
+            with open(self.manifest_filename, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        # 書込途中で終了した最終行等は無視する
+                        continue
+                    if entry.get("event") == "segment":
+                        segments[entry["filename"]] = entry
+                    elif entry.get("event") == "delete":
+                        segments.pop(entry["filename"], None)
+
+        # segments : 保持中セグメントのマニフェストエントリのリスト (古い順)
+        return sorted(segments.values(), key=lambda entry: entry["start_timestamp"])
+
+    def _append_manifest(self, entry):
+        # 1行単位で追記し、都度クローズする (異常終了時もクローズ済セグメントの記録は残る)
+        with open(self.manifest_filename, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def _open_segment(self):
+        # ==================================
+        # === セグメントファイル オープン関数 ===
+        # ==================================
+        # (破棄したバッファの時間長も含めて算出するため、破棄が無い限りセグメント間で連続する)
+        start_timestamp = self.start_timestamp + (self.total_frames + self.skipped_frames) / self.samplerate
+        start_time = datetime.datetime.fromtimestamp(start_timestamp)
+        filename = os.path.join(
+            self.output_dir,
+            self.filename_prefix + start_time.strftime("%Y%m%d_%H%M%S") + "_" + str(self.segment_index).zfill(6)
+            + AUDIO_FORMAT_EXTENSIONS[self.audio_format]
+        )
+
+        self.file = sf.SoundFile(
+            filename + PARTIAL_SUFFIX,
+            mode="w",
+            samplerate=self.samplerate,
+            channels=self.channels,
+            format=self.audio_format,
+            subtype=self.subtype
+        )
+        self.segment = {
+            "event": "segment",
+            "filename": filename,
+            "index": self.segment_index,
+            "start_time": start_time.isoformat(timespec="microseconds"),
+            "start_timestamp": start_timestamp,
+            "start_frame": self.total_frames,
+            "frames": 0,
+            "dropped_frames": 0
+        }
+        self.segment_index += 1
+
+    def _close_segment(self):
+        # ==================================================
+        # === セグメントファイル クローズ & マニフェスト追記関数 ===
+        # ==================================================
+        self.file.close()
+        self.file = None
+
+        segment = self.segment
+        self.segment = None
+        os.replace(segment["filename"] + PARTIAL_SUFFIX, segment["filename"])
+
+        segment["duration"] = segment["frames"] / self.samplerate
+        segment["file_size"] = os.path.getsize(segment["filename"])
+        self._append_manifest(segment)
+        self.segments.append(segment)
+        self.closed_count += 1
+        logger.info(
+            "Segment closed",
+            extra=log_fields(
+                filename=segment["filename"], start_time=segment["start_time"], frames=segment["frames"],
+                file_size_kib=round(segment["file_size"] / 1024, 1), dropped_frames=segment["dropped_frames"]
+            )
+        )
+
+        self._apply_retention()
+
+    def _apply_retention(self):
+        # ==================================================
+        # === 保持ポリシー適用関数 (古いセグメントから削除) ===
+        # ==================================================
+        # 直近にクローズしたセグメントは上限を超過する場合も保持する
+        while len(self.segments) > 1:
+            total_bytes = sum(segment["file_size"] for segment in self.segments)
+            over_files = self.max_files is not None and len(self.segments) > self.max_files
+            over_bytes = self.max_bytes is not None and total_bytes > self.max_bytes
+            if not (over_files or over_bytes):
+                break
+
+            segment = self.segments.pop(0)
+            try:
+                os.remove(segment["filename"])
+            except FileNotFoundError:
+                # 手動で削除済の場合は、マニフェストへの記録のみ行う
+                pass
+            self._append_manifest({"event": "delete", "filename": segment["filename"]})
+            self.deleted_count += 1
+            logger.info("Segment deleted by retention policy", extra=log_fields(filename=segment["filename"]))
+
+    def _write_buffer(self, data):
+        # ==================================================
+        # === 1バッファ分 書込関数 (セグメント境界で分割) ===
+        # ==================================================
+        x = np.frombuffer(data, dtype=np.int16).reshape(-1, self.channels)
+
+        # 直前に破棄されたバッファは、当該バッファの直前の欠落として記録する
+        with self.lock:
+            dropped_frames = self.pending_dropped_frames
+            self.pending_dropped_frames = 0
+        if dropped_frames > 0:
+            if self.file is None:
+                self._open_segment()
+            self.segment["dropped_frames"] += dropped_frames
+            self.skipped_frames += dropped_frames
+
+        pos = 0
+        while pos < x.shape[0]:
+            if self.file is None:
+                self._open_segment()
+
+            count = min(x.shape[0] - pos, self.segment_frames - self.segment["frames"])
+            self.file.write(x[pos:pos + count])
+            self.segment["frames"] += count
+            self.total_frames += count
+            self.written_frames += count
+            pos += count
+
+            if self.segment["frames"] >= self.segment_frames:
+                self._close_segment()
+
+    def _run_writer(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            if self.error is not None:
+                # 書込エラー発生後は、停止要求までキューを空にするのみ
+                continue
+
+            start = time.perf_counter()
+            try:
+                self._write_buffer(item)
+            except Exception as e:
+                logger.exception("Rotating Recorder write failed")
+                self.error = e
+            self.busy_time += time.perf_counter() - start
+
+        if self.file is not None and self.error is None:
+            # 最終セグメント (セグメント長未満) をクローズ
+            self._close_segment()
+
+    def start(self):
+        # ==================================
+        # === 書込スレッド開始関数 ===
+        # ==================================
+        self.writer_thread = threading.Thread(target=self._run_writer, name="rotating_recorder-writer", daemon=True)
+        self.writer_thread.start()
+
+    def write(self, data, timestamp=None):
+        # ==================================================
+        # === 1バッファ分 書込投入関数 (キャプチャスレッドから呼出) ===
+        # ==================================================
+        # data      : 時間領域波形 量子化離散データ (16bit量子化 byte列 / チャンネルインターリーブ)
+        # timestamp : バッファの取得開始時刻 (UNIX時間[s] / 初回バッファのみ使用 / Noneの場合は現在時刻から算出)
+        if self.error is not None:
+            raise self.error
+
+        frame_count = len(data) // (self.channels * SAMPLE_WIDTH)
+        if self.start_timestamp is None:
+            if timestamp is None:
+                timestamp = datetime.datetime.now().timestamp() - frame_count / self.samplerate
+            self.start_timestamp = timestamp
+
+        try:
+            self.queue.put_nowait(data)
+        except queue.Full:
+            # 書込スレッドの遅延時はキャプチャスレッドを待たせずに破棄する
+            # (破棄したデータ数は、欠落が生じたセグメントのマニフェストエントリに記録)
+            with self.lock:
+                self.pending_dropped_frames += frame_count
+            self.dropped_buffers += 1
+            self.dropped_frames += frame_count
+            logger.warning(
+                "Rotating Recorder queue full, buffer dropped",
+                extra=log_fields(rate_limit=1.0, dropped_buffers=self.dropped_buffers)
+            )
+            return
+
+        self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+
+    def stop(self):
+        # ==================================================
+        # === 書込完了待ち & 書込スレッド停止関数 ===
+        # ==================================================
+        if self.writer_thread is not None:
+            self.queue.put(None)
+            self.writer_thread.join()
+            self.writer_thread = None
+
+        # 書込スレッドで発生した例外はここで送出する
+        if self.error is not None:
+            raise self.error
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    def format_stats(self):
+        # ==================================
+        # === 連続録音統計 文字列化 ===
+        # ==================================
+        ave_time = self.busy_time / self.written_frames * self.samplerate if self.written_frames > 0 else 0
+        retained_bytes = sum(segment["file_size"] for segment in self.segments)
+        return (
+            "=== Rotating Recorder Stats (" + self.output_dir + ") ===\n"
+            f"  written: {self.written_frames / self.samplerate:10.1f} [s] | segments closed: {self.closed_count:6d}"
+            f" / deleted: {self.deleted_count:6d} / retained: {len(self.segments):6d}"
+            f" ({retained_bytes / 1024 / 1024:.1f} [MiB])\n"
+            f"  write time per audio second: {ave_time * 1000:8.3f} [ms] | max queue depth: {self.max_queue_depth:4d}"
+            f" | dropped: {self.dropped_buffers:6d} [buffers] ({self.dropped_frames} [frames])"
+        )
+
+    def print_stats(self):
+        print(self.format_stats())
+        print("")
@@ -0,0 +1,440 @@
+import threading
+import time
+
+import numpy as np
+import pyaudio
+from scipy import signal
+
+from .log_util import get_logger, log_fields
+
+logger = get_logger(__name__)
+
+# 測定信号の前後に付加する無音の時間長[s]
+LEAD_SILENCE_TIME = 0.1
+
+# 相互相関ピークの信頼度(ピーク値 / 相互相関絶対値の中央値)の下限
+# (下回る場合はループバック未接続/ゲイン不足と見なす)
+MIN_PEAK_RATIO = 8.0
+
+# 相互相関ピークを無効とする探索範囲末尾の割合
+# (往復遅延が探索範囲(max_latency)を超える場合、部分的な重なりによるピークが探索範囲の末尾付近に現れるため)
+PEAK_EDGE_RATIO = 0.02
+
+# バースト間の推定遅延の許容ばらつき[サンプル]
+# (同一の全二重ストリーム内では各バーストの往復遅延は一致するため、中央値からの差が超過するバーストは無効とする)
+MAX_BURST_JITTER_SAMPLES = 4.0
+
+
+def gen_test_signal(kind, samplerate, mls_order=14, amplitude=0.5):
+    # ==================================================
+    # === 往復遅延測定用 テスト信号生成関数 ===
+    # ==================================================
+    # kind          : テスト信号の種類 ("mls":M系列(最大長系列) / "impulse":インパルス)
+    # samplerate    : サンプリング周波数[Hz]
+    # mls_order     : M系列の次数 (系列長 = 2^mls_order - 1)
+    # amplitude     : 振幅 (フルスケールに対する比率)
+    if kind == "mls":
+        # M系列は自己相関が鋭いピークを持つため、雑音下でも遅延を安定して推定できる
+        sequence = signal.max_len_seq(mls_order)[0] * 2.0 - 1.0
+    elif kind == "impulse":
+        # インパルス(1サンプル) + 相互相関の探索範囲確保用の無音 (10[ms])
+        sequence = np.zeros(max(int(samplerate * 0.01), 1))
+        sequence[0] = 1.0
+    else:
+        raise ValueError("kind must be 'mls' or 'impulse' : " + str(kind))
+
+    # test_signal : テスト信号 1次元配列 (float64 / -amplitude～+amplitude)
+    return sequence * amplitude
+
+
+def estimate_delay(captured, reference, max_lag):
+    # ==================================================
+    # === FFT相互相関による遅延推定関数 ===
+    # ==================================================
+    # captured  : 録音信号 1次元配列
+    # reference : 再生信号 1次元配列 (録音信号と同一の時間軸)
+    # max_lag   : 探索する最大遅延[サンプル]
+    n_fft = 1 << int(np.ceil(np.log2(len(captured) + len(reference))))
+    correlation = np.fft.irfft(
+        np.fft.rfft(captured, n_fft) * np.conj(np.fft.rfft(reference, n_fft)),
+        n_fft
+    )[:max_lag + 1]
+    magnitude = np.abs(correlation)
+
+    peak = int(np.argmax(magnitude))
+    peak_ratio = magnitude[peak] / max(float(np.median(magnitude)), 1e-12)
+
+    # 放物線補間によりサンプル間の遅延を推定
+    delay = float(peak)
+    if 0 < peak < len(magnitude) - 1:
+        y0, y1, y2 = magnitude[peak - 1], magnitude[peak], magnitude[peak + 1]
+        denominator = y0 - 2 * y1 + y2
+        if denominator != 0:
+            delay += 0.5 * (y0 - y2) / denominator
+
+    # delay         : 推定遅延[サンプル] (小数)
+    # peak_ratio    : 相互相関ピークの信頼度 (ピーク値 / 相互相関絶対値の中央値)
+    return delay, peak_ratio
+
+
+class RoundTripLatencyMeter:
+    # ==================================================
+    # === 全二重ストリーム 往復遅延測定クラス ===
+    # ==================================================
+    # 入出力を同時に開いたストリームのコールバックで、テスト信号(M系列/インパルス)のバーストを再生しながら録音し、
+    # 録音信号と再生信号のFFT相互相関から往復遅延(出力 → ループバック → 入力)をバースト毎に推定する
+    # バースト間には探索範囲(max_latency)分の無音を挟み、各バーストの遅延を独立に測定する
+    # コールバック毎のPortAudio時刻情報(DAC出力時刻 - ADC入力時刻)も、バッファ毎のレイテンシとして記録する
+    #
+    # samplerate        : サンプリング周波数[Hz]
+    # frames_per_buffer : ストリームバッファあたりのフレーム数
+    # kind              : テスト信号の種類 ("mls" / "impulse")
+    # burst_count       : テスト信号のバースト数
+    # max_latency       : 測定可能な最大往復遅延[s] (相互相関の探索範囲 / バースト間の無音長)
+    # channels          : 入出力のチャンネル数 (録音は先頭チャンネル、再生は全チャンネルに同一信号を出力)
+    # mls_order         : M系列の次数
+    # amplitude         : テスト信号の振幅 (フルスケールに対する比率)
+
+    def __init__(
+        self,
+        samplerate,
+        frames_per_buffer,
+        kind="mls",
+        burst_count=4,
+        max_latency=0.5,
+        channels=1,
+        mls_order=14,
+        amplitude=0.5
+    ):
+        self.samplerate = samplerate
+        self.frames_per_buffer = frames_per_buffer
+        self.kind = kind
+        self.burst_count = burst_count
+        self.channels = channels
+        self.max_lag = int(max_latency * samplerate)
+
+        # === 再生信号の生成 (無音 + (バースト + 無音) × バースト数) ===
+        burst = gen_test_signal(kind, samplerate, mls_order, amplitude)
+        lead = int(LEAD_SILENCE_TIME * samplerate)
+        period = len(burst) + self.max_lag
+        self.reference = np.zeros(lead + period * burst_count + lead)
+        self.burst_offsets = []
+        for i in range(burst_count):
+            offset = lead + period * i
+            self.reference[offset:offset + len(burst)] = burst
+            self.burst_offsets.append(offset)
+        self.burst_length = len(burst)
+        self.playback = np.round(self.reference * 32767).astype(np.int16)
+
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        # ==================================
+        # === 測定状態 初期化関数 ===
+        # ==================================
+        with self.lock:
+            self.captured = np.zeros(len(self.playback) + self.frames_per_buffer, dtype=np.int16)
+            self.position = 0
+            self.callback_count = 0
+            self.status_count = 0
+            self.buffer_latencies = []
+            self.callback_times = []
+
+    def callback(self, in_data, frame_count, time_info, status):
+        # ==========================================
+        # === 全二重ストリーム コールバック関数 ===
+        # ==========================================
+        # (録音データの格納と、次の再生データの切出しのみを行う)
+        with self.lock:
+            start = self.position
+            end = min(start + frame_count, len(self.captured))
+            if in_data:
+                captured = np.frombuffer(in_data, dtype=np.int16)[::self.channels]
+                self.captured[start:end] = captured[:end - start]
+
+            out = np.zeros(frame_count, dtype=np.int16)
+            playback = self.playback[start:start + frame_count]
+            out[:len(playback)] = playback
+            if self.channels > 1:
+                out = np.repeat(out, self.channels)
+
+            self.position = start + frame_count
+            self.callback_count += 1
+            self.callback_times.append(time.perf_counter())
+            if status:
+                # 入力オーバーフロー / 出力アンダーフロー等
+                self.status_count += 1
+            if time_info:
+                dac_time = time_info.get("output_buffer_dac_time", 0)
+                adc_time = time_info.get("input_buffer_adc_time", 0)
+                if dac_time > 0 and adc_time > 0:
+                    self.buffer_latencies.append(dac_time - adc_time)
+
+            finished = self.position >= len(self.playback)
+
+        return (out.tobytes(), pyaudio.paComplete if finished else pyaudio.paContinue)
+
+    @property
+    def duration(self):
+        # 測定に要する時間[s]
+        return len(self.playback) / self.samplerate
+
+    def run(self, stream, timeout=None):
+        # ==========================================
+        # === 測定実行関数 (測定完了までブロック) ===
+        # ==========================================
+        # stream    : callbackをstream_callbackとして開いた全二重ストリーム
+        #             (pyaudio.PyAudio.Stream / SoftwareLoopback)
+        # timeout   : 測定のタイムアウト[s] (Noneの場合は測定時間の2倍 + 1[s])
+        if timeout is None:
+            timeout = self.duration * 2 + 1
+        deadline = time.monotonic() + timeout
+        while stream.is_active() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        reported_latency = None
+        if hasattr(stream, "get_input_latency") and hasattr(stream, "get_output_latency"):
+            reported_latency = stream.get_input_latency() + stream.get_output_latency()
+
+        # result : 測定結果辞書 (analyze()の戻り値)
+        return self.analyze(reported_latency)
+
+    def analyze(self, reported_latency=None):
+        # ==========================================
+        # === 往復遅延 解析関数 ===
+        # ==========================================
+        # reported_latency : ホストAPIが報告する入出力レイテンシの合計[s] (比較用 / Noneの場合は省略)
+        with self.lock:
+            captured = self.captured[:len(self.playback)].astype(np.float64) / 32767
+            buffer_latencies = np.array(self.buffer_latencies)
+            callback_intervals = np.diff(self.callback_times)
+            status_count = self.status_count
+            incomplete = self.position < len(self.playback)
+
+        # === バースト毎に、当該バーストのみを含む再生信号との相互相関から遅延を推定 ===
+        delays = []
+        peak_ratios = []
+        for offset in self.burst_offsets:
+            reference = np.zeros_like(self.reference)
+            reference[offset:offset + self.burst_length] = self.reference[offset:offset + self.burst_length]
+            delay, peak_ratio = estimate_delay(captured, reference, self.max_lag)
+            delays.append(delay)
+            peak_ratios.append(peak_ratio)
+
+        delays = np.array(delays)
+        valid = (np.array(peak_ratios) >= MIN_PEAK_RATIO) & (delays < self.max_lag * (1 - PEAK_EDGE_RATIO))
+        invalid_reason = None
+
+        # 推定遅延が中央値から許容ばらつきを超えるバーストは無効とする
+        if valid.any():
+            valid &= np.abs(delays - np.median(delays[valid])) <= MAX_BURST_JITTER_SAMPLES
+
+        if not valid.any():
+            invalid_reason = "no correlation peak (check loopback connection / gain)"
+        elif not valid[0]:
+            # 往復遅延が探索範囲を超える場合、2番目以降のバーストは前バーストの録音との相関により
+            # 一致した誤った遅延(往復遅延 - バースト周期)を示すため、先行バーストの無い先頭バーストでの検出を必須とする
+            invalid_reason = "first burst not detected (round-trip may exceed max_latency)"
+        elif valid.sum() < self.burst_count // 2 + 1:
+            invalid_reason = "burst delays disagree (jitter > " + str(MAX_BURST_JITTER_SAMPLES) + " samples)"
+        if invalid_reason is not None:
+            valid[:] = False
+        roundtrip = float(np.median(delays[valid])) if valid.any() else None
+
+        buffer_time = self.frames_per_buffer / self.samplerate
+        result = {
+            "samplerate": self.samplerate,
+            "frames_per_buffer": self.frames_per_buffer,
+            "buffer_ms": buffer_time * 1000,
+            "kind": self.kind,
+            "burst_count": self.burst_count,
+            "valid_bursts": int(valid.sum()),
+            "roundtrip_samples": roundtrip,
+            "roundtrip_ms": roundtrip / self.samplerate * 1000 if roundtrip is not None else None,
+            "roundtrip_buffers": roundtrip / self.frames_per_buffer if roundtrip is not None else None,
+            "roundtrip_jitter_ms": float(np.ptp(delays[valid])) / self.samplerate * 1000 if valid.any() else None,
+            "burst_delays_samples": [round(float(d), 2) for d in delays],
+            "peak_ratios": [round(float(r), 1) for r in peak_ratios],
+            "reported_latency_ms": reported_latency * 1000 if reported_latency is not None else None,
+            "buffer_latency_ms": {
+                "mean": float(buffer_latencies.mean()) * 1000,
+                "min": float(buffer_latencies.min()) * 1000,
+                "max": float(buffer_latencies.max()) * 1000
+            } if len(buffer_latencies) > 0 else None,
+            "callback_interval_ms": {
+                "mean": float(callback_intervals.mean()) * 1000,
+                "max": float(callback_intervals.max()) * 1000
+            } if len(callback_intervals) > 0 else None,
+            "xrun_count": status_count,
+            "incomplete": incomplete,
+            "invalid_reason": invalid_reason
+        }
+
+        if roundtrip is None:
+            logger.warning(
+                "Round-trip latency not detected (check loopback connection / gain / max_latency)",
+                extra=log_fields(
+                    frames_per_buffer=self.frames_per_buffer, peak_ratios=result["peak_ratios"],
+                    burst_delays_samples=result["burst_delays_samples"], invalid_reason=invalid_reason
+                )
+            )
+
+        # result : 測定結果辞書
+        return result
+
+
+class SoftwareLoopback:
+    # ==================================================
+    # === ソフトウェア ループバック ストリームクラス ===
+    # ==================================================
+    # 全二重のpyaudio.PyAudio.Streamの代替 (ハードウェア無しでの往復遅延測定の動作確認向け)
+    # スレッドからstream_callbackを呼出し、出力データを指定遅延だけ遅らせて次回以降の入力データとして渡す
+    # (入力データ = 遅延線の先頭 / 出力データは遅延線の末尾に追加するため、遅延はframes_per_buffer以上とする)
+    #
+    # samplerate        : サンプリング周波数[Hz]
+    # frames_per_buffer : ストリームバッファあたりのフレーム数
+    # stream_callback   : PyAudio形式のコールバック関数
+    # latency           : 往復遅延[サンプル] (Noneの場合は2バッファ分)
+    # channels          : チャンネル数
+    # noise_level       : 入力データに加える白色雑音の振幅 (フルスケールに対する比率)
+    # gain              : ループバックの利得
+    # realtime          : コールバックをバッファの時間長毎に呼出す(True)/待ち無しで呼出す(False)設定
+
+    def __init__(
+        self,
+        samplerate,
+        frames_per_buffer,
+        stream_callback,
+        latency=None,
+        channels=1,
+        noise_level=0.0,
+        gain=1.0,
+        realtime=False
+    ):
+        if latency is None:
+            latency = frames_per_buffer * 2
+        if latency < frames_per_buffer:
+            raise ValueError("latency must be frames_per_buffer or more : " + str(latency))
+
+        self.samplerate = samplerate
+        self.frames_per_buffer = frames_per_buffer
+        self.stream_callback = stream_callback
+        self.latency = latency
+        self.channels = channels
+        self.noise_level = noise_level
+        self.gain = gain
+        self.realtime = realtime
+        self.rng = np.random.default_rng(0)
+
+        # 遅延線 (出力データ → 入力データ / 先頭channelのみ)
+        self.delay_line = np.zeros(latency, dtype=np.float64)
+
+        self.active = True
+        self.thread = threading.Thread(target=self._run, name="software-loopback", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        # ==========================================
+        # === コールバック呼出スレッド関数 ===
+        # ==========================================
+        n = self.frames_per_buffer
+        buffer_time = n / self.samplerate
+        stream_time = 0.0
+        next_time = time.monotonic()
+
+        while self.active:
+            x = self.delay_line[:n] * self.gain
+            if self.noise_level > 0:
+                x = x + self.rng.standard_normal(n) * self.noise_level
+            in_data = np.repeat(np.clip(np.round(x * 32767), -32768, 32767).astype(np.int16), self.channels)
+
+            # PortAudioと同様の時刻情報 (ADC入力時刻 = 1バッファ前 / DAC出力時刻 = 往復遅延 - 1バッファ後)
+            time_info = {
+                "input_buffer_adc_time": stream_time - buffer_time,
+                "current_time": stream_time,
+                "output_buffer_dac_time": stream_time + (self.latency - n) / self.samplerate
+            }
+            # (PortAudioのストリーム時刻は0より大きい値とするため、1[s]加算して渡す)
+            time_info = {key: value + 1.0 for key, value in time_info.items()}
+
+            out_data, flag = self.stream_callback(in_data.tobytes(), n, time_info, 0)
+
+            out = np.frombuffer(out_data, dtype=np.int16)[::self.channels].astype(np.float64) / 32767
+            self.delay_line = np.concatenate((self.delay_line[n:], out))
+            stream_time += buffer_time
+
+            if flag == pyaudio.paComplete:
+                break
+
+            if self.realtime:
+                next_time += buffer_time
+                delay = next_time - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+        self.active = False
+
+    def is_active(self):
+        return self.active
+
+    def get_input_latency(self):
+        return self.frames_per_buffer / self.samplerate
+
+    def get_output_latency(self):
+        return (self.latency - self.frames_per_buffer) / self.samplerate
+
+    def stop_stream(self):
+        self.active = False
+        if self.thread is not threading.current_thread():
+            self.thread.join()
+
+    def close(self):
+        self.stop_stream()
+
+
+def _format_value(value, width, digits=2):
+    # 未検出(None)の値は"---"と表示する
+    return f"{value:{width}.{digits}f}" if value is not None else " " * (width - 3) + "---"
+
+
+def format_latency_results(results):
+    # ==================================================
+    # === 往復遅延測定結果 一覧表 文字列化関数 ===
+    # ==================================================
+    # results : RoundTripLatencyMeter.analyze()の測定結果辞書のリスト (frames_per_buffer毎)
+    lines = [
+        "=== Round-Trip Latency (frames_per_buffer sweep) ===",
+        "  frames/buf | buffer [ms] | round-trip [ms] | [buffers] | jitter [ms] | reported [ms] | xrun | bursts"
+    ]
+    for result in results:
+        fmt = _format_value
+        lines.append(
+            f"  {result['frames_per_buffer']:10d} | {result['buffer_ms']:11.2f} | {fmt(result['roundtrip_ms'], 15)}"
+            f" | {fmt(result['roundtrip_buffers'], 9)} | {fmt(result['roundtrip_jitter_ms'], 11, 3)}"
+            f" | {fmt(result['reported_latency_ms'], 13)} | {result['xrun_count']:4d}"
+            f" | {result['valid_bursts']}/{result['burst_count']}"
+        )
+    return "\n".join(lines)
+
+
+def select_frames_per_buffer(results, max_jitter_ms=1.0):
+    # ==================================================
+    # === 推奨 frames_per_buffer 選択関数 ===
+    # ==================================================
+    # results       : RoundTripLatencyMeter.analyze()の測定結果辞書のリスト
+    # max_jitter_ms : 許容するバースト間の往復遅延のばらつき[ms]
+    # (全バーストで遅延を検出し、xrun無し & ばらつきが許容範囲内の設定のうち、往復遅延が最小の設定を選択する)
+    candidates = [
+        result for result in results
+        if result["roundtrip_ms"] is not None
+        and result["valid_bursts"] == result["burst_count"]
+        and result["xrun_count"] == 0
+        and not result["incomplete"]
+        and result["roundtrip_jitter_ms"] <= max_jitter_ms
+    ]
+    if not candidates:
+        return None
+
+    # result : 推奨設定の測定結果辞書 (候補が無い場合はNone)
+    return min(candidates, key=lambda result: result["roundtrip_ms"])
@@ -1,31 +1,129 @@
 import datetime
 import os
+import time
 
+import numpy as np
 import soundfile as sf
 
+from .log_util import get_logger, log_fields
 
-def save_audio_to_wav_file(samplerate, audio_discrete_data):
-    # =====================================
-    # === 音声データwavファイル保存関数 ===
-    # =====================================
-    # samplerate                : サンプリング周波数 [sampling data count/s)]
-    # audio_discrete_data       : 音声データ(時系列離散データ) 1次元配列
+logger = get_logger(__name__)
+
+# 保存形式毎のファイル拡張子
+AUDIO_FORMAT_EXTENSIONS = {"WAV": ".wav", "FLAC": ".flac", "OGG": ".ogg"}
+
+# 保存形式毎の既定サブタイプ (指定サブタイプが保存形式で非対応の場合に使用 / OGGはPCM非対応のためVORBISとする)
+AUDIO_FORMAT_DEFAULT_SUBTYPES = {"WAV": "PCM_16", "FLAC": "PCM_16", "OGG": "VORBIS"}
 
-    print("Audio DATA File Save START")
+
+def gen_wav_filename(take_index=None, audio_format="WAV"):
+    # ==========================================
+    # === 音声データwavファイル名生成関数 ===
+    # ==========================================
+    # take_index    : テイク番号 (複数テイク録音時のファイル名重複防止用 / Noneの場合は付与しない)
+    # audio_format  : 保存形式 ("WAV" / "FLAC" / "OGG" / 拡張子の決定に使用)
 
     now = datetime.datetime.now()
 
     dirname = 'wav/'
     if not os.path.isdir(dirname):
-        os.mkdir(dirname)
+        os.makedirs(dirname, exist_ok=True)
+
+    filename = dirname + 'recorded-sound_' + now.strftime('%Y%m%d_%H%M%S')
+    if take_index is not None:
+        filename += '_take' + str(take_index).zfill(3)
+    filename += AUDIO_FORMAT_EXTENSIONS[audio_format.upper()]
+
+    # filename : 音声データのWAVファイル名(拡張子あり:相対PATH)
+    return filename
+
+
+def resolve_audio_subtype(audio_format, subtype):
+    # ==========================================
+    # === 保存形式に対応したサブタイプ決定関数 ===
+    # ==========================================
+    # audio_format  : 保存形式 ("WAV" / "FLAC" / "OGG")
+    # subtype       : 指定サブタイプ (Noneの場合、または保存形式で非対応の場合は保存形式の既定サブタイプとする)
+    audio_format = audio_format.upper()
+    if subtype is None or not sf.check_format(audio_format, subtype):
+        subtype = AUDIO_FORMAT_DEFAULT_SUBTYPES[audio_format]
+
+    # subtype : 保存に使用するサブタイプ
+    return subtype
+
+
+def _to_audio_array(buffer, channels):
+    # ==================================================
+    # === 書込バッファ → soundfile書込用配列 変換関数 ===
+    # ==================================================
+    # buffer    : 16bit量子化 byte列 / numpy配列 (int16:量子化値のまま / float:正規化済 -1.0～+1.0)
+    # channels  : チャンネル数
+    if isinstance(buffer, (bytes, bytearray, memoryview)):
+        # 入力音声ストリームの量子化データは、浮動小数点に変換せずint16のまま書込む
+        data = np.frombuffer(buffer, dtype=np.int16)
+    else:
+        data = np.asarray(buffer)
+
+    # data : 書込用配列 (チャンネル数2以上の場合は (フレーム数, チャンネル数))
+    return data.reshape(-1, channels) if channels > 1 else data
+
+
+def save_audio_to_wav_file(
+    samplerate,
+    audio_discrete_data,
+    filename=None,
+    audio_format="WAV",
+    subtype="PCM_16",
+    channels=1
+):
+    # =====================================
+    # === 音声データwavファイル保存関数 ===
+    # =====================================
+    # samplerate                : サンプリング周波数 [sampling data count/s)]
+    # audio_discrete_data       : 音声データ(時系列離散データ)
+    #                             (16bit量子化 byte列 / int16配列 / 正規化済float配列、またはそれらのバッファのリスト)
+    #                             (リストの場合は連結せずにバッファ毎に逐次書込む)
+    # filename                  : 保存するファイル名 (Noneの場合は現在時刻から生成)
+    # audio_format              : 保存形式 ("WAV" / "FLAC" / "OGG")
+    # subtype                   : サブタイプ ("PCM_16":16bit整数 / "PCM_24" / "FLOAT" / "VORBIS"等 / Noneの場合は形式の既定値)
+    #                             (保存形式で非対応のサブタイプの場合も形式の既定値とする / OGGの場合は"VORBIS")
+    #                             (int16データを"PCM_16"のWAV/FLACで保存する場合は、浮動小数点を経由せずに書込む)
+    # channels                  : チャンネル数 (インターリーブされたデータのチャンネル数)
+
+    logger.info("Audio DATA File Save START")
+
+    if filename is None:
+        filename = gen_wav_filename(audio_format=audio_format)
+    subtype = resolve_audio_subtype(audio_format, subtype)
 
-    filename = dirname + 'recorded-sound_' + \
-        now.strftime('%Y%m%d_%H%M%S') + '.wav'
+    if not isinstance(audio_discrete_data, (list, tuple)):
+        audio_discrete_data = [audio_discrete_data]
 
-    # Numpy array内の音声データをWAVファイルとして保存
-    sf.write(filename, audio_discrete_data, samplerate)
+    # 音声データをバッファ毎に逐次書込み
+    start = time.perf_counter()
+    frames = 0
+    with sf.SoundFile(
+        filename, mode="w", samplerate=samplerate, channels=channels, format=audio_format, subtype=subtype
+    ) as f:
+        for buffer in audio_discrete_data:
+            data = _to_audio_array(buffer, channels)
+            f.write(data)
+            frames += data.shape[0]
+    elapsed_time = time.perf_counter() - start
 
-    print("Audio DATA File Save END\n")
+    # 書込スループット (ファイルサイズ / 書込時間、音声時間長 / 書込時間)
+    file_size = os.path.getsize(filename)
+    logger.info(
+        "Audio DATA File Save END",
+        extra=log_fields(
+            filename=filename,
+            subtype=subtype,
+            file_size_kib=round(file_size / 1024, 1),
+            elapsed_ms=round(elapsed_time * 1000, 2),
+            throughput_mib_s=round(file_size / 1024 / 1024 / elapsed_time, 1) if elapsed_time > 0 else None,
+            audio_sec_per_sec=round(frames / samplerate / elapsed_time, 1) if elapsed_time > 0 else None
+        )
+    )
 
-    # filename : 保存した音声データのWAVファイル名(拡張子あり:相対PATH)
+    # filename : 保存した音声データのファイル名(拡張子あり:相対PATH)
     return filename
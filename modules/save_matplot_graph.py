@@ -3,26 +3,54 @@ from matplotlib import pyplot as plt
 import os
 import datetime
 
+from .log_util import get_logger, log_fields
 
-def save_matplot_graph(filename_prefix):
-    # ======================
-    # === グラフ保存関数 ===
-    # ======================
-    # filename_prefix : グラフ保存時のファイル名プレフィックス
+logger = get_logger(__name__)
 
-    print("Graph File Save START")
+
+def gen_graph_filename(filename_prefix, take_index=None):
+    # ==============================
+    # === グラフファイル名生成関数 ===
+    # ==============================
+    # filename_prefix : グラフ保存時のファイル名プレフィックス
+    # take_index      : テイク番号 (複数テイク録音時のファイル名重複防止用 / Noneの場合は付与しない)
 
     now = datetime.datetime.now()
 
     dirname = 'graph/'
     if not os.path.isdir(dirname):
-        os.mkdir(dirname)
+        os.makedirs(dirname, exist_ok=True)
+
+    filename = dirname + filename_prefix + now.strftime('%Y%m%d_%H%M%S')
+    if take_index is not None:
+        filename += '_take' + str(take_index).zfill(3)
+    filename += '.png'
+
+    # filename : グラフのファイル名(拡張子あり:相対PATH)
+    return filename
 
-    filename = dirname + filename_prefix + \
-        now.strftime('%Y%m%d_%H%M%S') + '.png'
+
+def save_matplot_graph(filename_prefix, fig=None, filename=None):
+    # ======================
+    # === グラフ保存関数 ===
+    # ======================
+    # filename_prefix : グラフ保存時のファイル名プレフィックス
+    # fig             : 保存するmatplotlib figureインスタンス (Noneの場合はカレントfigure)
+    # filename        : 保存するグラフファイル名 (Noneの場合は現在時刻から生成)
+
+    logger.info("Graph File Save START")
+
+    if filename is None:
+        filename = gen_graph_filename(filename_prefix)
 
     # matplotlibグラフをpngファイルとして保存
-    plt.savefig(filename)
-    plt.close()
+    if fig is None:
+        plt.savefig(filename)
+        plt.close()
+    else:
+        fig.savefig(filename)
+
+    logger.info("Graph File Save END", extra=log_fields(filename=filename))
 
-    print("Graph File Save END\n")
+    # filename : 保存したグラフのファイル名(拡張子あり:相対PATH)
+    return filename
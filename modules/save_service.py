@@ -0,0 +1,137 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+
+from matplotlib import pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+from .save_audio_to_wav_file import gen_wav_filename, save_audio_to_wav_file
+from .save_matplot_graph import gen_graph_filename, save_matplot_graph
+
+
+class SaveService:
+    # ===============================================
+    # === 音声 & グラフ バックグラウンド保存クラス ===
+    # ===============================================
+    # WAVファイル保存 / グラフ(png)保存をワーカースレッドプールに投入し、
+    # 保存ファイル名を結果とするconcurrent.futures.Futureを返す
+    # (保存処理の完了を待たずに、メインスレッドで次テイクの録音を継続できる)
+    #
+    # max_workers   : ワーカースレッド数
+    # audio_format  : 音声の保存形式 ("WAV" / "FLAC" / "OGG")
+    # audio_subtype : 音声の保存サブタイプ ("PCM_16":16bit整数 等 / Noneの場合は形式の既定値)
+
+    def __init__(self, max_workers=2, audio_format="WAV", audio_subtype="PCM_16"):
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="save_service"
+        )
+        self.audio_format = audio_format
+        self.audio_subtype = audio_subtype
+        self.futures = []
+        self.take_count = 0
+
+    def submit_audio(self, samplerate, audio_discrete_data, take_index=None, filename=None, channels=1):
+        # ==========================================
+        # === WAVファイル保存 投入関数 ===
+        # ==========================================
+        # samplerate            : サンプリング周波数 [sampling data count/s)]
+        # audio_discrete_data   : 音声データ(時系列離散データ)
+        #                         (16bit量子化 byte列 / 配列、またはそれらのバッファのリスト)
+        # take_index            : テイク番号 (Noneの場合はファイル名に付与しない)
+        # filename              : 保存するファイル名 (Noneの場合は投入時刻から生成)
+        # channels              : チャンネル数 (インターリーブされたデータのチャンネル数)
+
+        # ファイル名は投入時刻で確定させる
+        if filename is None:
+            filename = gen_wav_filename(take_index, self.audio_format)
+
+        future = self.executor.submit(
+            save_audio_to_wav_file,
+            samplerate,
+            audio_discrete_data,
+            filename,
+            self.audio_format,
+            self.audio_subtype,
+            channels
+        )
+        self.futures.append(future)
+
+        # future : 保存したWAVファイル名を結果とするFuture
+        return future
+
+    def submit_graph(self, fig, filename_prefix, take_index=None):
+        # ====================================
+        # === グラフ保存 投入関数 ===
+        # ====================================
+        # fig               : 保存するmatplotlib figureインスタンス
+        # filename_prefix   : グラフ保存時のファイル名プレフィックス
+        # take_index        : テイク番号 (Noneの場合はファイル名に付与しない)
+
+        filename = gen_graph_filename(filename_prefix, take_index)
+
+        # GUIバックエンドへの操作はメインスレッドで完了させた上で、
+        # figureをpyplotの管理対象から外し、Agg(非GUI)キャンバスに付け替えてワーカースレッドに渡す
+        plt.close(fig)
+        FigureCanvasAgg(fig)
+
+        future = self.executor.submit(save_matplot_graph, filename_prefix, fig, filename)
+        self.futures.append(future)
+
+        # future : 保存したグラフファイル名を結果とするFuture
+        return future
+
+    def submit_task(self, func, *args):
+        # ====================================
+        # === 任意の保存処理 投入関数 ===
+        # ====================================
+        # func  : ワーカースレッドで実行する保存関数 (保存したファイル名を返す)
+        # args  : 保存関数の引数
+        # (グラフを生成する場合は、pyplotを使用せずにAggキャンバスのfigureを関数内で生成すること)
+        future = self.executor.submit(func, *args)
+        self.futures.append(future)
+
+        # future : 保存関数の戻り値を結果とするFuture
+        return future
+
+    def submit_take(self, samplerate, audio_discrete_data, fig, filename_prefix, channels=1):
+        # ==============================================
+        # === 1テイク分の音声 & グラフ保存 投入関数 ===
+        # ==============================================
+        # samplerate            : サンプリング周波数 [sampling data count/s)]
+        # audio_discrete_data   : 音声データ(時系列離散データ) (16bit量子化 byte列 / 配列)
+        # fig                   : 保存するmatplotlib figureインスタンス
+        # filename_prefix       : グラフ保存時のファイル名プレフィックス
+        # channels              : チャンネル数 (インターリーブされたデータのチャンネル数)
+
+        # 同一時刻(秒)内の複数テイクでファイル名が重複しないよう、2テイク目以降はテイク番号を付与
+        take_index = self.take_count if self.take_count > 0 else None
+        self.take_count += 1
+
+        audio_future = self.submit_audio(samplerate, audio_discrete_data, take_index, channels=channels)
+        graph_future = self.submit_graph(fig, filename_prefix, take_index)
+
+        # audio_future : 保存したWAVファイル名を結果とするFuture
+        # graph_future : 保存したグラフファイル名を結果とするFuture
+        return audio_future, graph_future
+
+    def wait(self):
+        # ========================================
+        # === 投入済保存処理の完了待ち関数 ===
+        # ========================================
+        wait(self.futures)
+
+        # 保存処理で発生した例外はここで送出する
+        filenames = [future.result() for future in self.futures]
+        self.futures = []
+
+        # filenames : 保存したファイル名のリスト(投入順)
+        return filenames
+
+    def shutdown(self):
+        # ==============================================
+        # === 保存完了待ち & ワーカースレッド終了関数 ===
+        # ==============================================
+        filenames = self.wait()
+        self.executor.shutdown(wait=True)
+
+        # filenames : 保存したファイル名のリスト(投入順)
+        return filenames
@@ -0,0 +1,418 @@
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .log_util import get_logger, log_fields
+
+logger = get_logger(__name__)
+
+# 共有メモリ ヘッダ領域の要素index (int64配列)
+HEADER_SEQ_SLOT0 = 0        # スロット0の書込シーケンス番号 (奇数:書込中 / 偶数:書込完了)
+HEADER_SEQ_SLOT1 = 1        # スロット1の書込シーケンス番号 (奇数:書込中 / 偶数:書込完了)
+HEADER_ACTIVE_SLOT = 2      # 最新フレームが格納されたスロット番号
+HEADER_WRITE_COUNT = 3      # 書込済フレーム数 (キャプチャ側が更新)
+HEADER_RENDER_COUNT = 4     # 描画済フレーム数 (描画プロセス側が更新)
+HEADER_DIMS_SLOT0 = 5       # スロット0のフレーム形状 (周波数軸要素数, 時間軸要素数, 基本周波数要素数) の先頭index
+HEADER_DIMS_SLOT1 = 8       # スロット1のフレーム形状 (周波数軸要素数, 時間軸要素数, 基本周波数要素数) の先頭index
+HEADER_LENGTH = 11
+
+# 読出側のシーケンス番号不一致時の最大再試行回数
+# (書込側が書込途中で停止した場合も、読出側が無限に再試行し続けないよう上限を設ける)
+READ_MAX_RETRIES = 1000
+
+# 共有メモリ確保時の1スロットあたり要素数の余裕率
+# (適応品質制御によるフレーム形状の変化では再確保せず、容量を超える形状のフレームの場合のみ再確保する)
+SHM_CAPACITY_MARGIN = 2
+
+# 描画プロセス異常終了時の再起動間隔[s] (連続して異常終了する毎に2倍 / 上限RESTART_BACKOFF_MAX)
+RESTART_BACKOFF_INITIAL = 0.5
+RESTART_BACKOFF_MAX = 30.0
+
+# 描画プロセスの連続異常終了の上限回数 (超過時は再起動を停止する)
+RESTART_MAX_COUNT = 5
+
+
+def gen_slot_length(n_freq, n_time, n_f0):
+    # 1スロットあたりの要素数 (スペクトログラム / 周波数軸 / 時間軸 / 基本周波数 / 基本周波数時間軸)
+    return n_freq * n_time + n_freq + n_time + n_f0 * 2
+
+
+class SharedSpctrgrmBuffer:
+    # ======================================================================
+    # === スペクトログラム & 基本周波数フレーム 共有メモリダブルバッファ ===
+    # ======================================================================
+    # multiprocessing.shared_memory上に、最新フレーム格納用のスロットを2面確保し、
+    # 書込側(キャプチャ/DSPプロセス)は非アクティブ側スロットへの書込完了後にアクティブ側を切り替える
+    # (書込側はロック待ちを一切行わず、読出側はシーケンス番号の一致確認により書込途中のデータを読み飛ばす)
+    # (フレーム形状はスロット毎にヘッダ領域に格納するため、容量内であれば形状が変化しても再確保不要)
+    #
+    # slot_length   : 1スロットあたりの要素数(容量) (gen_slot_length()で算出した値以上)
+    # name          : 接続する共有メモリ名 (Noneの場合は新規作成)
+
+    def __init__(self, slot_length, name=None):
+        self.slot_length = slot_length
+        size = (HEADER_LENGTH * 8) + (self.slot_length * 4 * 2)
+
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+
+        self.name = self.shm.name
+
+        self.header = np.ndarray((HEADER_LENGTH,), dtype=np.int64, buffer=self.shm.buf)
+        self.slots = np.ndarray(
+            (2, self.slot_length),
+            dtype=np.float32,
+            buffer=self.shm.buf,
+            offset=HEADER_LENGTH * 8
+        )
+
+        if self.owner:
+            self.header[:] = 0
+
+    def _split_slot(self, slot, n_freq, n_time, n_f0):
+        # スロットの各データ領域(view)を取得
+        buf = self.slots[slot]
+        i0 = n_freq * n_time
+        i1 = i0 + n_freq
+        i2 = i1 + n_time
+        i3 = i2 + n_f0
+        return (
+            buf[:i0].reshape(n_freq, n_time),
+            buf[i0:i1],
+            buf[i1:i2],
+            buf[i2:i3],
+            buf[i3:i3 + n_f0]
+        )
+
+    def write(self, freq_spctrgrm, time_spctrgrm, spectrogram, f0, time_f0):
+        # ======================================
+        # === 最新フレーム書込関数(書込側) ===
+        # ======================================
+        dims = (spectrogram.shape[0], spectrogram.shape[1], len(f0))
+        if gen_slot_length(*dims) > self.slot_length:
+            raise ValueError("frame exceeds shared memory slot capacity : " + str(dims))
+
+        slot = 1 - int(self.header[HEADER_ACTIVE_SLOT])
+        seq_index = HEADER_SEQ_SLOT0 + slot
+        dims_index = HEADER_DIMS_SLOT0 if slot == 0 else HEADER_DIMS_SLOT1
+
+        # シーケンス番号を奇数(書込中)に更新
+        self.header[seq_index] += 1
+
+        self.header[dims_index:dims_index + 3] = dims
+        spctrgrm_buf, freq_buf, time_buf, f0_buf, time_f0_buf = self._split_slot(slot, *dims)
+        spctrgrm_buf[:] = spectrogram
+        freq_buf[:] = freq_spctrgrm
+        time_buf[:] = time_spctrgrm
+        f0_buf[:] = f0
+        time_f0_buf[:] = time_f0
+
+        # シーケンス番号を偶数(書込完了)に更新した上で、アクティブ側スロットを切り替え
+        self.header[seq_index] += 1
+        self.header[HEADER_ACTIVE_SLOT] = slot
+        self.header[HEADER_WRITE_COUNT] += 1
+
+    def read(self):
+        # ======================================
+        # === 最新フレーム読出関数(読出側) ===
+        # ======================================
+        for _ in range(READ_MAX_RETRIES):
+            slot = int(self.header[HEADER_ACTIVE_SLOT])
+            seq_index = HEADER_SEQ_SLOT0 + slot
+            dims_index = HEADER_DIMS_SLOT0 if slot == 0 else HEADER_DIMS_SLOT1
+
+            seq_before = int(self.header[seq_index])
+            if seq_before % 2 != 0:
+                # 書込中の場合は再試行
+                time.sleep(0)
+                continue
+
+            # フレーム形状は書込途中の値(新旧の混在)の可能性があるため、シーケンス番号の再確認と範囲確認の後に使用する
+            dims = tuple(int(dim) for dim in self.header[dims_index:dims_index + 3])
+            if int(self.header[seq_index]) != seq_before \
+                    or min(dims) <= 0 or gen_slot_length(*dims) > self.slot_length:
+                time.sleep(0)
+                continue
+
+            frame = tuple(data.copy() for data in self._split_slot(slot, *dims))
+
+            if int(self.header[seq_index]) == seq_before:
+                # 読出中に書込が行われていなければ読出完了
+                break
+        else:
+            # 再試行の上限に達した場合 (書込側が書込途中で停止した場合等) は読出無し
+            return None
+
+        spectrogram, freq_spctrgrm, time_spctrgrm, f0, time_f0 = frame
+
+        # freq_spctrgrm     : スペクトログラム y軸向けデータ[Hz]
+        # time_spctrgrm     : スペクトログラム x軸向けデータ[s]
+        # spectrogram       : スペクトログラム 振幅データ
+        # f0                : 基本周波数 時系列データ 1次元配列
+        # time_f0           : 基本周波数 時系列データに対応した時間軸データ 1次元配列
+        # (読出できなかった場合はNone)
+        return freq_spctrgrm, time_spctrgrm, spectrogram, f0, time_f0
+
+    @property
+    def write_count(self):
+        return int(self.header[HEADER_WRITE_COUNT])
+
+    @property
+    def render_count(self):
+        return int(self.header[HEADER_RENDER_COUNT])
+
+    def count_rendered_frame(self):
+        self.header[HEADER_RENDER_COUNT] += 1
+
+    def close(self):
+        # ==========================
+        # === 共有メモリ解放関数 ===
+        # ==========================
+        # numpy.ndarrayのviewを破棄した上で、共有メモリを閉じる (作成側のみ削除)
+        self.header = None
+        self.slots = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _renderer_process_main(
+    shm_name, slot_length, spctrgrm_mode, time_range, freq_range, dbref, A, render_fps, stop_event
+):
+    # ==================================
+    # === 描画プロセス メイン関数 ===
+    # ==================================
+    # 共有メモリから最新フレームを読み出し、描画プロセス独自のフレームレートで描画する
+    # (matplotlibは描画プロセス内でのみimportする)
+    from matplotlib import pyplot as plt
+
+    from .plot_matplot_graph import gen_graph_figure_for_realtime_spctrgrm
+    from .realtime_spctrgrm_renderer import RealtimeSpctrgrmRenderer
+
+    buffer = SharedSpctrgrmBuffer(slot_length, name=shm_name)
+
+    fig, spctrgrm_fig, cbar_fig, f0_fig = gen_graph_figure_for_realtime_spctrgrm(spctrgrm_mode)
+    renderer = RealtimeSpctrgrmRenderer(
+        fig, spctrgrm_fig, cbar_fig, f0_fig, time_range, freq_range, dbref, A
+    )
+
+    frame_period = 1 / render_fps
+    last_write_count = 0
+
+    try:
+        while not stop_event.is_set():
+            frame_start = time.perf_counter()
+
+            write_count = buffer.write_count
+            frame = buffer.read() if write_count != last_write_count else None
+            if frame is not None:
+                # 新規フレームが書き込まれている場合のみ描画
+                last_write_count = write_count
+                renderer.update(*frame)
+                buffer.count_rendered_frame()
+            elif renderer.spctrgrm_im is not None:
+                # 新規フレームが無い場合もGUIイベントは処理する
+                fig.canvas.flush_events()
+
+            if renderer.spctrgrm_im is not None and not renderer.is_open:
+                # グラフウィンドウが閉じられた場合は描画プロセスを終了
+                break
+
+            # 描画フレームレートの調整
+            sleep_time = frame_period - (time.perf_counter() - frame_start)
+            if sleep_time > 0:
+                time.sleep(sleep_time)
+
+    except KeyboardInterrupt:
+        # 「ctrl+c」はキャプチャ側プロセスで処理するため、描画プロセスは終了のみ行う
+        pass
+
+    finally:
+        plt.close("all")
+        buffer.close()
+
+
+class SpctrgrmRendererProcess:
+    # ================================================================
+    # === 別プロセス リアルタイムスペクトログラム描画管理クラス ===
+    # ================================================================
+    # matplotlibによる描画を別プロセスで実行し、キャプチャ/DSP側からは
+    # 共有メモリダブルバッファへの最新フレームの書込のみを行う
+    # (描画の遅延がstream.read()を停止させる事は無く、描画プロセスは録音を止めずに再起動可能)
+    #
+    # spctrgrm_mode     : スペクトログラムデータ算出モード
+    # time_range        : スペクトログラムグラフ X軸表示レンジ [s]
+    # freq_range        : スペクトログラムグラフ Y軸表示レンジ [Hz]
+    # dbref             : デシベル基準値
+    # A                 : 聴感補正(A特性)の有効(True)/無効(False)設定
+    # render_fps        : 描画プロセスの目標描画フレームレート [frame/s]
+
+    def __init__(self, spctrgrm_mode, time_range, freq_range, dbref, A, render_fps=30):
+        self.spctrgrm_mode = spctrgrm_mode
+        self.time_range = time_range
+        self.freq_range = freq_range
+        self.dbref = dbref
+        self.A = A
+        self.render_fps = render_fps
+
+        # GUIバックエンドを含むプロセス状態を引き継がないよう、spawn方式でプロセスを生成する
+        self.mp_context = multiprocessing.get_context("spawn")
+
+        self.buffer = None
+        self.process = None
+        self.stop_event = None
+        self.start_time = None
+        self.process_start_time = None
+        self.restart_count = 0
+
+        # 共有メモリ再確保前の描画済フレーム数の累計 (平均描画フレームレートの算出用)
+        self.rendered_total = 0
+
+        # 描画プロセス異常終了時の再起動制御 (連続異常終了回数 / 次回の再起動可能時刻 / 再起動停止済)
+        self.consecutive_failures = 0
+        self.next_restart_time = 0.0
+        self.restart_disabled = False
+
+    def start(self):
+        # ================================
+        # === 描画プロセス起動関数 ===
+        # ================================
+        self.stop_event = self.mp_context.Event()
+        self.process = self.mp_context.Process(
+            target=_renderer_process_main,
+            args=(
+                self.buffer.name,
+                self.buffer.slot_length,
+                self.spctrgrm_mode,
+                self.time_range,
+                self.freq_range,
+                self.dbref,
+                self.A,
+                self.render_fps,
+                self.stop_event
+            ),
+            daemon=True
+        )
+        self.process.start()
+
+        self.process_start_time = time.perf_counter()
+        if self.start_time is None:
+            self.start_time = self.process_start_time
+
+    def stop(self, timeout=2):
+        # ================================
+        # === 描画プロセス停止関数 ===
+        # ================================
+        if self.process is None:
+            return
+
+        self.stop_event.set()
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+        self.process = None
+
+    def restart(self):
+        # ==================================
+        # === 描画プロセス再起動関数 ===
+        # ==================================
+        # 共有メモリは維持したまま描画プロセスのみを再起動する (キャプチャ側は停止しない)
+        self.stop()
+        self.start()
+        self.restart_count += 1
+
+    def _handle_abnormal_exit(self):
+        # ==================================================
+        # === 描画プロセス異常終了時の再起動制御関数 ===
+        # ==================================================
+        # 連続して異常終了する場合は再起動間隔を延ばし、上限回数を超過した場合は再起動を停止する
+        now = time.perf_counter()
+        if now < self.next_restart_time:
+            return
+
+        # 前回の起動から十分に動作していた場合は、連続異常終了とみなさない
+        if now - self.process_start_time > RESTART_BACKOFF_MAX:
+            self.consecutive_failures = 0
+
+        if self.consecutive_failures >= RESTART_MAX_COUNT:
+            logger.error(
+                "Renderer Process exited abnormally too many times, Restart disabled",
+                extra=log_fields(exitcode=self.process.exitcode, restart_count=self.restart_count)
+            )
+            self.restart_disabled = True
+            return
+
+        logger.warning(
+            "Renderer Process exited abnormally, Restarting",
+            extra=log_fields(exitcode=self.process.exitcode, consecutive_failures=self.consecutive_failures)
+        )
+        self.restart()
+        self.consecutive_failures += 1
+        self.next_restart_time = now + min(
+            RESTART_BACKOFF_INITIAL * 2 ** (self.consecutive_failures - 1), RESTART_BACKOFF_MAX
+        )
+
+    def update(self, freq_spctrgrm, time_spctrgrm, spectrogram, f0, time_f0):
+        # ======================================================
+        # === 最新フレーム書込関数 (キャプチャ/DSP側から呼出) ===
+        # ======================================================
+        # freq_spctrgrm     : スペクトログラム y軸向けデータ[Hz]
+        # time_spctrgrm     : スペクトログラム x軸向けデータ[s]
+        # spectrogram       : スペクトログラム 振幅データ
+        # f0                : 基本周波数 時系列データ 1次元配列
+        # time_f0           : 基本周波数 時系列データに対応した時間軸データ 1次元配列
+
+        slot_length = gen_slot_length(spectrogram.shape[0], spectrogram.shape[1], len(f0))
+
+        if self.buffer is None or slot_length > self.buffer.slot_length:
+            # 初回、またはフレームが共有メモリの容量を超える場合のみ、共有メモリを(余裕を持って)再確保して描画プロセスを起動
+            # (容量内のフレーム形状の変化は、スロット毎のヘッダ領域の形状で描画プロセスに伝える)
+            self.stop()
+            if self.buffer is not None:
+                logger.info(
+                    "Shared memory reallocated",
+                    extra=log_fields(slot_length=slot_length, previous_slot_length=self.buffer.slot_length)
+                )
+                self.rendered_total += self.buffer.render_count
+                self.buffer.close()
+            self.buffer = SharedSpctrgrmBuffer(slot_length * SHM_CAPACITY_MARGIN)
+            self.start()
+
+        elif not self.restart_disabled and not self.process.is_alive() and self.process.exitcode != 0:
+            # 描画プロセスが異常終了していた場合は、録音を継続したまま再起動
+            self._handle_abnormal_exit()
+
+        self.buffer.write(freq_spctrgrm, time_spctrgrm, spectrogram, f0, time_f0)
+
+    @property
+    def is_open(self):
+        # is_open : 描画プロセスが動作中(True)/グラフウィンドウが閉じられ正常終了した、または再起動を停止した(False)
+        if self.restart_disabled:
+            return False
+        if self.process is None:
+            return True
+        return self.process.is_alive() or self.process.exitcode != 0
+
+    @property
+    def fps_average(self):
+        # fps_average : 描画開始からの描画プロセスの平均描画フレームレート[frame/s]
+        if self.buffer is None or self.start_time is None:
+            return 0.0
+        return (self.rendered_total + self.buffer.render_count) / (time.perf_counter() - self.start_time)
+
+    def close(self):
+        # ========================================
+        # === 描画プロセス停止 & 共有メモリ解放 ===
+        # ========================================
+        self.stop()
+        if self.buffer is not None:
+            self.buffer.close()
+            self.buffer = None
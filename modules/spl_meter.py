@@ -0,0 +1,242 @@
+import time
+
+import numpy as np
+import scipy
+
+from .audio_signal_processing_basic import db, discrete_data_normalize
+from .log_util import get_logger, log_fields
+
+logger = get_logger(__name__)
+
+# A特性 アナログ伝達関数の極周波数[Hz] (IEC 61672-1)
+A_WEIGHTING_POLE_FREQS = (20.598997, 107.65265, 737.86223, 12194.217)
+
+# A特性の正規化周波数[Hz] (当該周波数での利得を0[dB]とする)
+A_WEIGHTING_NORM_FREQ = 1000.0
+
+# 時間重み付けの時定数[s] (Fast / Slow)
+TIME_WEIGHTING_TAUS = {"fast": 0.125, "slow": 1.0}
+
+# 時間重み付け音圧レベルの最大値を求める時間分解能[s]
+# (当該時間長のブロック境界毎に指数平均の値を厳密に算出する / 時定数に対して十分短いため最大値の誤差は無視できる)
+TIME_WEIGHTING_RESOLUTION = 0.001
+
+
+def gen_a_weighting_sos(samplerate):
+    # ==================================================
+    # === A特性 IIRフィルタ係数(2次セクション)生成関数 ===
+    # ==================================================
+    # samplerate : サンプリング周波数[Hz]
+    # 20.6[Hz](2重) / 107.7[Hz] / 737.9[Hz]の極と原点の4重零点は双一次変換で離散化し、
+    # 12194[Hz](2重)の極は整合z変換(z = exp(-2π f / fs))で離散化する
+    # (8k/16k[Hz]等ではナイキスト周波数を超える極のため、双一次変換ではナイキスト周波数付近で減衰し過ぎる)
+    f1, f2, f3, f4 = A_WEIGHTING_POLE_FREQS
+    z, p, k = scipy.signal.bilinear_zpk(
+        np.zeros(4),
+        -2 * np.pi * np.array([f1, f1, f2, f3]),
+        1.0,
+        samplerate
+    )
+    p = np.concatenate((p, np.full(2, np.exp(-2 * np.pi * f4 / samplerate))))
+    sos = scipy.signal.zpk2sos(z, p, k)
+
+    # 1[kHz]の利得を0[dB]に正規化
+    _, h = scipy.signal.sosfreqz(sos, worN=[A_WEIGHTING_NORM_FREQ], fs=samplerate)
+    sos[0, :3] /= np.abs(h[0])
+
+    # sos : A特性 IIRフィルタ係数 (2次セクション形式 shape: (セクション数, 6))
+    return sos
+
+
+class SPLMeter:
+    # ==================================================
+    # === ストリーミング 騒音計(音圧レベル / 等価騒音レベル)クラス ===
+    # ==================================================
+    # 時間領域のA特性IIRフィルタ(2次セクション)をバッファ間でフィルタ状態を保持して適用し、
+    # 時間重み付け音圧レベル(Fast / Slow) と 一定区間毎の等価騒音レベル(Leq)を算出する
+    # (バッファ毎のFFT & 周波数領域のA特性補正が不要なため、連続監視の演算量を大幅に削減できる)
+    # (dbref > 0の場合は[dB SPL] (A=Trueで[dB SPL(A)]) / dbref = 0の場合は[dB FS])
+    #
+    # samplerate    : サンプリング周波数[Hz]
+    # dbref         : デシベル基準値 (dB SPLの場合は最小可聴値20[μPa] ="2e-5" / dB FSの場合は"0")
+    # A             : 聴感補正(A特性)の有効(True)/無効(False)設定
+    # leq_interval  : 等価騒音レベル(Leq)の算出区間[s]
+    # channels      : チャンネル数 (第1チャンネルで計測する)
+
+    def __init__(self, samplerate, dbref=2e-5, A=True, leq_interval=1.0, channels=1):
+        self.samplerate = samplerate
+        self.dbref = dbref
+        self.A = A
+        self.channels = channels
+        self.leq_interval_frames = int(round(leq_interval * samplerate))
+        if self.leq_interval_frames <= 0:
+            raise ValueError("leq_interval must be at least 1 frame : " + str(leq_interval))
+
+        # A特性フィルタ係数 & フィルタ状態
+        self.sos = gen_a_weighting_sos(samplerate) if A else None
+        self.zi = np.zeros((self.sos.shape[0], 2)) if A else None
+
+        # 時間重み付け(1次IIR 指数平均)の係数 & 状態 (2乗値の指数平均)
+        self.alphas = {
+            name: 1 - np.exp(-1 / (tau * samplerate)) for name, tau in TIME_WEIGHTING_TAUS.items()
+        }
+        self.ms = {name: 0.0 for name in TIME_WEIGHTING_TAUS}
+        self.block_len = max(1, int(round(TIME_WEIGHTING_RESOLUTION * samplerate)))
+
+        # データ数毎の指数平均の重み (時間重み付け名, データ数) → 重み 1次元配列
+        self.weights = {}
+
+        # Leq算出区間の2乗値積算 & データ数
+        self.leq_sum = 0.0
+        self.leq_count = 0
+        self.total_frames = 0
+
+        # 統計
+        self.total_sum = 0.0
+        self.leq_min = np.inf
+        self.leq_max = -np.inf
+        self.leq_count_total = 0
+        self.fast_max = -np.inf
+        self.chunk_count = 0
+        self.busy_time = 0.0
+        logger.debug(
+            "SPL Meter created",
+            extra=log_fields(samplerate=samplerate, dbref=dbref, A=A, leq_interval=leq_interval)
+        )
+
+    def _decay_weight(self, name, data_len):
+        # 指数平均 y[n] = (1 - α) y[n - 1] + α x2[n] において、data_len個の入力の寄与を1回の内積で求める重み
+        # (y[末尾] = (1 - α)^data_len * y[先頭の直前] + 重み・x2)
+        weight = self.weights.get((name, data_len))
+        if weight is None:
+            alpha = self.alphas[name]
+            weight = alpha * np.power(1 - alpha, np.arange(data_len - 1, -1, -1))
+            self.weights[(name, data_len)] = weight
+        return weight
+
+    def _time_weighting(self, name, x2, with_max=True):
+        # ==================================================
+        # === 時間重み付け(指数平均) 算出関数 ===
+        # ==================================================
+        # name      : 時間重み付け名 ("fast" / "slow")
+        # x2        : A特性フィルタ後の2乗値 1次元配列
+        # with_max  : バッファ内の最大値を算出する(True)/しない(False)設定
+        #             (Falseの場合はバッファ末尾の値のみを1回の内積で算出する)
+        # (サンプル毎の漸化式を、block_len毎のブロック境界での漸化式に置換えて演算量を削減する)
+        decay = 1 - self.alphas[name]
+        block_count = len(x2) // self.block_len if with_max else 0
+        ms = self.ms[name]
+        ms_max = ms
+
+        if block_count > 0:
+            # ブロック境界での指数平均の値 (ブロック内の寄与は重みとの内積で算出)
+            block_contrib = x2[:block_count * self.block_len].reshape(block_count, self.block_len) \
+                @ self._decay_weight(name, self.block_len)
+            block_decay = np.power(decay, self.block_len)
+            ms_blocks, _ = scipy.signal.lfilter([1], [1, -block_decay], block_contrib, zi=[block_decay * ms])
+            ms = ms_blocks[-1]
+            ms_max = max(ms_max, np.max(ms_blocks))
+
+        tail = x2[block_count * self.block_len:]
+        if len(tail) > 0:
+            ms = np.power(decay, len(tail)) * ms + tail @ self._decay_weight(name, len(tail))
+            ms_max = max(ms_max, ms)
+
+        self.ms[name] = ms
+
+        # ms        : バッファ末尾の指数平均(2乗値)
+        # ms_max    : バッファ内のブロック境界での指数平均(2乗値)の最大値
+        return ms, ms_max
+
+    def _level(self, mean_square):
+        # 平均2乗値 → レベル[dB] (dbref = 0の場合は満振幅(1.0)を基準とする)
+        return float(db(np.sqrt(mean_square), self.dbref if self.dbref > 0 else 1.0))
+
+    def process(self, data):
+        # ==================================================
+        # === 1バッファ分 音圧レベル算出関数 ===
+        # ==================================================
+        # data : 時間領域波形 量子化離散データ (16bit量子化 byte列 / チャンネルインターリーブ)
+        #        または時間領域 波形データ(正規化済 1次元配列)
+        start = time.perf_counter()
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            x = np.frombuffer(data, dtype=np.int16)
+            if self.channels > 1:
+                x = x[::self.channels]
+            x = discrete_data_normalize(x.tobytes(), "int16")
+        else:
+            x = np.asarray(data, dtype=np.float64)
+
+        # === A特性フィルタ (フィルタ状態をバッファ間で保持) ===
+        if self.A:
+            x, self.zi = scipy.signal.sosfilt(self.sos, x, zi=self.zi)
+        x2 = np.square(x)
+
+        # === 時間重み付け (Fast / Slow) ===
+        # (2乗値の1次IIR 指数平均 / 状態をバッファ間で保持)
+        _, fast_max_ms = self._time_weighting("fast", x2)
+        self._time_weighting("slow", x2, with_max=False)
+
+        # === 等価騒音レベル (Leq / 算出区間の境界はサンプル単位で分割) ===
+        leq = []
+        pos = 0
+        while pos < len(x2):
+            count = min(len(x2) - pos, self.leq_interval_frames - self.leq_count)
+            self.leq_sum += np.sum(x2[pos:pos + count])
+            self.leq_count += count
+            pos += count
+
+            if self.leq_count >= self.leq_interval_frames:
+                start_time = (self.total_frames + pos - self.leq_count) / self.samplerate
+                leq_level = self._level(self.leq_sum / self.leq_count)
+                leq.append((start_time, leq_level))
+                self.total_sum += self.leq_sum
+                self.leq_count_total += self.leq_count
+                self.leq_min = min(self.leq_min, leq_level)
+                self.leq_max = max(self.leq_max, leq_level)
+                self.leq_sum = 0.0
+                self.leq_count = 0
+        self.total_frames += len(x2)
+
+        fast_max = self._level(fast_max_ms)
+        self.fast_max = max(self.fast_max, fast_max)
+
+        self.chunk_count += 1
+        self.busy_time += time.perf_counter() - start
+
+        # spl : 音圧レベル辞書
+        #       L_fast      : バッファ末尾の時間重み付け音圧レベル(Fast)[dB]
+        #       L_slow      : バッファ末尾の時間重み付け音圧レベル(Slow)[dB]
+        #       L_fast_max  : バッファ内の時間重み付け音圧レベル(Fast)の最大値[dB]
+        #       leq         : バッファ内で算出区間が完了した等価騒音レベルのリスト ((区間開始時刻[s], Leq[dB]) のタプル)
+        return {
+            "L_fast": self._level(self.ms["fast"]),
+            "L_slow": self._level(self.ms["slow"]),
+            "L_fast_max": fast_max,
+            "leq": leq
+        }
+
+    def leq_total(self):
+        # 計測開始から完了済の算出区間までの等価騒音レベル[dB]
+        return self._level(self.total_sum / self.leq_count_total) if self.leq_count_total > 0 else -np.inf
+
+    def format_stats(self):
+        # ==================================
+        # === 騒音計統計 文字列化 ===
+        # ==================================
+        if self.dbref > 0:
+            unit = "dB SPL(A)" if self.A else "dB SPL"
+        else:
+            unit = "dB FS(A)" if self.A else "dB FS"
+        realtime_ratio = self.busy_time / (self.total_frames / self.samplerate) if self.total_frames > 0 else 0
+        return (
+            "=== SPL Meter Stats (" + unit + " / Leq interval: "
+            + str(self.leq_interval_frames / self.samplerate) + " [s]) ===\n"
+            f"  measured: {self.total_frames / self.samplerate:10.1f} [s] | Leq: {self.leq_total():7.2f}"
+            f" | Leq min/max: {self.leq_min:7.2f} / {self.leq_max:7.2f} | Lmax(Fast): {self.fast_max:7.2f}\n"
+            f"  chunks: {self.chunk_count:6d} | processing time / audio time: {realtime_ratio * 100:8.4f} [%]"
+        )
+
+    def print_stats(self):
+        print(self.format_stats())
+        print("")
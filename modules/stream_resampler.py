@@ -0,0 +1,156 @@
+import threading
+import time
+
+import numpy as np
+import soxr
+
+from .log_util import get_logger, log_fields
+
+logger = get_logger(__name__)
+
+# soxr 品質プリセット (先頭ほど高速 / 後方ほど高品質)
+# QQ    : Quick (3次補間 / 最速・低品質)
+# LQ    : Low Quality (帯域 80%)
+# MQ    : Medium Quality (帯域 87%)
+# HQ    : High Quality (帯域 91% / 20bit精度) ※既定値
+# VHQ   : Very High Quality (帯域 91% / 28bit精度)
+RESAMPLE_QUALITY_PRESETS = ("QQ", "LQ", "MQ", "HQ", "VHQ")
+
+# 出力遅延の事前計測に使用するバッファ数
+CALIBRATION_CHUNKS = 256
+
+
+class StreamResampler:
+    # ==================================================
+    # === ストリーミング サンプリング周波数変換クラス ===
+    # ==================================================
+    # soxr.ResampleStreamのフィルタ状態をバッファ間で保持し、入力音声ストリームのバッファ毎に変換する
+    # (バッファ毎に独立して変換した場合に生じる、バッファ境界の不連続/フィルタ過渡応答が生じない)
+    # 出力データ数は、累積入力データ数 × 変換比 となるよう調整する
+    # (soxrはフィルタ遅延 + 内部ブロック処理により出力が不足するバッファがあるため、
+    #  初回バッファで不足量の最大値を事前計測し、その分の無音を先頭に補って各バッファの出力データ数を一定に保つ)
+    #
+    # in_rate   : 入力サンプリング周波数[Hz] (デバイスのネイティブサンプリング周波数)
+    # out_rate  : 出力サンプリング周波数[Hz] (解析用サンプリング周波数)
+    # channels  : チャンネル数
+    # quality   : soxr 品質プリセット (RESAMPLE_QUALITY_PRESETSのいずれか)
+
+    def __init__(self, in_rate, out_rate, channels=1, quality="HQ"):
+        if quality not in RESAMPLE_QUALITY_PRESETS:
+            raise ValueError("quality must be one of " + str(RESAMPLE_QUALITY_PRESETS) + " : " + str(quality))
+
+        self.in_rate = in_rate
+        self.out_rate = out_rate
+        self.channels = channels
+        self.quality = quality
+        self.lock = threading.Lock()
+        self.stream = soxr.ResampleStream(in_rate, out_rate, channels, dtype="int16", quality=quality)
+        self._reset_counts()
+        logger.debug(
+            "Stream Resampler created",
+            extra=log_fields(in_rate=in_rate, out_rate=out_rate, channels=channels, quality=quality)
+        )
+
+        # 統計
+        self.chunk_count = 0
+        self.busy_time = 0.0
+        self.padded_frames = 0
+        self.underrun_count = 0
+
+    def _reset_counts(self):
+        self.in_total = 0
+        self.out_total = 0
+        self.pending = np.zeros((0, self.channels), dtype=np.int16)
+
+    def _calibrate(self, chunk_frames):
+        # ==================================================
+        # === 出力不足量 事前計測関数 (初回バッファで呼出) ===
+        # ==================================================
+        # chunk_frames : 1バッファあたりの入力データ数
+        # (soxrの出力タイミングは入力データの値に依らないため、無音を同一バッファ長で変換して計測する)
+        stream = soxr.ResampleStream(self.in_rate, self.out_rate, self.channels, dtype="int16", quality=self.quality)
+        chunk = np.zeros((chunk_frames, self.channels), dtype=np.int16)
+        in_total = 0
+        out_total = 0
+        max_shortage = 0
+        for _ in range(CALIBRATION_CHUNKS):
+            out_total += stream.resample_chunk(chunk).shape[0]
+            in_total += chunk_frames
+            max_shortage = max(max_shortage, in_total * self.out_rate // self.in_rate - out_total)
+
+        # latency : 先頭に補う無音のデータ数 (出力の遅延 [出力サンプリング周波数のデータ数])
+        return max_shortage
+
+    def process(self, data, last=False):
+        # ==================================================
+        # === 1バッファ分 サンプリング周波数変換関数 ===
+        # ==================================================
+        # data  : 入力 時間領域波形 量子化離散データ (16bit量子化 byte列 / チャンネルインターリーブ)
+        # last  : 最終バッファ(True)の場合、フィルタ内の残りを出力してフィルタ状態を初期化する
+        #         (レコーディングモードのテイク毎の変換等、前後のバッファと連続しない場合に指定)
+        start = time.perf_counter()
+        with self.lock:
+            x = np.frombuffer(data, dtype=np.int16).reshape(-1, self.channels)
+            if self.in_total == 0 and not last:
+                latency = self._calibrate(x.shape[0])
+                self.pending = np.zeros((latency, self.channels), dtype=np.int16)
+                self.padded_frames += latency
+
+            y = self.stream.resample_chunk(x, last=last)
+
+            if self.pending.shape[0] > 0:
+                y = np.concatenate((self.pending, y))
+
+            self.in_total += x.shape[0]
+            out_count = self.in_total * self.out_rate // self.in_rate - self.out_total
+
+            if y.shape[0] < out_count:
+                # 事前計測より出力が不足した場合(バッファ長の変化時等)は、先頭を無音で補う
+                pad = out_count - y.shape[0]
+                y = np.concatenate((np.zeros((pad, self.channels), dtype=np.int16), y))
+                self.padded_frames += pad
+                self.underrun_count += 1
+
+            out = y[:out_count]
+            self.pending = y[out_count:]
+            self.out_total += out_count
+
+            if last:
+                self.stream.clear()
+                self._reset_counts()
+
+        self.chunk_count += 1
+        self.busy_time += time.perf_counter() - start
+
+        # discrete_data : 変換後 時間領域波形 量子化離散データ (16bit量子化 byte列)
+        return np.ascontiguousarray(out).tobytes()
+
+    def format_stats(self):
+        # ==========================================
+        # === サンプリング周波数変換統計 文字列化 ===
+        # ==========================================
+        ave_time = self.busy_time / self.chunk_count if self.chunk_count > 0 else 0
+        return (
+            "=== Stream Resampler Stats (" + str(self.in_rate) + " -> " + str(self.out_rate) + " [Hz] / quality: "
+            + self.quality + ") ===\n"
+            f"  chunks: {self.chunk_count:6d} | ave: {ave_time * 1000:8.3f} [ms]"
+            f" | padded (latency): {self.padded_frames:6d} [frames] / underruns: {self.underrun_count:4d}"
+        )
+
+    def print_stats(self):
+        print(self.format_stats())
+        print("")
+
+
+def gen_capture_frames_per_buffer(frames_per_buffer, capture_samplerate, samplerate):
+    # ==================================================
+    # === 取得用 バッファあたりのサンプリングデータ数 算出関数 ===
+    # ==================================================
+    # frames_per_buffer     : 解析用 バッファあたりのサンプリングデータ数
+    # capture_samplerate    : 取得時のサンプリング周波数[Hz]
+    # samplerate            : 解析用サンプリング周波数[Hz]
+    # (変換後のバッファが解析用と同一の時間長となるよう換算する)
+
+    # capture_frames_per_buffer : 取得時の 入力音声ストリームバッファあたりのサンプリングデータ数
+    return int(round(frames_per_buffer * capture_samplerate / samplerate))
+
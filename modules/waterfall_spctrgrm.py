@@ -0,0 +1,267 @@
+import math
+
+import numpy as np
+from matplotlib import cm, colors
+from matplotlib import pyplot as plt
+
+from .plot_matplot_graph import gen_graph_figure_for_realtime_spctrgrm
+from .realtime_spctrgrm_renderer import RealtimeSpctrgrmRenderer
+
+
+class WaterfallSpctrgrm(RealtimeSpctrgrmRenderer):
+    # ==================================================================
+    # === ウォーターフォール(スクロール表示)スペクトログラム描画クラス ===
+    # ==================================================================
+    # バッファ毎のSTFT列データを、事前確保した固定長の画像リングバッファ(RGBA uint8)に書き込み、
+    # 画像データの参照範囲と表示範囲(extent)の更新のみでスクロール表示を行う
+    # (カラーマップはルックアップテーブル(LUT)として事前計算し、新規列の書き込み時のみ適用する)
+    #
+    # リングバッファは表示列数の2倍の幅を確保し、各列を「書込位置」と「書込位置 + 表示列数」の
+    # 2箇所に書き込む事で、常に時系列順に連続した範囲をnp.roll等の並べ替え無しの参照(view)として取得できる
+    # (メモリ使用量は表示列数に対して固定)
+    #
+    # バッファ毎の処理量:
+    #   - 量子化 / LUTによるRGBA変換 / リングバッファ書込 : 新規列数に比例
+    #   - AxesImage.set_data() : matplotlibが表示範囲(周波数軸要素数 × 表示列数 × RGBA uint8)をコピーするため、表示列数に比例
+    #   - Blitting : スクロールにより全画素が移動するため、画像全体を再描画(表示ピクセル数に比例)
+    # (全履歴へのカラーマップ適用/正規化は毎回行わないため、その分の処理量のみ新規列数に比例に削減される)
+    #
+    # fig               : 生成したmatplotlib figureインスタンス
+    # spctrgrm_fig      : スペクトログラム向けmatplotlib Axesインスタンス
+    # cbar_fig          : スペクトログラム向けmatplotlib カラーバー用Axesインスタンス
+    # f0_fig            : 基本周波数 時系列波形向けmatplotlib Axesインスタンス
+    # buffer_time       : 入力音声ストリームバッファあたりの時間長 [s]
+    # history_time      : ウォーターフォール表示の履歴時間長 [s]
+    # freq_range        : スペクトログラムグラフ Y軸表示レンジ [Hz]
+    # dbref             : デシベル基準値
+    # A                 : 聴感補正(A特性)の有効(True)/無効(False)設定
+
+    def __init__(self, fig, spctrgrm_fig, cbar_fig, f0_fig, buffer_time, history_time, freq_range, dbref, A):
+        super().__init__(fig, spctrgrm_fig, cbar_fig, f0_fig, history_time, freq_range, dbref, A)
+
+        self.buffer_time = buffer_time
+        self.history_time = history_time
+
+        # X軸は現在時刻を0とした相対時間とし、軸目盛りを固定する
+        # (軸目盛りの再描画を不要とし、Blittingの対象を画像/ラインのみに限定する)
+        spctrgrm_fig.set_xlabel("Time (relative to now) [s]")
+        f0_fig.set_xlabel("Time (relative to now) [s]")
+        spctrgrm_fig.set_xlim(-history_time, 0)
+        f0_fig.set_xlim(-history_time, 0)
+
+        # カラーマップのルックアップテーブル(LUT)の事前計算 (256階調 × RGBA uint8)
+        self.cmap = plt.get_cmap("jet")
+        self.lut = self.cmap(np.linspace(0, 1, 256), bytes=True)
+
+        # 画像リングバッファ / 基本周波数リングバッファ (初回書き込み時に確保)
+        self.image_ring = None
+        self.f0_ring = None
+
+    def _alloc_ring_buffers(self, freq_spctrgrm, spectrogram, f0):
+        # ======================================
+        # === リングバッファ確保関数 ===
+        # ======================================
+
+        # バッファあたりの列数 / 基本周波数データ数
+        self.buffer_shape = (spectrogram.shape[1], len(f0))
+
+        # スペクトログラム 1列あたりの時間長 [s] / 表示列数
+        self.column_period = self.buffer_time / spectrogram.shape[1]
+        self.column_count = math.ceil(self.history_time / self.column_period)
+
+        # 画像リングバッファ (周波数軸要素数 × 表示列数の2倍 × RGBA)
+        self.image_ring = np.zeros(
+            (spectrogram.shape[0], self.column_count * 2, 4), dtype=np.uint8
+        )
+        self.image_write_pos = 0
+        self.image_filled = 0
+
+        # 基本周波数 1点あたりの時間長 [s] / 表示点数
+        self.f0_period = self.buffer_time / len(f0)
+        self.f0_count = math.ceil(self.history_time / self.f0_period)
+
+        # 基本周波数リングバッファ (表示点数の2倍)
+        self.f0_ring = np.zeros(self.f0_count * 2, dtype=np.float64)
+        self.f0_write_pos = 0
+        self.f0_filled = 0
+
+        # 基本周波数 相対時間軸データ (最新点を0とする)
+        self.f0_time_axis = (np.arange(self.f0_count) - (self.f0_count - 1)) * self.f0_period
+
+        # Y軸(周波数軸)の表示範囲
+        if len(freq_spctrgrm) > 1:
+            df = (freq_spctrgrm[-1] - freq_spctrgrm[0]) / (len(freq_spctrgrm) - 1)
+        else:
+            df = 0
+        self.freq_extent = (freq_spctrgrm[0] - df / 2, freq_spctrgrm[-1] + df / 2)
+
+    def _create_artists(self, freq_spctrgrm, time_spctrgrm, spectrogram, f0, time_f0):
+        # ================================
+        # === 描画対象Artist生成関数 ===
+        # ================================
+
+        # スペクトログラム画像の生成 (RGBA画像を直接表示するため、カラーマップ変換は行われない)
+        self.spctrgrm_im = self.spctrgrm_fig.imshow(
+            self._get_image_view(),
+            extent=self._get_image_extent(),
+            origin="lower",
+            aspect="auto",
+            interpolation="nearest",
+            animated=True
+        )
+
+        # カラーバー設定 (LUTと同一のカラーマップ/データ範囲のScalarMappableから生成)
+        cbar = plt.colorbar(
+            cm.ScalarMappable(
+                norm=colors.Normalize(vmin=self.colorbar_min, vmax=self.colorbar_max),
+                cmap=self.cmap
+            ),
+            orientation='vertical',
+            cax=self.cbar_fig
+        )
+
+        if (self.dbref > 0) and not (self.A):
+            cbar.set_label("Sound Pressure [dB spl]")
+        elif (self.dbref > 0) and (self.A):
+            cbar.set_label("Sound Pressure [dB spl(A)]")
+        else:
+            cbar.set_label("Log Power Spectrum [dB FS]")
+
+        # 基本周波数ラインの生成
+        (self.f0_line,) = self.f0_fig.plot(
+            *self._get_f0_view(),
+            label="Fundamental Frequency",
+            lw=3,
+            color="forestgreen",
+            animated=True
+        )
+
+        # グラフの凡例表示
+        self.f0_fig.legend(loc="upper right", borderaxespad=1, fontsize=8)
+
+        # ウィンドウリサイズ等でfigure全体が再描画された場合に、背景画像を再取得する
+        self.fig.canvas.mpl_connect("draw_event", self._on_draw)
+
+        # グラフウィンドウの表示 & 静的な背景の初回描画
+        plt.pause(0.0001)
+        self.fig.canvas.draw()
+
+    def _push_columns(self, spectrogram):
+        # ======================================================
+        # === スペクトログラム列データのリングバッファ書込関数 ===
+        # ======================================================
+        # spectrogram : スペクトログラム 振幅データ (周波数軸要素数 × 新規列数)
+
+        # 表示列数を超える新規列は、最新の表示列数分のみを書き込む
+        new_columns = spectrogram[:, -self.column_count:]
+        new_count = new_columns.shape[1]
+
+        # 新規列のみをLUTのインデックス(0〜255)に量子化し、RGBAに変換
+        scale = 255 / (self.colorbar_max - self.colorbar_min)
+        lut_index = np.nan_to_num(
+            (new_columns - self.colorbar_min) * scale, nan=0, posinf=255, neginf=0
+        )
+        np.clip(lut_index, 0, 255, out=lut_index)
+        rgba = self.lut[lut_index.astype(np.uint8)]
+
+        # リングバッファの2箇所(書込位置 / 書込位置 + 表示列数)に書き込み
+        pos = (self.image_write_pos + np.arange(new_count)) % self.column_count
+        self.image_ring[:, pos] = rgba
+        self.image_ring[:, pos + self.column_count] = rgba
+
+        self.image_write_pos = (self.image_write_pos + new_count) % self.column_count
+        self.image_filled = min(self.image_filled + new_count, self.column_count)
+
+    def _push_f0(self, f0):
+        # ==============================================
+        # === 基本周波数データのリングバッファ書込関数 ===
+        # ==============================================
+        # f0 : 基本周波数 時系列データ 1次元配列 (新規データ)
+
+        new_f0 = f0[-self.f0_count:]
+        new_count = len(new_f0)
+
+        pos = (self.f0_write_pos + np.arange(new_count)) % self.f0_count
+        self.f0_ring[pos] = new_f0
+        self.f0_ring[pos + self.f0_count] = new_f0
+
+        self.f0_write_pos = (self.f0_write_pos + new_count) % self.f0_count
+        self.f0_filled = min(self.f0_filled + new_count, self.f0_count)
+
+    def _get_image_view(self):
+        # 最古列から最新列までの書込済範囲を、時系列順の連続した参照(view)として取得
+        end = self.image_write_pos + self.column_count
+        return self.image_ring[:, end - self.image_filled:end]
+
+    def _get_image_extent(self):
+        # 最新列の右端を相対時間0[s]とし、書込済列数分の表示範囲とする
+        return (
+            -self.image_filled * self.column_period,
+            0,
+            self.freq_extent[0],
+            self.freq_extent[1]
+        )
+
+    def _get_f0_view(self):
+        # 最古点から最新点までの書込済範囲を、時系列順の連続した参照(view)として取得
+        end = self.f0_write_pos + self.f0_count
+        return (
+            self.f0_time_axis[self.f0_count - self.f0_filled:],
+            self.f0_ring[end - self.f0_filled:end]
+        )
+
+    def update(self, freq_spctrgrm, time_spctrgrm, spectrogram, f0, time_f0):
+        # ========================================================
+        # === ウォーターフォールスペクトログラム 描画更新関数 ===
+        # ========================================================
+        # freq_spctrgrm     : スペクトログラム y軸向けデータ[Hz]
+        # time_spctrgrm     : スペクトログラム x軸向けデータ[s]
+        # spectrogram       : スペクトログラム 振幅データ (当該バッファ分の新規列)
+        # f0                : 基本周波数 時系列データ 1次元配列 (当該バッファ分の新規データ)
+        # time_f0           : 基本周波数 時系列データに対応した時間軸データ 1次元配列
+
+        if self.image_ring is None or self.image_ring.shape[0] != spectrogram.shape[0] \
+                or self.buffer_shape != (spectrogram.shape[1], len(f0)):
+            # 初回、または適応品質制御等によりバッファあたりの列数/周波数軸要素数が変化した場合は
+            # リングバッファを再確保する (表示履歴はクリアされる)
+            self._alloc_ring_buffers(freq_spctrgrm, spectrogram, f0)
+
+        # 新規列/新規データのみをリングバッファに書き込み
+        self._push_columns(spectrogram)
+        self._push_f0(f0)
+
+        if self.spctrgrm_im is None:
+            self._create_artists(freq_spctrgrm, time_spctrgrm, spectrogram, f0, time_f0)
+        else:
+            # 画像データの参照範囲と表示範囲のみを更新
+            # (set_data()では表示範囲のRGBAデータがコピーされる / カラーマップの再適用は無し)
+            self.spctrgrm_im.set_data(self._get_image_view())
+            self.spctrgrm_im.set_extent(self._get_image_extent())
+            self.f0_line.set_data(*self._get_f0_view())
+
+        self._blit()
+
+
+def gen_waterfall_spctrgrm(spctrgrm_mode, buffer_time, history_time, freq_range, dbref, A):
+    # ===================================================================
+    # === グラフ領域作成関数(ウォーターフォールスペクトログラム用) ===
+    # ===================================================================
+    # spctrgrm_mode     : スペクトログラムデータ算出モード
+    # buffer_time       : 入力音声ストリームバッファあたりの時間長 [s]
+    # history_time      : ウォーターフォール表示の履歴時間長 [s]
+    # freq_range        : スペクトログラムグラフ Y軸表示レンジ [Hz]
+    # dbref             : デシベル基準値
+    # A                 : 聴感補正(A特性)の有効(True)/無効(False)設定
+
+    # グラフ領域はリアルタイムスペクトログラム用と同一のレイアウトとする
+    fig, spctrgrm_fig, cbar_fig, f0_fig = gen_graph_figure_for_realtime_spctrgrm(
+        spctrgrm_mode
+    )
+
+    waterfall = WaterfallSpctrgrm(
+        fig, spctrgrm_fig, cbar_fig, f0_fig, buffer_time, history_time, freq_range, dbref, A
+    )
+
+    # fig           : 生成したmatplotlib figureインスタンス
+    # waterfall     : ウォーターフォールスペクトログラム描画クラスインスタンス
+    return fig, waterfall
@@ -0,0 +1,483 @@
+import collections
+import mmap
+import os
+import struct
+import threading
+
+import numpy as np
+import pyaudio
+import soundfile as sf
+
+from .log_util import get_logger, log_fields
+
+logger = get_logger(__name__)
+
+# WAVファイル fmtチャンクのフォーマットコード
+WAVE_FORMAT_PCM = 0x0001
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+# リーダースレッドが1回に読込むフレーム数の既定値
+DEFAULT_READ_FRAMES = 4096
+
+
+class MmapWavSource:
+    # ==================================================
+    # === PCM WAVファイル メモリマップ読込クラス ===
+    # ==================================================
+    # RIFFチャンクを解析してdataチャンクの位置を取得し、ファイル全体をmmapで読取専用マップする
+    # (read()はmmapのスライス(memoryview)を返すため、ファイル読込はページフォールト時に必要な範囲のみ行われる)
+    #
+    # filename : PCM WAVファイルPATH (8/16/24/32bit整数)
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.file = open(filename, "rb")
+        try:
+            self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._parse_chunks()
+        except Exception:
+            self.close()
+            raise
+
+    def _parse_chunks(self):
+        # ==================================
+        # === RIFFチャンク解析関数 ===
+        # ==================================
+        if self.mm[0:4] != b"RIFF" or self.mm[8:12] != b"WAVE":
+            raise ValueError("not a RIFF/WAVE file : " + self.filename)
+
+        fmt = None
+        pos = 12
+        while pos + 8 <= len(self.mm):
+            chunk_id = self.mm[pos:pos + 4]
+            chunk_size = struct.unpack("<I", self.mm[pos + 4:pos + 8])[0]
+            body = pos + 8
+
+            if chunk_id == b"fmt ":
+                fmt = struct.unpack("<HHIIHH", self.mm[body:body + 16])
+            elif chunk_id == b"data":
+                # 書込途中等でdataチャンクサイズがファイル長を超える場合は、ファイル末尾までとする
+                self.data_offset = body
+                self.data_size = min(chunk_size, len(self.mm) - body)
+                break
+
+            # チャンクは2byte境界に配置される
+            pos = body + chunk_size + (chunk_size & 1)
+        else:
+            raise ValueError("data chunk not found : " + self.filename)
+
+        if fmt is None:
+            raise ValueError("fmt chunk not found : " + self.filename)
+
+        format_code, self.channels, self.samplerate, _, block_align, bits = fmt
+        if format_code not in (WAVE_FORMAT_PCM, WAVE_FORMAT_EXTENSIBLE) or bits not in (8, 16, 24, 32):
+            raise ValueError("unsupported WAV format (PCM 8/16/24/32bit only) : " + self.filename)
+
+        self.sampwidth = bits // 8
+        self.frame_bytes = block_align
+        self.n_frames = self.data_size // self.frame_bytes
+
+    def read(self, start_frame, frame_count):
+        # ==========================================
+        # === 指定フレーム範囲 読込関数 ===
+        # ==========================================
+        # start_frame   : 読込開始フレーム
+        # frame_count   : 読込フレーム数 (ファイル末尾を超える場合は末尾まで)
+        start = self.data_offset + start_frame * self.frame_bytes
+        end = min(start + frame_count * self.frame_bytes, self.data_offset + self.data_size)
+
+        # data : PCMデータ (mmapのmemoryview)
+        return memoryview(self.mm)[start:max(start, end)]
+
+    def close(self):
+        mm = getattr(self, "mm", None)
+        if mm is not None:
+            try:
+                mm.close()
+            except BufferError:
+                # 解析タップ等がmemoryviewを参照中の場合は、参照解除時(GC時)に解放される
+                pass
+            self.mm = None
+        self.file.close()
+
+
+class DecodedAudioSource:
+    # ==================================================
+    # === 圧縮音声ファイル(FLAC等) デコード読込クラス ===
+    # ==================================================
+    # soundfileで16bit整数PCMにデコードしながら読込む (mmap非対応の形式 / 浮動小数点WAV向け)
+    # (デコードはリーダースレッドで先行して行うため、コールバック内ではデコードしない)
+    #
+    # filename : 音声ファイルPATH
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.sf = sf.SoundFile(filename)
+        self.channels = self.sf.channels
+        self.samplerate = self.sf.samplerate
+        self.sampwidth = 2
+        self.frame_bytes = self.channels * self.sampwidth
+        self.n_frames = self.sf.frames
+
+    def read(self, start_frame, frame_count):
+        if self.sf.tell() != start_frame:
+            self.sf.seek(start_frame)
+        data = self.sf.read(frame_count, dtype="int16", always_2d=True)
+        if len(data) == 0:
+            # ファイル末尾以降の読込 (0フレームの配列はbyte列にcastできないため、空のmemoryviewを返す)
+            return memoryview(b"")
+
+        # data : PCMデータ (16bit整数 インターリーブ)
+        return memoryview(np.ascontiguousarray(data)).cast("B")
+
+    def close(self):
+        self.sf.close()
+
+
+def open_audio_source(filename):
+    # ==================================================
+    # === 音声ファイル 読込クラス生成関数 ===
+    # ==================================================
+    # filename : 音声ファイルPATH
+    # (PCM WAVファイルはメモリマップ、それ以外(FLAC/浮動小数点WAV等)はデコード読込とする)
+    if os.path.splitext(filename)[1].lower() in (".wav", ".wave"):
+        try:
+            return MmapWavSource(filename)
+        except ValueError:
+            pass
+    return DecodedAudioSource(filename)
+
+
+class PcmRingBuffer:
+    # ==================================================
+    # === PCMデータ リングバッファクラス ===
+    # ==================================================
+    # 書込(リーダースレッド) / 読出(コールバック)の位置は累積byte数で管理する
+    #
+    # capacity : バッファサイズ[byte]
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buffer = np.zeros(capacity, dtype=np.uint8)
+        self.write_total = 0
+        self.read_total = 0
+
+    @property
+    def available(self):
+        return self.write_total - self.read_total
+
+    @property
+    def free(self):
+        return self.capacity - self.available
+
+    def write(self, data):
+        # data : 書込むPCMデータ (bytes / memoryview、freeバイト以下)
+        data = np.frombuffer(data, dtype=np.uint8)
+        start = self.write_total % self.capacity
+        first = min(len(data), self.capacity - start)
+        self.buffer[start:start + first] = data[:first]
+        self.buffer[:len(data) - first] = data[first:]
+        self.write_total += len(data)
+
+    def read(self, n_bytes):
+        # n_bytes : 読出すbyte数 (availableを超える場合はavailableまで)
+        n_bytes = min(n_bytes, self.available)
+        start = self.read_total % self.capacity
+        first = min(n_bytes, self.capacity - start)
+        if first == n_bytes:
+            data = self.buffer[start:start + n_bytes].tobytes()
+        else:
+            data = self.buffer[start:].tobytes() + self.buffer[:n_bytes - first].tobytes()
+        self.read_total += n_bytes
+
+        # data : PCMデータ (bytes)
+        return data
+
+    def clear(self):
+        self.read_total = self.write_total
+
+
+class WavPlayer:
+    # ==================================================
+    # === 先読み型 音声ファイル再生クラス (Callbackモード) ===
+    # ==================================================
+    # リーダースレッドが音声ファイル(PCM WAVはmmap / FLAC等はデコード)を先読みしてリングバッファに書込み、
+    # PortAudioのコールバックではリングバッファからのコピーのみを行う (ディスク読込の遅延でアンダーランしない)
+    # プレイリストの各ファイルは同一のリングバッファに連続して書込むため、曲間の無音無しで再生する(ギャップレス)
+    #
+    # playlist              : 再生する音声ファイルPATHのリスト (サンプリング周波数/チャンネル数/量子化bit数が同一であること)
+    # frames_per_buffer     : 出力音声ストリームバッファあたりのフレーム数
+    # buffer_time           : リングバッファの時間長[s] (先読み量)
+    # loop                  : プレイリスト末尾到達時に先頭から繰り返し再生する(True)/しない(False)設定
+
+    def __init__(self, playlist, frames_per_buffer=1024, buffer_time=2.0, loop=False):
+        if isinstance(playlist, str):
+            playlist = [playlist]
+        if len(playlist) == 0:
+            raise ValueError("playlist is empty")
+
+        self.sources = []
+        try:
+            for filename in playlist:
+                self.sources.append(open_audio_source(filename))
+        except Exception:
+            self.close()
+            raise
+
+        first = self.sources[0]
+        for source in self.sources[1:]:
+            if (source.samplerate, source.channels, source.sampwidth) != \
+                    (first.samplerate, first.channels, first.sampwidth):
+                self.close()
+                raise ValueError(
+                    "gapless playlist requires the same format : " + source.filename
+                    + " (samplerate/channels/sampwidth = "
+                    + str((source.samplerate, source.channels, source.sampwidth)) + ")"
+                )
+
+        self.playlist = playlist
+        self.samplerate = first.samplerate
+        self.channels = first.channels
+        self.sampwidth = first.sampwidth
+        self.frame_bytes = self.channels * self.sampwidth
+        self.frames_per_buffer = frames_per_buffer
+        self.loop = loop
+
+        # 8bit PCMは符号無し整数のため、無音は0x80とする
+        self.silence_byte = b"\x80" if self.sampwidth == 1 else b"\x00"
+
+        ring_frames = max(int(self.samplerate * buffer_time), frames_per_buffer * 2)
+        self.ring = PcmRingBuffer(ring_frames * self.frame_bytes)
+
+        # リーダースレッドが1回に読込むフレーム数 (リングバッファの1/4以下)
+        self.read_frames = max(min(DEFAULT_READ_FRAMES, ring_frames // 4), 1)
+        self.lock = threading.Lock()
+        self.cond = threading.Condition(self.lock)
+
+        # リーダースレッドの読込位置 (プレイリスト内のindex, ファイル内のフレーム)
+        self.track_index = 0
+        self.track_frame = 0
+        self.seek_request = None
+        self.reader_finished = False
+        self.stop_event = threading.Event()
+
+        # 再生位置の算出用マーカー (リングバッファの累積書込byte数, プレイリスト内のindex, ファイル内のフレーム)
+        self.markers = collections.deque()
+
+        self.underrun_count = 0
+        self.underrun_frames = 0
+
+        # 再生範囲を解析に渡すPlaybackAnalysisTapインスタンス (タップ生成時に設定される)
+        self.analysis_tap = None
+
+        self.pa = None
+        self.stream = None
+        self.reader_thread = None
+
+    def _run_reader(self):
+        # ==========================================
+        # === 先読みリーダースレッド関数 ===
+        # ==========================================
+        # (読込/デコードで例外が発生した場合は、先読み済のデータの再生後に再生終了とする)
+        try:
+            self._read_loop()
+        except Exception:
+            logger.exception("WAV Player reader failed")
+            with self.cond:
+                self.reader_finished = True
+                self.cond.notify_all()
+
+    def _read_loop(self):
+        read_frames = self.read_frames
+
+        while not self.stop_event.is_set():
+            with self.cond:
+                # リングバッファに空きができるか、シーク要求があるまで待機
+                while not self.stop_event.is_set() and self.seek_request is None \
+                        and self.ring.free < read_frames * self.frame_bytes:
+                    self.cond.wait(0.1)
+
+                if self.seek_request is not None:
+                    # シーク要求: 先読み済のデータを破棄して読込位置を変更
+                    self.track_index, self.track_frame = self.seek_request
+                    self.seek_request = None
+                    self.ring.clear()
+                    self.markers.clear()
+                    self.reader_finished = False
+
+                if self.stop_event.is_set() or self.reader_finished:
+                    if self.reader_finished:
+                        self.cond.wait(0.1)
+                    continue
+
+                track_index, track_frame = self.track_index, self.track_frame
+                # 読込単位の境界をリングバッファの累積位置でread_frames毎に揃える
+                # (ファイル末尾の端数読込後も、次ファイルの読込で境界に戻す)
+                frame_count = min(
+                    read_frames - (self.ring.write_total // self.frame_bytes) % read_frames,
+                    self.ring.free // self.frame_bytes
+                )
+
+            # ファイル読込(ページフォールト/デコード)はロック外で行い、コールバックを待たせない
+            # (読込データはコピーせず、リングバッファへの書込と解析タップで共有する)
+            source = self.sources[track_index]
+            data = source.read(track_frame, frame_count)
+            read_count = len(data) // self.frame_bytes
+
+            with self.cond:
+                if self.seek_request is not None:
+                    # 読込中にシーク要求があった場合は、読込結果を破棄
+                    continue
+
+                if read_count > 0:
+                    if self.analysis_tap is not None:
+                        self.analysis_tap.add_chunk(self.ring.write_total, track_index, track_frame, data)
+                    self.ring.write(data)
+                    self.track_frame = track_frame + read_count
+                    self.markers.append((self.ring.write_total, track_index, self.track_frame))
+                    while len(self.markers) > 1 and self.markers[0][0] <= self.ring.read_total:
+                        self.markers.popleft()
+
+                if self.track_frame >= source.n_frames or read_count == 0:
+                    # 当該ファイルの末尾に到達した場合は、次のファイル(ループ時は先頭ファイル)へ
+                    if self.track_index + 1 < len(self.sources):
+                        self.track_index += 1
+                        self.track_frame = 0
+                    elif self.loop:
+                        self.track_index = 0
+                        self.track_frame = 0
+                    else:
+                        self.reader_finished = True
+
+    def callback(self, in_data, frame_count, time_info, status):
+        # ==========================================
+        # === PortAudio 出力コールバック関数 ===
+        # ==========================================
+        # (リングバッファからのコピーのみを行い、ファイル読込/デコードは行わない)
+        n_bytes = frame_count * self.frame_bytes
+
+        with self.cond:
+            read_start = self.ring.read_total
+            data = self.ring.read(n_bytes)
+            finished = self.reader_finished and self.ring.available == 0
+            self.cond.notify()
+
+        if self.analysis_tap is not None:
+            if len(data) > 0:
+                self.analysis_tap.add_played(read_start, len(data), time_info)
+            if finished:
+                self.analysis_tap.finish()
+
+        if len(data) < n_bytes:
+            if finished:
+                # 再生終了 (最終バッファは無音で埋める)
+                return (data + self.silence_byte * (n_bytes - len(data)), pyaudio.paComplete)
+
+            # 先読みが間に合わなかった場合(アンダーラン)は、不足分を無音で埋めて再生を継続
+            self.underrun_count += 1
+            self.underrun_frames += (n_bytes - len(data)) // self.frame_bytes
+            data += self.silence_byte * (n_bytes - len(data))
+
+        return (data, pyaudio.paContinue)
+
+    def start(self):
+        # ==================================
+        # === 再生開始関数 ===
+        # ==================================
+        self.stop_event.clear()
+        self.reader_thread = threading.Thread(target=self._run_reader, name="wav_player-reader", daemon=True)
+        self.reader_thread.start()
+
+        # 再生開始時のアンダーランを避けるため、リングバッファに1バッファ分以上を先読みしてからストリームを開く
+        with self.cond:
+            while not self.reader_finished and self.ring.available < self.frames_per_buffer * self.frame_bytes:
+                self.cond.wait(0.01)
+
+        self.pa = pyaudio.PyAudio()
+        self.stream = self.pa.open(
+            format=self.pa.get_format_from_width(self.sampwidth, unsigned=self.sampwidth == 1),
+            channels=self.channels,
+            rate=self.samplerate,
+            output=True,
+            frames_per_buffer=self.frames_per_buffer,
+            stream_callback=self.callback
+        )
+        logger.info(
+            "Playback START",
+            extra=log_fields(
+                playlist=self.playlist, samplerate=self.samplerate, channels=self.channels,
+                sampwidth=self.sampwidth, loop=self.loop
+            )
+        )
+
+    def seek(self, time, track_index=None):
+        # ==================================
+        # === 再生位置変更関数 ===
+        # ==================================
+        # time          : ファイル先頭からの時間[s]
+        # track_index   : プレイリスト内のindex (Noneの場合は再生中のファイル)
+        if track_index is None:
+            track_index = self.position[0]
+        frame = min(max(int(time * self.samplerate), 0), self.sources[track_index].n_frames)
+        with self.cond:
+            self.seek_request = (track_index, frame)
+            self.cond.notify()
+
+    @property
+    def position(self):
+        # ==================================
+        # === 再生位置取得 ===
+        # ==================================
+        # 戻り値 : (プレイリスト内のindex, ファイル先頭からの時間[s])
+        with self.lock:
+            read_total = self.ring.read_total
+            for write_total, track_index, track_frame in self.markers:
+                if write_total >= read_total:
+                    frame = track_frame - (write_total - read_total) // self.frame_bytes
+                    return track_index, max(frame, 0) / self.samplerate
+            return self.track_index, self.track_frame / self.samplerate
+
+    def is_active(self):
+        return self.stream is not None and self.stream.is_active()
+
+    def stop(self):
+        # ==================================
+        # === 再生停止関数 ===
+        # ==================================
+        if self.stream is not None:
+            self.stream.stop_stream()
+            self.stream.close()
+            self.stream = None
+        if self.pa is not None:
+            self.pa.terminate()
+            self.pa = None
+
+        self.stop_event.set()
+        if self.reader_thread is not None:
+            self.reader_thread.join()
+            self.reader_thread = None
+        if self.analysis_tap is not None:
+            self.analysis_tap.finish()
+
+        logger.info(
+            "Playback END",
+            extra=log_fields(underrun_count=self.underrun_count, underrun_frames=self.underrun_frames)
+        )
+
+    def close(self):
+        # ==================================
+        # === 音声ファイル クローズ関数 ===
+        # ==================================
+        if getattr(self, "analysis_tap", None) is not None:
+            self.analysis_tap.clear()
+        for source in self.sources:
+            source.close()
+        self.sources = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.stream is not None or self.reader_thread is not None:
+            self.stop()
+        self.close()
@@ -0,0 +1,83 @@
+# ==============================================================
+# === Batch Analyze Audio Files (Spectrogram/F0/Cepstrum/MFCC) ===
+# ==============================================================
+import argparse
+import os
+
+from modules.batch_corpus_analyzer import (DEFAULT_ANALYSIS_PARAMS,
+                                           run_batch_corpus_analysis)
+from modules.log_util import LOG_LEVEL_ENV, setup_logging
+
+if __name__ == '__main__':
+    # =================
+    # === Main Code ===
+    # =================
+
+    # --- Parameters ---
+    # (標準入力での対話選択は行わず、コマンドライン引数で指定する)
+    parser = argparse.ArgumentParser(
+        description="Analyze WAV/FLAC files (spectrogram, F0, cepstrum, mel-cepstrum) in a process pool."
+    )
+    parser.add_argument("input_path", help="directory of audio files, or manifest file (one audio file path per line)")
+    parser.add_argument("-o", "--output-dir", default="batch_result/", help="output directory (default: batch_result/)")
+    parser.add_argument("-j", "--workers", type=int, default=None, help="worker process count (default: CPU count)")
+    parser.add_argument("--no-resume", action="store_true", help="re-analyze files that already have results")
+    parser.add_argument(
+        "--format", choices=["npz", "feature_store"], default="npz",
+        help="output format: per-file npz, or chunked memory-mappable feature store (default: npz)"
+    )
+    parser.add_argument(
+        "--feature-dtype", choices=["float16", "float32"], default="float32",
+        help="value dtype of feature store chunks (default: float32)"
+    )
+    parser.add_argument("--cache-dir", default=None, help="result cache directory (default: no cache)")
+    parser.add_argument("--cache-max-mb", type=int, default=1024, help="result cache size limit [MiB] (default: 1024)")
+    parser.add_argument("--verbose", action="store_true", help="show standard output of analysis functions")
+    parser.add_argument(
+        "--log-level",
+        default=None,
+        choices=["DEBUG", "INFO", "WARNING", "ERROR"],
+        help="log level (default: environment variable " + LOG_LEVEL_ENV + ", or INFO)"
+    )
+    parser.add_argument("--stft-frame-size", type=int, default=DEFAULT_ANALYSIS_PARAMS["stft_frame_size"])
+    parser.add_argument("--overlap-rate", type=int, default=DEFAULT_ANALYSIS_PARAMS["overlap_rate"])
+    parser.add_argument("--window-func", default=DEFAULT_ANALYSIS_PARAMS["window_func"])
+    parser.add_argument("--mel-filter-number", type=int, default=DEFAULT_ANALYSIS_PARAMS["mel_filter_number"])
+    parser.add_argument("--mfcc-dim", type=int, default=DEFAULT_ANALYSIS_PARAMS["mfcc_dim"])
+    parser.add_argument("--dbref", type=float, default=DEFAULT_ANALYSIS_PARAMS["dbref"])
+    parser.add_argument("--no-a-weighting", action="store_true", help="disable A-weighting")
+    args = parser.parse_args()
+
+    if args.log_level is not None:
+        # ワーカープロセスにも同一のログレベルを適用するため、環境変数にも設定する
+        os.environ[LOG_LEVEL_ENV] = args.log_level
+        setup_logging(args.log_level)
+
+    analysis_params = {
+        "stft_frame_size": args.stft_frame_size,
+        "overlap_rate": args.overlap_rate,
+        "window_func": args.window_func,
+        "mel_filter_number": args.mel_filter_number,
+        "mfcc_dim": args.mfcc_dim,
+        "dbref": args.dbref,
+        "A": not args.no_a_weighting
+    }
+    # ------------------------
+
+    # === 音声ファイル 一括解析 ===
+    total_summary = run_batch_corpus_analysis(
+        args.input_path,
+        args.output_dir,
+        workers=args.workers,
+        analysis_params=analysis_params,
+        resume=not args.no_resume,
+        quiet=not args.verbose,
+        output_format=args.format,
+        feature_dtype=args.feature_dtype,
+        cache_dir=args.cache_dir,
+        cache_max_bytes=args.cache_max_mb * 1024 * 1024
+    )
+
+    print("=================")
+    print("= Main Code END =")
+    print("=================\n")
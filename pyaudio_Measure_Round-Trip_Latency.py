@@ -0,0 +1,132 @@
+# ==============================================================
+# === Measure Round-Trip Latency with Full-Duplex Stream ===
+# ==============================================================
+# (実行例)
+#   python pyaudio_Measure_Round-Trip_Latency.py --input-index 1 --output-index 3 --frames-per-buffer 128 256 512 1024
+#   python pyaudio_Measure_Round-Trip_Latency.py --software-loopback --loopback-latency 5.0 -o latency.json
+import argparse
+import json
+
+from modules.audio_stream import audio_stream_stop, duplex_stream_start
+from modules.roundtrip_latency import (RoundTripLatencyMeter,
+                                       SoftwareLoopback,
+                                       format_latency_results,
+                                       select_frames_per_buffer)
+
+if __name__ == '__main__':
+    # =================
+    # === Main Code ===
+    # =================
+
+    # --- Parameters ---
+    parser = argparse.ArgumentParser(
+        description="Measures round-trip (output -> loopback -> input) latency per frames_per_buffer setting "
+                    "by playing an MLS/impulse and FFT cross-correlating the captured signal."
+    )
+    parser.add_argument("--input-index", type=int, default=None, help="input device index (default: host default)")
+    parser.add_argument("--output-index", type=int, default=None, help="output device index (default: host default)")
+    parser.add_argument("--samplerate", type=int, default=48000, help="sampling frequency [Hz] (default: 48000)")
+    parser.add_argument("--channels", type=int, default=1, help="input/output channels (default: 1)")
+    parser.add_argument(
+        "--frames-per-buffer", type=int, nargs="+", default=[64, 128, 256, 512, 1024, 2048],
+        help="frames_per_buffer settings to measure (default: 64 128 256 512 1024 2048)"
+    )
+    parser.add_argument("--signal", choices=["mls", "impulse"], default="mls", help="test signal (default: mls)")
+    parser.add_argument("--mls-order", type=int, default=14, help="MLS order, length = 2^order - 1 (default: 14)")
+    parser.add_argument("--bursts", type=int, default=4, help="test signal bursts per setting (default: 4)")
+    parser.add_argument("--amplitude", type=float, default=0.5, help="test signal amplitude (default: 0.5)")
+    parser.add_argument(
+        "--max-latency", type=float, default=0.5, help="max measurable round-trip latency [s] (default: 0.5)"
+    )
+    parser.add_argument(
+        "--software-loopback", action="store_true",
+        help="measure against a software loopback stand-in instead of audio devices"
+    )
+    parser.add_argument(
+        "--loopback-latency", type=float, default=None,
+        help="software loopback extra latency on top of 2 buffers [ms] (default: 0)"
+    )
+    parser.add_argument("--loopback-noise", type=float, default=0.01, help="software loopback noise level (default: 0.01)")
+    parser.add_argument("-o", "--output", default=None, help="output JSON file of the results")
+    args = parser.parse_args()
+    # ------------------------
+
+    results = []
+    for frames_per_buffer in args.frames_per_buffer:
+        meter = RoundTripLatencyMeter(
+            args.samplerate,
+            frames_per_buffer,
+            kind=args.signal,
+            burst_count=args.bursts,
+            max_latency=args.max_latency,
+            channels=args.channels,
+            mls_order=args.mls_order,
+            amplitude=args.amplitude
+        )
+        print(
+            "Measuring frames_per_buffer = ", frames_per_buffer,
+            "(", round(meter.duration, 1), "[s] )"
+        )
+
+        if args.software_loopback:
+            # === ソフトウェア ループバック (往復遅延 = 2バッファ + 指定遅延) ===
+            latency = frames_per_buffer * 2
+            if args.loopback_latency is not None:
+                latency += int(args.loopback_latency / 1000 * args.samplerate)
+            stream = SoftwareLoopback(
+                args.samplerate,
+                frames_per_buffer,
+                meter.callback,
+                latency=latency,
+                channels=args.channels,
+                noise_level=args.loopback_noise
+            )
+            result = meter.run(stream)
+            stream.close()
+        else:
+            # === 全二重音声ストリーム (物理/仮想ループバック) ===
+            pa, stream = duplex_stream_start(
+                args.input_index,
+                args.output_index,
+                args.channels,
+                args.samplerate,
+                frames_per_buffer,
+                meter.callback
+            )
+            try:
+                result = meter.run(stream)
+            finally:
+                audio_stream_stop(pa, stream)
+
+        results.append(result)
+
+    print("")
+    print(format_latency_results(results))
+    print("")
+
+    # === 推奨 frames_per_buffer (全バーストで検出 / xrun無し / ばらつき1[ms]以内 のうち往復遅延が最小) ===
+    recommended = select_frames_per_buffer(results)
+    if recommended is not None:
+        print(
+            "Recommended frames_per_buffer = ", recommended["frames_per_buffer"],
+            "( round-trip", round(recommended["roundtrip_ms"], 2), "[ms] )\n"
+        )
+    else:
+        print("Recommended frames_per_buffer = None (no stable setting, check loopback connection / gain / --max-latency)\n")
+
+    if args.output is not None:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "results": results,
+                    "recommended_frames_per_buffer": recommended["frames_per_buffer"] if recommended else None
+                },
+                f,
+                ensure_ascii=False,
+                indent=2
+            )
+        print("Saved Latency Result = ", args.output, "\n")
+
+    print("=================")
+    print("= Main Code END =")
+    print("=================\n")
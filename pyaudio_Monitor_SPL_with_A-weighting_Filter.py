@@ -0,0 +1,111 @@
+# ==============================================================
+# === Monitor Sound Pressure Level (Fast / Slow / Leq) with Time-Domain A-weighting Filter ===
+# ==============================================================
+# (実行例)
+#   python pyaudio_Monitor_SPL_with_A-weighting_Filter.py --leq-interval 1 -o leq.csv
+#   python pyaudio_Monitor_SPL_with_A-weighting_Filter.py --index 1 --dbref 0 --no-a-weighting
+import argparse
+import csv
+import datetime
+
+from modules.audio_stream import (audio_stream_start, audio_stream_stop,
+                                  gen_discrete_data_from_audio_stream)
+from modules.get_mic_index import get_mic_index
+from modules.get_std_input import get_selected_mic_index_by_std_input
+from modules.spl_meter import SPLMeter
+
+if __name__ == '__main__':
+    # =================
+    # === Main Code ===
+    # =================
+
+    # --- Parameters ---
+    parser = argparse.ArgumentParser(
+        description="Monitors Fast/Slow time-weighted levels and Leq of microphone input continuously "
+                    "with a streaming time-domain A-weighting IIR filter."
+    )
+    parser.add_argument("--index", type=int, default=None, help="microphone device index (default: select by stdin)")
+    parser.add_argument("--samplerate", type=int, default=16000, help="sampling frequency [Hz] (default: 16000)")
+    parser.add_argument("--channels", type=int, choices=[1, 2], default=1, help="1: mono / 2: stereo (default: 1)")
+    parser.add_argument("--frames-per-buffer", type=int, default=1024, help="frames per input buffer (default: 1024)")
+    parser.add_argument("--dbref", type=float, default=2e-5, help="decibel reference (default: 2e-5 = dB SPL)")
+    parser.add_argument("--no-a-weighting", action="store_true", help="disable A-weighting (Z-weighting)")
+    parser.add_argument("--leq-interval", type=float, default=1.0, help="Leq interval [s] (default: 1)")
+    parser.add_argument("-o", "--output", default=None, help="output CSV file of the Leq intervals")
+    parser.add_argument(
+        "--duration", type=float, default=0,
+        help="monitoring duration [s] (default: 0 = until ctrl+c)"
+    )
+    args = parser.parse_args()
+    # ------------------------
+
+    # === マイクチャンネルを自動取得 ===
+    # (未指定の場合は、標準入力にて選択可能とする)
+    if args.index is None:
+        print("=================================================================")
+        print("  [ Please Select Microphone index ]")
+        print("=================================================================")
+        print("")
+        mic_list = get_mic_index()
+        selected_index = get_selected_mic_index_by_std_input(mic_list)
+    else:
+        selected_index = args.index
+    print("\nUse Microphone Index :", selected_index, "\n")
+
+    # === 騒音計クラスの生成 ===
+    meter = SPLMeter(
+        args.samplerate,
+        dbref=args.dbref,
+        A=not args.no_a_weighting,
+        leq_interval=args.leq_interval,
+        channels=args.channels
+    )
+
+    # === Microphone入力音声ストリーム生成 ===
+    pa, stream = audio_stream_start(selected_index, args.channels, args.samplerate, args.frames_per_buffer)
+
+    csv_file = None
+    csv_writer = None
+    if args.output is not None:
+        csv_file = open(args.output, "w", newline="", encoding="utf-8")
+        csv_writer = csv.writer(csv_file)
+        csv_writer.writerow(["start_time", "leq_db"])
+
+    # === 音圧レベル監視 ===
+    # バッファ毎にFast / Slowの音圧レベルを表示し、Leqの算出区間完了毎に1行出力する
+    # キーボードインタラプトあるまで(指定時は監視時間経過まで)処理継続
+    max_buffers = int(args.duration * args.samplerate / args.frames_per_buffer) if args.duration > 0 else None
+    buffer_count = 0
+    start_timestamp = datetime.datetime.now().timestamp()
+    try:
+        while max_buffers is None or buffer_count < max_buffers:
+            audio_discrete_data = gen_discrete_data_from_audio_stream(stream, args.frames_per_buffer)
+            spl = meter.process(audio_discrete_data)
+            buffer_count += 1
+
+            print(
+                f"\r  L(Fast): {spl['L_fast']:7.2f} | L(Slow): {spl['L_slow']:7.2f}"
+                f" | Lmax(Fast): {spl['L_fast_max']:7.2f} [dB]",
+                end=""
+            )
+            for start_time, leq in spl["leq"]:
+                timestamp = datetime.datetime.fromtimestamp(start_timestamp + start_time)
+                print(f"\n  {timestamp.isoformat(timespec='milliseconds')}  Leq: {leq:7.2f} [dB]")
+                if csv_writer is not None:
+                    csv_writer.writerow([timestamp.isoformat(timespec="milliseconds"), round(leq, 2)])
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # === Microphone入力音声ストリーム停止 ===
+        audio_stream_stop(pa, stream)
+        if csv_file is not None:
+            csv_file.close()
+
+    print("\n")
+    meter.print_stats()
+    if args.output is not None:
+        print("Saved Leq Result = ", args.output, "\n")
+
+    print("=================")
+    print("= Main Code END =")
+    print("=================\n")
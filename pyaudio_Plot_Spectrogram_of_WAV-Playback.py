@@ -0,0 +1,175 @@
+# ===============================================================
+# === Play WAV File and Plot Spectrogram of the Playback Audio ===
+# ===============================================================
+import argparse
+from functools import partial
+
+from modules.latency_monitor import LatencyMonitor
+from modules.pipeline import Pipeline, PipelineStage, PipelineStop
+from modules.pipeline_stages import (stage_f0, stage_frame, stage_normalize,
+                                     stage_signal_spctrgrm, stage_stft)
+from modules.playback_analysis_tap import PlaybackAnalysisTap
+from modules.plot_matplot_graph import gen_graph_figure_for_realtime_spctrgrm
+from modules.realtime_spctrgrm_renderer import RealtimeSpctrgrmRenderer
+from modules.wav_player import WavPlayer
+
+if __name__ == '__main__':
+    # =================
+    # === Main Code ===
+    # =================
+
+    # --- Parameters ---
+    parser = argparse.ArgumentParser(
+        description="Plays WAV/FLAC files and plots spectrogram/F0 of exactly the played frames, "
+                    "synchronized to the output DAC time."
+    )
+    parser.add_argument("playlist", nargs="+", help="16bit audio files to play gaplessly (same format)")
+    parser.add_argument("--loop", action="store_true", help="repeat the playlist")
+    parser.add_argument("--seek", type=float, default=0.0, help="start position of the first file [s]")
+    parser.add_argument(
+        "--spectrogram-mode", type=int, choices=[0, 1], default=1,
+        help="0: scipy.signal.spectrogram / 1: full scratch STFT (default: 1)"
+    )
+    parser.add_argument("--frames-per-buffer", type=int, default=1024, help="frames per output buffer (default: 1024)")
+    parser.add_argument(
+        "--analysis-frames", type=int, default=4096, help="frames per analysis frame (default: 4096)"
+    )
+    parser.add_argument("--stft-frame-size", type=int, default=256, help="STFT frame size (default: 256)")
+    parser.add_argument("--overlap-rate", type=int, default=50, help="overlap rate [%%] (default: 50)")
+    parser.add_argument(
+        "--max-lag", type=float, default=1.0,
+        help="max analysis lag behind playback [s], older frames are skipped (default: 1.0)"
+    )
+    args = parser.parse_args()
+
+    # デシベル基準値 (dB FS)
+    dbref = 0
+
+    # 聴感補正(A特性)の有効(True)/無効(False)設定
+    A = True
+
+    # 使用する窓関数 ("hann" : Hanning窓)
+    window_func = "hann"
+    # ------------------------
+
+    # === 音声ファイルのオープン & 解析用タップ生成 ===
+    # リーダースレッドが読込んだPCMデータを、出力コールバック(再生)と解析パイプラインで共有する
+    # (解析パイプラインには、再生済の範囲のみをコピー無しで渡す)
+    with WavPlayer(args.playlist, frames_per_buffer=args.frames_per_buffer, loop=args.loop) as player:
+        samplerate = player.samplerate
+        time_range = args.analysis_frames / samplerate
+        freq_range = samplerate / 2
+        print("\nSampling Frequency[Hz] = ", samplerate)
+        print("analysis frames [sampling data count/analysis frame] = ", args.analysis_frames, "\n")
+
+        # === 各ステージの処理時間(レイテンシ) & 再生に対する表示遅れの計測 ===
+        # (処理時間予算[s] = 1解析フレーム分の音声の時間長)
+        latency_monitor = LatencyMonitor(budget=time_range)
+
+        tap = PlaybackAnalysisTap(
+            player,
+            frames_per_buffer=args.analysis_frames,
+            max_lag_time=args.max_lag,
+            latency_monitor=latency_monitor
+        )
+
+        # === グラフ領域作成 & リアルタイム描画クラスの生成 ===
+        fig, spctrgrm_fig, cbar_fig, f0_fig = gen_graph_figure_for_realtime_spctrgrm(args.spectrogram_mode)
+        renderer = RealtimeSpctrgrmRenderer(
+            fig, spctrgrm_fig, cbar_fig, f0_fig, time_range, freq_range, dbref, A
+        )
+
+        # === グラフ表示シンク (DAC出力時刻に同期して表示) ===
+        def plot_sink(frame):
+            # 解析が再生より先行した場合は、当該フレームの音声がDACから出力されるまで表示を待つ
+            tap.wait_for_playback(frame)
+
+            renderer.update(
+                frame["freq_spctrgrm"],
+                frame["time_spctrgrm"],
+                frame["spectrogram"],
+                frame["f0"],
+                frame["time_f0"]
+            )
+
+            if not renderer.is_open:
+                # グラフウィンドウが閉じられた場合、パイプラインを停止する
+                raise PipelineStop()
+
+        # === スペクトログラムデータ算出ステージ ===
+        if args.spectrogram_mode == 0:
+            # === scipy.signal.spectrogram()を使用する場合 ===
+            spctrgrm_stages = [
+                PipelineStage(
+                    "spctrgrm",
+                    partial(
+                        stage_signal_spctrgrm,
+                        samplerate=samplerate,
+                        stft_frame_size=args.stft_frame_size,
+                        overlap_rate=args.overlap_rate,
+                        window_func=window_func,
+                        dbref=dbref,
+                        A=A
+                    )
+                )
+            ]
+        else:
+            # === 自作STFT関数を使用する場合 ===
+            spctrgrm_stages = [
+                PipelineStage(
+                    "frame",
+                    partial(
+                        stage_frame,
+                        samplerate=samplerate,
+                        stft_frame_size=args.stft_frame_size,
+                        overlap_rate=args.overlap_rate,
+                        window_func=window_func
+                    )
+                ),
+                PipelineStage(
+                    "stft",
+                    partial(
+                        stage_stft,
+                        samplerate=samplerate,
+                        stft_frame_size=args.stft_frame_size,
+                        dbref=dbref,
+                        A=A
+                    )
+                )
+            ]
+
+        # === 再生 & 解析 パイプライン構成 ===
+        # 再生済PCMデータ取得(解析用タップ) → 時間領域波形データ生成 → スペクトログラムデータ算出
+        # → 基本周波数 時系列データ生成 → DAC出力時刻に同期したグラフ表示
+        # 再生完了、グラフウィンドウのクローズ、または「ctrl+c」押下まで処理継続
+        pipeline = Pipeline(
+            source=tap.source,
+            stages=[
+                PipelineStage("normalize", partial(stage_normalize, samplerate=samplerate)),
+                *spctrgrm_stages,
+                PipelineStage("f0", partial(stage_f0, samplerate=samplerate))
+            ],
+            sink=plot_sink,
+            latency_monitor=latency_monitor
+        )
+
+        if args.seek > 0:
+            player.seek(args.seek, track_index=0)
+
+        # === 再生開始 & パイプライン実行 ===
+        player.start()
+        try:
+            pipeline.run()
+        finally:
+            # === ストリーム停止 & PortAudioリソース解放 ===
+            player.stop()
+
+        pipeline.print_stats()
+        latency_monitor.print_stats()
+        tap.print_stats()
+        print("Underrun Count = ", player.underrun_count, "(", player.underrun_frames, "frames )")
+        print("\nRealtime Rendering Average FPS = ", round(renderer.fps_average, 1), "\n")
+
+    print("=================")
+    print("= Main Code END =")
+    print("=================\n")
@@ -1,12 +1,20 @@
-from modules.audio_stream import audio_stream_start, audio_stream_stop
-from modules.gen_freq_domain_data import gen_freq_domain_data
-from modules.gen_time_domain_data import gen_time_domain_data
+from functools import partial
+
+from modules.audio_stream import (audio_stream_start, audio_stream_stop,
+                                  get_capture_samplerate)
+from modules.gen_time_domain_data import gen_audio_stream_source
 from modules.get_mic_index import get_mic_index
 from modules.get_std_input import (get_selected_mic_index_by_std_input,
                                    get_selected_mode_by_std_input)
+from modules.latency_monitor import LatencyMonitor
+from modules.pipeline import Pipeline, PipelineStage
+from modules.pipeline_stages import (stage_freq_domain, stage_normalize,
+                                     stage_resample)
 from modules.plot_matplot_graph import gen_graph_figure, plot_time_and_freq
-from modules.save_audio_to_wav_file import save_audio_to_wav_file
-from modules.save_matplot_graph import save_matplot_graph
+from modules.profiling_hooks import setup_profiling_hooks
+from modules.save_service import SaveService
+from modules.stream_resampler import (StreamResampler,
+                                      gen_capture_frames_per_buffer)
 
 if __name__ == '__main__':
     # =================
@@ -74,6 +82,32 @@ if __name__ == '__main__':
     # 聴感補正(A特性)の有効(True)/無効(False)設定
     A = True
 
+    # レコーディングモードのテイク数
+    # (前テイクの音声/グラフ保存をバックグラウンドで行いながら、次テイクの録音を継続する)
+    recording_take_count = 1
+
+    # 解析ステージの実行方式 ("thread":スレッド / "process":プロセス)
+    stage_executor = "thread"
+
+    # 入力デバイスのネイティブサンプリング周波数で取得し、解析用サンプリング周波数(samplerate)に変換する(True)/しない(False)設定
+    # (Falseの場合も、デバイスがsamplerateに非対応の場合はネイティブサンプリング周波数で取得して変換する)
+    capture_at_native_rate = False
+    # サンプリング周波数変換の品質プリセット ("QQ"/"LQ"/"MQ"/"HQ"/"VHQ" / 後方ほど高品質・高負荷)
+    resample_quality = "HQ"
+
+    # プロファイリング(cProfile / tracemalloc / サンプリング)対象のイテレーション数
+    # (0の場合は、環境変数 AUDIO_SP_PROFILE 指定時 または SIGUSR1受信時のみプロファイリング)
+    # (レポートは profile/<日時>/ に出力)
+    profiling_iterations = 0
+
+    # 処理時間(レイテンシ)計測結果の出力ファイル名プレフィックス
+    # (Noneの場合はファイル出力無し / 指定時は<プレフィックス>.json & <プレフィックス>.csvを出力)
+    latency_export_prefix = None
+
+    # 録音音声の保存形式 ("WAV" / "FLAC") / サブタイプ ("PCM_16":16bit整数 (量子化データをそのまま保存))
+    audio_format = "WAV"
+    audio_subtype = "PCM_16"
+
     # グラフ保存時のファイル名プレフィックス
     filename_prefix = "time-waveform_and_freq-response_"
     # ------------------------
@@ -96,65 +130,105 @@ if __name__ == '__main__':
     # freq_fig          : 周波数特性向けmatplotlib Axesインスタンス
     # no_use_sub_fig    :未使用戻り値
 
+    # === 音声 & グラフ バックグラウンド保存サービス生成 ===
+    save_service = SaveService(audio_format=audio_format, audio_subtype=audio_subtype)
+
+    # === 入力音声ストリーム取得時のサンプリング周波数決定 ===
+    # (解析用サンプリング周波数と異なる場合は、取得したバッファ毎にパイプライン内で変換する)
+    capture_samplerate = get_capture_samplerate(selected_index, mic_mode, samplerate, capture_at_native_rate)
+    capture_frames_per_buffer = gen_capture_frames_per_buffer(frames_per_buffer, capture_samplerate, samplerate)
+    print("Capture Sampling Frequency[Hz] = ", capture_samplerate, "\n")
+
+    resampler = None
+    resample_stages = []
+    if capture_samplerate != samplerate:
+        # フィルタ状態をバッファ間で保持するため、ワーカー数1のスレッドで実行する
+        # (レコーディングモードの場合は1テイク = 1フレームのため、フレーム毎にフィルタ状態を初期化する)
+        resampler = StreamResampler(capture_samplerate, samplerate, mic_mode, resample_quality)
+        resample_stages = [
+            PipelineStage("resample", partial(stage_resample, resampler=resampler, last=selected_mode == 0))
+        ]
+
     # === Microphone入力音声ストリーム生成 ===
     pa, stream = audio_stream_start(
-        selected_index, mic_mode, samplerate, frames_per_buffer)
+        selected_index, mic_mode, capture_samplerate, capture_frames_per_buffer)
     # pa        : 生成したpyaudio.PyAudioクラスオブジェクト
     #             (pyaudio.PyAudio object)
     # stream    : 生成したpyaudio.PyAudio.Streamオブジェクト
     #             (pyaudio.PyAudio.Stream object)
 
-    # === 時間領域波形 & 周波数特性プロット ===
-    # キーボードインタラプトあるまでループ処理継続
-    while True:
-        try:
-            # === 時間領域波形データ生成 ===
-            data_normalized, time_normalized = gen_time_domain_data(
-                stream, frames_per_buffer, samplerate, time
-            )
-            # data_normalized : 時間領域波形データ(正規化済)
-            # time_normalized : 時間領域波形データ(正規化済)に対応した時間軸データ
-
-            # === 周波数特性データ生成 ===
-            spectrum_normalized, amp_normalized, phase_normalized, freq_normalized = gen_freq_domain_data(
-                data_normalized, samplerate, dbref, A)
-            # spectrum_normalized   : 正規化後 DFTデータ 1次元配列
-            # amp_normalized        : 正規化後 DFTデータ振幅成分 1次元配列
-            # phase_normalized      : 正規化後 DFTデータ位相成分 1次元配列
-            # freq_normalized       : 正規化後 周波数軸データ 1次元配列
-
-            # === グラフ表示 ===
-            plot_time_and_freq(
-                fig,
-                wave_fig,
-                freq_fig,
-                data_normalized,
-                time_normalized,
-                time_range,
-                amp_normalized,
-                freq_normalized,
-                freq_range,
-                dbref,
-                A,
-                selected_mode
+    # === グラフ表示 & 保存シンク ===
+    def plot_sink(frame):
+        global fig, wave_fig, freq_fig, no_use_sub_fig
+
+        # === グラフ表示 ===
+        plot_time_and_freq(
+            fig,
+            wave_fig,
+            freq_fig,
+            frame["data_normalized"],
+            frame["time_normalized"],
+            time_range,
+            frame["amp_normalized"],
+            frame["freq_normalized"],
+            freq_range,
+            dbref,
+            A,
+            selected_mode
+        )
+
+        if selected_mode == 0:
+            # レコーディングモードの場合、音声およびグラフの保存をバックグラウンドで開始する
+            save_service.submit_take(
+                samplerate, frame["audio_discrete_data"], fig, filename_prefix, channels=mic_mode
             )
 
-            if selected_mode == 0:
-                # レコーディングモードの場合、While処理を1回で抜ける
-                break
-
-        except KeyboardInterrupt:
-            # 「ctrl+c」が押下された場合、While処理を抜ける
-            break
+            # 次テイク向けのグラフ領域を作成
+            if frame["index"] + 1 < recording_take_count:
+                fig, wave_fig, freq_fig, no_use_sub_fig = gen_graph_figure(graph_type)
+
+    # === 各ステージの処理時間(レイテンシ)計測 ===
+    # (処理時間予算[s] = 1バッファ分の音声の時間長)
+    latency_monitor = LatencyMonitor(budget=frames_per_buffer / samplerate)
+
+    # === プロファイリング設定 (フラグ指定時は起動直後から / SIGUSR1受信時はその時点から計測) ===
+    profiling_hooks = setup_profiling_hooks(profiling_iterations)
+
+    # === 時間領域波形 & 周波数特性プロット パイプライン構成 ===
+    # 音声取得 → 時間領域波形データ生成 → 周波数特性データ生成 → グラフ表示
+    # (各ステージは個別スレッドで実行し、グラフ表示中も次フレームの音声取得/解析を継続する)
+    # キーボードインタラプトあるまで(レコーディングモードの場合は指定テイク数の録音完了まで)処理継続
+    pipeline = Pipeline(
+        source=partial(
+            gen_audio_stream_source, stream, capture_frames_per_buffer, capture_samplerate, time,
+            recording_take_count
+        ),
+        stages=[
+            *resample_stages,
+            PipelineStage("normalize", partial(stage_normalize, samplerate=samplerate)),
+            PipelineStage(
+                "freq_domain",
+                partial(stage_freq_domain, samplerate=samplerate, dbref=dbref, A=A),
+                executor=stage_executor
+            )
+        ],
+        sink=plot_sink,
+        latency_monitor=latency_monitor,
+        profiling_hooks=profiling_hooks
+    )
+    pipeline.run()
+    pipeline.print_stats()
+    if resampler is not None:
+        resampler.print_stats()
+    latency_monitor.print_stats()
+    if latency_export_prefix is not None:
+        latency_monitor.export_json(latency_export_prefix + ".json")
+        latency_monitor.export_csv(latency_export_prefix + ".csv")
 
     if selected_mode == 0:
-        # レコーディングモードの場合、音声およびグラフを保存する
-
-        # === レコーディング音声のwavファイル保存 ===
-        save_audio_to_wav_file(samplerate, data_normalized)
-
-        # === グラフ保存 ===
-        save_matplot_graph(filename_prefix)
+        # レコーディングモードの場合、バックグラウンドで実行中の音声およびグラフの保存完了を待つ
+        saved_filenames = save_service.shutdown()
+        print("Saved Files = ", saved_filenames, "\n")
 
     # === Microphone入力音声ストリーム停止 ===
     audio_stream_stop(pa, stream)
@@ -1,17 +1,24 @@
-from modules.audio_stream import audio_stream_start, audio_stream_stop
-from modules.gen_cepstrum_data import (gen_cepstrum_data,
-                                       gen_melscale_spctrm_env_data,
-                                       gen_mfcc_spctrm_env_data)
-from modules.gen_freq_domain_data import (gen_freq_domain_data,
-                                          gen_fundamental_freq_data)
-from modules.gen_time_domain_data import gen_time_domain_data
+from functools import partial
+
+from modules.activity_gate import ActivityGate
+from modules.audio_stream import (audio_stream_start, audio_stream_stop,
+                                  get_capture_samplerate)
+from modules.gen_time_domain_data import gen_audio_stream_source
 from modules.get_mic_index import get_mic_index
 from modules.get_std_input import (get_selected_mic_index_by_std_input,
                                    get_selected_mode_by_std_input)
+from modules.latency_monitor import LatencyMonitor
+from modules.pipeline import Pipeline, PipelineStage
+from modules.pipeline_stages import (stage_activity, stage_cepstrum,
+                                     stage_f0, stage_freq_domain, stage_mel,
+                                     stage_normalize, stage_resample)
 from modules.plot_matplot_graph import (gen_graph_figure_for_cepstrum,
                                         plot_time_freq_melfreq)
-from modules.save_audio_to_wav_file import save_audio_to_wav_file
-from modules.save_matplot_graph import save_matplot_graph
+from modules.profiling_hooks import setup_profiling_hooks
+from modules.quality_controller import AdaptiveQualityController
+from modules.save_service import SaveService
+from modules.stream_resampler import (StreamResampler,
+                                      gen_capture_frames_per_buffer)
 
 if __name__ == '__main__':
     # =================
@@ -85,6 +92,40 @@ if __name__ == '__main__':
     # メル周波数ケプストラム係数(MFCC) 次元数
     mfcc_dim = 12
 
+    # レコーディングモードのテイク数
+    # (前テイクの音声/グラフ保存をバックグラウンドで行いながら、次テイクの録音を継続する)
+    recording_take_count = 1
+
+    # 解析ステージの実行方式 ("thread":スレッド / "process":プロセス)
+    stage_executor = "thread"
+
+    # リアルタイムモードの適応品質制御の有効(True)/無効(False)設定
+    # (処理時間が1バッファ分の音声の時間長を超過する場合に、解析の品質を自動的に下げる)
+    adaptive_quality = True
+
+    # リアルタイムモードの音声区間(アクティビティ)判定の有効(True)/無効(False)設定
+    # (無音 / 定常雑音のバッファでは基本周波数 & ケプストラム & メルスケールスペクトル包絡の解析を省略し、該当グラフは空白(基本周波数は0[Hz])で表示する)
+    activity_gating = True
+
+    # 入力デバイスのネイティブサンプリング周波数で取得し、解析用サンプリング周波数(samplerate)に変換する(True)/しない(False)設定
+    # (Falseの場合も、デバイスがsamplerateに非対応の場合はネイティブサンプリング周波数で取得して変換する)
+    capture_at_native_rate = False
+    # サンプリング周波数変換の品質プリセット ("QQ"/"LQ"/"MQ"/"HQ"/"VHQ" / 後方ほど高品質・高負荷)
+    resample_quality = "HQ"
+
+    # プロファイリング(cProfile / tracemalloc / サンプリング)対象のイテレーション数
+    # (0の場合は、環境変数 AUDIO_SP_PROFILE 指定時 または SIGUSR1受信時のみプロファイリング)
+    # (レポートは profile/<日時>/ に出力)
+    profiling_iterations = 0
+
+    # 処理時間(レイテンシ)計測結果の出力ファイル名プレフィックス
+    # (Noneの場合はファイル出力無し / 指定時は<プレフィックス>.json & <プレフィックス>.csvを出力)
+    latency_export_prefix = None
+
+    # 録音音声の保存形式 ("WAV" / "FLAC") / サブタイプ ("PCM_16":16bit整数 (量子化データをそのまま保存))
+    audio_format = "WAV"
+    audio_subtype = "PCM_16"
+
     # グラフ保存時のファイル名プレフィックス
     filename_prefix = "time-waveform_and_Mel-Cepstrum_"
     # ------------------
@@ -108,103 +149,160 @@ if __name__ == '__main__':
     # f0_fig            : 基本周波数 時系列波形向けmatplotlib Axesインスタンス
     # melfilbank_fig    : メルフィルタバンク伝達関数向けmatplotlib Axesインスタンス
 
+    # === 音声 & グラフ バックグラウンド保存サービス生成 ===
+    save_service = SaveService(audio_format=audio_format, audio_subtype=audio_subtype)
+
+    # === 入力音声ストリーム取得時のサンプリング周波数決定 ===
+    # (解析用サンプリング周波数と異なる場合は、取得したバッファ毎にパイプライン内で変換する)
+    capture_samplerate = get_capture_samplerate(selected_index, mic_mode, samplerate, capture_at_native_rate)
+    capture_frames_per_buffer = gen_capture_frames_per_buffer(frames_per_buffer, capture_samplerate, samplerate)
+    print("Capture Sampling Frequency[Hz] = ", capture_samplerate, "\n")
+
+    resampler = None
+    resample_stages = []
+    if capture_samplerate != samplerate:
+        # フィルタ状態をバッファ間で保持するため、ワーカー数1のスレッドで実行する
+        # (レコーディングモードの場合は1テイク = 1フレームのため、フレーム毎にフィルタ状態を初期化する)
+        resampler = StreamResampler(capture_samplerate, samplerate, mic_mode, resample_quality)
+        resample_stages = [
+            PipelineStage("resample", partial(stage_resample, resampler=resampler, last=selected_mode == 0))
+        ]
+
     # === Microphone入力音声ストリーム生成 ===
     pa, stream = audio_stream_start(
-        selected_index, mic_mode, samplerate, frames_per_buffer)
+        selected_index, mic_mode, capture_samplerate, capture_frames_per_buffer)
     # pa        : 生成したpyaudio.PyAudioクラスオブジェクト
     #             (pyaudio.PyAudio object)
     # stream    : 生成したpyaudio.PyAudio.Streamオブジェクト
     #             (pyaudio.PyAudio.Stream object)
 
-    # === 時間領域波形 & ケプストラムプロット ===
-    # キーボードインタラプトあるまでループ処理継続
-    while True:
-        try:
-            # === 時間領域波形データ生成 ===
-            data_normalized, time_normalized = gen_time_domain_data(
-                stream, frames_per_buffer, samplerate, time
-            )
-            # data_normalized : 時間領域波形データ(正規化済)
-            # time_normalized : 時間領域波形データ(正規化済)に対応した時間軸データ
+    # === グラフ表示 & 保存シンク ===
+    def plot_sink(frame):
+        global fig, wave_fig, freq_fig, f0_fig, melfilbank_fig
 
-            # === 周波数特性データ生成 ===
-            spectrum_normalized, amp_normalized, phase_normalized, freq_normalized = gen_freq_domain_data(
-                data_normalized, samplerate, dbref, A
-            )
-            # spectrum_normalized   : 正規化後 DFTデータ 1次元配列
-            # amp_normalized        : 正規化後 DFTデータ振幅成分 1次元配列
-            # phase_normalized      : 正規化後 DFTデータ位相成分 1次元配列
-            # freq_normalized       : 正規化後 周波数軸データ 1次元配列
-
-            # === 基本周波数 時系列データ生成 ===
-            f0, time_f0 = gen_fundamental_freq_data(data_normalized, samplerate)
-            # f0        : 基本周波数 時系列データ 1次元配列
-            # time_f0   : 基本周波数 時系列データに対応した時間軸データ 1次元配列
-
-            # === ケプストラムデータ生成 ===
-            amp_envelope_normalized, cepstrum_data, cepstrum_data_lpl = gen_cepstrum_data(
-                data_normalized, samplerate, dbref
-            )
-            # amp_envelope_normalized   : 正規化後 スペクトル包絡データ振幅成分 1次元配列
-            # cepstrum_data             : ケプストラムデータ(対数値)[dB] 1次元配列
-            # cepstrum_data_lpl         : LPL(=Low-Pass-Lifter)適用後
-            #                             ケプストラムデータ(対数値)[dB] 1次元配列
-
-            # === メルスケール(メル尺度)スペクトル包絡データ生成 ===
-            melscale_amp_normalized, melscale_freq_normalized, mel_filter_bank = gen_melscale_spctrm_env_data(
-                data_normalized, samplerate, mel_filter_number, dbref
-            )
-            # melscale_amp_normalized    : メルスケール(メル尺度)スペクトル包絡データ振幅成分 1次元配列
-            # melscale_freq_normalized   : メル周波数軸データ 1次元配列
-            # mel_filter_bank           : メルフィルタバンク伝達関数(周波数特性) 1次元配列
-
-            # === メル周波数ケプストラム係数(Mel-Frequency Cepstrum Coefficients: MFCC)スペクトル包絡データ生成 ===
-            mfcc_amp_normalized = gen_mfcc_spctrm_env_data(melscale_amp_normalized, mfcc_dim, mel_filter_number)
-            # mfcc_amp_normalized : MFCCスペクトル包絡データ振幅成分 1次元配列
-
-            # === グラフ表示 ===
-            plot_time_freq_melfreq(
-                fig,
-                wave_fig,
-                freq_fig,
-                f0_fig,
-                melfilbank_fig,
-                data_normalized,
-                time_normalized,
-                time_range,
-                amp_normalized,
-                amp_envelope_normalized,
-                freq_normalized,
-                freq_range,
-                f0,
-                time_f0,
-                melscale_amp_normalized,
-                melscale_freq_normalized,
-                mel_filter_number,
-                mel_filter_bank,
-                mfcc_amp_normalized,
-                mfcc_dim,
-                dbref,
-                A,
-                selected_mode
+        # 解析ステージの実行/省略を集計 (音声区間判定の有効時)
+        if activity_gate is not None:
+            activity_gate.account(frame)
+
+        # === グラフ表示 ===
+        plot_time_freq_melfreq(
+            fig,
+            wave_fig,
+            freq_fig,
+            f0_fig,
+            melfilbank_fig,
+            frame["data_normalized"],
+            frame["time_normalized"],
+            time_range,
+            frame["amp_normalized"],
+            frame["amp_envelope_normalized"],
+            frame["freq_normalized"],
+            freq_range,
+            frame["f0"],
+            frame["time_f0"],
+            frame["melscale_amp_normalized"],
+            frame["melscale_freq_normalized"],
+            mel_filter_number,
+            frame["mel_filter_bank"],
+            frame["mfcc_amp_normalized"],
+            mfcc_dim,
+            dbref,
+            A,
+            selected_mode
+        )
+
+        if selected_mode == 0:
+            # レコーディングモードの場合、音声およびグラフの保存をバックグラウンドで開始する
+            save_service.submit_take(
+                samplerate, frame["audio_discrete_data"], fig, filename_prefix, channels=mic_mode
             )
 
-            if selected_mode == 0:
-                # レコーディングモードの場合、While処理を1回で抜ける
-                break
+            # 次テイク向けのグラフ領域を作成
+            if frame["index"] + 1 < recording_take_count:
+                fig, wave_fig, freq_fig, f0_fig, melfilbank_fig = gen_graph_figure_for_cepstrum()
 
-        except KeyboardInterrupt:
-            # 「ctrl+c」が押下された場合、While処理を抜ける
-            break
+    # === 各ステージの処理時間(レイテンシ)計測 ===
+    # (処理時間予算[s] = 1バッファ分の音声の時間長)
+    latency_monitor = LatencyMonitor(budget=frames_per_buffer / samplerate)
 
-    if selected_mode == 0:
-        # レコーディングモードの場合、音声およびグラフを保存する
+    # === プロファイリング設定 (フラグ指定時は起動直後から / SIGUSR1受信時はその時点から計測) ===
+    profiling_hooks = setup_profiling_hooks(profiling_iterations)
+
+    # === リアルタイムモードの適応品質制御 ===
+    quality_controller = None
+    if selected_mode == 1 and adaptive_quality:
+        quality_controller = AdaptiveQualityController(
+            budget=frames_per_buffer / samplerate,
+            samplerate=samplerate
+        )
+
+    # === リアルタイムモードの音声区間(アクティビティ)判定 ===
+    activity_gate = None
+    activity_stages = []
+    if selected_mode == 1 and activity_gating:
+        # 雑音レベル推定値 & ハングオーバーをバッファ間で保持するため、ワーカー数1のスレッドで実行する
+        activity_gate = ActivityGate(samplerate)
+        activity_stages = [PipelineStage("activity", partial(stage_activity, gate=activity_gate))]
 
-        # === レコーディング音声のwavファイル保存 ===
-        save_audio_to_wav_file(samplerate, data_normalized)
+    # === 時間領域波形 & メル周波数ケプストラムプロット パイプライン構成 ===
+    # 音声取得 → 時間領域波形データ生成 → 周波数特性データ生成 → 基本周波数 時系列データ生成
+    # → ケプストラムデータ生成 → メルスケールスペクトル包絡 & MFCCデータ生成 → グラフ表示
+    # (各ステージは個別スレッドで実行し、グラフ表示中も次フレームの音声取得/解析を継続する)
+    # キーボードインタラプトあるまで(レコーディングモードの場合は指定テイク数の録音完了まで)処理継続
+    pipeline = Pipeline(
+        source=partial(
+            gen_audio_stream_source, stream, capture_frames_per_buffer, capture_samplerate, time,
+            recording_take_count
+        ),
+        stages=[
+            *resample_stages,
+            PipelineStage("normalize", partial(stage_normalize, samplerate=samplerate)),
+            *activity_stages,
+            PipelineStage(
+                "freq_domain",
+                partial(stage_freq_domain, samplerate=samplerate, dbref=dbref, A=A),
+                executor=stage_executor
+            ),
+            PipelineStage("f0", partial(stage_f0, samplerate=samplerate), executor=stage_executor),
+            PipelineStage(
+                "cepstrum",
+                partial(stage_cepstrum, samplerate=samplerate, dbref=dbref),
+                executor=stage_executor
+            ),
+            PipelineStage(
+                "mel",
+                partial(
+                    stage_mel,
+                    samplerate=samplerate,
+                    mel_filter_number=mel_filter_number,
+                    mfcc_dim=mfcc_dim,
+                    dbref=dbref
+                ),
+                executor=stage_executor
+            )
+        ],
+        sink=plot_sink,
+        latency_monitor=latency_monitor,
+        quality_controller=quality_controller,
+        profiling_hooks=profiling_hooks
+    )
+    pipeline.run()
+    pipeline.print_stats()
+    if resampler is not None:
+        resampler.print_stats()
+    latency_monitor.print_stats()
+    if quality_controller is not None:
+        quality_controller.print_stats()
+    if activity_gate is not None:
+        activity_gate.print_stats()
+    if latency_export_prefix is not None:
+        latency_monitor.export_json(latency_export_prefix + ".json")
+        latency_monitor.export_csv(latency_export_prefix + ".csv")
 
-        # === グラフ保存 ===
-        save_matplot_graph(filename_prefix)
+    if selected_mode == 0:
+        # レコーディングモードの場合、バックグラウンドで実行中の音声およびグラフの保存完了を待つ
+        saved_filenames = save_service.shutdown()
+        print("Saved Files = ", saved_filenames, "\n")
 
     # === Microphone入力音声ストリーム停止 ===
     audio_stream_stop(pa, stream)
@@ -1,17 +1,30 @@
-from modules.audio_signal_processing_advanced import overlap, window
-from modules.audio_stream import audio_stream_start, audio_stream_stop
-from modules.gen_freq_domain_data import (
-    gen_freq_domain_data_of_signal_spctrgrm, gen_freq_domain_data_of_stft,
-    gen_fundamental_freq_data)
-from modules.gen_time_domain_data import gen_time_domain_data
+from functools import partial
+
+from modules.activity_gate import ActivityGate
+from modules.audio_stream import (audio_stream_start, audio_stream_stop,
+                                  get_capture_samplerate)
+from modules.gen_time_domain_data import gen_audio_stream_source
 from modules.get_mic_index import get_mic_index
 from modules.get_std_input import (get_selected_mic_index_by_std_input,
                                    get_selected_mode_by_std_input)
+from modules.latency_monitor import LatencyMonitor
+from modules.pipeline import Pipeline, PipelineStage, PipelineStop
+from modules.octave_band_analyzer import OctaveBandAnalyzer
+from modules.pipeline_stages import (stage_activity, stage_f0, stage_frame,
+                                     stage_normalize, stage_octave_band,
+                                     stage_resample, stage_signal_spctrgrm,
+                                     stage_stft)
 from modules.plot_matplot_graph import (gen_graph_figure,
                                         gen_graph_figure_for_realtime_spctrgrm,
                                         plot_time_and_spectrogram)
-from modules.save_audio_to_wav_file import save_audio_to_wav_file
-from modules.save_matplot_graph import save_matplot_graph
+from modules.profiling_hooks import setup_profiling_hooks
+from modules.quality_controller import AdaptiveQualityController
+from modules.realtime_spctrgrm_renderer import RealtimeSpctrgrmRenderer
+from modules.shared_memory_renderer import SpctrgrmRendererProcess
+from modules.waterfall_spctrgrm import gen_waterfall_spctrgrm
+from modules.save_service import SaveService
+from modules.stream_resampler import (StreamResampler,
+                                      gen_capture_frames_per_buffer)
 
 if __name__ == '__main__':
     # =================
@@ -23,7 +36,7 @@ if __name__ == '__main__':
     # (標準入力にて変更可能とする)
     print("")
     print("=================================================================")
-    print("  [ Please INPUT MODE type ] (1/2)")
+    print("  [ Please INPUT MODE type ] (1/3)")
     print("")
     print("  0 : Recording MODE")
     print("  1 : Real-Time MODE")
@@ -41,7 +54,7 @@ if __name__ == '__main__':
     # (標準入力にて変更可能とする)
     print("")
     print("=================================================================")
-    print("  [ Please INPUT Spectrogram Mode ] (2/2)")
+    print("  [ Please INPUT Spectrogram Mode ] (2/3)")
     print("")
     print("  0 : Use scipy.signal.spectrogram Function")
     print("  1 : Use Full Scratch STFT Function")
@@ -55,6 +68,31 @@ if __name__ == '__main__':
         spctrgrm_mode_name = "'Full Scratch STFT Function Mode'"
     print("\n - Selected Spectrogram Mode = ", spctrgrm_mode_name, " - \n")
 
+    # リアルタイム表示モード
+    # (0:バッファ毎のスペクトログラム表示 / 1:ウォーターフォール表示 / 2:別プロセスでのバッファ毎のスペクトログラム表示)
+    # (リアルタイムモードの場合のみ、標準入力にて変更可能とする)
+    if selected_mode == 1:
+        print("")
+        print("=================================================================")
+        print("  [ Please INPUT Real-Time Display Mode ] (3/3)")
+        print("")
+        print("  0 : Spectrogram of Each Buffer")
+        print("  1 : Scrolling Waterfall Spectrogram")
+        print("  2 : Spectrogram of Each Buffer (Separate Renderer Process)")
+        print("=================================================================")
+        print("")
+        display_mode = get_selected_mode_by_std_input(mode_count=3)
+
+        if display_mode == 0:
+            display_mode_name = "'Spectrogram of Each Buffer Mode'"
+        elif display_mode == 1:
+            display_mode_name = "'Scrolling Waterfall Spectrogram Mode'"
+        else:
+            display_mode_name = "'Separate Renderer Process Mode'"
+        print("\n - Selected Real-Time Display Mode = ", display_mode_name, " - \n")
+    else:
+        display_mode = 0
+
     # マイクモード (1:モノラル / 2:ステレオ)
     mic_mode = 1
 
@@ -107,6 +145,48 @@ if __name__ == '__main__':
     # 使用する窓関数 ("hann" : Hanning窓)
     window_func = "hann"
 
+    # ウォーターフォール表示の履歴時間長[s]
+    waterfall_history_time = 10
+
+    # レコーディングモードのテイク数
+    # (前テイクの音声/グラフ保存をバックグラウンドで行いながら、次テイクの録音を継続する)
+    recording_take_count = 1
+
+    # 解析ステージの実行方式 ("thread":スレッド / "process":プロセス)
+    stage_executor = "thread"
+
+    # リアルタイムモードの適応品質制御の有効(True)/無効(False)設定
+    # (処理時間が1バッファ分の音声の時間長を超過する場合に、解析の品質を自動的に下げる)
+    adaptive_quality = True
+
+    # リアルタイムモードの音声区間(アクティビティ)判定の有効(True)/無効(False)設定
+    # (無音 / 定常雑音のバッファでは基本周波数の解析を省略し、該当グラフは空白(基本周波数は0[Hz])で表示する)
+    activity_gating = True
+
+    # 入力デバイスのネイティブサンプリング周波数で取得し、解析用サンプリング周波数(samplerate)に変換する(True)/しない(False)設定
+    # (Falseの場合も、デバイスがsamplerateに非対応の場合はネイティブサンプリング周波数で取得して変換する)
+    capture_at_native_rate = False
+    # サンプリング周波数変換の品質プリセット ("QQ"/"LQ"/"MQ"/"HQ"/"VHQ" / 後方ほど高品質・高負荷)
+    resample_quality = "HQ"
+
+    # オクターブバンド分析の帯域分割 (None:分析無し / 1:オクターブバンド / 3:1/3オクターブバンド)
+    # (スペクトログラムと並行して帯域毎の等価騒音レベル(Leq)をoctave_band_leq_interval[s]毎に算出し、終了時に表示する)
+    octave_band_fraction = None
+    octave_band_leq_interval = 1.0
+
+    # プロファイリング(cProfile / tracemalloc / サンプリング)対象のイテレーション数
+    # (0の場合は、環境変数 AUDIO_SP_PROFILE 指定時 または SIGUSR1受信時のみプロファイリング)
+    # (レポートは profile/<日時>/ に出力)
+    profiling_iterations = 0
+
+    # 処理時間(レイテンシ)計測結果の出力ファイル名プレフィックス
+    # (Noneの場合はファイル出力無し / 指定時は<プレフィックス>.json & <プレフィックス>.csvを出力)
+    latency_export_prefix = None
+
+    # 録音音声の保存形式 ("WAV" / "FLAC") / サブタイプ ("PCM_16":16bit整数 (量子化データをそのまま保存))
+    audio_format = "WAV"
+    audio_subtype = "PCM_16"
+
     # グラフ保存時のファイル名プレフィックス
     filename_prefix = "time-waveform_and_spectrogram_"
     # ------------------------
@@ -132,6 +212,31 @@ if __name__ == '__main__':
         # spctrgrm_fig  : スペクトログラム向けmatplotlib Axesインスタンス
         # f0_fig        : 基本周波数 時系列波形向けmatplotlib Axesインスタンス
 
+    elif display_mode == 1:
+        # === リアルタイムモード(ウォーターフォール表示)の場合 ===
+        fig, renderer = gen_waterfall_spctrgrm(
+            spctrgrm_mode,
+            frames_per_buffer / samplerate,
+            waterfall_history_time,
+            freq_range,
+            dbref,
+            A
+        )
+        wave_fig = 0    # 未使用変数の初期化
+        # fig           : 生成したmatplotlib figureインスタンス
+        # renderer      : ウォーターフォールスペクトログラム描画クラスインスタンス
+        #                 (新規STFT列を画像リングバッファに書き込み、スクロール表示する)
+
+    elif display_mode == 2:
+        # === リアルタイムモード(別プロセス描画)の場合 ===
+        # (グラフ領域は描画プロセス内で作成し、当該プロセスでは共有メモリへの書込のみを行う)
+        renderer = SpctrgrmRendererProcess(
+            spctrgrm_mode, time_range, freq_range, dbref, A
+        )
+        wave_fig = 0    # 未使用変数の初期化
+        # renderer      : 別プロセス リアルタイムスペクトログラム描画管理クラスインスタンス
+        #                 (最新フレームを共有メモリダブルバッファ経由で描画プロセスに渡す)
+
     else:
         # === リアルタイムモードの場合 ===
         fig, spctrgrm_fig, cbar_fig, f0_fig = gen_graph_figure_for_realtime_spctrgrm(
@@ -143,109 +248,231 @@ if __name__ == '__main__':
         # cbar_fig      : スペクトログラムカラーバー向けmatplotlib Axesインスタンス
         # f0_fig        : 基本周波数 時系列波形向けmatplotlib Axesインスタンス
 
+        # リアルタイム描画クラスの生成
+        # (Artistを初回のみ生成し、以降はデータ差し替え & Blittingにより描画を更新する)
+        renderer = RealtimeSpctrgrmRenderer(
+            fig, spctrgrm_fig, cbar_fig, f0_fig, time_range, freq_range, dbref, A
+        )
+
+    # === 音声 & グラフ バックグラウンド保存サービス生成 ===
+    save_service = SaveService(audio_format=audio_format, audio_subtype=audio_subtype)
+
+    # === 入力音声ストリーム取得時のサンプリング周波数決定 ===
+    # (解析用サンプリング周波数と異なる場合は、取得したバッファ毎にパイプライン内で変換する)
+    capture_samplerate = get_capture_samplerate(selected_index, mic_mode, samplerate, capture_at_native_rate)
+    capture_frames_per_buffer = gen_capture_frames_per_buffer(frames_per_buffer, capture_samplerate, samplerate)
+    print("Capture Sampling Frequency[Hz] = ", capture_samplerate, "\n")
+
+    resampler = None
+    resample_stages = []
+    if capture_samplerate != samplerate:
+        # フィルタ状態をバッファ間で保持するため、ワーカー数1のスレッドで実行する
+        # (レコーディングモードの場合は1テイク = 1フレームのため、フレーム毎にフィルタ状態を初期化する)
+        resampler = StreamResampler(capture_samplerate, samplerate, mic_mode, resample_quality)
+        resample_stages = [
+            PipelineStage("resample", partial(stage_resample, resampler=resampler, last=selected_mode == 0))
+        ]
+
+    # === オクターブ / 1/3オクターブバンド分析ステージ ===
+    # (マルチレートIIRフィルタバンクの状態をバッファ間で保持するため、ワーカー数1のスレッドで実行する)
+    octave_band_analyzer = None
+    octave_band_stages = []
+    if octave_band_fraction is not None:
+        octave_band_analyzer = OctaveBandAnalyzer(
+            samplerate,
+            fraction=octave_band_fraction,
+            dbref=dbref,
+            A=A,
+            leq_interval=octave_band_leq_interval,
+            channels=mic_mode
+        )
+        octave_band_stages = [
+            PipelineStage("octave_band", partial(stage_octave_band, analyzer=octave_band_analyzer))
+        ]
+
     # === Microphone入力音声ストリーム生成 ===
     pa, stream = audio_stream_start(
-        selected_index, mic_mode, samplerate, frames_per_buffer)
+        selected_index, mic_mode, capture_samplerate, capture_frames_per_buffer)
     # pa        : 生成したpyaudio.PyAudioクラスオブジェクト
     #             (pyaudio.PyAudio object)
     # stream    : 生成したpyaudio.PyAudio.Streamオブジェクト
     #             (pyaudio.PyAudio.Stream object)
 
-    # === 時間領域波形 & スペクトログラムプロット ===
-    # キーボードインタラプトあるまでループ処理継続
-    while True:
-        try:
-            # === 時間領域波形データ生成 ===
-            data_normalized, time_normalized = gen_time_domain_data(
-                stream, frames_per_buffer, samplerate, time
-            )
-            # data_normalized : 時間領域波形データ(正規化済)
-            # time_normalized : 時間領域波形データ(正規化済)に対応した時間軸データ
-
-            # === スペクトログラムデータ算出 ===
-            if spctrgrm_mode == 0:
-
-                # ================================================
-                # === scipy.signal.spectrogram()を使用する場合 ===
-                # ================================================
-
-                freq_spctrgrm, time_spctrgrm, spectrogram = gen_freq_domain_data_of_signal_spctrgrm(
-                    data_normalized, samplerate, stft_frame_size, overlap_rate, window_func, dbref, A)
-                # freq_spctrgrm         : スペクトログラム y軸向けデータ[Hz]
-                # time_spctrgrm         : スペクトログラム x軸向けデータ[s]
-                # spectrogram           : スペクトログラム 振幅データ
-
-            else:
-
-                # ==================================
-                # === 自作STFT関数を使用する場合 ===
-                # ==================================
-
-                # オーバーラップ処理の実行
-                data_overlaped, N_ave, final_time = overlap(
-                    data_normalized, samplerate, stft_frame_size, overlap_rate
-                )
-                # data_overlaped    : オーバーラップ抽出された時間領域波形配列(正規化済)
-                # N_ave             : オーバーラップ処理における切り出しフレーム数
-                # final_time        : オーバーラップ処理で切り出したデータの最終時刻[s]
-
-                # 窓関数の適用
-                data_applied_window, acf = window(
-                    data_overlaped, stft_frame_size, N_ave, window_func
-                )
-                # data_applied_window   : 時間領域 波形データ(正規化/オーバーラップ処理/hanning窓関数適用済)
-                # acf                   : 振幅補正係数(Amplitude Correction Factor)
-
-                # STFT(Short-Time Fourier Transform)の実行
-                freq_spctrgrm, time_spctrgrm, spectrogram = gen_freq_domain_data_of_stft(
-                    data_applied_window, samplerate, stft_frame_size, N_ave, final_time, acf, dbref, A)
-                # freq_spctrgrm         : スペクトログラム y軸向けデータ[Hz]
-                # time_spctrgrm         : スペクトログラム x軸向けデータ[s]
-                # spectrogram           : スペクトログラム 振幅データ
-
-            # === 基本周波数 時系列データ生成 ===
-            f0, time_f0 = gen_fundamental_freq_data(data_normalized, samplerate)
-            # f0        : 基本周波数 時系列データ 1次元配列
-            # time_f0   : 基本周波数 時系列データに対応した時間軸データ 1次元配列
-
-            # === グラフ表示 ===
+    # === グラフ表示 & 保存シンク ===
+    def plot_sink(frame):
+        global fig, wave_fig, spctrgrm_fig, f0_fig
+
+        # 解析ステージの実行/省略を集計 (音声区間判定の有効時)
+        if activity_gate is not None:
+            activity_gate.account(frame)
+
+        # === グラフ表示 ===
+        if selected_mode == 0:
             plot_time_and_spectrogram(
                 fig,
                 wave_fig,
                 spctrgrm_fig,
                 cbar_fig,
                 f0_fig,
-                data_normalized,
-                time_normalized,
+                frame["data_normalized"],
+                frame["time_normalized"],
                 time_range,
-                freq_spctrgrm,
-                time_spctrgrm,
-                spectrogram,
+                frame["freq_spctrgrm"],
+                frame["time_spctrgrm"],
+                frame["spectrogram"],
                 freq_range,
-                f0,
-                time_f0,
+                frame["f0"],
+                frame["time_f0"],
                 dbref,
                 A,
                 selected_mode,
                 spctrgrm_mode
             )
 
-            if selected_mode == 0:
-                # レコーディングモードの場合、While処理を1回で抜ける
-                break
+            # レコーディングモードの場合、音声およびグラフの保存をバックグラウンドで開始する
+            save_service.submit_take(
+                samplerate, frame["audio_discrete_data"], fig, filename_prefix, channels=mic_mode
+            )
+
+            # 次テイク向けのグラフ領域を作成
+            if frame["index"] + 1 < recording_take_count:
+                fig, wave_fig, spctrgrm_fig, f0_fig = gen_graph_figure(graph_type)
+
+        else:
+            # リアルタイムモードの場合、描画済Artistのデータ差し替えのみを実施
+            renderer.update(
+                frame["freq_spctrgrm"],
+                frame["time_spctrgrm"],
+                frame["spectrogram"],
+                frame["f0"],
+                frame["time_f0"]
+            )
 
-        except KeyboardInterrupt:
-            # 「ctrl+c」が押下された場合、While処理を抜ける
-            break
+            if not renderer.is_open:
+                # グラフウィンドウが閉じられた場合、パイプラインを停止する
+                raise PipelineStop()
+
+    # === スペクトログラムデータ算出ステージ ===
+    if spctrgrm_mode == 0:
+        # === scipy.signal.spectrogram()を使用する場合 ===
+        spctrgrm_stages = [
+            PipelineStage(
+                "spctrgrm",
+                partial(
+                    stage_signal_spctrgrm,
+                    samplerate=samplerate,
+                    stft_frame_size=stft_frame_size,
+                    overlap_rate=overlap_rate,
+                    window_func=window_func,
+                    dbref=dbref,
+                    A=A
+                ),
+                executor=stage_executor
+            )
+        ]
+    else:
+        # === 自作STFT関数を使用する場合 ===
+        # (オーバーラップ & 窓関数適用 → STFT(Short-Time Fourier Transform)の実行)
+        spctrgrm_stages = [
+            PipelineStage(
+                "frame",
+                partial(
+                    stage_frame,
+                    samplerate=samplerate,
+                    stft_frame_size=stft_frame_size,
+                    overlap_rate=overlap_rate,
+                    window_func=window_func
+                ),
+                executor=stage_executor
+            ),
+            PipelineStage(
+                "stft",
+                partial(
+                    stage_stft,
+                    samplerate=samplerate,
+                    stft_frame_size=stft_frame_size,
+                    dbref=dbref,
+                    A=A
+                ),
+                executor=stage_executor
+            )
+        ]
+
+    # === 各ステージの処理時間(レイテンシ)計測 ===
+    # (処理時間予算[s] = 1バッファ分の音声の時間長)
+    latency_monitor = LatencyMonitor(budget=frames_per_buffer / samplerate)
+
+    # === プロファイリング設定 (フラグ指定時は起動直後から / SIGUSR1受信時はその時点から計測) ===
+    profiling_hooks = setup_profiling_hooks(profiling_iterations)
+
+    # === リアルタイムモードの適応品質制御 ===
+    quality_controller = None
+    if selected_mode == 1 and adaptive_quality:
+        quality_controller = AdaptiveQualityController(
+            budget=frames_per_buffer / samplerate,
+            samplerate=samplerate,
+            stft_frame_size=stft_frame_size,
+            overlap_rate=overlap_rate
+        )
+
+    # === リアルタイムモードの音声区間(アクティビティ)判定 ===
+    activity_gate = None
+    activity_stages = []
+    if selected_mode == 1 and activity_gating:
+        # 雑音レベル推定値 & ハングオーバーをバッファ間で保持するため、ワーカー数1のスレッドで実行する
+        activity_gate = ActivityGate(samplerate)
+        activity_stages = [PipelineStage("activity", partial(stage_activity, gate=activity_gate))]
+
+    # === 時間領域波形 & スペクトログラムプロット パイプライン構成 ===
+    # 音声取得 → 時間領域波形データ生成 → スペクトログラムデータ算出 → 基本周波数 時系列データ生成
+    # → グラフ表示
+    # (各ステージは個別スレッドで実行し、グラフ表示中も次フレームの音声取得/解析を継続する)
+    # キーボードインタラプトあるまで(レコーディングモードの場合は指定テイク数の録音完了まで)処理継続
+    pipeline = Pipeline(
+        source=partial(
+            gen_audio_stream_source, stream, capture_frames_per_buffer, capture_samplerate, time,
+            recording_take_count
+        ),
+        stages=[
+            *resample_stages,
+            *octave_band_stages,
+            PipelineStage("normalize", partial(stage_normalize, samplerate=samplerate)),
+            *activity_stages,
+            *spctrgrm_stages,
+            PipelineStage("f0", partial(stage_f0, samplerate=samplerate), executor=stage_executor)
+        ],
+        sink=plot_sink,
+        latency_monitor=latency_monitor,
+        quality_controller=quality_controller,
+        profiling_hooks=profiling_hooks
+    )
+    pipeline.run()
+    pipeline.print_stats()
+    if resampler is not None:
+        resampler.print_stats()
+    if octave_band_analyzer is not None:
+        octave_band_analyzer.print_stats()
+    latency_monitor.print_stats()
+    if quality_controller is not None:
+        quality_controller.print_stats()
+    if activity_gate is not None:
+        activity_gate.print_stats()
+    if latency_export_prefix is not None:
+        latency_monitor.export_json(latency_export_prefix + ".json")
+        latency_monitor.export_csv(latency_export_prefix + ".csv")
 
     if selected_mode == 0:
-        # レコーディングモードの場合、音声およびグラフを保存する
+        # レコーディングモードの場合、バックグラウンドで実行中の音声およびグラフの保存完了を待つ
+        saved_filenames = save_service.shutdown()
+        print("Saved Files = ", saved_filenames, "\n")
 
-        # === レコーディング音声のwavファイル保存 ===
-        save_audio_to_wav_file(samplerate, data_normalized)
+    else:
+        # リアルタイムモードの場合、平均描画フレームレートを表示する
+        print("\nRealtime Rendering Average FPS = ", round(renderer.fps_average, 1), "\n")
 
-        # === グラフ保存 ===
-        save_matplot_graph(filename_prefix)
+        if display_mode == 2:
+            # 描画プロセスの停止 & 共有メモリの解放
+            renderer.close()
 
     # === Microphone入力音声ストリーム停止 ===
     audio_stream_stop(pa, stream)
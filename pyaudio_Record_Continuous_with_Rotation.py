@@ -0,0 +1,111 @@
+# ==============================================================
+# === Continuous Recording with Segment Rotation & Retention ===
+# ==============================================================
+# (実行例)
+#   python pyaudio_Record_Continuous_with_Rotation.py --segment-time 600 --max-files 144
+#   python pyaudio_Record_Continuous_with_Rotation.py --index 1 --format FLAC --segment-mb 50 --max-gb 20
+import argparse
+import datetime
+
+from modules.audio_stream import (audio_stream_start, audio_stream_stop,
+                                  gen_discrete_data_from_audio_stream)
+from modules.get_mic_index import get_mic_index
+from modules.get_std_input import get_selected_mic_index_by_std_input
+from modules.rotating_recorder import RotatingRecorder
+
+if __name__ == '__main__':
+    # =================
+    # === Main Code ===
+    # =================
+
+    # --- Parameters ---
+    parser = argparse.ArgumentParser(
+        description="Records microphone input continuously into gapless fixed-duration/fixed-size segment files "
+                    "with a retention policy and a JSON Lines manifest."
+    )
+    parser.add_argument("--index", type=int, default=None, help="microphone device index (default: select by stdin)")
+    parser.add_argument("--samplerate", type=int, default=16000, help="sampling frequency [Hz] (default: 16000)")
+    parser.add_argument("--channels", type=int, choices=[1, 2], default=1, help="1: mono / 2: stereo (default: 1)")
+    parser.add_argument("--frames-per-buffer", type=int, default=1024, help="frames per input buffer (default: 1024)")
+    parser.add_argument("--output-dir", default="wav/continuous", help="segment output directory (default: wav/continuous)")
+    parser.add_argument("--segment-time", type=float, default=600.0, help="segment duration [s] (default: 600)")
+    parser.add_argument(
+        "--segment-mb", type=float, default=None,
+        help="segment PCM data size [MiB] (overrides --segment-time)"
+    )
+    parser.add_argument("--max-files", type=int, default=None, help="max retained segments (default: unlimited)")
+    parser.add_argument("--max-gb", type=float, default=None, help="max retained total size [GiB] (default: unlimited)")
+    parser.add_argument("--format", choices=["WAV", "FLAC"], default="WAV", help="segment file format (default: WAV)")
+    parser.add_argument("--subtype", default="PCM_16", help="segment file subtype (default: PCM_16)")
+    parser.add_argument(
+        "--duration", type=float, default=0,
+        help="recording duration [s] (default: 0 = until ctrl+c)"
+    )
+    args = parser.parse_args()
+    # ------------------------
+
+    # === マイクチャンネルを自動取得 ===
+    # (未指定の場合は、標準入力にて選択可能とする)
+    if args.index is None:
+        print("=================================================================")
+        print("  [ Please Select Microphone index ]")
+        print("=================================================================")
+        print("")
+        mic_list = get_mic_index()
+        selected_index = get_selected_mic_index_by_std_input(mic_list)
+    else:
+        selected_index = args.index
+    print("\nUse Microphone Index :", selected_index, "\n")
+
+    # === 連続録音 セグメント分割クラスの生成 ===
+    recorder = RotatingRecorder(
+        args.samplerate,
+        channels=args.channels,
+        output_dir=args.output_dir,
+        segment_time=args.segment_time,
+        segment_bytes=int(args.segment_mb * 1024 * 1024) if args.segment_mb is not None else None,
+        max_files=args.max_files,
+        max_bytes=int(args.max_gb * 1024 * 1024 * 1024) if args.max_gb is not None else None,
+        audio_format=args.format,
+        subtype=args.subtype
+    )
+    print(
+        "Segment Length = ", round(recorder.segment_frames / args.samplerate, 1), "[s]",
+        "(", recorder.segment_frames, "frames )\n"
+    )
+
+    # === Microphone入力音声ストリーム生成 ===
+    pa, stream = audio_stream_start(selected_index, args.channels, args.samplerate, args.frames_per_buffer)
+
+    # === 連続録音 ===
+    # キャプチャ(当該スレッド)はバッファの取得と書込キューへの投入のみを行い、
+    # ファイル書込 / セグメントのローテーション / 保持ポリシーによる削除は書込スレッドで行う
+    # キーボードインタラプトあるまで(指定時は録音時間経過まで)処理継続
+    max_buffers = int(args.duration * args.samplerate / args.frames_per_buffer) if args.duration > 0 else None
+    buffer_count = 0
+    print("Recording ... (ctrl+c to stop)\n")
+    try:
+        with recorder:
+            while max_buffers is None or buffer_count < max_buffers:
+                audio_discrete_data = gen_discrete_data_from_audio_stream(stream, args.frames_per_buffer)
+                if buffer_count == 0:
+                    # 録音開始時刻 = 初回バッファの取得開始時刻 (以降のセグメント開始時刻はサンプル数から算出)
+                    recorder.write(
+                        audio_discrete_data,
+                        datetime.datetime.now().timestamp() - args.frames_per_buffer / args.samplerate
+                    )
+                else:
+                    recorder.write(audio_discrete_data)
+                buffer_count += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # === Microphone入力音声ストリーム停止 ===
+        audio_stream_stop(pa, stream)
+
+    recorder.print_stats()
+    print("Manifest = ", recorder.manifest_filename, "\n")
+
+    print("=================")
+    print("= Main Code END =")
+    print("=================\n")
@@ -0,0 +1,135 @@
+# ==============================================================
+# === Event-Triggered Recording with Pre-Trigger Ring Buffer ===
+# ==============================================================
+# (実行例)
+#   python pyaudio_Record_Events_with_Pre-Trigger.py --level 65 --pre 5 --post 5 --spectrogram
+#   python pyaudio_Record_Events_with_Pre-Trigger.py --index 1 --band 2000 4000 50 --f0 80 400 0.5 --format FLAC
+import argparse
+import datetime
+
+from modules.audio_stream import (audio_stream_start, audio_stream_stop,
+                                  gen_discrete_data_from_audio_stream)
+from modules.event_recorder import EventRecorder, F0Trigger, LevelTrigger
+from modules.get_mic_index import get_mic_index
+from modules.get_std_input import get_selected_mic_index_by_std_input
+from modules.save_service import SaveService
+
+if __name__ == '__main__':
+    # =================
+    # === Main Code ===
+    # =================
+
+    # --- Parameters ---
+    parser = argparse.ArgumentParser(
+        description="Keeps the last N seconds of microphone input in a ring buffer and saves pre-trigger + "
+                    "post-trigger audio (and optionally its spectrogram) when a level, band energy or F0 "
+                    "condition triggers."
+    )
+    parser.add_argument("--index", type=int, default=None, help="microphone device index (default: select by stdin)")
+    parser.add_argument("--samplerate", type=int, default=16000, help="sampling frequency [Hz] (default: 16000)")
+    parser.add_argument("--channels", type=int, choices=[1, 2], default=1, help="1: mono / 2: stereo (default: 1)")
+    parser.add_argument("--frames-per-buffer", type=int, default=1024, help="frames per input buffer (default: 1024)")
+    parser.add_argument(
+        "--level", type=float, default=None,
+        help="trigger level [dB] (dB SPL(A) with --dbref 2e-5 / dB FS with --dbref 0) (default: 60 if no trigger given)"
+    )
+    parser.add_argument(
+        "--band", type=float, nargs=3, action="append", default=[], metavar=("LOW", "HIGH", "DB"),
+        help="trigger on band level [dB] within LOW-HIGH [Hz] (repeatable)"
+    )
+    parser.add_argument(
+        "--f0", type=float, nargs=3, default=None, metavar=("MIN", "MAX", "RATIO"),
+        help="trigger when the F0 is within MIN-MAX [Hz] for RATIO of the buffer"
+    )
+    parser.add_argument("--dbref", type=float, default=2e-5, help="decibel reference (default: 2e-5 = dB SPL)")
+    parser.add_argument("--no-a-weighting", action="store_true", help="disable A-weighting of the level trigger")
+    parser.add_argument("--pre", type=float, default=5.0, help="pre-trigger time [s] (default: 5)")
+    parser.add_argument("--post", type=float, default=5.0, help="post-trigger time after the last trigger [s] (default: 5)")
+    parser.add_argument("--max-event", type=float, default=60.0, help="max event duration [s] (default: 60)")
+    parser.add_argument("--spectrogram", action="store_true", help="also save the spectrogram (png) of each event")
+    parser.add_argument("--output-dir", default="wav/events", help="event output directory (default: wav/events)")
+    parser.add_argument("--format", choices=["WAV", "FLAC"], default="WAV", help="event file format (default: WAV)")
+    parser.add_argument(
+        "--duration", type=float, default=0,
+        help="monitoring duration [s] (default: 0 = until ctrl+c)"
+    )
+    args = parser.parse_args()
+
+    # 聴感補正(A特性)の有効(True)/無効(False)設定
+    A = not args.no_a_weighting
+    # ------------------------
+
+    # === トリガー条件 (いずれかを満たした場合にトリガー) ===
+    triggers = []
+    if args.level is not None or (not args.band and args.f0 is None):
+        triggers.append(LevelTrigger(args.level if args.level is not None else 60, dbref=args.dbref, A=A))
+    for low, high, threshold in args.band:
+        triggers.append(LevelTrigger(threshold, dbref=args.dbref, A=A, band=(low, high)))
+    if args.f0 is not None:
+        triggers.append(F0Trigger(args.f0[0], args.f0[1], args.f0[2]))
+
+    # === マイクチャンネルを自動取得 ===
+    # (未指定の場合は、標準入力にて選択可能とする)
+    if args.index is None:
+        print("=================================================================")
+        print("  [ Please Select Microphone index ]")
+        print("=================================================================")
+        print("")
+        mic_list = get_mic_index()
+        selected_index = get_selected_mic_index_by_std_input(mic_list)
+    else:
+        selected_index = args.index
+    print("\nUse Microphone Index :", selected_index, "\n")
+
+    # === 音声 & グラフ バックグラウンド保存サービス / イベント録音クラスの生成 ===
+    save_service = SaveService(audio_format=args.format)
+    recorder = EventRecorder(
+        args.samplerate,
+        triggers,
+        save_service,
+        channels=args.channels,
+        pre_trigger_time=args.pre,
+        post_trigger_time=args.post,
+        max_event_time=args.max_event,
+        save_spectrogram=args.spectrogram,
+        dbref=args.dbref,
+        A=A,
+        output_dir=args.output_dir
+    )
+
+    # === Microphone入力音声ストリーム生成 ===
+    pa, stream = audio_stream_start(selected_index, args.channels, args.samplerate, args.frames_per_buffer)
+
+    # === イベント録音 ===
+    # バッファ毎にトリガー判定を行い、イベント区間の音声のみをバックグラウンドで保存する
+    # キーボードインタラプトあるまで(指定時は監視時間経過まで)処理継続
+    max_buffers = int(args.duration * args.samplerate / args.frames_per_buffer) if args.duration > 0 else None
+    buffer_count = 0
+    print("Monitoring ... (ctrl+c to stop)\n")
+    try:
+        while max_buffers is None or buffer_count < max_buffers:
+            audio_discrete_data = gen_discrete_data_from_audio_stream(stream, args.frames_per_buffer)
+            if buffer_count == 0:
+                # 録音開始時刻 = 初回バッファの取得開始時刻 (以降のイベント時刻はサンプル数から算出)
+                recorder.process(
+                    audio_discrete_data,
+                    datetime.datetime.now().timestamp() - args.frames_per_buffer / args.samplerate
+                )
+            else:
+                recorder.process(audio_discrete_data)
+            buffer_count += 1
+    except KeyboardInterrupt:
+        pass
+    finally:
+        # === Microphone入力音声ストリーム停止 ===
+        audio_stream_stop(pa, stream)
+
+    # 録音中のイベントを保存し、バックグラウンドで実行中の保存完了を待つ
+    recorder.flush()
+    saved_filenames = save_service.shutdown()
+    recorder.print_stats()
+    print("Saved Files = ", saved_filenames, "\n")
+
+    print("=================")
+    print("= Main Code END =")
+    print("=================\n")
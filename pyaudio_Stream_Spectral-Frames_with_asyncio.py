@@ -0,0 +1,90 @@
+import asyncio
+from contextlib import aclosing
+
+import numpy as np
+
+from modules.async_spectral_analyzer import AsyncSpectralAnalyzer
+from modules.get_mic_index import get_mic_index
+from modules.get_std_input import get_selected_mic_index_by_std_input
+
+
+async def print_spectral_frames(analyzer, frame_count):
+    # ==================================================
+    # === スペクトル特徴量フレーム 標準出力表示関数 ===
+    # ==================================================
+    # analyzer      : AsyncSpectralAnalyzerクラスインスタンス
+    # frame_count   : 表示するフレーム数 ("0"の場合は、キーボードインタラプトあるまで継続)
+
+    # aclosing()により、break時も即座にframes()を終了して音声ストリームを停止する
+    async with aclosing(analyzer.frames()) as frames:
+        async for frame in frames:
+            # 有声区間(F0 > 0)の平均基本周波数
+            voiced_f0 = frame["f0"][frame["f0"] > 0]
+            f0_mean = np.mean(voiced_f0) if len(voiced_f0) > 0 else 0
+
+            print(
+                "Frame[", frame["index"], "]",
+                " timestamp = ", round(frame["timestamp"], 3),
+                " / spectrogram.shape = ", frame["spectrogram"].shape,
+                " / F0 mean[Hz] = ", round(f0_mean, 1),
+                " / MFCC[0:3] = ", np.round(frame["mfcc_amp_normalized"][0:3], 1)
+            )
+
+            if frame_count > 0 and frame["index"] + 1 >= frame_count:
+                # 指定フレーム数の表示完了で終了
+                break
+
+
+if __name__ == '__main__':
+    # =================
+    # === Main Code ===
+    # =================
+
+    # --- Parameters ---
+    # サンプリング周波数[Hz]
+    samplerate = int(16000 / 2)
+    print("\nSampling Frequency[Hz] = ", samplerate)
+
+    # 入力音声ストリームバッファあたりのサンプリングデータ数
+    frames_per_buffer = 1024 * 8
+    print(
+        "frames_per_buffer [sampling data count/stream buffer] = ",
+        frames_per_buffer,
+        "\n"
+    )
+
+    # スペクトログラムデータ算出モード (0:scipy.signal.spectrogram()関数を使用 / 1:自作STFT関数を使用)
+    spctrgrm_mode = 0
+
+    # 表示するフレーム数 ("0"の場合は、キーボードインタラプトあるまで継続)
+    frame_count = 0
+    # ------------------------
+
+    # === マイクチャンネルを自動取得 ===
+    # (標準入力にて選択可能とする)
+    print("=================================================================")
+    print("  [ Please Select Microphone index ]")
+    print("=================================================================")
+    print("")
+    mic_list = get_mic_index()
+    selected_index = get_selected_mic_index_by_std_input(mic_list)
+    print("\nUse Microphone Index :", selected_index, "\n")
+
+    # === asyncio対応 スペクトル特徴量ストリーミングクラス生成 ===
+    analyzer = AsyncSpectralAnalyzer(
+        selected_index,
+        samplerate=samplerate,
+        frames_per_buffer=frames_per_buffer,
+        spctrgrm_mode=spctrgrm_mode
+    )
+
+    # === スペクトル特徴量フレーム表示 ===
+    # (「ctrl+c」押下時は、asyncio.runによるタスクキャンセルで音声ストリームを停止する)
+    try:
+        asyncio.run(print_spectral_frames(analyzer, frame_count))
+    except KeyboardInterrupt:
+        pass
+
+    print("=================")
+    print("= Main Code END =")
+    print("=================\n")
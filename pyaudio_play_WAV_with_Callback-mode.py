@@ -1,64 +1,61 @@
 # ========================================
 # === Play WAV File with Callback-mode ===
 # ========================================
-import sys
+import argparse
 import time
-import wave
 
-import pyaudio
-
-CHUNK = 1024
-
-if len(sys.argv) < 2:
-    print(f'Plays a wave file. Usage: {sys.argv[0]} filename.wav')
-    sys.exit(-1)
-
-with wave.open(sys.argv[1], 'rb') as wf:  # mode="rb" is read-only mode
-
-    # ====================================
-    # === Define callback for playback ===
-    # ====================================
-    def callback(in_data, frame_count, time_info, status):
-        # PyAudio will call a user-defined callback function whenever it
-        # needs new audio data to play and/or when new recorded audio data
-        # becomes available. PyAudio calls the callback function in a separate
-        # thread. The callback function must have the following signature
-        # callback(<input_data>, <frame_count>, <time_info>, <status_flag>). It
-        # must return a tuple containing frame_count frames of audio data to
-        # output (for output streams) and a flag signifying whether there are
-        # more expected frames to play or record. (For input-only streams, the
-        # audio data portion of the return value is ignored.)
-        data = wf.readframes(frame_count)
-        # If len(data) is less than requested frame_count, PyAudio
-        # automatically assumes the stream is finished, and the stream stops.
-        return (data, pyaudio.paContinue)
-
-    # === Instantiate PyAudio and initialize PortAudio system resources ===
-    p = pyaudio.PyAudio()
-
-    # === Open stream using callbac ===
-    # The audio stream starts processing once the stream is opened, which
-    # will call the callback function repeatedly until that function returns
-    # "pyaudio.paComplete" or "pyaudio.paAbort", or until either
-    # "pyaudio.PyAudio.Stream.stop" or "pyaudio.PyAudio.Stream.close" is called.
-    # Note that if the callback returns fewer frames than the frame_count
-    # argument, the stream automatically closes after those frames are played.
-    stream = p.open(format=p.get_format_from_width(wf.getsampwidth()),
-                    channels=wf.getnchannels(),
-                    rate=wf.getframerate(),
-                    output=True,
-                    stream_callback=callback)
-
-    # === Wait for stream to finish ===
-    # To keep the stream active, the main thread must remain alive, e.g., by
-    # sleeping. In the example above, once the entire wavefile is read,
-    # "wf.readframes(frame_count)" will eventually return fewer than the
-    # requested frames. The stream will stop, and the while loop will end.
-    while stream.is_active():
-        time.sleep(0.1)
-
-    # === Close stream ===
-    stream.close()
-
-    # === Release PortAudio system resources ===
-    p.terminate()
+from modules.wav_player import WavPlayer
+
+if __name__ == '__main__':
+    # =================
+    # === Main Code ===
+    # =================
+
+    # --- Parameters ---
+    parser = argparse.ArgumentParser(
+        description="Plays WAV/FLAC files with callback-mode (prefetching reader thread + ring buffer)."
+    )
+    parser.add_argument("playlist", nargs="+", help="audio files to play gaplessly (same samplerate/channels/sampwidth)")
+    parser.add_argument("--loop", action="store_true", help="repeat the playlist")
+    parser.add_argument("--seek", type=float, default=0.0, help="start position of the first file [s]")
+    parser.add_argument("--frames-per-buffer", type=int, default=1024, help="frames per output buffer (default: 1024)")
+    parser.add_argument("--buffer-time", type=float, default=2.0, help="prefetch ring buffer length [s] (default: 2.0)")
+    args = parser.parse_args()
+    # ------------------------
+
+    # === 音声ファイルのオープン ===
+    # PCM WAVファイルはメモリマップ、FLAC等はリーダースレッドで先行デコードしてリングバッファに書込む
+    # (PyAudioはコールバック関数を別スレッドから呼出すため、コールバック内ではリングバッファからのコピーのみを行い、
+    #  ディスク読込の遅延によるアンダーランを防ぐ)
+    with WavPlayer(
+        args.playlist,
+        frames_per_buffer=args.frames_per_buffer,
+        buffer_time=args.buffer_time,
+        loop=args.loop
+    ) as player:
+
+        if args.seek > 0:
+            player.seek(args.seek, track_index=0)
+
+        # === 再生開始 ===
+        # ストリームを開いた時点でコールバック関数の呼出しが開始され、
+        # プレイリスト末尾までの再生完了(ループ時は「ctrl+c」押下)まで継続する
+        player.start()
+
+        # === 再生完了待ち ===
+        # ストリームをアクティブに保つため、メインスレッドは再生完了までsleepする
+        try:
+            while player.is_active():
+                time.sleep(0.1)
+        except KeyboardInterrupt:
+            # 「ctrl+c」が押下された場合、再生を停止する
+            pass
+
+        # === ストリーム停止 & PortAudioリソース解放 ===
+        player.stop()
+
+        print("Underrun Count = ", player.underrun_count, "(", player.underrun_frames, "frames )\n")
+
+    print("=================")
+    print("= Main Code END =")
+    print("=================\n")